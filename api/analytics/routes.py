@@ -0,0 +1,70 @@
+"""
+Analytics routes for the Equipment Hire System
+Fleet utilization reports from the in-memory utilization engine
+"""
+
+from datetime import date
+from flask import Blueprint, request, jsonify
+import logging
+
+logger = logging.getLogger(__name__)
+
+analytics_bp = Blueprint('analytics', __name__)
+
+
+def _engine():
+    # NumPy is only imported once analytics is used, keeping API cold starts light
+    from .utilization_engine import utilization_engine
+    return utilization_engine
+
+
+def _date_arg(name: str):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+
+
+@analytics_bp.route('/utilization', methods=['GET'])
+def get_utilization():
+    """Booked days, idle days, utilization and revenue.
+
+    Query options: group_by=type|unit|fleet, period=month|quarter|year|all,
+    date_from / date_to (defaults: full history to today), equipment_type_id,
+    and for units limit / offset / order=asc|desc (by utilization).
+    """
+    try:
+        result = _engine().report(
+            group_by=request.args.get('group_by', 'type'),
+            period=request.args.get('period', 'month'),
+            date_from=_date_arg('date_from'),
+            date_to=_date_arg('date_to'),
+            equipment_type_id=request.args.get('equipment_type_id', type=int),
+            limit=request.args.get('limit', 100, type=int),
+            offset=request.args.get('offset', 0, type=int),
+            order=request.args.get('order', 'asc')
+        )
+        return jsonify({'success': True, 'data': result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error computing utilization: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to compute utilization'}), 500
+
+
+@analytics_bp.route('/utilization/reload', methods=['POST'])
+def reload_utilization():
+    """Reload the fleet history now instead of waiting for the next stale check"""
+    try:
+        snapshot = _engine().load()
+        return jsonify({
+            'success': True,
+            'units': snapshot.unit_count,
+            'intervals': snapshot.interval_count
+        })
+    except Exception as e:
+        logger.error(f"Error reloading utilization snapshot: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to reload utilization data'}), 500
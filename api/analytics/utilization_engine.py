@@ -0,0 +1,429 @@
+"""
+Fleet Utilization Engine
+Booked days, idle days, utilization and revenue per equipment type, unit and period over
+the full hire history. Units and allocation intervals are bulk-loaded into NumPy arrays
+once; every report is vectorized interval arithmetic over those arrays.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from database.connection import pooled_connection
+from events.event_bus import event_bus
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('month', 'quarter', 'year', 'all')
+GROUP_BY = ('type', 'unit', 'fleet')
+
+# Open-ended intervals (unit still out, unit never sold) are loaded as this and
+# closed at the report's end date
+OPEN_END = -1
+
+# Seconds a computed report is reused, and how many are kept
+CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', '300'))
+CACHE_SIZE = 64
+
+# A snapshot marked stale by change events is reloaded at most this often;
+# it is reloaded regardless once it is this old (covers missed events)
+MIN_RELOAD_INTERVAL = float(os.getenv('ANALYTICS_MIN_RELOAD_SECONDS', '60'))
+MAX_SNAPSHOT_AGE = float(os.getenv('ANALYTICS_MAX_SNAPSHOT_AGE', '900'))
+
+DEFAULT_UNIT_LIMIT = 100
+MAX_UNIT_LIMIT = 5000
+
+# Tables whose changes make the loaded snapshot stale
+WATCHED_TABLES = {
+    'interactions.interactions',
+    'interactions.interaction_equipment',
+    'interactions.interaction_equipment_generic',
+    'equipment.equipment',
+    'equipment.equipment_types'
+}
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(value: date) -> int:
+    return (value - EPOCH).days
+
+
+def from_day_number(day: int) -> date:
+    return EPOCH + timedelta(days=int(day))
+
+
+class FleetSnapshot:
+    """Column arrays for types, units and booked intervals (day numbers, end exclusive)"""
+
+    def __init__(self, type_rows: List[Tuple], unit_rows: List[Tuple], interval_rows: List[Tuple]):
+        self.type_ids = np.array([row[0] for row in type_rows], dtype=np.int64)
+        self.type_codes = [row[1] for row in type_rows]
+        self.type_names = [row[2] for row in type_rows]
+        self.daily_rates = np.array([float(row[3] or 0) for row in type_rows], dtype=np.float64)
+
+        units = np.array([(row[0], row[1], row[3], row[4]) for row in unit_rows], dtype=np.int64).reshape(-1, 4)
+        self.unit_ids = units[:, 0]
+        self.asset_codes = [row[2] for row in unit_rows]
+        self.unit_type_index = np.searchsorted(self.type_ids, units[:, 1])
+        self.fleet_from = units[:, 2].astype(np.int32)
+        self.fleet_to = units[:, 3].astype(np.int32)
+
+        intervals = np.array(interval_rows, dtype=np.int64).reshape(-1, 3)
+        unit_index = np.searchsorted(self.unit_ids, intervals[:, 0])
+        # Drop intervals for units that no longer exist
+        known = unit_index < len(self.unit_ids)
+        known[known] = self.unit_ids[unit_index[known]] == intervals[known, 0]
+        order = np.argsort(unit_index[known], kind='stable')
+        self.interval_unit = unit_index[known][order]
+        self.interval_start = intervals[known, 1][order].astype(np.int32)
+        self.interval_end = intervals[known, 2][order].astype(np.int32)
+
+        self.loaded_at = time.time()
+
+    @property
+    def unit_count(self) -> int:
+        return len(self.unit_ids)
+
+    @property
+    def interval_count(self) -> int:
+        return len(self.interval_start)
+
+    def first_day(self) -> Optional[int]:
+        starts = [array.min() for array in (self.fleet_from, self.interval_start) if len(array)]
+        return int(min(starts)) if starts else None
+
+
+def period_bounds(period: str, first_day: int, last_day: int) -> Tuple[np.ndarray, List[str]]:
+    """Period boundaries as day numbers (len = periods + 1) clipped to [first_day, last_day]"""
+    start = np.datetime64(from_day_number(first_day), 'D')
+    end = np.datetime64(from_day_number(last_day), 'D')
+
+    if period == 'all':
+        bounds = np.array([first_day, last_day + 1], dtype=np.int64)
+        return bounds, ['all']
+
+    if period == 'year':
+        starts = np.arange(start.astype('datetime64[Y]'), end.astype('datetime64[Y]') + 1)
+        labels = [str(value) for value in starts]
+    else:
+        first_month = start.astype('datetime64[M]')
+        step = 1
+        if period == 'quarter':
+            first_month -= first_month.astype(np.int64) % 3
+            step = 3
+        starts = np.arange(first_month, end.astype('datetime64[M]') + 1, step)
+        if period == 'quarter':
+            labels = [f"{str(value)[:4]}-Q{int(str(value)[5:7]) // 3 + 1}" for value in starts]
+        else:
+            labels = [str(value) for value in starts]
+
+    bounds = starts.astype('datetime64[D]').astype(np.int64)
+    bounds = np.append(bounds, last_day + 1)
+    bounds[0] = first_day
+    return bounds, labels
+
+
+def interval_days(rows: np.ndarray, starts: np.ndarray, ends: np.ndarray, bounds: np.ndarray,
+                  row_count: int) -> np.ndarray:
+    """Days of [start, end) intervals falling in each period, summed per row -> (rows x periods).
+
+    Each interval adds its partial first and last periods directly and marks the
+    whole periods in between on a difference grid, so the cost is one pass over
+    the intervals plus one over the grid however long the history is.
+    """
+    period_count = len(bounds) - 1
+    starts = np.clip(starts, bounds[0], bounds[-1])
+    ends = np.clip(ends, bounds[0], bounds[-1])
+    keep = ends > starts
+    rows, starts, ends = rows[keep], starts[keep], ends[keep]
+
+    first = np.searchsorted(bounds, starts, side='right') - 1
+    last = np.searchsorted(bounds, ends - 1, side='right') - 1
+    single = first == last
+    size = row_count * period_count
+
+    # Partial days: the whole interval when it sits in one period, else its two ends
+    cells = np.concatenate([rows * period_count + first, (rows * period_count + last)[~single]])
+    days = np.concatenate([np.where(single, ends - starts, bounds[first + 1] - starts),
+                           (ends - bounds[last])[~single]])
+    result = np.bincount(cells, weights=days, minlength=size).reshape(row_count, period_count)
+
+    # Whole periods strictly between the first and last
+    spans = ~single & (last > first + 1)
+    marks = np.concatenate([rows[spans] * (period_count + 1) + first[spans] + 1,
+                            rows[spans] * (period_count + 1) + last[spans]])
+    steps = np.concatenate([np.ones(spans.sum()), -np.ones(spans.sum())])
+    covering = np.bincount(marks, weights=steps, minlength=row_count * (period_count + 1))
+    covering = np.cumsum(covering.reshape(row_count, period_count + 1), axis=1)[:, :period_count]
+    return result + covering * np.diff(bounds)
+
+
+class FleetUtilizationEngine:
+    """Loads the fleet history once and computes utilization reports from it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[FleetSnapshot] = None
+        self._stale = False
+        self._version = 0
+        self._cache: 'OrderedDict[tuple, Tuple[float, Dict]]' = OrderedDict()
+        self._stats = {'reports': 0, 'cache_hits': 0, 'loads': 0, 'last_load_ms': None, 'last_compute_ms': None}
+        event_bus.add_handler(self.handle_change_event)
+
+    # =========================================================================
+    # LOADING
+    # =========================================================================
+
+    def load(self) -> FleetSnapshot:
+        """Bulk-load types, units and every booked interval into arrays"""
+        event_bus.start()
+        started = time.perf_counter()
+        with pooled_connection(read_only=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM sp_get_utilization_types()")
+            type_rows = cursor.fetchall()
+            cursor.execute("""
+                SELECT equipment_id, equipment_type_id, asset_code, in_fleet_from, COALESCE(in_fleet_to, %s)
+                FROM sp_get_utilization_units()
+            """, [OPEN_END])
+            unit_rows = cursor.fetchall()
+            cursor.execute("""
+                SELECT equipment_id, start_day, COALESCE(end_day, %s)
+                FROM sp_get_utilization_intervals()
+            """, [OPEN_END])
+            interval_rows = cursor.fetchall()
+            cursor.close()
+
+        snapshot = FleetSnapshot(type_rows, unit_rows, interval_rows)
+        load_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.set_snapshot(snapshot)
+        with self._lock:
+            self._stats['loads'] += 1
+            self._stats['last_load_ms'] = load_ms
+        logger.info(f"Utilization snapshot loaded: {snapshot.unit_count} units, "
+                    f"{snapshot.interval_count} intervals in {load_ms} ms")
+        return snapshot
+
+    def set_snapshot(self, snapshot: FleetSnapshot):
+        """Swap in a new snapshot and drop reports computed from the old one"""
+        with self._lock:
+            self._snapshot = snapshot
+            self._stale = False
+            self._version += 1
+            self._cache.clear()
+
+    def snapshot(self) -> FleetSnapshot:
+        with self._lock:
+            snapshot = self._snapshot
+            stale = self._stale
+        if snapshot is None:
+            return self.load()
+        age = time.time() - snapshot.loaded_at
+        if (stale and age >= MIN_RELOAD_INTERVAL) or age >= MAX_SNAPSHOT_AGE:
+            try:
+                return self.load()
+            except Exception as e:
+                logger.error(f"Error reloading utilization snapshot, serving the previous one: {e}")
+        return snapshot
+
+    def handle_change_event(self, event: Dict):
+        if event.get('op') == 'RESYNC' or event.get('table') in WATCHED_TABLES:
+            with self._lock:
+                self._stale = True
+
+    # =========================================================================
+    # REPORTS
+    # =========================================================================
+
+    def report(self, group_by: str = 'type', period: str = 'month', date_from: date = None,
+               date_to: date = None, equipment_type_id: int = None, limit: int = DEFAULT_UNIT_LIMIT,
+               offset: int = 0, order: str = 'asc') -> Dict:
+        """Utilization report, served from the cache when the same report was computed recently"""
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        if date_from and date_to and date_from > date_to:
+            raise ValueError('date_from must not be after date_to')
+        limit = max(1, min(int(limit), MAX_UNIT_LIMIT))
+        offset = max(0, int(offset))
+
+        snapshot = self.snapshot()
+        key = (self._version, group_by, period, date_from, date_to, equipment_type_id, limit, offset, order)
+        now = time.monotonic()
+        with self._lock:
+            self._stats['reports'] += 1
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                self._stats['cache_hits'] += 1
+                self._cache.move_to_end(key)
+                return dict(cached[1], cached=True)
+
+        started = time.perf_counter()
+        result = self.compute(snapshot, group_by, period, date_from, date_to, equipment_type_id,
+                              limit, offset, order)
+        compute_ms = round((time.perf_counter() - started) * 1000, 1)
+        result['compute_ms'] = compute_ms
+
+        with self._lock:
+            self._stats['last_compute_ms'] = compute_ms
+            self._cache[key] = (now + CACHE_TTL, result)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return dict(result, cached=False)
+
+    def compute(self, snapshot: FleetSnapshot, group_by: str, period: str, date_from: date = None,
+                date_to: date = None, equipment_type_id: int = None, limit: int = DEFAULT_UNIT_LIMIT,
+                offset: int = 0, order: str = 'asc') -> Dict:
+        """Build a report from a snapshot (no caching, no database access)"""
+        today = day_number(date.today())
+        last_day = day_number(date_to) if date_to else today
+        first_day = day_number(date_from) if date_from else snapshot.first_day()
+        if first_day is None or first_day > last_day:
+            first_day = last_day
+        bounds, labels = period_bounds(period, first_day, last_day)
+        # Open intervals run to the end of today, never past the report
+        open_end = min(today, last_day) + 1
+
+        unit_mask = np.ones(snapshot.unit_count, dtype=bool)
+        if equipment_type_id is not None:
+            type_position = np.searchsorted(snapshot.type_ids, equipment_type_id)
+            unit_mask = snapshot.unit_type_index == type_position
+            if type_position >= len(snapshot.type_ids) or snapshot.type_ids[type_position] != equipment_type_id:
+                unit_mask[:] = False
+
+        available = self._available_days(snapshot, bounds, open_end)
+        booked = self._booked_days(snapshot, bounds, open_end)
+        # Overlapping allocations of one unit never count more than its days in the fleet
+        booked = np.minimum(booked, available)
+        revenue = booked * snapshot.daily_rates[snapshot.unit_type_index][:, None]
+
+        available[~unit_mask] = 0
+        booked[~unit_mask] = 0
+        revenue[~unit_mask] = 0
+
+        result = {
+            'group_by': group_by,
+            'period': period,
+            'date_from': from_day_number(first_day).isoformat(),
+            'date_to': from_day_number(last_day).isoformat(),
+            'periods': labels,
+            'equipment_type_id': equipment_type_id,
+            'revenue_basis': 'daily_rate',
+            'totals': self._totals(booked.sum(), available.sum(), revenue.sum()),
+            'snapshot': {
+                'units': snapshot.unit_count,
+                'intervals': snapshot.interval_count,
+                'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(snapshot.loaded_at))
+            }
+        }
+
+        if group_by == 'fleet':
+            result['rows'] = [self._row({}, booked.sum(axis=0), available.sum(axis=0),
+                                        revenue.sum(axis=0), labels)]
+        elif group_by == 'type':
+            type_count = len(snapshot.type_ids)
+            type_booked = self._sum_by_type(snapshot, booked)
+            type_available = self._sum_by_type(snapshot, available)
+            type_revenue = self._sum_by_type(snapshot, revenue)
+            unit_counts = np.bincount(snapshot.unit_type_index[unit_mask], minlength=type_count)
+            result['rows'] = [
+                self._row({
+                    'equipment_type_id': int(snapshot.type_ids[t]),
+                    'type_code': snapshot.type_codes[t],
+                    'type_name': snapshot.type_names[t],
+                    'units': int(unit_counts[t])
+                }, type_booked[t], type_available[t], type_revenue[t], labels)
+                for t in range(type_count) if unit_counts[t]
+            ]
+        else:
+            selected = np.flatnonzero(unit_mask & (available.sum(axis=1) > 0))
+            overall = booked[selected].sum(axis=1) / available[selected].sum(axis=1)
+            ranked = selected[np.argsort(overall if order == 'asc' else -overall, kind='stable')]
+            page = ranked[offset:offset + limit]
+            result['total_units'] = int(len(selected))
+            result['limit'] = limit
+            result['offset'] = offset
+            result['order'] = order
+            result['rows'] = [
+                self._row({
+                    'equipment_id': int(snapshot.unit_ids[u]),
+                    'asset_code': snapshot.asset_codes[u],
+                    'equipment_type_id': int(snapshot.type_ids[snapshot.unit_type_index[u]]),
+                    'type_name': snapshot.type_names[snapshot.unit_type_index[u]]
+                }, booked[u], available[u], revenue[u], labels)
+                for u in page
+            ]
+        return result
+
+    @staticmethod
+    def _available_days(snapshot: FleetSnapshot, bounds: np.ndarray, open_end: int) -> np.ndarray:
+        fleet_to = np.where(snapshot.fleet_to == OPEN_END, open_end, snapshot.fleet_to).astype(np.int64)
+        return interval_days(np.arange(snapshot.unit_count), snapshot.fleet_from.astype(np.int64),
+                             fleet_to, bounds, snapshot.unit_count)
+
+    @staticmethod
+    def _booked_days(snapshot: FleetSnapshot, bounds: np.ndarray, open_end: int) -> np.ndarray:
+        ends = snapshot.interval_end.astype(np.int64)
+        ends = np.where(ends == OPEN_END, open_end, ends)
+        return interval_days(snapshot.interval_unit, snapshot.interval_start.astype(np.int64),
+                             ends, bounds, snapshot.unit_count)
+
+    @staticmethod
+    def _sum_by_type(snapshot: FleetSnapshot, matrix: np.ndarray) -> np.ndarray:
+        """Sum unit rows into equipment type rows"""
+        result = np.zeros((len(snapshot.type_ids), matrix.shape[1]))
+        if not len(matrix):
+            return result
+        order = np.argsort(snapshot.unit_type_index, kind='stable')
+        types = snapshot.unit_type_index[order]
+        run_starts = np.flatnonzero(np.r_[True, types[1:] != types[:-1]])
+        result[types[run_starts]] = np.add.reduceat(matrix[order], run_starts, axis=0)
+        return result
+
+    @classmethod
+    def _row(cls, fields: Dict, booked: np.ndarray, available: np.ndarray, revenue: np.ndarray,
+             labels: List[str]) -> Dict:
+        row = dict(fields)
+        row['periods'] = [
+            dict(cls._totals(booked[p], available[p], revenue[p]), period=labels[p])
+            for p in range(len(labels))
+        ]
+        row['totals'] = cls._totals(booked.sum(), available.sum(), revenue.sum())
+        return row
+
+    @staticmethod
+    def _totals(booked, available, revenue) -> Dict:
+        booked, available = int(booked), int(available)
+        return {
+            'booked_days': booked,
+            'idle_days': max(0, available - booked),
+            'available_days': available,
+            'utilization': round(booked / available, 4) if available else 0.0,
+            'revenue': round(float(revenue), 2)
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            snapshot = self._snapshot
+            return dict(
+                self._stats,
+                loaded=snapshot is not None,
+                stale=self._stale,
+                units=snapshot.unit_count if snapshot else 0,
+                intervals=snapshot.interval_count if snapshot else 0,
+                cached_reports=len(self._cache)
+            )
+
+
+# Shared per-process engine
+utilization_engine = FleetUtilizationEngine()
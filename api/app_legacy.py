@@ -110,7 +110,7 @@ def index():
                 reference_number, customer_name, allocation_status,
                 equipment_types_count, total_equipment_booked, driver_task_status,
                 interaction_id, hire_start_date, delivery_date
-            FROM v_hire_summary 
+            FROM mv_hire_summary 
             ORDER BY interaction_id DESC 
             LIMIT 10
         """)
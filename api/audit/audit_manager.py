@@ -0,0 +1,150 @@
+"""
+Audit Log Queries
+Searches system.activity_log newest first with keyset pagination, filtering by
+user, action, table and record, and by JSONB containment on the logged values
+"""
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+import logging
+
+from database.connection import execute_query, execute_stored_procedure
+
+logger = logging.getLogger(__name__)
+
+# Entries per page
+AUDIT_PAGE_LIMIT = 100
+AUDIT_MAX_PAGE_LIMIT = 1000
+
+# Query options that are shorthand for a containment match on the logged values
+CONTAINMENT_KEYS = {
+    'reference_number': str,
+    'booking_id': int,
+    'customer_id': int,
+    'allocation_id': int
+}
+
+
+class AuditQueryError(ValueError):
+    """The audit query options are invalid (bad date, cursor or JSON)"""
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def encode_cursor(created_at: datetime, log_id: int) -> str:
+    """Opaque page token holding the last entry's (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, log_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (ValueError, TypeError):
+        raise AuditQueryError("Invalid cursor")
+
+
+def _parse_time(name: str, value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """ISO timestamp or date; a date_to date includes that whole day"""
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            day = datetime.fromisoformat(value)
+            return day + timedelta(days=1) if end_of_day else day
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise AuditQueryError(f"{name} must be a date (YYYY-MM-DD) or ISO timestamp")
+
+
+class AuditLogManager:
+    """Read-only queries over the activity log"""
+
+    def search(self, options: Dict) -> Dict:
+        """One page of audit entries, newest first.
+
+        Options: user_id, action (comma-separated), table_name, record_id,
+        reference_number / booking_id / customer_id / allocation_id (matched
+        inside new_values or old_values), contains (a JSON object to match the
+        same way), date_from / date_to, limit (default 100, max 1000) and
+        cursor (next_cursor from the previous page).
+
+        Returns {'entries': [...], 'next_cursor': token or None}.
+        """
+        query, params, limit = self.build_query(options)
+        try:
+            rows = execute_query(query, params, read_only=True)
+        except Exception as e:
+            logger.error(f"Error searching activity log: {e}")
+            raise
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['log_id'])
+        entries = json.loads(json.dumps(rows, default=_json_default))
+        return {'entries': entries, 'next_cursor': next_cursor}
+
+    def build_query(self, options: Dict) -> Tuple[str, list, int]:
+        """SQL, parameters and page size for a search (the query fetches one extra row)"""
+        contains = {}
+        if options.get('contains'):
+            try:
+                contains = json.loads(options['contains'])
+            except ValueError as e:
+                raise AuditQueryError(f"contains must be a JSON object: {e}")
+            if not isinstance(contains, dict):
+                raise AuditQueryError("contains must be a JSON object")
+        try:
+            for key, cast in CONTAINMENT_KEYS.items():
+                if options.get(key):
+                    contains[key] = cast(options[key])
+            user_id = int(options['user_id']) if options.get('user_id') else None
+            record_id = int(options['record_id']) if options.get('record_id') else None
+            limit = min(max(int(options.get('limit') or AUDIT_PAGE_LIMIT), 1), AUDIT_MAX_PAGE_LIMIT)
+        except ValueError as e:
+            raise AuditQueryError(str(e))
+        actions = [action.strip() for action in (options.get('action') or '').split(',') if action.strip()]
+        before_at, before_id = decode_cursor(options['cursor']) if options.get('cursor') else (None, None)
+
+        # One row more than the page tells whether there is a next page
+        query = """
+            SELECT * FROM sp_search_activity_log(
+                %s, %s::TEXT[], %s, %s, %s::JSONB,
+                %s::TIMESTAMPTZ, %s::TIMESTAMPTZ, %s::TIMESTAMPTZ, %s, %s)
+        """
+        params = [
+            user_id, actions or None, options.get('table_name') or None, record_id,
+            json.dumps(contains) if contains else None,
+            _parse_time('date_from', options.get('date_from')),
+            _parse_time('date_to', options.get('date_to'), end_of_day=True),
+            before_at, before_id, limit + 1
+        ]
+        return query, params, limit
+
+    def facets(self) -> Dict:
+        """Distinct actions and tables in the log"""
+        try:
+            rows = execute_stored_procedure('sp_get_activity_log_facets', [])
+        except Exception as e:
+            logger.error(f"Error getting activity log facets: {e}")
+            raise
+        return {
+            'actions': [row['value'] for row in rows if row['facet'] == 'action'],
+            'tables': [row['value'] for row in rows if row['facet'] == 'table']
+        }
+
+
+# Shared per-process manager
+audit_log_manager = AuditLogManager()
@@ -0,0 +1,40 @@
+"""
+Audit routes for the Equipment Hire System
+Paginated search over the activity log for support staff
+"""
+
+from flask import Blueprint, request, jsonify
+from .audit_manager import audit_log_manager, AuditQueryError
+import logging
+
+logger = logging.getLogger(__name__)
+
+audit_bp = Blueprint('audit', __name__)
+
+
+@audit_bp.route('/log', methods=['GET'])
+def search_activity_log():
+    """Audit entries newest first; follow next_cursor for older pages.
+
+    Query options: user_id, action, table_name, record_id, reference_number,
+    booking_id, customer_id, allocation_id, contains (JSON), date_from, date_to,
+    limit and cursor.
+    """
+    try:
+        result = audit_log_manager.search(request.args.to_dict())
+        return jsonify({'success': True, **result})
+    except AuditQueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching activity log: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to search activity log'}), 500
+
+
+@audit_bp.route('/log/facets', methods=['GET'])
+def get_activity_log_facets():
+    """Actions and tables present in the log, for filter lists"""
+    try:
+        return jsonify({'success': True, **audit_log_manager.facets()})
+    except Exception as e:
+        logger.error(f"Error getting activity log facets: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to load audit filters'}), 500
@@ -0,0 +1,255 @@
+"""
+Batch Requests
+Runs a list of sub-requests (method, path, body) against the app's own routes in
+one HTTP round trip. Reads without dependencies between them run concurrently;
+writes run one at a time so none loses another's session changes. Each goes
+through the full request pipeline (session, admission control, read routing,
+tracing) on its own pooled connection.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import logging
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from server.admission import classify
+
+logger = logging.getLogger(__name__)
+
+# Sub-requests per batch, total cost per batch and sub-requests run at once
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '20'))
+BATCH_MAX_COST = int(os.getenv('BATCH_MAX_COST', '30'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+# Largest batch request body
+BATCH_MAX_BODY_BYTES = 1024 * 1024
+
+# Cost of a sub-request by admission class
+CLASS_COSTS = {
+    'interactive': 1,
+    'write': 2,
+    'report': 5
+}
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Session changes, event streams and nested batches cannot run inside a batch
+FORBIDDEN_PREFIXES = ('/api/batch', '/api/auth', '/api/events')
+
+
+class BatchError(ValueError):
+    """The batch is malformed or over its size or cost limits"""
+
+
+def item_cost(method: str, path: str) -> int:
+    return CLASS_COSTS.get(classify(method, path.split('?', 1)[0]), 1)
+
+
+class BatchRunner:
+    """Validates a batch and runs its sub-requests in dependency order"""
+
+    def validate(self, items) -> List[Dict]:
+        """Normalized sub-requests: id, method, path, body and depends_on.
+
+        Raises BatchError for a malformed batch, an unknown or cyclic
+        dependency, a forbidden path, or a batch over BATCH_MAX_ITEMS or
+        BATCH_MAX_COST.
+        """
+        if not isinstance(items, list) or not items:
+            raise BatchError("requests must be a non-empty list")
+        if len(items) > BATCH_MAX_ITEMS:
+            raise BatchError(f"A batch may hold at most {BATCH_MAX_ITEMS} requests")
+
+        normalized = []
+        ids = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                raise BatchError(f"Request {index} must be an object")
+            item_id = str(item.get('id', index))
+            if item_id in ids:
+                raise BatchError(f"Duplicate request id: {item_id}")
+            ids.add(item_id)
+            method = str(item.get('method', 'GET')).upper()
+            path = item.get('path')
+            if method not in BATCH_METHODS:
+                raise BatchError(f"Request {item_id}: unsupported method {method}")
+            if not isinstance(path, str) or not path.startswith('/api/'):
+                raise BatchError(f"Request {item_id}: path must start with /api/")
+            if path.startswith(FORBIDDEN_PREFIXES):
+                raise BatchError(f"Request {item_id}: {path.split('?', 1)[0]} cannot be batched")
+            depends_on = item.get('depends_on') or []
+            if not isinstance(depends_on, list):
+                raise BatchError(f"Request {item_id}: depends_on must be a list of request ids")
+            normalized.append({
+                'id': item_id,
+                'method': method,
+                'path': path,
+                'body': item.get('body'),
+                'depends_on': [str(dependency) for dependency in depends_on],
+                'cost': item_cost(method, path)
+            })
+
+        for item in normalized:
+            for dependency in item['depends_on']:
+                if dependency not in ids:
+                    raise BatchError(f"Request {item['id']}: unknown dependency {dependency}")
+        cost = sum(item['cost'] for item in normalized)
+        if cost > BATCH_MAX_COST:
+            raise BatchError(f"Batch cost {cost} exceeds the limit of {BATCH_MAX_COST} "
+                             f"(reads cost 1, writes 2, reports 5)")
+        self._waves(normalized)
+        return normalized
+
+    @staticmethod
+    def _waves(items: List[Dict]) -> List[List[Dict]]:
+        """Group sub-requests into waves whose dependencies all ran in earlier waves"""
+        waves = []
+        done = set()
+        pending = list(items)
+        while pending:
+            wave = [item for item in pending if all(dependency in done for dependency in item['depends_on'])]
+            if not wave:
+                raise BatchError("Batch dependencies form a cycle: " + ', '.join(item['id'] for item in pending))
+            waves.append(wave)
+            done.update(item['id'] for item in wave)
+            pending = [item for item in pending if item['id'] not in done]
+        return waves
+
+    # =========================================================================
+    # EXECUTION
+    # =========================================================================
+
+    def run(self, app, items: List[Dict], base_url: str, cookie: str, remote_addr: str,
+            trace_id: Optional[str] = None) -> Dict:
+        """Run validated sub-requests; returns {'results': [...], 'session_cookie', 'duration_ms'}
+        with results in request order.
+
+        Each wave's reads run concurrently (up to BATCH_MAX_CONCURRENCY at a time)
+        alongside its writes, which run one after another. A sub-request whose
+        dependency failed is skipped with status 424. Session cookie changes (e.g.
+        read-your-writes after a write) carry over to later writes and waves and
+        are returned as session_cookie.
+        """
+        started = time.perf_counter()
+        results = {}
+        session_cookie = None
+        cookie_name = app.config.get('SESSION_COOKIE_NAME', 'session')
+
+        with ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY, thread_name_prefix='batch') as executor:
+            for wave in self._waves(items):
+                runnable = []
+                for item in wave:
+                    failed = [dependency for dependency in item['depends_on']
+                              if results[dependency]['status'] >= 400]
+                    if failed:
+                        results[item['id']] = {
+                            'id': item['id'],
+                            'status': 424,
+                            'body': {'success': False, 'error': f"Skipped: {', '.join(failed)} failed"},
+                            'duration_ms': 0.0
+                        }
+                    else:
+                        runnable.append(item)
+
+                # Reads run concurrently; writes, which can change the session, run one after
+                # another so each sees (and keeps) the session the previous one set
+                reads = [item for item in runnable if item['method'] == 'GET']
+                writes = [item for item in runnable if item['method'] != 'GET']
+                read_futures = [
+                    executor.submit(self._dispatch, app, item, base_url, cookie, remote_addr,
+                                    self._sub_trace_id(trace_id, item))
+                    for item in reads
+                ]
+                write_future = executor.submit(self._dispatch_in_order, app, writes, base_url, cookie,
+                                               cookie_name, remote_addr, trace_id)
+                outcomes = [future.result() for future in read_futures] + write_future.result()
+                for item, (result, set_cookie) in zip(reads + writes, outcomes):
+                    results[item['id']] = result
+                    if set_cookie:
+                        session_cookie = set_cookie
+                if session_cookie:
+                    cookie = self._with_session(cookie, cookie_name, session_cookie)
+
+        return {
+            'results': [results[item['id']] for item in items],
+            'session_cookie': session_cookie,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def _dispatch_in_order(self, app, items: List[Dict], base_url: str, cookie: str, cookie_name: str,
+                           remote_addr: str, trace_id: Optional[str]) -> List:
+        """Run sub-requests one after another, each with the session cookie the previous one set"""
+        outcomes = []
+        for item in items:
+            result, set_cookie = self._dispatch(app, item, base_url, cookie, remote_addr,
+                                                self._sub_trace_id(trace_id, item))
+            if set_cookie:
+                cookie = self._with_session(cookie, cookie_name, set_cookie)
+            outcomes.append((result, set_cookie))
+        return outcomes
+
+    @staticmethod
+    def _sub_trace_id(trace_id: Optional[str], item: Dict) -> Optional[str]:
+        return f"{trace_id}.{item['id']}"[:64] if trace_id else None
+
+    @staticmethod
+    def _dispatch(app, item: Dict, base_url: str, cookie: str, remote_addr: str, trace_id: Optional[str]):
+        """Run one sub-request through the WSGI app; returns (result, session Set-Cookie or None)"""
+        started = time.perf_counter()
+        path, _, query_string = item['path'].partition('?')
+        headers = {}
+        if cookie:
+            headers['Cookie'] = cookie
+        if trace_id:
+            headers['X-Trace-Id'] = trace_id
+        builder = EnvironBuilder(path=path, query_string=query_string, method=item['method'], base_url=base_url,
+                                 headers=headers, json=item['body'] if item['body'] is not None else None,
+                                 environ_base={'REMOTE_ADDR': remote_addr})
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+
+        try:
+            app_iter, status, response_headers = run_wsgi_app(app.wsgi_app, environ, buffered=True)
+            try:
+                payload = b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        except Exception as e:
+            logger.error(f"Batch request {item['id']} ({item['method']} {path}) failed: {e}")
+            return {'id': item['id'], 'status': 500, 'body': {'success': False, 'error': 'Request failed'},
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 2)}, None
+
+        status_code = int(status.split(' ', 1)[0])
+        content_type = response_headers.get('Content-Type', '')
+        body = payload.decode('utf-8', errors='replace')
+        if content_type.startswith('application/json') and payload:
+            try:
+                body = json.loads(payload)
+            except ValueError:
+                pass
+        result = {'id': item['id'], 'status': status_code, 'body': body,
+                  'duration_ms': round((time.perf_counter() - started) * 1000, 2)}
+        if not content_type.startswith('application/json'):
+            result['content_type'] = content_type
+
+        cookie_name = app.config.get('SESSION_COOKIE_NAME', 'session')
+        set_cookie = next((value for value in response_headers.getlist('Set-Cookie')
+                           if value.startswith(cookie_name + '=')), None)
+        return result, set_cookie
+
+    @staticmethod
+    def _with_session(cookie: str, cookie_name: str, set_cookie: str) -> str:
+        """The Cookie header with the session cookie replaced by a Set-Cookie value"""
+        others = [part.strip() for part in (cookie or '').split(';')
+                  if part.strip() and not part.strip().startswith(cookie_name + '=')]
+        return '; '.join(others + [set_cookie.split(';', 1)[0]])
+
+
+# Shared per-process runner
+batch_runner = BatchRunner()
@@ -0,0 +1,48 @@
+"""
+Batch routes for the Equipment Hire System
+One round trip for screens that need many small reads and writes
+"""
+
+from flask import Blueprint, current_app, g, request, jsonify
+from .batch_runner import batch_runner, BatchError, BATCH_MAX_BODY_BYTES
+import logging
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch', __name__)
+
+
+@batch_bp.route('', methods=['POST'])
+def run_batch():
+    """Run several API requests in one call.
+
+    Body: {"requests": [{"id", "method", "path", "body", "depends_on": [ids]}, ...]}.
+    Requests without dependencies on each other run concurrently; each result
+    carries its own status and body, in request order.
+    """
+    if request.content_length and request.content_length > BATCH_MAX_BODY_BYTES:
+        return jsonify({'success': False, 'error': 'Batch body too large'}), 413
+    data = request.get_json(silent=True) or {}
+    try:
+        items = batch_runner.validate(data.get('requests'))
+    except BatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        result = batch_runner.run(
+            current_app._get_current_object(),
+            items,
+            base_url=request.host_url,
+            cookie=request.headers.get('Cookie', ''),
+            remote_addr=request.remote_addr,
+            trace_id=g.get('trace_id')
+        )
+    except Exception as e:
+        logger.error(f"Error running batch: {str(e)}")
+        return jsonify({'success': False, 'error': 'Batch failed'}), 500
+
+    response = jsonify({'success': True, 'results': result['results'], 'duration_ms': result['duration_ms']})
+    if result['session_cookie']:
+        # Keeps e.g. read-your-writes routing from the batch's writes
+        response.headers.add('Set-Cookie', result['session_cookie'])
+    return response
@@ -0,0 +1,256 @@
+"""
+Allocation Overlap Benchmark
+Compares the double-booking checks before and after allocations carried a
+daterange: the old hand-written predicate (join to the hire, COALESCE the open end
+to 30 days, compare both ends) against `hire_period && period` served by the GiST
+exclusion constraint's index. Also checks that the constraint rejects a double
+booking.
+
+    cd api
+    python benchmarks/allocation_overlap.py                    # 5,000 units, 200,000 hires
+    python benchmarks/allocation_overlap.py --units 20000 --hires 1000000 --json overlap.json
+
+Everything runs in one transaction that is rolled back at the end, so the
+synthetic units, hires and allocations never become visible to the API.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+
+from database.connection import pooled_connection
+
+BENCHMARK_PREFIX = 'OVB'
+# Each unit's hires are this many days apart, longer than any hire holds a unit,
+# so the seeded bookings never overlap
+SLOT_DAYS = 35
+
+# (name, before, after): each query takes %(type_id)s, %(start)s, %(end)s and %(unit_id)s
+QUERIES = [
+    ('type availability count', """
+        SELECT COUNT(*)
+        FROM equipment.equipment e
+        WHERE e.equipment_type_id = %(type_id)s
+          AND e.status = 'available'
+          AND e.id NOT IN (
+              SELECT ie.equipment_id
+              FROM interactions.interaction_equipment ie
+              JOIN interactions.interactions i ON ie.interaction_id = i.id
+              WHERE i.interaction_type = 'hire'
+                AND i.status NOT IN ('cancelled', 'completed')
+                AND i.hire_start_date <= %(end)s
+                AND COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= %(start)s
+          )
+    """, """
+        SELECT COUNT(*)
+        FROM equipment.equipment e
+        WHERE e.equipment_type_id = %(type_id)s
+          AND e.status = 'available'
+          AND NOT EXISTS (
+              SELECT 1
+              FROM interactions.interaction_equipment ie
+              WHERE ie.equipment_id = e.id
+                AND ie.hire_period && sp_requested_period(%(start)s, %(end)s)
+          )
+    """),
+    ('single unit conflict check', """
+        SELECT COUNT(*)
+        FROM interactions.interaction_equipment ie
+        JOIN interactions.interactions i ON ie.interaction_id = i.id
+        WHERE ie.equipment_id = %(unit_id)s
+          AND i.interaction_type = 'hire'
+          AND i.status NOT IN ('cancelled', 'completed')
+          AND i.hire_start_date <= %(end)s
+          AND COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= %(start)s
+    """, """
+        SELECT EXISTS (
+            SELECT 1
+            FROM interactions.interaction_equipment ie
+            WHERE ie.equipment_id = %(unit_id)s
+              AND ie.hire_period && sp_requested_period(%(start)s, %(end)s)
+        )
+    """),
+    ('bookings overlapping a week', """
+        SELECT ie.equipment_id, i.id
+        FROM interactions.interaction_equipment ie
+        JOIN interactions.interactions i ON ie.interaction_id = i.id
+        WHERE i.interaction_type = 'hire'
+          AND i.status NOT IN ('cancelled', 'completed')
+          AND i.hire_start_date <= %(end)s
+          AND COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= %(start)s
+    """, """
+        SELECT ie.equipment_id, ie.interaction_id
+        FROM interactions.interaction_equipment ie
+        WHERE ie.hire_period && sp_requested_period(%(start)s, %(end)s)
+    """)
+]
+
+
+def seed(cursor, units: int, hires: int) -> dict:
+    """Synthetic units of one type and non-overlapping hires allocated to them"""
+    cursor.execute("SELECT MIN(id) FROM core.employees")
+    employee_id = cursor.fetchone()[0]
+    cursor.execute("SELECT c.customer_id, c.id FROM core.contacts c ORDER BY c.id LIMIT 1")
+    customer_id, contact_id = cursor.fetchone()
+    cursor.execute("SELECT MIN(id) FROM equipment.equipment_types")
+    type_id = cursor.fetchone()[0]
+
+    started = time.perf_counter()
+    cursor.execute("""
+        INSERT INTO equipment.equipment (equipment_type_id, asset_code, status, created_by)
+        SELECT %(type_id)s, %(prefix)s || lpad(n::TEXT, 10, '0'), 'available', %(employee_id)s
+        FROM generate_series(1, %(units)s) AS n
+        RETURNING id
+    """, {'type_id': type_id, 'prefix': BENCHMARK_PREFIX, 'employee_id': employee_id, 'units': units})
+    unit_ids = [row[0] for row in cursor.fetchall()]
+
+    # Hire n goes on unit n % units, in slot n / units; slots start a year back.
+    # One in ten is open-ended, one in ten completed and one in twenty cancelled.
+    first_day = date.today() - timedelta(days=365)
+    cursor.execute("""
+        INSERT INTO interactions.interactions (
+            customer_id, contact_id, employee_id, interaction_type, status, reference_number,
+            contact_method, hire_start_date, hire_end_date, delivery_date, created_by
+        )
+        SELECT
+            %(customer_id)s, %(contact_id)s, %(employee_id)s, 'hire',
+            CASE WHEN n %% 10 = 3 THEN 'completed' WHEN n %% 20 = 7 THEN 'cancelled' ELSE 'in_progress' END,
+            %(prefix)s || lpad(n::TEXT, 12, '0'),
+            'phone',
+            %(first_day)s::DATE + (n / %(units)s) * %(slot)s + n %% 5,
+            CASE WHEN n %% 10 = 1 THEN NULL
+                 ELSE %(first_day)s::DATE + (n / %(units)s) * %(slot)s + n %% 5 + 1 + n %% 28 END,
+            %(first_day)s::DATE + (n / %(units)s) * %(slot)s + n %% 5,
+            %(employee_id)s
+        FROM generate_series(0, %(hires)s - 1) AS n
+    """, {'customer_id': customer_id, 'contact_id': contact_id, 'employee_id': employee_id,
+          'prefix': BENCHMARK_PREFIX, 'first_day': first_day, 'units': units, 'slot': SLOT_DAYS, 'hires': hires})
+
+    cursor.execute("""
+        INSERT INTO interactions.interaction_equipment (interaction_id, equipment_id, allocation_status, allocated_by)
+        SELECT i.id, (%(unit_ids)s::INTEGER[])[1 + (substr(i.reference_number, 4)::INTEGER %% %(units)s)],
+               'allocated', %(employee_id)s
+        FROM interactions.interactions i
+        WHERE i.reference_number LIKE %(pattern)s
+    """, {'unit_ids': unit_ids, 'units': units, 'employee_id': employee_id, 'pattern': BENCHMARK_PREFIX + '%'})
+    cursor.execute("ANALYZE equipment.equipment")
+    cursor.execute("ANALYZE interactions.interactions")
+    cursor.execute("ANALYZE interactions.interaction_equipment")
+    print(f"  seeded {units:,} units and {hires:,} allocated hires in {time.perf_counter() - started:.1f}s")
+    return {'type_id': type_id, 'unit_ids': unit_ids, 'employee_id': employee_id}
+
+
+def explain(cursor, query: str, params: dict) -> dict:
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+    plan = cursor.fetchone()[0][0]
+    indexes = set()
+
+    def walk(node):
+        if node.get('Index Name'):
+            indexes.add(node['Index Name'])
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan['Plan'])
+    return {
+        'execution_ms': round(plan['Execution Time'], 3),
+        'shared_blocks': plan['Plan'].get('Shared Hit Blocks', 0) + plan['Plan'].get('Shared Read Blocks', 0),
+        'indexes': sorted(indexes) or ['(sequential scan)']
+    }
+
+
+def time_query(cursor, query: str, param_sets: list) -> dict:
+    timings = []
+    for params in param_sets:
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3)
+    }
+
+
+def check_enforced(cursor, seeded: dict) -> bool:
+    """Try to book a unit onto a second live hire over the same days; the constraint should refuse"""
+    cursor.execute("SAVEPOINT double_booking")
+    try:
+        cursor.execute("""
+            INSERT INTO interactions.interaction_equipment (interaction_id, equipment_id, allocation_status, allocated_by)
+            SELECT other.id, ie.equipment_id, 'allocated', %(employee_id)s
+            FROM interactions.interaction_equipment ie
+            JOIN interactions.interactions other
+              ON other.reference_number LIKE %(pattern)s
+             AND other.id <> ie.interaction_id
+             AND sp_hire_period(other.hire_start_date, other.hire_end_date) && ie.hire_period
+             AND other.status NOT IN ('cancelled', 'completed')
+            WHERE ie.hire_period IS NOT NULL AND ie.equipment_id = ANY(%(unit_ids)s)
+            LIMIT 1
+        """, {'employee_id': seeded['employee_id'], 'pattern': BENCHMARK_PREFIX + '%',
+              'unit_ids': seeded['unit_ids']})
+        enforced = cursor.rowcount == 0  # nothing overlapping to try
+    except psycopg2.errors.ExclusionViolation:
+        enforced = True
+    cursor.execute("ROLLBACK TO SAVEPOINT double_booking")
+    return enforced
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Double-booking checks: hand-written predicate vs daterange')
+    parser.add_argument('--units', type=int, default=5_000, help='synthetic units to seed')
+    parser.add_argument('--hires', type=int, default=200_000, help='synthetic hires, one unit each')
+    parser.add_argument('--repeats', type=int, default=50, help='timed runs per query')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    random.seed(42)
+    results = {'units': args.units, 'hires': args.hires, 'queries': {}}
+    with pooled_connection(autocommit=False) as conn:
+        cursor = conn.cursor()
+        try:
+            print(f"Seeding {args.units:,} units and {args.hires:,} hires (rolled back afterwards)...")
+            seeded = seed(cursor, args.units, args.hires)
+
+            param_sets = []
+            for _ in range(args.repeats):
+                start = date.today() + timedelta(days=random.randint(-300, 300))
+                param_sets.append({'type_id': seeded['type_id'], 'start': start, 'end': start + timedelta(days=7),
+                                   'unit_id': random.choice(seeded['unit_ids'])})
+
+            print(f"\n{'query':<28} {'before':>10} {'after':>10} {'speedup':>8}  after index")
+            for name, before, after in QUERIES:
+                result = {
+                    'before': dict(time_query(cursor, before, param_sets), plan=explain(cursor, before, param_sets[0])),
+                    'after': dict(time_query(cursor, after, param_sets), plan=explain(cursor, after, param_sets[0]))
+                }
+                results['queries'][name] = result
+                speedup = result['before']['median_ms'] / max(result['after']['median_ms'], 0.001)
+                print(f"{name:<28} {result['before']['median_ms']:>8.3f}ms {result['after']['median_ms']:>8.3f}ms "
+                      f"{speedup:>7.1f}x  {', '.join(result['after']['plan']['indexes'])}", flush=True)
+
+            results['double_booking_rejected'] = check_enforced(cursor, seeded)
+            print(f"\nDouble booking rejected by the constraint: "
+                  f"{'yes' if results['double_booking_rejected'] else 'NO'}")
+        finally:
+            conn.rollback()
+            cursor.close()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Audit Log Query Benchmark
+Seeds system.activity_log with synthetic entries (tens of millions by default) and
+times the audit search API's typical queries: latest page, per user, per action,
+per record, containment on reference_number / booking_id, a one-day window and
+deep keyset pages. Each query is also EXPLAINed to show the index it used.
+
+    cd api
+    python benchmarks/audit_log_query.py                     # seed 20M rows, run, clean up
+    python benchmarks/audit_log_query.py --rows 50000000 --keep
+    python benchmarks/audit_log_query.py --reuse --seq-scan  # rerun on kept rows, with full-scan baseline
+
+Seeded rows carry user_agent 'audit-benchmark' and are deleted afterwards unless
+--keep is given. Seeding 20M rows takes a few minutes and about 6 GB with indexes.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit.audit_manager import AuditLogManager
+from database.connection import pooled_connection
+
+BENCHMARK_AGENT = 'audit-benchmark'
+SEED_BATCH_ROWS = 1_000_000
+SEED_DAYS = 3 * 365
+BOOKINGS = 500_000
+
+ACTIONS = [
+    ('ALLOCATE_EQUIPMENT', 'interactions.interaction_equipment'),
+    ('QC_SIGNOFF', 'interactions.interaction_equipment'),
+    ('CREATE_HIRE_INTERACTION', 'interactions.interactions'),
+    ('DISPATCH_TASKS', 'tasks.drivers_taskboard'),
+    ('BULK_IMPORT', 'equipment')
+]
+
+
+def seeded_rows() -> int:
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM system.activity_log WHERE user_agent = %s", [BENCHMARK_AGENT])
+        count = cursor.fetchone()[0]
+        cursor.close()
+    return count
+
+
+def seed(rows: int):
+    """Insert synthetic entries server-side, one committed batch at a time"""
+    with pooled_connection(autocommit=False) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(array_agg(id ORDER BY id), ARRAY[]::INTEGER[]) FROM core.employees")
+        employees = cursor.fetchone()[0] or [None]
+        actions = [action for action, _ in ACTIONS]
+        tables = [table for _, table in ACTIONS]
+        started = time.perf_counter()
+        for first in range(1, rows + 1, SEED_BATCH_ROWS):
+            last = min(first + SEED_BATCH_ROWS - 1, rows)
+            # Spread evenly over SEED_DAYS ending now; action mix and ids derive from n
+            cursor.execute("""
+                INSERT INTO system.activity_log (user_id, action, table_name, record_id,
+                                                 old_values, new_values, user_agent, created_at)
+                SELECT
+                    (%(employees)s::INTEGER[])[1 + n %% array_length(%(employees)s::INTEGER[], 1)],
+                    (%(actions)s::TEXT[])[1 + n %% 5],
+                    (%(tables)s::TEXT[])[1 + n %% 5],
+                    n / 3,
+                    CASE WHEN n %% 5 = 1 THEN jsonb_build_object('approved', false) END,
+                    CASE n %% 5
+                        WHEN 0 THEN jsonb_build_object('booking_id', n %% %(bookings)s,
+                                                       'equipment_ids', jsonb_build_array(n %% 20000),
+                                                       'allocated_count', 1)
+                        WHEN 1 THEN jsonb_build_object('approved', true, 'qc_notes', 'Bench QC ' || n)
+                        WHEN 2 THEN jsonb_build_object('reference_number', 'BN' || lpad((n / 5)::TEXT, 10, '0'),
+                                                       'customer_id', n %% 5000)
+                        WHEN 3 THEN jsonb_build_object('date', CURRENT_DATE, 'assigned', n %% 40)
+                        ELSE jsonb_build_object('rows', n %% 1000, 'inserted', n %% 700)
+                    END,
+                    %(agent)s,
+                    now() - make_interval(secs => (%(total)s - n)::FLOAT8 * %(seconds)s / %(total)s)
+                FROM generate_series(%(first)s, %(last)s) AS n
+            """, {'employees': employees, 'actions': actions, 'tables': tables, 'bookings': BOOKINGS,
+                  'agent': BENCHMARK_AGENT, 'total': rows, 'seconds': SEED_DAYS * 86400,
+                  'first': first, 'last': last})
+            conn.commit()
+            elapsed = time.perf_counter() - started
+            print(f"  seeded {last:>11,} rows  {elapsed:>7.1f}s  ({last / elapsed:,.0f} rows/s)", flush=True)
+        cursor.execute("ANALYZE system.activity_log")
+        conn.commit()
+        cursor.close()
+
+
+def cleanup():
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM system.activity_log WHERE user_agent = %s", [BENCHMARK_AGENT])
+        print(f"Deleted {cursor.rowcount:,} benchmark rows")
+        cursor.execute("VACUUM ANALYZE system.activity_log")
+        cursor.close()
+
+
+def scenarios(rows: int):
+    sample_reference = 'BN' + str(rows // 10).zfill(10)
+    return [
+        ('latest page', {}),
+        ('by user', {'user_id': '1'}),
+        ('by action', {'action': 'QC_SIGNOFF'}),
+        ('by record', {'table_name': 'interactions.interactions', 'record_id': str(rows // 6)}),
+        ('reference_number', {'reference_number': sample_reference}),
+        ('booking_id', {'booking_id': str(BOOKINGS // 2)}),
+        ('booking_id + action', {'booking_id': str(BOOKINGS // 3), 'action': 'ALLOCATE_EQUIPMENT'}),
+        ('one day window', {'date_from': time.strftime('%Y-%m-%d', time.localtime(time.time() - 90 * 86400)),
+                            'date_to': time.strftime('%Y-%m-%d', time.localtime(time.time() - 90 * 86400))})
+    ]
+
+
+def explain(manager: AuditLogManager, options: dict, seq_scan: bool = False) -> dict:
+    query, params, _ = manager.build_query(options)
+    with pooled_connection(autocommit=False) as conn:
+        cursor = conn.cursor()
+        if seq_scan:
+            cursor.execute("SET LOCAL enable_indexscan = off; SET LOCAL enable_bitmapscan = off; "
+                           "SET LOCAL enable_indexonlyscan = off")
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        plan = cursor.fetchone()[0][0]
+        conn.rollback()
+        cursor.close()
+
+    indexes = set()
+
+    def walk(node):
+        if node.get('Index Name'):
+            indexes.add(node['Index Name'])
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan['Plan'])
+    return {
+        'execution_ms': round(plan['Execution Time'], 2),
+        'shared_blocks': plan['Plan'].get('Shared Hit Blocks', 0) + plan['Plan'].get('Shared Read Blocks', 0),
+        'indexes': sorted(indexes) or ['(sequential scan)']
+    }
+
+
+def time_search(manager: AuditLogManager, options: dict, repeats: int) -> dict:
+    timings = []
+    entries = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = manager.search(options)
+        timings.append((time.perf_counter() - started) * 1000)
+        entries = len(result['entries'])
+    timings.sort()
+    return {
+        'entries': entries,
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2)
+    }
+
+
+def time_deep_pages(manager: AuditLogManager, pages: int) -> dict:
+    """Follow next_cursor page after page; keyset pages should not slow down with depth"""
+    options = {'limit': '100'}
+    timings = []
+    for _ in range(pages):
+        started = time.perf_counter()
+        result = manager.search(options)
+        timings.append((time.perf_counter() - started) * 1000)
+        if not result['next_cursor']:
+            break
+        options['cursor'] = result['next_cursor']
+    return {
+        'pages': len(timings),
+        'first_page_ms': round(timings[0], 2),
+        'last_page_ms': round(timings[-1], 2),
+        'median_ms': round(statistics.median(timings), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audit log search at scale')
+    parser.add_argument('--rows', type=int, default=20_000_000, help='synthetic log entries to seed')
+    parser.add_argument('--repeats', type=int, default=20, help='timed runs per query')
+    parser.add_argument('--pages', type=int, default=200, help='keyset pages to follow')
+    parser.add_argument('--reuse', action='store_true', help='use benchmark rows kept by an earlier --keep run')
+    parser.add_argument('--keep', action='store_true', help='leave the seeded rows in place')
+    parser.add_argument('--seq-scan', action='store_true', help='also EXPLAIN each query with index scans disabled')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    manager = AuditLogManager()
+    rows = seeded_rows() if args.reuse else 0
+    if not rows:
+        print(f"Seeding {args.rows:,} synthetic audit entries...")
+        seed(args.rows)
+        rows = args.rows
+    print(f"\nBenchmark rows: {rows:,}\n")
+
+    results = {'rows': rows, 'queries': {}}
+    print(f"{'query':<22} {'entries':>7} {'median':>9} {'p95':>9} {'plan':>9}  index")
+    for name, options in scenarios(rows):
+        timing = time_search(manager, options, args.repeats)
+        plan = explain(manager, options)
+        result = dict(timing, plan=plan)
+        line = (f"{name:<22} {timing['entries']:>7} {timing['median_ms']:>7.2f}ms {timing['p95_ms']:>7.2f}ms "
+                f"{plan['execution_ms']:>7.2f}ms  {', '.join(plan['indexes'])}")
+        if args.seq_scan:
+            result['seq_scan'] = explain(manager, options, seq_scan=True)
+            line += f"  (full scan {result['seq_scan']['execution_ms']:,.0f}ms)"
+        results['queries'][name] = result
+        print(line, flush=True)
+
+    deep = time_deep_pages(manager, args.pages)
+    results['deep_pages'] = deep
+    print(f"\nKeyset paging: {deep['pages']} pages, first {deep['first_page_ms']}ms, "
+          f"last {deep['last_page_ms']}ms, median {deep['median_ms']}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if not args.keep:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Bulk Data Throughput Benchmark
+Rows per second for COPY-based import (staging, validation and upsert) against a
+row-by-row INSERT baseline, and for streaming COPY exports
+
+    cd api
+    python benchmarks/bulk_throughput.py                  # 10,000 synthetic customers
+    python benchmarks/bulk_throughput.py --rows 50000 --export-entity allocations
+
+Imports run as dry runs (applied, then rolled back) so the database is left unchanged.
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk.bulk_manager import BulkDataManager
+from database.connection import pooled_connection
+
+
+def synthetic_customers(rows: int) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['customer_code', 'customer_name', 'is_company', 'vat_number', 'credit_limit', 'status'])
+    for n in range(rows):
+        writer.writerow([f'BENCH{n:07d}', f'Benchmark Customer {n}', 'true', f'4{n:09d}', '25000.00', 'active'])
+    return buffer.getvalue().encode()
+
+
+def bench_copy_import(manager: BulkDataManager, data: bytes) -> dict:
+    result = manager.import_csv('customers', io.BytesIO(data), dry_run=True)
+    if not result['success']:
+        raise RuntimeError(f"Import reported errors: {result['errors'][:3]}")
+    return {
+        'rows': result['rows'],
+        'seconds': result['timings_ms']['total'] / 1000,
+        'rows_per_second': result['rows_per_second'],
+        'stage_ms': result['timings_ms']['stage'],
+        'validate_and_apply_ms': result['timings_ms']['validate_and_apply']
+    }
+
+
+def bench_row_by_row(data: bytes) -> dict:
+    """The same upsert one INSERT per row, as the sample-data scripts do"""
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    started = time.perf_counter()
+    with pooled_connection(autocommit=False) as conn:
+        cursor = conn.cursor()
+        for row in rows:
+            cursor.execute("""
+                INSERT INTO core.customers (customer_code, customer_name, is_company, vat_number,
+                                            credit_limit, status, created_by)
+                VALUES (%s, %s, %s, %s, %s, %s, 1)
+                ON CONFLICT (customer_code) DO UPDATE SET customer_name = EXCLUDED.customer_name
+            """, [row['customer_code'], row['customer_name'], row['is_company'] == 'true',
+                  row['vat_number'], row['credit_limit'], row['status']])
+        conn.rollback()
+        cursor.close()
+    seconds = time.perf_counter() - started
+    return {'rows': len(rows), 'seconds': seconds, 'rows_per_second': round(len(rows) / seconds)}
+
+
+def bench_export(manager: BulkDataManager, entity: str) -> dict:
+    started = time.perf_counter()
+    first_chunk_ms = None
+    size = lines = 0
+    for chunk in manager.export_csv(entity):
+        if first_chunk_ms is None:
+            first_chunk_ms = (time.perf_counter() - started) * 1000
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+    seconds = time.perf_counter() - started
+    rows = max(0, lines - 1)
+    return {
+        'entity': entity,
+        'rows': rows,
+        'bytes': size,
+        'seconds': seconds,
+        'first_chunk_ms': round(first_chunk_ms or 0, 1),
+        'rows_per_second': round(rows / seconds) if seconds else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import/export throughput')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--export-entity', default='interactions')
+    parser.add_argument('--skip-baseline', action='store_true', help='skip the row-by-row INSERT baseline')
+    args = parser.parse_args()
+
+    manager = BulkDataManager()
+    data = synthetic_customers(args.rows)
+    print(f"Synthetic customers CSV: {args.rows} rows, {len(data) / 1024:.0f} KiB\n")
+
+    copy_result = bench_copy_import(manager, data)
+    print(f"COPY import      {copy_result['rows']:>8} rows  {copy_result['seconds']:>7.2f}s  "
+          f"{copy_result['rows_per_second']:>9} rows/s  (stage {copy_result['stage_ms']}ms, "
+          f"validate+upsert {copy_result['validate_and_apply_ms']}ms)")
+
+    if not args.skip_baseline:
+        baseline = bench_row_by_row(data)
+        print(f"Row-by-row       {baseline['rows']:>8} rows  {baseline['seconds']:>7.2f}s  "
+              f"{baseline['rows_per_second']:>9} rows/s  "
+              f"(COPY is {copy_result['rows_per_second'] / max(baseline['rows_per_second'], 1):.1f}x faster)")
+
+    export_result = bench_export(manager, args.export_entity)
+    print(f"COPY export      {export_result['rows']:>8} rows  {export_result['seconds']:>7.2f}s  "
+          f"{export_result['rows_per_second']:>9} rows/s  ({export_result['entity']}, "
+          f"{export_result['bytes'] / 1024:.0f} KiB, first chunk {export_result['first_chunk_ms']}ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Cold Start Benchmark
+Measures the time from launching a fresh Python process to the API's first response,
+the way a serverless platform pays for it on every cold start
+
+    cd api
+    python benchmarks/cold_start.py                       # 10 runs of GET /api/health
+    python benchmarks/cold_start.py --runs 20 --path /api/ready
+    python benchmarks/cold_start.py --save benchmarks/results/cold_start.json
+    python benchmarks/cold_start.py --baseline benchmarks/results/cold_start.json
+
+Each run reports the wall time for the whole process and, from inside it, the time
+spent importing the app and serving the first request through the WSGI test client.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in each fresh interpreter
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from {target} import app
+imported = time.perf_counter()
+response = app.test_client().get({path!r})
+responded = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (responded - imported) * 1000,
+    'status': response.status_code,
+    'psycopg2_loaded': 'psycopg2' in sys.modules
+}}))
+"""
+
+
+def run_once(target: str, path: str) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT.format(target=target, path=path)],
+        cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'child failed')
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['process_ms'] = wall_ms
+    return result
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for metric in ('process_ms', 'import_ms', 'first_request_ms'):
+        values = [run[metric] for run in runs]
+        summary[metric] = {
+            'min': round(min(values), 1),
+            'median': round(statistics.median(values), 1),
+            'p95': round(percentile(values, 95), 1),
+            'max': round(max(values), 1)
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold process to first response benchmark')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--target', default='index', help='module exposing app (index or wsgi)')
+    parser.add_argument('--path', default='/api/health', help='first request path')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against a saved results file')
+    parser.add_argument('--max-regression', type=float, default=20.0,
+                        help='percent slower than baseline median that fails the run')
+    args = parser.parse_args()
+
+    # One unmeasured run so the OS file cache is warm and runs are comparable
+    run_once(args.target, args.path)
+
+    runs = [run_once(args.target, args.path) for _ in range(args.runs)]
+    summary = summarize(runs)
+    result = {
+        'target': args.target,
+        'path': args.path,
+        'runs': args.runs,
+        'python': sys.version.split()[0],
+        'status': runs[-1]['status'],
+        'psycopg2_loaded': runs[-1]['psycopg2_loaded'],
+        'summary': summary
+    }
+
+    print(f"Cold start: {args.runs} runs of {args.target} -> GET {args.path} (status {result['status']})")
+    print(f"{'metric':<18} {'min':>8} {'median':>8} {'p95':>8} {'max':>8}")
+    for metric, stats in summary.items():
+        print(f"{metric:<18} {stats['min']:>8} {stats['median']:>8} {stats['p95']:>8} {stats['max']:>8}")
+    print(f"psycopg2 imported before first response: {result['psycopg2_loaded']}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        before = baseline['summary']['process_ms']['median']
+        after = summary['process_ms']['median']
+        change = (after - before) / before * 100 if before else 0
+        print(f"Median process time: {before} ms -> {after} ms ({change:+.1f}%)")
+        if change > args.max_regression:
+            print(f"Cold start regressed by more than {args.max_regression}%")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
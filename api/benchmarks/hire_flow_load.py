@@ -0,0 +1,411 @@
+"""
+New-hire Wizard Load Test
+Replays the diary/hires/new flow with concurrent virtual users against a running API,
+mixed with allocation and dashboard traffic, and reports per-step latency percentiles,
+errors and database-side statistics
+
+    cd api
+    python benchmarks/hire_flow_load.py                                  # 10 users for 60s
+    python benchmarks/hire_flow_load.py --users 50 --duration 120 --ramp-up 10
+    python benchmarks/hire_flow_load.py --read-only                      # no hires created
+    python benchmarks/hire_flow_load.py --save benchmarks/results/hire_flow.json
+    python benchmarks/hire_flow_load.py --baseline benchmarks/results/hire_flow.json
+
+Each virtual user logs in once, then loops: customer search -> contacts + sites ->
+equipment-type search with dates -> auto accessories -> validate -> create hire.
+Between flows a user may run the allocation flow (pending allocations -> available
+units -> allocate) or poll the dashboard, per --allocation-mix / --dashboard-mix.
+Hires created by the test carry the note LOADTEST so they can be found afterwards.
+
+Database statistics come from pg_stat_database (and pg_stat_statements when the
+extension is installed), read before and after the run with the API's own
+connection settings (PGHOST, PGDATABASE, ... or DATABASE_URL).
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Steps in report order
+FLOW_STEPS = ['login', 'customer_search', 'contacts', 'sites', 'equipment_search', 'auto_accessories',
+              'validate', 'create_hire']
+ALLOCATION_STEPS = ['pending_allocations', 'available_units', 'allocate']
+DASHBOARD_STEPS = ['todays_hires', 'unassigned_board', 'hire_list']
+
+DB_COUNTERS = ['xact_commit', 'xact_rollback', 'blks_read', 'blks_hit', 'tup_returned', 'tup_fetched',
+               'tup_inserted', 'tup_updated', 'tup_deleted', 'conflicts', 'deadlocks', 'temp_files', 'temp_bytes']
+
+REQUEST_TIMEOUT = 30
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StepStats:
+    """Latency samples and errors per step, shared by every virtual user"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_examples: Dict[str, str] = {}
+
+    def record(self, step: str, elapsed_ms: float, error: Optional[str] = None):
+        with self._lock:
+            self.samples[step].append(elapsed_ms)
+            if error:
+                self.errors[step] += 1
+                self.error_examples.setdefault(step, error[:200])
+
+    def summary(self, seconds: float) -> Dict:
+        steps = {}
+        for step in FLOW_STEPS + ALLOCATION_STEPS + DASHBOARD_STEPS:
+            values = self.samples.get(step)
+            if not values:
+                continue
+            steps[step] = {
+                'requests': len(values),
+                'errors': self.errors.get(step, 0),
+                'error_rate': round(self.errors.get(step, 0) / len(values), 4),
+                'rps': round(len(values) / seconds, 2),
+                'p50_ms': round(percentile(values, 50), 1),
+                'p95_ms': round(percentile(values, 95), 1),
+                'p99_ms': round(percentile(values, 99), 1),
+                'max_ms': round(max(values), 1)
+            }
+            if step in self.error_examples:
+                steps[step]['example_error'] = self.error_examples[step]
+        return steps
+
+
+class VirtualUser(threading.Thread):
+    """One browser session working through the wizard in a loop"""
+
+    def __init__(self, number: int, args, stats: StepStats, fixtures: Dict, stop_at: float):
+        super().__init__(name=f'vu-{number}', daemon=True)
+        self.args = args
+        self.stats = stats
+        self.fixtures = fixtures
+        self.stop_at = stop_at
+        self.random = random.Random(args.seed + number)
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.flows = 0
+
+    def call(self, step: str, path: str, body: Dict = None, ok=lambda data: True):
+        """Time one request; non-2xx responses, bad JSON or a failed ok() check count as errors"""
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.args.base_url + path, data=data,
+                                         headers={'Content-Type': 'application/json'} if data else {})
+        started = time.perf_counter()
+        error = None
+        payload = None
+        try:
+            with self.opener.open(request, timeout=REQUEST_TIMEOUT) as response:
+                payload = json.loads(response.read() or b'null')
+            if not ok(payload):
+                error = f"unexpected response: {json.dumps(payload)[:150]}"
+        except urllib.error.HTTPError as e:
+            error = f"HTTP {e.code}: {e.read()[:150].decode(errors='replace')}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.stats.record(step, (time.perf_counter() - started) * 1000, error)
+        return None if error else payload
+
+    def think(self):
+        if self.args.think_time:
+            time.sleep(self.random.uniform(0.5, 1.5) * self.args.think_time)
+
+    def run(self):
+        self.call('login', '/api/auth/login', {'username': 'operator', 'password': 'op123'},
+                  ok=lambda data: data.get('success'))
+        while time.time() < self.stop_at:
+            if self.args.iterations and self.flows >= self.args.iterations:
+                return
+            self.hire_flow()
+            self.flows += 1
+            roll = self.random.random()
+            if roll < self.args.allocation_mix:
+                self.allocation_flow()
+            elif roll < self.args.allocation_mix + self.args.dashboard_mix:
+                self.dashboard_flow()
+
+    def hire_flow(self):
+        customer = self.random.choice(self.fixtures['customers'])
+        term = (customer.get('name') or 'a')[:3]
+        self.call('customer_search', f"/api/customers?search={urllib.request.quote(term)}",
+                  ok=lambda data: isinstance(data, list))
+        self.think()
+
+        customer_id = customer['id']
+        contacts = self.call('contacts', f'/api/customers/{customer_id}/contacts',
+                             ok=lambda data: isinstance(data, list)) or []
+        sites = self.call('sites', f'/api/customers/{customer_id}/sites',
+                          ok=lambda data: isinstance(data, list)) or []
+        self.think()
+
+        start = date.today() + timedelta(days=self.random.randint(0, 14))
+        end = start + timedelta(days=self.random.randint(1, 45))
+        equipment_type = self.random.choice(self.fixtures['equipment_types'])
+        term = (equipment_type.get('type_name') or 'a')[:4]
+        self.call('equipment_search',
+                  f"/api/equipment-types?search={urllib.request.quote(term)}&hire_start_date={start}"
+                  f"&hire_end_date={end}",
+                  ok=lambda data: isinstance(data, list))
+        self.think()
+
+        equipment_types = [{'equipment_type_id': equipment_type['equipment_type_id'],
+                            'quantity': self.random.randint(1, 3)}]
+        accessories = self.call('auto_accessories', '/api/accessories/auto-calculate',
+                                {'equipment_types': equipment_types},
+                                ok=lambda data: isinstance(data, list)) or []
+        self.think()
+
+        if self.args.read_only or not contacts or not sites:
+            return
+        hire = {
+            'customer_id': customer_id,
+            'contact_id': contacts[0]['contact_id'],
+            'site_id': sites[0]['site_id'],
+            'hire_start_date': start.isoformat(),
+            'hire_end_date': end.isoformat(),
+            'delivery_date': start.isoformat(),
+            'delivery_time': '09:00',
+            'contact_method': 'phone',
+            'special_instructions': '',
+            'notes': 'LOADTEST',
+            'equipment_types': equipment_types,
+            'accessories': [{'accessory_id': item['accessory_id'], 'quantity': item.get('total_quantity', 1)}
+                            for item in accessories if item.get('accessory_id')]
+        }
+        self.call('validate', '/api/hire/validate', hire, ok=lambda data: data.get('is_valid'))
+        self.call('create_hire', '/api/hire/create', hire, ok=lambda data: data.get('success'))
+
+    def allocation_flow(self):
+        pending = self.call('pending_allocations', '/api/hire/pending-allocations',
+                            ok=lambda data: isinstance(data, list)) or []
+        candidates = [hire for hire in pending if hire.get('generic_equipment')]
+        if not candidates:
+            return
+        hire = self.random.choice(candidates)
+        booking = self.random.choice(hire['generic_equipment'])
+        units = self.call('available_units', f"/api/hire/equipment/{booking['equipment_type_id']}/available",
+                          ok=lambda data: isinstance(data, list)) or []
+        if self.args.read_only or not units:
+            return
+        self.think()
+        self.call('allocate', '/api/hire/allocate-equipment', {
+            'hire_id': hire['interaction_id'],
+            'equipment_type_id': booking['equipment_type_id'],
+            'equipment_ids': [self.random.choice(units)['equipment_id']]
+        }, ok=lambda data: data.get('success'))
+
+    def dashboard_flow(self):
+        self.call('todays_hires', '/api/hire/today', ok=lambda data: isinstance(data, list))
+        self.call('unassigned_board', '/api/tasks/unassigned/board')
+        self.call('hire_list', '/api/hire/list', ok=lambda data: data.get('success'))
+
+
+# =============================================================================
+# FIXTURES AND DATABASE STATS
+# =============================================================================
+
+def load_fixtures(base_url: str) -> Dict:
+    """Customers and equipment types to drive the flow, read through the API"""
+    def get(path):
+        with urllib.request.urlopen(base_url + path, timeout=REQUEST_TIMEOUT) as response:
+            return json.loads(response.read())
+
+    customers = [row for row in get('/api/customers') if row.get('id')]
+    equipment_types = [row for row in get('/api/equipment-types?limit=500') if row.get('equipment_type_id')]
+    if not customers or not equipment_types:
+        raise RuntimeError('The API returned no customers or equipment types - load sample data first')
+    return {'customers': customers, 'equipment_types': equipment_types}
+
+
+def database_snapshot() -> Optional[Dict]:
+    """pg_stat_database counters and pg_stat_statements totals, or None if the database is unreachable"""
+    try:
+        from database.connection import get_db_connection
+        conn = get_db_connection()
+    except Exception as e:
+        print(f"(database stats unavailable: {str(e).strip().splitlines()[0]})")
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {', '.join(DB_COUNTERS)}, numbackends
+            FROM pg_stat_database WHERE datname = current_database()
+        """)
+        row = cursor.fetchone()
+        snapshot = {'database': dict(zip(DB_COUNTERS + ['numbackends'], [int(value or 0) for value in row])),
+                    'statements': {}}
+        try:
+            cursor.execute("""
+                SELECT queryid::TEXT, LEFT(query, 120), calls, total_exec_time
+                FROM pg_stat_statements
+                WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+            """)
+            snapshot['statements'] = {queryid: {'query': query, 'calls': calls, 'total_ms': total}
+                                      for queryid, query, calls, total in cursor.fetchall()}
+        except Exception:
+            pass
+        cursor.close()
+        return snapshot
+    finally:
+        conn.close()
+
+
+def database_delta(before: Optional[Dict], after: Optional[Dict], top: int = 10) -> Optional[Dict]:
+    if not before or not after:
+        return None
+    counters = {name: after['database'][name] - before['database'][name] for name in DB_COUNTERS}
+    reads = counters['blks_hit'] + counters['blks_read']
+    counters['cache_hit_ratio'] = round(counters['blks_hit'] / reads, 4) if reads else None
+    counters['backends_after'] = after['database']['numbackends']
+
+    statements = []
+    for queryid, stats in after['statements'].items():
+        previous = before['statements'].get(queryid, {'calls': 0, 'total_ms': 0.0})
+        calls = stats['calls'] - previous['calls']
+        if calls > 0:
+            total = stats['total_ms'] - previous['total_ms']
+            statements.append({'query': stats['query'], 'calls': calls, 'total_ms': round(total, 1),
+                               'mean_ms': round(total / calls, 2)})
+    statements.sort(key=lambda s: s['total_ms'], reverse=True)
+    return {'counters': counters, 'top_statements': statements[:top]}
+
+
+# =============================================================================
+# REPORTING AND BASELINES
+# =============================================================================
+
+def print_report(result: Dict):
+    print(f"\n{result['users']} users, {result['seconds']}s, {result['flows']} hire flows "
+          f"({result['flows_per_second']}/s)\n")
+    print(f"{'step':<20} {'reqs':>7} {'err%':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for step, stats in result['steps'].items():
+        print(f"{step:<20} {stats['requests']:>7} {stats['error_rate'] * 100:>5.1f}% {stats['rps']:>7} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['max_ms']:>8}")
+    for step, stats in result['steps'].items():
+        if stats.get('example_error'):
+            print(f"  {step}: {stats['example_error']}")
+
+    database = result.get('database')
+    if database:
+        counters = database['counters']
+        print(f"\nDatabase: {counters['xact_commit']} commits, {counters['xact_rollback']} rollbacks, "
+              f"cache hit {counters['cache_hit_ratio']}, {counters['tup_returned']} tuples returned, "
+              f"{counters['tup_inserted']} inserted, {counters['deadlocks']} deadlocks, "
+              f"{counters['temp_bytes']} temp bytes")
+        for statement in database['top_statements']:
+            print(f"  {statement['total_ms']:>10.1f} ms {statement['calls']:>7} calls "
+                  f"{statement['mean_ms']:>8.2f} ms/call  {statement['query']}")
+
+
+def compare_to_baseline(result: Dict, baseline: Dict, max_regression: float, max_error_rate: float) -> List[str]:
+    """Steps whose p95 regressed past max_regression percent, or whose error rate rose past max_error_rate"""
+    failures = []
+    print(f"\n{'step':<20} {'base p95':>9} {'now p95':>9} {'change':>8}")
+    for step, stats in result['steps'].items():
+        before = baseline['steps'].get(step)
+        if not before:
+            continue
+        change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        print(f"{step:<20} {before['p95_ms']:>9} {stats['p95_ms']:>9} {change:>+7.1f}%")
+        if change > max_regression:
+            failures.append(f"{step}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms ({change:+.1f}%)")
+        if stats['error_rate'] > max(before['error_rate'], max_error_rate):
+            failures.append(f"{step}: error rate {before['error_rate']:.2%} -> {stats['error_rate']:.2%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the new-hire wizard flow')
+    parser.add_argument('--base-url', default=os.getenv('LOADTEST_BASE_URL', 'http://localhost:5328'))
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to run')
+    parser.add_argument('--iterations', type=int, default=0, help='hire flows per user (0 = until duration)')
+    parser.add_argument('--ramp-up', type=float, default=5, help='seconds over which users start')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean pause between steps (seconds)')
+    parser.add_argument('--allocation-mix', type=float, default=0.3, help='share of flows followed by allocation')
+    parser.add_argument('--dashboard-mix', type=float, default=0.4, help='share of flows followed by dashboard polling')
+    parser.add_argument('--read-only', action='store_true', help='skip validate/create/allocate (no writes)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against a saved results file')
+    parser.add_argument('--max-regression', type=float, default=20.0,
+                        help='percent p95 increase over baseline that fails the run')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='error rate a step may reach before it fails the run')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.base_url)
+    print(f"Target {args.base_url}: {len(fixtures['customers'])} customers, "
+          f"{len(fixtures['equipment_types'])} equipment types")
+
+    before = database_snapshot()
+    stats = StepStats()
+    started = time.time()
+    stop_at = started + args.duration
+    users = []
+    for number in range(args.users):
+        user = VirtualUser(number, args, stats, fixtures, stop_at)
+        user.start()
+        users.append(user)
+        if args.ramp_up and args.users > 1:
+            time.sleep(args.ramp_up / (args.users - 1))
+    for user in users:
+        user.join()
+    seconds = max(time.time() - started, 0.001)
+    after = database_snapshot()
+
+    flows = sum(user.flows for user in users)
+    result = {
+        'base_url': args.base_url,
+        'users': args.users,
+        'seconds': round(seconds, 1),
+        'read_only': args.read_only,
+        'mix': {'allocation': args.allocation_mix, 'dashboard': args.dashboard_mix},
+        'flows': flows,
+        'flows_per_second': round(flows / seconds, 2),
+        'steps': stats.summary(seconds),
+        'database': database_delta(before, after)
+    }
+    print_report(result)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare_to_baseline(result, baseline, args.max_regression, args.max_error_rate)
+        if failures:
+            print('\nPerformance gate failed:')
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print('\nPerformance gate passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Off-Hire Benchmark
+Times closing a site's worth of units: one sp_bulk_off_hire call for the whole
+hire against one call per unit (returns handled one unit at a time), and checks
+the units were freed and the collection tasks booked.
+
+    cd api
+    python benchmarks/off_hire.py                     # one hire of 200 units
+    python benchmarks/off_hire.py --units 1000 --hires 5 --json off_hire.json
+
+Everything runs in one transaction that is rolled back at the end, so the
+synthetic units, hires, allocations and collection tasks never become visible.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import pooled_connection
+
+BENCHMARK_PREFIX = 'OHB'
+
+
+def seed(cursor, units: int, hires: int) -> dict:
+    """Live hires starting last week with units delivered to site, spread evenly"""
+    cursor.execute("SELECT MIN(id) FROM core.employees")
+    employee_id = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT c.customer_id, c.id, s.id
+        FROM core.contacts c
+        LEFT JOIN core.sites s ON s.customer_id = c.customer_id
+        ORDER BY c.id
+        LIMIT 1
+    """)
+    customer_id, contact_id, site_id = cursor.fetchone()
+    cursor.execute("SELECT MIN(id) FROM equipment.equipment_types")
+    type_id = cursor.fetchone()[0]
+
+    cursor.execute("""
+        INSERT INTO equipment.equipment (equipment_type_id, asset_code, status, created_by)
+        SELECT %(type_id)s, %(prefix)s || lpad(n::TEXT, 10, '0'), 'rented', %(employee_id)s
+        FROM generate_series(1, %(units)s) AS n
+        RETURNING id
+    """, {'type_id': type_id, 'prefix': BENCHMARK_PREFIX, 'employee_id': employee_id, 'units': units})
+    unit_ids = [row[0] for row in cursor.fetchall()]
+
+    start = date.today() - timedelta(days=7)
+    cursor.execute("""
+        INSERT INTO interactions.interactions (
+            customer_id, contact_id, employee_id, interaction_type, status, reference_number,
+            contact_method, hire_start_date, delivery_date, site_id, created_by
+        )
+        SELECT %(customer_id)s, %(contact_id)s, %(employee_id)s, 'hire', 'in_progress',
+               %(prefix)s || lpad(n::TEXT, 12, '0'), 'phone', %(start)s, %(start)s, %(site_id)s, %(employee_id)s
+        FROM generate_series(1, %(hires)s) AS n
+        RETURNING id
+    """, {'customer_id': customer_id, 'contact_id': contact_id, 'employee_id': employee_id,
+          'prefix': BENCHMARK_PREFIX, 'start': start, 'site_id': site_id, 'hires': hires})
+    hire_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("""
+        INSERT INTO interactions.interaction_equipment (interaction_id, equipment_id, allocation_status, allocated_by)
+        SELECT (%(hire_ids)s::INTEGER[])[1 + (n - 1) %% %(hires)s], (%(unit_ids)s::INTEGER[])[n], 'delivered',
+               %(employee_id)s
+        FROM generate_series(1, %(units)s) AS n
+    """, {'hire_ids': hire_ids, 'unit_ids': unit_ids, 'hires': hires, 'units': units, 'employee_id': employee_id})
+    return {'hire_ids': hire_ids, 'unit_ids': unit_ids, 'employee_id': employee_id}
+
+
+def off_hire(cursor, hire_ids, employee_id, equipment_ids=None) -> list:
+    cursor.execute("SELECT * FROM sp_bulk_off_hire(%s, %s, %s, %s)",
+                   (hire_ids, date.today(), employee_id, equipment_ids))
+    return cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk off-hire vs one unit at a time')
+    parser.add_argument('--units', type=int, default=200, help='units on site')
+    parser.add_argument('--hires', type=int, default=1, help='hires the units are spread over')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {'units': args.units, 'hires': args.hires}
+    with pooled_connection(autocommit=False) as conn:
+        cursor = conn.cursor()
+        try:
+            seeded = seed(cursor, args.units, args.hires)
+            print(f"Seeded {args.units:,} units on {args.hires:,} hires (rolled back afterwards)")
+
+            cursor.execute("SAVEPOINT off_hire")
+            started = time.perf_counter()
+            for index, unit_id in enumerate(seeded['unit_ids']):
+                off_hire(cursor, [seeded['hire_ids'][index % args.hires]], seeded['employee_id'], [unit_id])
+            per_unit_ms = (time.perf_counter() - started) * 1000
+            cursor.execute("ROLLBACK TO SAVEPOINT off_hire")
+
+            started = time.perf_counter()
+            rows = off_hire(cursor, seeded['hire_ids'], seeded['employee_id'])
+            bulk_ms = (time.perf_counter() - started) * 1000
+
+            cursor.execute("""
+                SELECT COUNT(*) FROM tasks.drivers_taskboard
+                WHERE interaction_id = ANY(%s) AND task_type = 'collection'
+            """, (seeded['hire_ids'],))
+            tasks = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM equipment.equipment WHERE id = ANY(%s) AND status = 'available'",
+                           (seeded['unit_ids'],))
+            freed = cursor.fetchone()[0]
+
+            results.update({
+                'per_unit_ms': round(per_unit_ms, 1),
+                'bulk_ms': round(bulk_ms, 1),
+                'units_returned': sum(row[3] for row in rows),
+                'hires_completed': sum(1 for row in rows if row[5]),
+                'units_freed': freed,
+                'collection_tasks': tasks
+            })
+            print(f"\none call per unit:  {per_unit_ms:>9.1f}ms  ({args.units:,} calls)")
+            print(f"one bulk call:      {bulk_ms:>9.1f}ms  "
+                  f"({per_unit_ms / max(bulk_ms, 0.001):.1f}x faster)")
+            print(f"\n{results['units_returned']:,} units returned, {freed:,} back in stock, "
+                  f"{results['hires_completed']:,} hires completed, {tasks:,} collection tasks")
+        finally:
+            conn.rollback()
+            cursor.close()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Pricing Engine Benchmark
+Times cheapest-rate pricing and billing-run batches over synthetic hire lines, without a database
+
+    cd api
+    python benchmarks/pricing_engine.py                     # 100,000 lines
+    python benchmarks/pricing_engine.py --lines 500000 --target-seconds 1
+
+Lines are built in the row shape the billing run fetches, so the billing timing
+includes turning rows into arrays.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing.pricing_engine import OPEN_END, PricingEngine, cheapest_rental, day_number
+
+
+def synthetic_rows(lines: int, seed: int = 11):
+    """Equipment and accessory lines of hires running through the current month"""
+    rng = np.random.default_rng(seed)
+    today = day_number(date.today())
+    starts = today - rng.integers(0, 400, lines)
+    ends = starts + rng.integers(0, 240, lines)
+    ends = np.where(rng.random(lines) < 0.1, OPEN_END, ends)
+    daily = rng.integers(50, 1500, lines).astype(float)
+    weekly = np.where(rng.random(lines) < 0.9, np.round(daily * rng.uniform(4, 6.5, lines)), 0)
+    monthly = np.where(rng.random(lines) < 0.8, np.round(daily * rng.uniform(14, 24, lines)), 0)
+    accessory = rng.random(lines) < 0.3
+
+    rows = []
+    for n in range(lines):
+        if accessory[n]:
+            rows.append((n // 4, f'HIR{n // 4:08d}', 1, 'accessory', n, 'ACC', 'Accessory', 2.0,
+                         int(starts[n]), int(ends[n]), 0.0, 0.0, 0.0, 35.0))
+        else:
+            rows.append((n // 4, f'HIR{n // 4:08d}', 1, 'equipment', n, 'EQ', 'Equipment', 1.0,
+                         int(starts[n]), int(ends[n]), daily[n], weekly[n], monthly[n], 0.0))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pricing engine throughput')
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--target-seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.lines)
+    equipment = [row for row in rows if row[3] == 'equipment']
+    days = np.array([max(row[9], row[8]) - row[8] + 1 for row in equipment])
+    rates = np.array([row[10:13] for row in equipment])
+    print(f"Synthetic lines: {len(rows)} ({len(equipment)} equipment, {len(rows) - len(equipment)} accessories)\n")
+
+    started = time.perf_counter()
+    priced = cheapest_rental(days, rates[:, 0], rates[:, 1], rates[:, 2])
+    pricing_seconds = time.perf_counter() - started
+    daily_only = (days * rates[:, 0]).sum()
+    print(f"{'cheapest rental':<20} {pricing_seconds:>8.3f}s  {len(equipment) / pricing_seconds:>12,.0f} lines/s  "
+          f"(saves {1 - priced['cost'].sum() / daily_only:.1%} vs daily rate)")
+
+    first_day = day_number(date.today().replace(day=1))
+    started = time.perf_counter()
+    charges = PricingEngine.bill_batch(rows, first_day, day_number(date.today()))
+    billing_seconds = time.perf_counter() - started
+    print(f"{'billing batch':<20} {billing_seconds:>8.3f}s  {len(rows) / billing_seconds:>12,.0f} lines/s  "
+          f"({int(charges['billable'].sum())} billable, total {charges['charge'].sum():,.2f})")
+
+    slowest = max(pricing_seconds, billing_seconds)
+    print(f"\nSlowest: {slowest:.3f}s for {args.lines} lines (target {args.target_seconds}s)")
+    if slowest > args.target_seconds:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
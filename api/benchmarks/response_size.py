@@ -0,0 +1,133 @@
+"""
+Response Size Benchmark
+Measures bytes on the wire for the list endpoints against a running API: the full
+payload, the same request with a typical ?fields= projection, and each of those
+uncompressed, gzip and brotli (brotli only when the server has it installed).
+
+    cd api
+    python benchmarks/response_size.py
+    python benchmarks/response_size.py --base-url http://localhost:5328 --json benchmarks/results/sizes.json
+
+Sizes are the response bodies as sent, with Content-Encoding applied, which is
+what the client downloads. The server's running totals per encoding are in
+/api/metrics under 'compression'.
+"""
+
+import argparse
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+
+REQUEST_TIMEOUT = 30
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def scenarios(customer_id: int):
+    """(name, path, fields the screen actually uses)"""
+    start = date.today().isoformat()
+    end = (date.today() + timedelta(days=7)).isoformat()
+    return [
+        ('equipment types (keystroke)', '/api/equipment-types?search=a&limit=50',
+         'equipment_type_id,type_code,type_name'),
+        ('equipment types with dates', f'/api/equipment-types?search=a&limit=50&hire_start_date={start}'
+                                       f'&hire_end_date={end}',
+         'equipment_type_id,type_name,daily_rate,available_units'),
+        ('equipment units', '/api/equipment?limit=200', 'equipment_id,asset_code,type_name'),
+        ('customers', '/api/customers?search=', 'id,name'),
+        ('contacts', f'/api/customers/{customer_id}/contacts', 'contact_id,full_name'),
+        ('sites', f'/api/customers/{customer_id}/sites', 'site_id,site_name'),
+        ('fleet status', '/api/equipment/fleet-status?limit=500', 'equipment_id,asset_code,unit_state'),
+        ('hire list', '/api/hires?limit=500', 'id,reference_number,customer_name,status'),
+        ('allocation queue', '/api/hire/allocation-queue?limit=200',
+         'interaction_id,reference_number,priority,units_pending')
+    ]
+
+
+class Client:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def login(self, username: str, password: str):
+        self.fetch('/api/auth/login', 'identity', {'username': username, 'password': password})
+
+    def fetch(self, path: str, encoding: str, body: dict = None) -> dict:
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {'Accept-Encoding': encoding}
+        if data is not None:
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        started = time.perf_counter()
+        with self.opener.open(request, timeout=REQUEST_TIMEOUT) as response:
+            payload = response.read()
+            return {
+                'bytes': len(payload),
+                'encoding': response.headers.get('Content-Encoding', 'identity'),
+                'ms': round((time.perf_counter() - started) * 1000, 1),
+                'payload': payload
+            }
+
+
+def first_customer_id(client: Client) -> int:
+    customers = json.loads(client.fetch('/api/customers?fields=id', 'identity')['payload'])
+    return customers[0]['id'] if customers else 1
+
+
+def measure(client: Client, path: str, fields: str) -> dict:
+    separator = '&' if '?' in path else '?'
+    result = {}
+    for variant, url in (('full', path), ('fields', f'{path}{separator}fields={fields}')):
+        result[variant] = {}
+        for encoding in ENCODINGS:
+            response = client.fetch(url, encoding)
+            if response['encoding'] != encoding and encoding != 'identity':
+                # Server does not offer this encoding (or the body was below the threshold)
+                result[variant][encoding] = None
+                continue
+            result[variant][encoding] = {'bytes': response['bytes'], 'ms': response['ms']}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes on the wire for list endpoints')
+    parser.add_argument('--base-url', default=os.getenv('LOADTEST_BASE_URL', 'http://localhost:5328'))
+    parser.add_argument('--username', default='operator')
+    parser.add_argument('--password', default='op123')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    client = Client(args.base_url)
+    client.login(args.username, args.password)
+    customer_id = first_customer_id(client)
+
+    def size(entry):
+        return f"{entry['bytes']:>9,}" if entry else f"{'-':>9}"
+
+    results = {'base_url': args.base_url, 'endpoints': {}}
+    print(f"{'endpoint':<28} {'full':>9} {'gzip':>9} {'br':>9} | {'fields':>9} {'gzip':>9} {'br':>9}  saved")
+    for name, path, fields in scenarios(customer_id):
+        try:
+            result = measure(client, path, fields)
+        except urllib.error.URLError as e:
+            print(f"{name:<28} failed: {e}")
+            continue
+        results['endpoints'][name] = dict(result, path=path, fields=fields)
+        before = result['full']['identity']['bytes']
+        smallest = min(entry['bytes'] for variant in result.values() for entry in variant.values() if entry)
+        saved = f"{100 * (1 - smallest / before):.0f}%" if before else '-'
+        print(f"{name:<28} {size(result['full']['identity'])} {size(result['full']['gzip'])} "
+              f"{size(result['full']['br'])} | {size(result['fields']['identity'])} "
+              f"{size(result['fields']['gzip'])} {size(result['fields']['br'])}  {saved}", flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Utilization Engine Benchmark
+Times full-history utilization reports over a synthetic fleet, without a database
+
+    cd api
+    python benchmarks/utilization_engine.py                         # 50,000 units, 10 years
+    python benchmarks/utilization_engine.py --units 100000 --years 15 --target-seconds 5
+
+The snapshot is built from the same row shapes the loader fetches, so the timings
+include converting rows to arrays as well as computing each report.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics.utilization_engine import FleetSnapshot, FleetUtilizationEngine, OPEN_END, day_number
+
+
+def synthetic_rows(units: int, types: int, years: int, seed: int = 7):
+    """Types, units and back-to-back hires with idle gaps, as loader rows"""
+    rng = np.random.default_rng(seed)
+    today = day_number(date.today())
+    first_day = today - years * 365
+
+    type_rows = [(t + 1, f'T{t + 1:03d}', f'Type {t + 1}', float(rng.integers(50, 2000)), 0, 0)
+                 for t in range(types)]
+
+    unit_types = rng.integers(1, types + 1, units)
+    acquired = first_day + rng.integers(0, years * 365 // 2, units)
+    sold = np.where(rng.random(units) < 0.05, today - rng.integers(0, 365, units), OPEN_END)
+    unit_rows = list(zip(range(1, units + 1), unit_types.tolist(), [f'A{n:06d}' for n in range(1, units + 1)],
+                         acquired.tolist(), sold.tolist()))
+
+    # Per unit: hires of 1-60 days separated by 0-30 idle days, from acquisition to today
+    interval_rows = []
+    average = 45 + 15
+    hires_per_unit = max(1, years * 365 // average)
+    lengths = rng.integers(1, 61, (units, hires_per_unit))
+    gaps = rng.integers(0, 31, (units, hires_per_unit))
+    starts = acquired[:, None] + np.cumsum(lengths + gaps, axis=1) - lengths
+    ends = starts + lengths
+    keep = starts < today
+    unit_ids = np.broadcast_to(np.arange(1, units + 1)[:, None], starts.shape)
+    ends = np.where(ends > today, OPEN_END, ends)
+    interval_rows = list(zip(unit_ids[keep].tolist(), starts[keep].tolist(), ends[keep].tolist()))
+    return type_rows, unit_rows, interval_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-history utilization report timings')
+    parser.add_argument('--units', type=int, default=50000)
+    parser.add_argument('--types', type=int, default=200)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--target-seconds', type=float, default=5.0,
+                        help='fail if any full-history report takes longer')
+    args = parser.parse_args()
+
+    type_rows, unit_rows, interval_rows = synthetic_rows(args.units, args.types, args.years)
+    print(f"Synthetic fleet: {len(unit_rows)} units, {len(type_rows)} types, "
+          f"{len(interval_rows)} allocations over {args.years} years\n")
+
+    started = time.perf_counter()
+    snapshot = FleetSnapshot(type_rows, unit_rows, interval_rows)
+    print(f"{'snapshot build':<28} {(time.perf_counter() - started):>8.3f}s")
+
+    engine = FleetUtilizationEngine()
+    slowest = 0.0
+    for group_by, period in [('fleet', 'month'), ('type', 'month'), ('type', 'quarter'),
+                             ('type', 'year'), ('unit', 'month'), ('unit', 'all')]:
+        started = time.perf_counter()
+        result = engine.compute(snapshot, group_by, period)
+        seconds = time.perf_counter() - started
+        slowest = max(slowest, seconds)
+        print(f"{group_by + ' / ' + period:<28} {seconds:>8.3f}s  "
+              f"{len(result['periods']):>4} periods, {len(result['rows']):>5} rows, "
+              f"fleet utilization {result['totals']['utilization']:.1%}")
+
+    print(f"\nSlowest report: {slowest:.3f}s (target {args.target_seconds}s)")
+    if slowest > args.target_seconds:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Bulk Data Management
+CSV bulk import (COPY FROM STDIN into a staging table, set-based validation and upsert)
+and streaming CSV export (COPY TO STDOUT) for depot onboarding and month-end reporting
+"""
+
+import csv
+import io
+import json
+import queue
+import threading
+import time
+from typing import BinaryIO, Dict, Iterator
+import logging
+
+from database.connection import pooled_connection
+
+logger = logging.getLogger(__name__)
+
+# Import entities -> staging table (see 10_bulk_data_procedures.sql)
+IMPORT_ENTITIES = {
+    'equipment': 'bulk_stage_equipment',
+    'customers': 'bulk_stage_customers',
+    'contacts': 'bulk_stage_contacts',
+    'sites': 'bulk_stage_sites'
+}
+
+# Export entities -> export function and the filters it accepts
+EXPORT_ENTITIES = {
+    'interactions': ('sp_export_interactions', ['date_from', 'date_to', 'interaction_type']),
+    'allocations': ('sp_export_allocations', ['date_from', 'date_to']),
+    'accessories': ('sp_export_accessories', ['date_from', 'date_to'])
+}
+
+# Row errors returned in an import report (the total is always reported)
+MAX_REPORTED_ERRORS = 1000
+
+# Export chunks buffered between the COPY thread and the HTTP response
+EXPORT_QUEUE_CHUNKS = 64
+EXPORT_PUT_TIMEOUT = 60
+
+
+class BulkImportError(ValueError):
+    """The CSV cannot be imported at all (unknown entity, bad header)"""
+
+
+class _CsvBody(io.RawIOBase):
+    """Byte stream handed to COPY (header already consumed), counting bytes read"""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data or b'')
+        return data
+
+
+class _QueueWriter:
+    """File-like target for COPY TO STDOUT that hands chunks to a consumer thread"""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def write(self, data):
+        while True:
+            if self.cancelled.is_set():
+                raise IOError('export cancelled by client')
+            try:
+                self.chunks.put(data, timeout=1)
+                return len(data)
+            except queue.Full:
+                continue
+
+
+class BulkDataManager:
+    """Bulk CSV import and export through COPY"""
+
+    # =========================================================================
+    # IMPORT
+    # =========================================================================
+
+    def import_csv(self, entity: str, stream: BinaryIO, employee_id: int = 1,
+                   dry_run: bool = False, skip_invalid: bool = False) -> Dict:
+        """Load a CSV into the staging table with COPY, validate it and upsert.
+
+        Every row is checked before anything is written. With skip_invalid the
+        valid rows are applied and the rest reported; otherwise any error aborts
+        the import. dry_run applies everything and rolls back, so the report
+        shows exactly what would change.
+        """
+        if entity not in IMPORT_ENTITIES:
+            raise BulkImportError(f"Unknown import entity '{entity}' (expected one of {', '.join(IMPORT_ENTITIES)})")
+        stage_table = IMPORT_ENTITIES[entity]
+        started = time.perf_counter()
+
+        header_line = stream.readline()
+        if not header_line:
+            raise BulkImportError('CSV is empty')
+        header = next(csv.reader([header_line.decode('utf-8-sig')]))
+        columns = [column.strip().lower() for column in header]
+
+        with pooled_connection(autocommit=False) as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT sp_bulk_create_stage(%s)", [entity])
+                cursor.execute(f"SELECT * FROM {stage_table} LIMIT 0")
+                allowed = [description[0] for description in cursor.description if description[0] != 'line_no']
+
+                unknown = [column for column in columns if column not in allowed]
+                if unknown:
+                    raise BulkImportError(f"Unknown column(s) for {entity}: {', '.join(unknown)}. "
+                                          f"Allowed: {', '.join(allowed)}")
+                if len(set(columns)) != len(columns):
+                    raise BulkImportError('CSV header repeats a column')
+
+                # Stage: one COPY for the whole file, line_no assigned in file order
+                body = _CsvBody(stream)
+                cursor.copy_expert(
+                    f"COPY {stage_table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", body
+                )
+                rows = cursor.rowcount
+                staged_at = time.perf_counter()
+
+                # Validate: set-based checks, errors keyed by staging line
+                cursor.execute(f"SELECT sp_bulk_validate_{entity}()")
+                error_count = cursor.fetchone()[0]
+                cursor.execute("""
+                    SELECT line_no + 1 AS line, field, message
+                    FROM bulk_stage_errors
+                    ORDER BY line_no, field
+                    LIMIT %s
+                """, [MAX_REPORTED_ERRORS])
+                errors = [{'line': line, 'field': field, 'message': message}
+                          for line, field, message in cursor.fetchall()]
+                invalid_rows = 0
+                if error_count:
+                    cursor.execute("SELECT COUNT(DISTINCT line_no) FROM bulk_stage_errors")
+                    invalid_rows = cursor.fetchone()[0]
+
+                inserted = updated = 0
+                applied = not error_count or skip_invalid
+                if applied:
+                    cursor.execute(f"SELECT inserted, updated FROM sp_bulk_apply_{entity}(%s)", [employee_id])
+                    inserted, updated = cursor.fetchone()
+                    cursor.execute("SELECT sp_log_activity(%s, %s, %s, %s, %s, %s::JSONB)", [
+                        employee_id, 'BULK_IMPORT', entity, None, None,
+                        json.dumps({'rows': rows, 'inserted': inserted, 'updated': updated,
+                                    'invalid_rows': invalid_rows})
+                    ])
+
+                if dry_run or not applied:
+                    conn.rollback()
+                else:
+                    conn.commit()
+                cursor.close()
+            except Exception:
+                conn.rollback()
+                raise
+
+        finished = time.perf_counter()
+        return {
+            'success': applied,
+            'entity': entity,
+            'dry_run': dry_run,
+            'committed': applied and not dry_run,
+            'rows': rows,
+            'inserted': inserted,
+            'updated': updated,
+            'invalid_rows': invalid_rows,
+            'error_count': error_count,
+            'errors': errors,
+            'errors_truncated': error_count > len(errors),
+            'bytes': body.bytes_read + len(header_line),
+            'timings_ms': {
+                'stage': round((staged_at - started) * 1000, 1),
+                'validate_and_apply': round((finished - staged_at) * 1000, 1),
+                'total': round((finished - started) * 1000, 1)
+            },
+            'rows_per_second': round(rows / (finished - started)) if rows and finished > started else 0
+        }
+
+    # =========================================================================
+    # EXPORT
+    # =========================================================================
+
+    def export_csv(self, entity: str, filters: Dict = None) -> Iterator[bytes]:
+        """Stream an export as CSV chunks straight from COPY TO STDOUT.
+
+        COPY runs on a worker thread that writes into a small bounded queue, so
+        memory stays flat however large the export is and a slow client slows
+        the COPY down rather than buffering it.
+        """
+        if entity not in EXPORT_ENTITIES:
+            raise BulkImportError(f"Unknown export entity '{entity}' (expected one of {', '.join(EXPORT_ENTITIES)})")
+        function_name, filter_names = EXPORT_ENTITIES[entity]
+        filters = filters or {}
+        params = [filters.get(name) or None for name in filter_names]
+        return self._stream_copy(entity, function_name, params)
+
+    def _stream_copy(self, entity: str, function_name: str, params: list) -> Iterator[bytes]:
+        chunks: queue.Queue = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+        cancelled = threading.Event()
+        done = object()
+
+        def hand_over(item):
+            # Never block forever on a consumer that has gone away
+            while not cancelled.is_set():
+                try:
+                    chunks.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+
+        def run_copy():
+            try:
+                with pooled_connection(read_only=True) as conn:
+                    cursor = conn.cursor()
+                    placeholders = ', '.join(['%s'] * len(params))
+                    query = cursor.mogrify(f"SELECT * FROM {function_name}({placeholders})", params).decode()
+                    try:
+                        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)",
+                                           _QueueWriter(chunks, cancelled))
+                    except Exception:
+                        # An aborted COPY leaves the connection mid-protocol - don't reuse it
+                        conn.close()
+                        raise
+                    cursor.close()
+                hand_over(done)
+            except Exception as e:
+                if not cancelled.is_set():
+                    logger.error(f"Error exporting {entity}: {e}")
+                    hand_over(e)
+
+        thread = threading.Thread(target=run_copy, name=f'bulk-export-{entity}', daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=EXPORT_PUT_TIMEOUT)
+                except queue.Empty:
+                    # A slow query may produce nothing for a while - keep waiting while COPY runs
+                    if thread.is_alive():
+                        continue
+                    # The thread may have handed over its last item just before it exited
+                    try:
+                        chunk = chunks.get_nowait()
+                    except queue.Empty:
+                        raise RuntimeError(f'Export of {entity} stopped without finishing')
+                if chunk is done:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            cancelled.set()
+
+    def export_filename(self, entity: str, filters: Dict = None) -> str:
+        filters = filters or {}
+        period = '_'.join(filter(None, [filters.get('date_from'), filters.get('date_to')]))
+        return f"{entity}{'_' + period if period else ''}.csv"
+
@@ -0,0 +1,60 @@
+"""
+Bulk data command line
+Run from the api directory:
+
+    python -m bulk.cli import equipment depot_units.csv --dry-run
+    python -m bulk.cli import customers customers.csv --skip-invalid
+    python -m bulk.cli export interactions --from 2025-06-01 --to 2025-06-30 -o hires_june.csv
+    python -m bulk.cli export allocations --from 2025-06-01 --to 2025-06-30 > allocations.csv
+"""
+
+import argparse
+import json
+import sys
+
+from bulk.bulk_manager import BulkDataManager, BulkImportError, IMPORT_ENTITIES, EXPORT_ENTITIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk CSV import and export')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='import a CSV file (use - for stdin)')
+    import_parser.add_argument('entity', choices=list(IMPORT_ENTITIES))
+    import_parser.add_argument('file')
+    import_parser.add_argument('--employee-id', type=int, default=1)
+    import_parser.add_argument('--dry-run', action='store_true', help='validate and apply, then roll back')
+    import_parser.add_argument('--skip-invalid', action='store_true', help='apply valid rows, report the rest')
+
+    export_parser = commands.add_parser('export', help='export CSV to a file or stdout')
+    export_parser.add_argument('entity', choices=list(EXPORT_ENTITIES))
+    export_parser.add_argument('--from', dest='date_from')
+    export_parser.add_argument('--to', dest='date_to')
+    export_parser.add_argument('--type', dest='interaction_type', help='interaction type (interactions only)')
+    export_parser.add_argument('-o', '--output', help='output file (default: stdout)')
+
+    args = parser.parse_args()
+    manager = BulkDataManager()
+
+    try:
+        if args.command == 'import':
+            stream = sys.stdin.buffer if args.file == '-' else open(args.file, 'rb')
+            with stream:
+                result = manager.import_csv(args.entity, stream, employee_id=args.employee_id,
+                                            dry_run=args.dry_run, skip_invalid=args.skip_invalid)
+            print(json.dumps(result, indent=2))
+            sys.exit(0 if result['success'] else 2)
+
+        filters = {'date_from': args.date_from, 'date_to': args.date_to,
+                   'interaction_type': args.interaction_type}
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        with output:
+            for chunk in manager.export_csv(args.entity, filters):
+                output.write(chunk)
+    except BulkImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
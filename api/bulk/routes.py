@@ -0,0 +1,59 @@
+"""
+Bulk data routes for the Equipment Hire System
+CSV bulk import and streaming CSV export using BulkDataManager
+"""
+
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
+from .bulk_manager import BulkDataManager, BulkImportError
+import logging
+
+logger = logging.getLogger(__name__)
+
+bulk_bp = Blueprint('bulk', __name__)
+bulk_manager = BulkDataManager()
+
+
+@bulk_bp.route('/import/<entity>', methods=['POST'])
+def import_entity(entity):
+    """Import a CSV (multipart 'file' field or a text/csv body).
+
+    Query options: dry_run=true validates and rolls back, skip_invalid=true applies
+    the valid rows and reports the rest.
+    """
+    try:
+        employee_id = session.get('employee_id', 1)  # Default employee for demo
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+
+        result = bulk_manager.import_csv(
+            entity,
+            stream,
+            employee_id=employee_id,
+            dry_run=request.args.get('dry_run') == 'true',
+            skip_invalid=request.args.get('skip_invalid') == 'true'
+        )
+        return jsonify(result), 200 if result['success'] else 422
+    except BulkImportError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error importing {entity}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Bulk import failed'}), 500
+
+
+@bulk_bp.route('/export/<entity>', methods=['GET'])
+def export_entity(entity):
+    """Stream a CSV export (interactions, allocations or accessories) filtered by date_from / date_to."""
+    filters = {
+        'date_from': request.args.get('date_from'),
+        'date_to': request.args.get('date_to'),
+        'interaction_type': request.args.get('interaction_type')
+    }
+    try:
+        chunks = bulk_manager.export_csv(entity, filters)
+    except BulkImportError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    response = Response(stream_with_context(chunks), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{bulk_manager.export_filename(entity, filters)}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
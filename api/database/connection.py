@@ -0,0 +1,337 @@
+"""
+Shared database access for the Flask API
+Connection settings, the per-process connection pool and helpers used by the managers,
+the event listener and background jobs
+"""
+
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import List, Dict
+import logging
+
+from .single_flight import single_flight, COALESCED_PROCEDURES
+from .replica_router import ReplicaRouter, is_read_only, READ_ONLY_TRANSACTION
+from server.tracing import tracer, redact
+from server.admission import admission_controller, statement_timeout_ms
+
+logger = logging.getLogger(__name__)
+
+# psycopg2 is imported on first database use so cold starts that only serve
+# health checks or static responses never pay for it
+psycopg2 = None
+
+# Database configuration
+DATABASE_CONFIG = {
+    'host': os.getenv('PGHOST', 'localhost'),
+    'database': os.getenv('PGDATABASE', 'hire_system'),
+    'user': os.getenv('PGUSER', 'postgres'),
+    'password': os.getenv('PGPASSWORD', 'password'),
+    'port': os.getenv('PGPORT', '5432')
+}
+
+# Connections kept open per process (each WSGI worker has its own pool)
+POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN', '2'))
+POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX', '10'))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# Optional read replicas (DATABASE_REPLICA_URLS / PGREPLICA_HOSTS)
+replica_router = ReplicaRouter(DATABASE_CONFIG)
+
+# statement_timeout last set on each open connection, so it is only re-sent when
+# a connection moves to a request class with a different timeout
+_statement_timeouts = weakref.WeakKeyDictionary()
+
+# SQLSTATE for a statement cancelled by statement_timeout
+QUERY_CANCELED = '57014'
+
+
+def _prepare_connection(conn, autocommit: bool):
+    """Apply the current request class's statement_timeout and the autocommit mode"""
+    timeout = statement_timeout_ms()
+    if _statement_timeouts.get(conn) != timeout:
+        # Set outside any transaction so a later rollback cannot undo it
+        if not conn.autocommit:
+            conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute("SET statement_timeout = %s", [timeout])
+        cursor.close()
+        _statement_timeouts[conn] = timeout
+    if conn.autocommit != autocommit:
+        conn.autocommit = autocommit
+
+
+def _note_failure(error: Exception):
+    if getattr(error, 'pgcode', None) == QUERY_CANCELED:
+        admission_controller.record_statement_timeout()
+
+
+def _note_write():
+    """After a write: keep the session's reads on the primary and drop micro-cached reads"""
+    replica_router.note_write()
+    single_flight.invalidate()
+
+
+def _load_driver():
+    global psycopg2
+    if psycopg2 is None:
+        import psycopg2
+        import psycopg2.extras
+        import psycopg2.pool
+
+
+def get_db_connection(autocommit: bool = True):
+    """Get database connection with proper error handling"""
+    _load_driver()
+    try:
+        if os.getenv('DATABASE_URL'):
+            conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        else:
+            conn = psycopg2.connect(**DATABASE_CONFIG)
+
+        conn.autocommit = autocommit
+        return conn
+    except psycopg2.Error as e:
+        logger.error(f"Database connection error: {e}")
+        raise
+
+
+# =============================================================================
+# CONNECTION POOL
+# =============================================================================
+
+def get_pool() -> 'psycopg2.pool.ThreadedConnectionPool':
+    """Get this process's connection pool, creating it on first use.
+
+    The pool is keyed by pid so a worker forked from a parent that already
+    opened connections never shares sockets with it.
+    """
+    global _pool, _pool_pid
+    _load_driver()
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if os.getenv('DATABASE_URL'):
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, os.getenv('DATABASE_URL'))
+            else:
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, **DATABASE_CONFIG)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+@contextmanager
+def pooled_connection(autocommit: bool = True, read_only: bool = False):
+    """Borrow a connection from the pool and return it afterwards.
+
+    read_only connections come from a caught-up replica when one is configured
+    (see replica_router), otherwise from the primary. Falls back to a dedicated
+    connection when the pool is exhausted. Broken connections are discarded
+    instead of being returned to the pool.
+    """
+    _load_driver()
+    replica = replica_router.choose_replica() if read_only else None
+    if replica is not None:
+        with tracer.span('db.connect', 'connection', target=replica.name):
+            try:
+                replica_pool = replica.pool()
+                conn = replica_pool.getconn()
+            except psycopg2.pool.PoolError:
+                # Replica pool busy - this read goes to the primary
+                replica = None
+            except psycopg2.Error as e:
+                replica.mark_failed(e)
+                replica = None
+        if replica is not None:
+            try:
+                _prepare_connection(conn, autocommit)
+                yield conn
+            except Exception as e:
+                _note_failure(e)
+                if not conn.closed and not autocommit:
+                    conn.rollback()
+                raise
+            finally:
+                replica_pool.putconn(conn, close=bool(conn.closed))
+            return
+
+    with tracer.span('db.connect', 'connection', target='primary') as span:
+        try:
+            pool = get_pool()
+            conn = pool.getconn()
+        except psycopg2.pool.PoolError:
+            logger.warning("Connection pool exhausted - opening a dedicated connection")
+            if span is not None:
+                span.attrs['dedicated'] = True
+            pool = None
+            conn = get_db_connection(autocommit)
+        except psycopg2.Error as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+
+    try:
+        _prepare_connection(conn, autocommit)
+        yield conn
+        if not autocommit and not read_only:
+            _note_write()
+    except Exception as e:
+        _note_failure(e)
+        if not conn.closed and not autocommit:
+            conn.rollback()
+        raise
+    finally:
+        if pool is None:
+            conn.close()
+        else:
+            pool.putconn(conn, close=bool(conn.closed))
+
+
+def fill_pool(connections: int = None) -> int:
+    """Open and check pool connections up front (worker warm-up). Returns the number ready."""
+    connections = min(connections or POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS)
+    pool = get_pool()
+    borrowed = []
+    try:
+        for _ in range(connections):
+            conn = pool.getconn()
+            borrowed.append(conn)
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+    finally:
+        for conn in borrowed:
+            pool.putconn(conn, close=bool(conn.closed))
+    return len(borrowed)
+
+
+def close_pool():
+    """Close every pooled connection, primary and replicas (worker shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+    replica_router.close()
+
+
+# =============================================================================
+# QUERY HELPERS
+# =============================================================================
+
+def execute_stored_procedure(proc_name: str, params: List = None, columns: List[str] = None) -> List[Dict]:
+    """Execute stored procedure and return results as dictionaries.
+
+    Read-only procedures (named as reads, see is_read_only) may run on a read replica, and
+    those listed in COALESCED_PROCEDURES share concurrent identical executions
+    (and a short micro-cache). Any other procedure may write, so it runs on the
+    primary, keeps the session's reads on the primary for a while, and clears
+    the micro-cache once it completes. Reads never clear the micro-cache.
+
+    columns selects only those output columns (validated names, never user text);
+    for SQL-language procedures the planner then skips computing the others.
+    """
+    if proc_name in COALESCED_PROCEDURES:
+        # Sessions that must read from the primary don't share replica results
+        variant = 'primary' if not replica_router.may_use_replica() else ''
+        if columns:
+            variant += ':' + ','.join(columns)
+        return single_flight.do(proc_name, params, lambda: _run_stored_procedure(proc_name, params, True, columns),
+                                variant=variant)
+    if is_read_only(proc_name):
+        return _run_stored_procedure(proc_name, params, True, columns)
+    try:
+        return _run_stored_procedure(proc_name, params, columns=columns)
+    finally:
+        _note_write()
+
+
+def _run_stored_procedure(proc_name: str, params: List = None, read_only: bool = False,
+                          columns: List[str] = None) -> List[Dict]:
+    _load_driver()
+    try:
+        return _call_procedure(proc_name, params, read_only, columns)
+    except psycopg2.OperationalError as e:
+        # A statement_timeout would only time out again on the primary
+        if not (read_only and replica_router.enabled) or e.pgcode == QUERY_CANCELED:
+            logger.error(f"Stored procedure error: {e}")
+            raise
+        # Replica dropped or cancelled the query (e.g. recovery conflict) - retry on the primary
+        logger.warning(f"Read of {proc_name} failed on a replica, retrying on the primary: {e}")
+        try:
+            return _call_procedure(proc_name, params, False, columns)
+        except psycopg2.Error as e:
+            logger.error(f"Stored procedure error: {e}")
+            raise
+    except psycopg2.Error as e:
+        if not (read_only and e.pgcode == READ_ONLY_TRANSACTION):
+            logger.error(f"Stored procedure error: {e}")
+            raise
+        # Named as a read but wrote (e.g. a document built on first read) - run it on the primary
+        logger.warning(f"{proc_name} wrote on a replica, retrying on the primary: {e}")
+        try:
+            return _call_procedure(proc_name, params, False, columns)
+        except psycopg2.Error as e:
+            logger.error(f"Stored procedure error: {e}")
+            raise
+        finally:
+            _note_write()
+
+
+def _call_procedure(proc_name: str, params: List, read_only: bool, columns: List[str] = None) -> List[Dict]:
+    with pooled_connection(read_only=read_only) as conn:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+        with tracer.span(proc_name, 'sql', params=[redact(param) for param in params or []]) as span:
+            if columns:
+                select = ', '.join(psycopg2.extensions.quote_ident(column, cursor) for column in columns)
+                placeholders = ', '.join(['%s'] * len(params or []))
+                cursor.execute(f"SELECT {select} FROM {proc_name}({placeholders})", params or [])
+            elif params:
+                cursor.callproc(proc_name, params)
+            else:
+                cursor.callproc(proc_name)
+            if span is not None:
+                span.attrs['rows'] = cursor.rowcount
+
+        try:
+            results = [dict(row) for row in cursor.fetchall()]
+        except psycopg2.ProgrammingError:
+            results = []
+        cursor.close()
+        return results
+
+
+def _statement_name(query: str) -> str:
+    """Span name for an ad-hoc query: its whitespace-collapsed start (placeholders, never values)"""
+    statement = ' '.join(query.split())
+    return statement if len(statement) <= 80 else statement[:77] + '...'
+
+
+def execute_query(query: str, params: List = None, read_only: bool = False) -> List[Dict]:
+    """Execute direct SQL query and return results (read_only queries may use a replica)"""
+    _load_driver()
+    try:
+        with pooled_connection(read_only=read_only) as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            with tracer.span(_statement_name(query), 'sql', params=[redact(param) for param in params or []]) as span:
+                cursor.execute(query, params)
+                if span is not None:
+                    span.attrs['rows'] = cursor.rowcount
+
+            try:
+                results = [dict(row) for row in cursor.fetchall()]
+            except psycopg2.ProgrammingError:
+                results = []
+            cursor.close()
+            return results
+    except psycopg2.Error as e:
+        logger.error(f"Query execution error: {e}")
+        raise
+    finally:
+        if not read_only:
+            _note_write()
@@ -0,0 +1,264 @@
+"""
+Read-replica Routing
+Sends read-only procedures to streaming replicas and everything else to the primary.
+Reads fall back to the primary for a session that has just written (read-your-writes),
+when every replica is lagging past the threshold, or when no replica is reachable.
+"""
+
+import contextvars
+import itertools
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Procedures named for reading (sp_get_..., sp_search_... and so on) never write and
+# may run on a replica. Anything else is treated as a write and runs on the primary,
+# so a new procedure only reaches a replica when it is named as a read.
+READ_ONLY_PREFIXES = (
+    'sp_get_',
+    'sp_search_',
+    'sp_filter_',
+    'sp_validate_',
+    'sp_calculate_',
+    'sp_export_'
+)
+
+# Named like reads but write, so they always run on the primary
+WRITE_PROCEDURES = frozenset()
+
+# SQLSTATE a replica returns for a write (read_only_sql_transaction)
+READ_ONLY_TRANSACTION = '25006'
+
+# Replicas: full DSNs, or host[:port] entries that reuse the primary's credentials
+REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_HOSTS = [host.strip() for host in os.getenv('PGREPLICA_HOSTS', '').split(',') if host.strip()]
+
+# A replica further behind than this (seconds of replay lag) is skipped
+MAX_REPLICA_LAG = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '2'))
+# How often each worker re-measures a replica's lag
+LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', '1'))
+# How long an unreachable replica is left alone before it is tried again
+RETRY_INTERVAL = float(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+# Reads stay on the primary this long after a session writes. Never shorter than
+# the lag threshold, so a replica used afterwards has already replayed the write.
+READ_YOUR_WRITES_WINDOW = max(float(os.getenv('READ_YOUR_WRITES_SECONDS', '5')), MAX_REPLICA_LAG + 1)
+
+REPLICA_POOL_MIN = int(os.getenv('DB_REPLICA_POOL_MIN', '1'))
+REPLICA_POOL_MAX = int(os.getenv('DB_REPLICA_POOL_MAX', os.getenv('DB_POOL_MAX', '10')))
+
+LAG_QUERY = """
+    SELECT
+        pg_is_in_recovery(),
+        CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+"""
+
+
+def is_read_only(proc_name: str) -> bool:
+    return proc_name.startswith(READ_ONLY_PREFIXES) and proc_name not in WRITE_PROCEDURES
+
+
+class _RequestRoute:
+    """Routing state for one request: when its session may read from replicas again"""
+    __slots__ = ('primary_until', 'wrote')
+
+    def __init__(self, primary_until: float = 0.0):
+        self.primary_until = primary_until
+        self.wrote = False
+
+
+_request_route: contextvars.ContextVar = contextvars.ContextVar('request_route', default=None)
+
+
+class Replica:
+    """One replica, its per-process pool and its last measured lag"""
+
+    def __init__(self, name: str, dsn: str = None, config: Dict = None):
+        self.name = name
+        self.dsn = dsn
+        self.config = config
+        self.lag_seconds: Optional[float] = None
+        self.in_recovery: Optional[bool] = None
+        self.checked_at = 0.0
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+        self.reads = 0
+        self.failures = 0
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._check_lock = threading.Lock()
+
+    @property
+    def reachable(self) -> bool:
+        return time.time() >= self.retry_at
+
+    def pool(self):
+        import psycopg2.pool
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                if self.dsn:
+                    self._pool = psycopg2.pool.ThreadedConnectionPool(REPLICA_POOL_MIN, REPLICA_POOL_MAX, self.dsn)
+                else:
+                    self._pool = psycopg2.pool.ThreadedConnectionPool(REPLICA_POOL_MIN, REPLICA_POOL_MAX,
+                                                                      **self.config)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+
+    def check_lag(self):
+        """Re-measure replay lag if it is due; only one thread measures at a time"""
+        if time.time() - self.checked_at < LAG_CHECK_INTERVAL or not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            pool = self.pool()
+            conn = pool.getconn()
+            try:
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute(LAG_QUERY)
+                self.in_recovery, lag = cursor.fetchone()
+                cursor.close()
+                self.lag_seconds = float(lag)
+            finally:
+                pool.putconn(conn, close=bool(conn.closed))
+            self.checked_at = time.time()
+            self.last_error = None
+        except Exception as e:
+            self.mark_failed(e)
+        finally:
+            self._check_lock.release()
+
+    def mark_failed(self, error: Exception):
+        self.failures += 1
+        self.retry_at = time.time() + RETRY_INTERVAL
+        self.last_error = str(error).strip()
+        logger.warning(f"Read replica {self.name} unavailable for {RETRY_INTERVAL:.0f}s: {self.last_error}")
+        self.close()
+
+    def stats(self) -> Dict:
+        return {
+            'name': self.name,
+            'reachable': self.reachable,
+            'in_recovery': self.in_recovery,
+            'lag_seconds': None if self.lag_seconds is None else round(self.lag_seconds, 3),
+            'checked_seconds_ago': round(time.time() - self.checked_at, 1) if self.checked_at else None,
+            'reads': self.reads,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
+
+
+class ReplicaRouter:
+    """Chooses a replica (or the primary) for each read"""
+
+    def __init__(self, base_config: Dict = None):
+        self.replicas: List[Replica] = []
+        for n, url in enumerate(REPLICA_URLS):
+            self.replicas.append(Replica(f'replica{n + 1}', dsn=url))
+        for host in REPLICA_HOSTS:
+            name, _, port = host.partition(':')
+            config = dict(base_config or {}, host=name)
+            if port:
+                config['port'] = port
+            self.replicas.append(Replica(host, config=config))
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._primary_reads = {'session_write': 0, 'lagging': 0, 'unavailable': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    # =========================================================================
+    # SESSION (READ-YOUR-WRITES)
+    # =========================================================================
+
+    def begin_request(self, primary_until: Optional[float] = None):
+        """Start routing a request for a session that last wrote until primary_until"""
+        _request_route.set(_RequestRoute(float(primary_until or 0)))
+
+    def end_request(self) -> Optional[float]:
+        """Finish a request; returns the new primary_until to store if it wrote"""
+        route = _request_route.get()
+        _request_route.set(None)
+        if route is not None and route.wrote:
+            return route.primary_until
+        return None
+
+    def note_write(self):
+        """Keep this request's session on the primary long enough for replicas to catch up"""
+        route = _request_route.get()
+        if route is not None:
+            route.wrote = True
+            route.primary_until = time.time() + READ_YOUR_WRITES_WINDOW
+
+    # =========================================================================
+    # ROUTING
+    # =========================================================================
+
+    def may_use_replica(self) -> bool:
+        """False when reads must go to the primary for this request's session"""
+        if not self.replicas:
+            return False
+        route = _request_route.get()
+        return route is None or route.primary_until <= time.time()
+
+    def choose_replica(self) -> Optional[Replica]:
+        """A replica that is reachable and caught up, or None to read from the primary"""
+        if not self.replicas:
+            return None
+        route = _request_route.get()
+        if route is not None and route.primary_until > time.time():
+            self._count_primary('session_write')
+            return None
+
+        start = next(self._next)
+        lagging = False
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if not replica.reachable:
+                continue
+            replica.check_lag()
+            if not replica.reachable or replica.lag_seconds is None:
+                continue
+            if replica.lag_seconds > MAX_REPLICA_LAG:
+                lagging = True
+                continue
+            replica.reads += 1
+            return replica
+
+        self._count_primary('lagging' if lagging else 'unavailable')
+        return None
+
+    def _count_primary(self, reason: str):
+        with self._lock:
+            self._primary_reads[reason] += 1
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            primary_reads = dict(self._primary_reads)
+        return {
+            'enabled': self.enabled,
+            'max_lag_seconds': MAX_REPLICA_LAG,
+            'read_your_writes_seconds': READ_YOUR_WRITES_WINDOW,
+            'replica_reads': sum(replica.reads for replica in self.replicas),
+            'primary_reads': primary_reads,
+            'replicas': [replica.stats() for replica in self.replicas]
+        }
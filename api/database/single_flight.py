@@ -0,0 +1,158 @@
+"""
+Single-flight Read Coalescing
+Concurrent identical read-only procedure calls share one database execution, with an
+optional micro-cache window so a burst of requests just after it also reuses the result
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Read-only procedures safe to coalesce, with their micro-cache window in seconds
+# (0 = share in-flight executions only). COALESCE_CACHE_TTL overrides every window.
+COALESCED_PROCEDURES = {
+    'sp_get_todays_hires': 2.0,
+    'sp_get_pending_allocations': 1.0,
+    'sp_get_equipment_type_availability': 1.0,
+    'sp_get_active_drivers': 5.0
+}
+
+# Longest a follower waits for the leader before running the query itself
+FOLLOWER_TIMEOUT = 30.0
+
+MICRO_CACHE_SIZE = 1024
+
+
+def call_key(proc_name: str, params: Optional[List], variant: str = '') -> str:
+    """Stable key for a procedure call (lists and dates are serialized, not hashed)"""
+    return proc_name + variant + json.dumps(list(params or []), default=str, separators=(',', ':'))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'generation')
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Shares in-flight executions and recent results between identical calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Call] = {}
+        self._cache: Dict[str, tuple] = {}
+        # Bumped by invalidate(); a result read before a write is never cached after it
+        self._generation = 0
+        self._stats = defaultdict(lambda: {'calls': 0, 'executions': 0, 'coalesced': 0, 'cache_hits': 0})
+        override = os.getenv('COALESCE_CACHE_TTL')
+        self.ttl_override = float(override) if override is not None else None
+
+    def ttl_for(self, proc_name: str) -> float:
+        if self.ttl_override is not None:
+            return self.ttl_override
+        return COALESCED_PROCEDURES.get(proc_name, 0.0)
+
+    def do(self, proc_name: str, params: Optional[List], execute: Callable[[], List[Dict]],
+           variant: str = '') -> List[Dict]:
+        """Run execute() once for all concurrent identical calls and return each caller a copy.
+
+        variant separates calls that must not share results (e.g. primary vs replica reads).
+        """
+        key = call_key(proc_name, params, variant)
+        now = time.monotonic()
+
+        with self._lock:
+            stats = self._stats[proc_name]
+            stats['calls'] += 1
+
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                stats['cache_hits'] += 1
+                return [dict(row) for row in cached[1]]
+
+            call = self._inflight.get(key)
+            # A call that started before the last write may return pre-write rows - don't join it
+            leader = call is None or call.generation != self._generation
+            if leader:
+                call = self._inflight[key] = _Call(self._generation)
+                stats['executions'] += 1
+            else:
+                stats['coalesced'] += 1
+
+        if not leader:
+            if call.done.wait(FOLLOWER_TIMEOUT):
+                if call.error is not None:
+                    raise call.error
+                return [dict(row) for row in call.result]
+            logger.warning(f"Coalesced call to {proc_name} timed out waiting - running it directly")
+            return execute()
+
+        try:
+            call.result = execute()
+            ttl = self.ttl_for(proc_name)
+            if ttl > 0:
+                with self._lock:
+                    if self._generation == call.generation:
+                        self._cache[key] = (time.monotonic() + ttl, call.result)
+                        if len(self._cache) > MICRO_CACHE_SIZE:
+                            self._evict_expired()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+            call.done.set()
+
+        return [dict(row) for row in call.result]
+
+    def invalidate(self):
+        """Drop micro-cached results (called after writes in this process)"""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        # Still full of live entries - drop the oldest half
+        if len(self._cache) > MICRO_CACHE_SIZE:
+            for key in sorted(self._cache, key=lambda k: self._cache[k][0])[:len(self._cache) // 2]:
+                del self._cache[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            procedures = {}
+            totals = {'calls': 0, 'executions': 0, 'coalesced': 0, 'cache_hits': 0}
+            for proc_name, stats in self._stats.items():
+                procedures[proc_name] = dict(stats, hit_rate=self._hit_rate(stats))
+                for counter in totals:
+                    totals[counter] += stats[counter]
+            return {
+                'totals': dict(totals, hit_rate=self._hit_rate(totals)),
+                'procedures': procedures,
+                'in_flight': len(self._inflight),
+                'cached_results': len(self._cache)
+            }
+
+    @staticmethod
+    def _hit_rate(stats: Dict) -> float:
+        if not stats['calls']:
+            return 0.0
+        return round((stats['coalesced'] + stats['cache_hits']) / stats['calls'], 4)
+
+
+# Shared per-process coalescer
+single_flight = SingleFlight()
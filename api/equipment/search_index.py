@@ -0,0 +1,387 @@
+"""
+Equipment Search Index
+In-process inverted index over equipment types and units for the hire wizard search box.
+Text matching, ranking and paging happen in memory; availability is then checked in the
+database only for the matched candidates.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from database.connection import execute_stored_procedure
+from events.event_bus import event_bus
+
+logger = logging.getLogger(__name__)
+
+# Field weights used for ranking
+UNIT_FIELDS = {
+    'asset_code': 8,
+    'type_name': 4,
+    'type_code': 4,
+    'model': 3,
+    'serial_number': 2
+}
+TYPE_FIELDS = {
+    'type_name': 6,
+    'type_code': 6,
+    'description': 1
+}
+
+# Edge n-grams (prefixes) are indexed up to this length; longer tokens match in full
+MAX_PREFIX = 12
+
+# An exact token hit scores this much more than a prefix hit
+EXACT_BONUS = 2.0
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-case alphanumeric tokens ('R-1001 Wacker' -> ['r', '1001', 'wacker', 'r1001'])"""
+    if not text:
+        return []
+    lowered = text.lower()
+    tokens = TOKEN_PATTERN.findall(lowered)
+    # Codes like 'R-1001' are also searchable as typed without punctuation
+    joined = ''.join(tokens)
+    if len(tokens) > 1 and len(joined) <= MAX_PREFIX * 2:
+        tokens.append(joined)
+    return tokens
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+class _InvertedIndex:
+    """Term -> {doc_id: weight} postings with prefix terms for each token"""
+
+    def __init__(self, fields: Dict[str, int]):
+        self.fields = fields
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.doc_terms: Dict[int, Set[str]] = {}
+        self.docs: Dict[int, Dict] = {}
+
+    def add(self, doc_id: int, doc: Dict):
+        self.remove(doc_id)
+        terms = {}
+        for field_name, weight in self.fields.items():
+            for token in tokenize(doc.get(field_name)):
+                # Exact token
+                terms[token] = max(terms.get(token, 0), weight * EXACT_BONUS)
+                # Prefixes for type-ahead and asset code prefix matching
+                for length in range(1, min(len(token), MAX_PREFIX) + 1):
+                    prefix = '^' + token[:length]
+                    terms[prefix] = max(terms.get(prefix, 0), weight)
+        for term, weight in terms.items():
+            self.postings[term][doc_id] = weight
+        self.doc_terms[doc_id] = set(terms)
+        self.docs[doc_id] = doc
+
+    def remove(self, doc_id: int):
+        for term in self.doc_terms.pop(doc_id, ()):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.docs.pop(doc_id, None)
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """All documents matching every query token, with scores (unsorted)"""
+        tokens = TOKEN_PATTERN.findall((query or '').lower())
+        if not tokens:
+            return [(doc_id, 0.0) for doc_id in self.docs]
+
+        scores: Optional[Dict[int, float]] = None
+        # Rarest token first keeps the intersection small
+        for token in sorted(set(tokens), key=lambda t: len(self._postings_for(t))):
+            matches = self._postings_for(token)
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {doc_id: score + matches[doc_id] for doc_id, score in scores.items() if doc_id in matches}
+            if not scores:
+                return []
+        return list(scores.items())
+
+    def _postings_for(self, token: str) -> Dict[int, float]:
+        exact = self.postings.get(token, {})
+        if len(token) > MAX_PREFIX:
+            return exact
+        prefix = self.postings.get('^' + token, {})
+        if not exact:
+            return prefix
+        merged = dict(prefix)
+        for doc_id, weight in exact.items():
+            merged[doc_id] = max(merged.get(doc_id, 0), weight)
+        return merged
+
+
+class EquipmentSearchIndex:
+    """Ranked, paginated search over equipment units and types"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._units = _InvertedIndex(UNIT_FIELDS)
+        self._types = _InvertedIndex(TYPE_FIELDS)
+        self._loaded = False
+        self._watermark = None
+        # Changes queued by the event bus, applied in one batch before the next search
+        self._pending_units = set()
+        self._pending_types = set()
+        self._needs_refresh = False
+        event_bus.add_handler(self.handle_change_event)
+
+    # =========================================================================
+    # LOADING
+    # =========================================================================
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.rebuild()
+            return
+        self._apply_pending()
+
+    def _apply_pending(self):
+        """Reload everything the event bus reported since the last search"""
+        with self._lock:
+            needs_refresh, self._needs_refresh = self._needs_refresh, False
+            unit_ids, self._pending_units = self._pending_units, set()
+            type_ids, self._pending_types = self._pending_types, set()
+        try:
+            if needs_refresh:
+                self.refresh()
+            if unit_ids or type_ids:
+                self.refresh_units(equipment_ids=unit_ids, equipment_type_ids=type_ids)
+        except Exception as e:
+            logger.error(f"Error refreshing equipment search index: {e}")
+            # Try again on the next search
+            with self._lock:
+                self._needs_refresh = self._needs_refresh or needs_refresh
+                self._pending_units |= unit_ids
+                self._pending_types |= type_ids
+
+    def rebuild(self):
+        """Load every unit and type from the database"""
+        event_bus.start()
+        units = _InvertedIndex(UNIT_FIELDS)
+        types = _InvertedIndex(TYPE_FIELDS)
+        unit_rows = execute_stored_procedure('sp_get_equipment_search_documents', [None, None, None])
+        type_rows = execute_stored_procedure('sp_get_equipment_type_search_documents', [None, None])
+        for row in unit_rows:
+            units.add(row['equipment_id'], self._unit_doc(row))
+        for row in type_rows:
+            types.add(row['equipment_type_id'], self._type_doc(row))
+
+        with self._lock:
+            self._units, self._types = units, types
+            self._watermark = self._max_updated(unit_rows + type_rows)
+            self._loaded = True
+        logger.info(f"Equipment search index built: {len(unit_rows)} units, {len(type_rows)} types")
+
+    def refresh(self):
+        """Pick up rows changed since the last load (fallback if events were missed)"""
+        if not self._loaded:
+            return self.rebuild()
+        unit_rows = execute_stored_procedure('sp_get_equipment_search_documents', [self._watermark, None, None])
+        type_rows = execute_stored_procedure('sp_get_equipment_type_search_documents', [self._watermark, None])
+        self._apply(unit_rows, type_rows)
+
+    def refresh_units(self, equipment_ids: Iterable[int] = None, equipment_type_ids: Iterable[int] = None):
+        """Reload specific units, or all units of specific types"""
+        equipment_ids = list(equipment_ids or []) or None
+        equipment_type_ids = list(equipment_type_ids or []) or None
+        unit_rows, type_rows = [], []
+        if equipment_ids:
+            unit_rows += execute_stored_procedure('sp_get_equipment_search_documents',
+                                                  [None, equipment_ids, None])
+        if equipment_type_ids:
+            unit_rows += execute_stored_procedure('sp_get_equipment_search_documents',
+                                                  [None, None, equipment_type_ids])
+            type_rows = execute_stored_procedure('sp_get_equipment_type_search_documents',
+                                                 [None, equipment_type_ids])
+        with self._lock:
+            # Units that no longer come back were deleted
+            returned = {row['equipment_id'] for row in unit_rows}
+            for equipment_id in equipment_ids or []:
+                if equipment_id not in returned:
+                    self._units.remove(equipment_id)
+            returned_types = {row['equipment_type_id'] for row in type_rows}
+            for equipment_type_id in equipment_type_ids or []:
+                if equipment_type_id not in returned_types:
+                    self._types.remove(equipment_type_id)
+        self._apply(unit_rows, type_rows)
+
+    def handle_change_event(self, event: Dict):
+        """Queue equipment and type changes from the event bus.
+
+        Changes are applied in one batch before the next search, so a bulk load
+        of thousands of units costs one reload rather than one per row.
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            if event.get('op') == 'RESYNC':
+                self._needs_refresh = True
+            elif event.get('table') == 'equipment.equipment' and event.get('id'):
+                self._pending_units.add(event['id'])
+            elif event.get('table') == 'equipment.equipment_types' and event.get('id'):
+                self._pending_types.add(event['id'])
+
+    def _apply(self, unit_rows: List[Dict], type_rows: List[Dict]):
+        with self._lock:
+            for row in unit_rows:
+                self._units.add(row['equipment_id'], self._unit_doc(row))
+            for row in type_rows:
+                self._types.add(row['equipment_type_id'], self._type_doc(row))
+            latest = self._max_updated(unit_rows + type_rows)
+            if latest and (self._watermark is None or latest > self._watermark):
+                self._watermark = latest
+
+    @staticmethod
+    def _max_updated(rows: List[Dict]):
+        stamps = [row['updated_at'] for row in rows if row.get('updated_at')]
+        return max(stamps) if stamps else None
+
+    @staticmethod
+    def _unit_doc(row: Dict) -> Dict:
+        return {key: _json_value(value) for key, value in row.items() if key != 'updated_at'}
+
+    @staticmethod
+    def _type_doc(row: Dict) -> Dict:
+        return {key: _json_value(value) for key, value in row.items() if key != 'updated_at'}
+
+    # =========================================================================
+    # SEARCH
+    # =========================================================================
+
+    def search_units(self, search_term: str = '', equipment_type_id: int = None,
+                     hire_start_date: str = None, hire_end_date: str = None,
+                     limit: int = DEFAULT_LIMIT, offset: int = 0) -> Dict:
+        """Ranked available units matching the search term.
+
+        Candidates are ranked in memory, then availability for the hire period is
+        checked in batches until the requested page is full.
+        """
+        self.ensure_loaded()
+        limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+        offset = max(0, offset or 0)
+
+        with self._lock:
+            candidates = [
+                (doc_id, score, self._units.docs[doc_id])
+                for doc_id, score in self._units.search(search_term)
+                if self._units.docs[doc_id]['status'] == 'available'
+                and self._units.docs[doc_id]['type_is_active']
+                and (equipment_type_id is None or self._units.docs[doc_id]['equipment_type_id'] == equipment_type_id)
+            ]
+        candidates.sort(key=lambda c: (-c[1], c[2]['type_name'] or '', c[2]['asset_code']))
+
+        wanted = offset + limit
+        available = []
+        batch_size = max(wanted * 2, 100)
+        position = 0
+        while position < len(candidates) and len(available) < wanted + 1:
+            batch = candidates[position:position + batch_size]
+            position += len(batch)
+            free_ids = {
+                row['equipment_id'] for row in execute_stored_procedure(
+                    'sp_filter_available_equipment',
+                    [[doc_id for doc_id, _, _ in batch], hire_start_date, hire_end_date]
+                )
+            }
+            available.extend(doc for doc_id, _, doc in batch if doc_id in free_ids)
+
+        page = available[offset:offset + limit]
+        return {
+            'results': [self._unit_result(doc) for doc in page],
+            'limit': limit,
+            'offset': offset,
+            'has_more': len(available) > offset + limit,
+            'candidates': len(candidates)
+        }
+
+    def search_types(self, search_term: str = '', hire_start_date: str = None, hire_end_date: str = None,
+                     limit: int = DEFAULT_LIMIT, offset: int = 0, with_counts: bool = True) -> Dict:
+        """Ranked equipment types with availability counts for the returned page
+        (with_counts=False skips the availability query and leaves the counts out)"""
+        self.ensure_loaded()
+        limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+        offset = max(0, offset or 0)
+
+        with self._lock:
+            matches = [
+                (score, self._types.docs[doc_id])
+                for doc_id, score in self._types.search(search_term)
+                if self._types.docs[doc_id]['is_active']
+            ]
+        matches.sort(key=lambda m: (-m[0], m[1]['type_name'] or ''))
+        page = [doc for _, doc in matches[offset:offset + limit]]
+
+        counts = {}
+        if page and with_counts:
+            counts = {
+                row['equipment_type_id']: row for row in execute_stored_procedure(
+                    'sp_get_equipment_type_availability',
+                    [[doc['equipment_type_id'] for doc in page], hire_start_date, hire_end_date]
+                )
+            }
+
+        results = []
+        for doc in page:
+            result = {key: value for key, value in doc.items() if key != 'is_active'}
+            if with_counts:
+                count = counts.get(doc['equipment_type_id'], {})
+                result['available_units'] = count.get('available_units', 0)
+                result['total_units'] = count.get('total_units', 0)
+            results.append(result)
+
+        return {
+            'results': results,
+            'limit': limit,
+            'offset': offset,
+            'has_more': len(matches) > offset + limit,
+            'total_matches': len(matches)
+        }
+
+    @staticmethod
+    def _unit_result(doc: Dict) -> Dict:
+        """Same columns as sp_get_available_individual_equipment"""
+        return {
+            'equipment_id': doc['equipment_id'],
+            'asset_code': doc['asset_code'],
+            'equipment_type_id': doc['equipment_type_id'],
+            'type_name': doc['type_name'],
+            'model': doc['model'],
+            'serial_number': doc['serial_number'],
+            'condition': doc['condition'],
+            'location': doc['location'],
+            'last_service_date': doc['last_service_date'],
+            'next_service_due': doc['next_service_due']
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'loaded': self._loaded,
+                'units': len(self._units.docs),
+                'types': len(self._types.docs),
+                'terms': len(self._units.postings) + len(self._types.postings)
+            }
+
+
+# Shared per-process index
+equipment_search_index = EquipmentSearchIndex()
@@ -0,0 +1,211 @@
+"""
+Change event bus
+Listens on the Postgres 'aetherflow_changes' channel (see 06_change_event_triggers.sql)
+and fans the events out to Server-Sent Event subscribers and in-process cache handlers
+"""
+
+import os
+import json
+import queue
+import select
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import logging
+
+from database.connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'aetherflow_changes'
+
+# Seconds to wait on the socket before checking for shutdown / reconnecting
+POLL_TIMEOUT = 5.0
+RECONNECT_DELAY = 2.0
+
+# Events buffered per browser before the slowest consumers start dropping
+SUBSCRIBER_QUEUE_SIZE = 500
+
+
+def event_topics(event: Dict) -> Set[str]:
+    """Work out which topics a change event belongs to.
+
+    Topics are 'hire:<interaction_id>', 'date:<YYYY-MM-DD>', 'driver:<employee_id>'
+    and 'table:<schema.table>'. Moves between dates or drivers publish to both sides.
+    """
+    topics = {'all'}
+    if event.get('table'):
+        topics.add(f"table:{event['table']}")
+    if event.get('interaction_id') is not None:
+        topics.add(f"hire:{event['interaction_id']}")
+    for key in ('date', 'old_date'):
+        if event.get(key):
+            topics.add(f"date:{event[key]}")
+    for key in ('driver_id', 'old_driver_id'):
+        if event.get(key) is not None:
+            topics.add(f"driver:{event[key]}")
+    return topics
+
+
+class Subscription:
+    """A single browser stream subscribed to a set of topics"""
+
+    def __init__(self, topics: Iterable[str]):
+        self.topics = set(topics) or {'all'}
+        self.events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+        self.needs_resync = False
+
+    def matches(self, topics: Set[str]) -> bool:
+        return not self.topics.isdisjoint(topics)
+
+    def offer(self, event: Dict):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            # Slow client - drop the event and tell it to resync on the next read
+            self.dropped += 1
+            self.needs_resync = True
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        if self.needs_resync and self.events.empty():
+            self.needs_resync = False
+            return {'table': None, 'op': 'RESYNC'}
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """One LISTEN connection per process, fanned out to many subscribers"""
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+        self._handlers: List[Callable[[Dict], None]] = []
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self.connected = False
+        self.events_received = 0
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Start the listener thread (idempotent, and safe after a worker fork)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._listen_loop, name='event-bus-listener', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    # -------------------------------------------------------------------------
+    # Subscribers
+    # -------------------------------------------------------------------------
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Register a browser stream for the given topics"""
+        self.start()
+        subscription = Subscription(topics)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def add_handler(self, handler: Callable[[Dict], None]):
+        """Register an in-process callback, e.g. to invalidate a cache.
+
+        Does not start the listener - caches call start() when they first load,
+        and the RESYNC sent on connect covers anything loaded before that.
+        """
+        with self._lock:
+            self._handlers.append(handler)
+
+    def publish(self, event: Dict):
+        """Deliver an event to every matching subscriber and handler"""
+        topics = event_topics(event)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            handlers = list(self._handlers)
+
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Event handler error: {e}")
+
+        broadcast = event.get('op') == 'RESYNC'
+        for subscription in subscriptions:
+            if broadcast or subscription.matches(topics):
+                subscription.offer(event)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'connected': self.connected,
+                'subscribers': len(self._subscriptions),
+                'handlers': len(self._handlers),
+                'events_received': self.events_received,
+                'events_dropped': sum(s.dropped for s in self._subscriptions)
+            }
+
+    # -------------------------------------------------------------------------
+    # Listener
+    # -------------------------------------------------------------------------
+
+    def _listen_loop(self):
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = get_db_connection()
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {self.channel}")
+                self.connected = True
+                logger.info(f"Event bus listening on {self.channel}")
+
+                # Tell consumers to resync anything they missed while disconnected
+                self.publish({'table': None, 'op': 'RESYNC'})
+
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._dispatch(notify.payload)
+            except Exception as e:
+                logger.error(f"Event bus listener error: {e}")
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _dispatch(self, payload: str):
+        try:
+            event = json.loads(payload)
+        except (json.JSONDecodeError, TypeError):
+            logger.warning(f"Ignoring malformed change event: {payload!r}")
+            return
+        self.events_received += 1
+        self.publish(event)
+
+
+# Shared per-process bus
+event_bus = EventBus()
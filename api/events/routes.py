@@ -0,0 +1,59 @@
+"""
+Change event routes for the Equipment Hire System
+Streams database change events to the browser over Server-Sent Events
+"""
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from .event_bus import event_bus
+from server.warmup import warmup_state
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+events_bp = Blueprint('events', __name__)
+
+# Comment line sent when idle so proxies keep the stream open
+HEARTBEAT_SECONDS = 15
+
+
+def parse_topics(raw_topics: str):
+    """Parse 'hire:12,date:2025-07-01,driver:5' into a topic list"""
+    return [topic.strip() for topic in (raw_topics or '').split(',') if topic.strip()]
+
+
+@events_bp.route('/stream', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of change events for the requested topics."""
+    topics = parse_topics(request.args.get('topics'))
+    subscription = event_bus.subscribe(topics)
+
+    def generate():
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield 'retry: 3000\n\n'
+            # End the stream when the worker drains; the browser reconnects elsewhere
+            while not warmup_state.draining.is_set():
+                event = subscription.get(timeout=HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                event_name = 'resync' if event.get('op') == 'RESYNC' else 'change'
+                yield f"event: {event_name}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@events_bp.route('/stats', methods=['GET'])
+def event_stats():
+    """Listener and subscriber counters for the event bus."""
+    try:
+        return jsonify(event_bus.stats())
+    except Exception as e:
+        logger.error(f"Error getting event bus stats: {str(e)}")
+        return jsonify({'error': 'Failed to load event stats'}), 500
@@ -0,0 +1,51 @@
+"""
+Gunicorn configuration for the Equipment Hire API
+Run from the api directory: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.getenv('BIND', '0.0.0.0:5328')
+
+# Threaded workers: Server-Sent Event streams hold a thread each, so keep
+# threads comfortably above the expected open streams per worker
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Load the app in each worker (not the master) so pools and listener threads
+# are never shared across a fork
+preload_app = False
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# Recycle workers periodically; replacements warm up before taking traffic
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = 500
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+
+def post_worker_init(worker):
+    """Warm the worker before its accept loop starts"""
+    from server.warmup import warm_up, install_drain_handler
+    install_drain_handler()
+    status = warm_up()
+    worker.log.info(f"Worker {worker.pid} warm-up: {status['state']} ({status['warmup_ms']}ms)")
+
+
+def worker_int(worker):
+    from server.warmup import warmup_state
+    warmup_state.start_draining()
+
+
+def worker_exit(server, worker):
+    """Close pooled connections when a worker stops"""
+    from database.connection import close_pool
+    close_pool()
@@ -3,125 +3,144 @@ Hire Management System - Comprehensive Python Class
 Handles all hire creation, customer selection, equipment management using stored procedures
 """
 
-import os
 import json
-import psycopg2
-import psycopg2.extras
-from datetime import datetime, date
+import os
+from datetime import datetime, date, timedelta
 from decimal import Decimal
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator
 import logging
 
+from database.connection import DATABASE_CONFIG, get_db_connection, execute_stored_procedure, execute_query, pooled_connection
+from equipment.search_index import equipment_search_index, DEFAULT_LIMIT
+from hire.summary_refresher import hire_summary_refresher
+from server.responses import parse_fields, project
+from server.tracing import tracer
+
 logger = logging.getLogger(__name__)
 
+# Hire list page size
+HIRE_LIST_LIMIT = 100
+HIRE_LIST_MAX_LIMIT = 500
+
+# Allocation work queue page size and claim lease
+ALLOCATION_QUEUE_LIMIT = 50
+ALLOCATION_QUEUE_MAX_LIMIT = 200
+ALLOCATION_LEASE_SECONDS = int(os.getenv('ALLOCATION_LEASE_SECONDS', '300'))
+ALLOCATION_MAX_LEASE_SECONDS = 3600
+
+# Columns each list method can return, for ?fields= projections
+CUSTOMER_FIELDS = ('id', 'name', 'customer_code')
+CONTACT_FIELDS = ('contact_id', 'full_name', 'job_title', 'email', 'phone_number', 'whatsapp_number',
+                  'is_primary_contact')
+SITE_FIELDS = ('site_id', 'site_code', 'site_name', 'site_type', 'full_address', 'site_contact_name',
+               'site_contact_phone')
+EQUIPMENT_TYPE_FIELDS = ('equipment_type_id', 'type_code', 'type_name', 'description', 'specifications',
+                         'daily_rate', 'weekly_rate', 'monthly_rate', 'available_units', 'total_units')
+EQUIPMENT_UNIT_FIELDS = ('equipment_id', 'asset_code', 'equipment_type_id', 'type_name', 'model', 'serial_number',
+                         'condition', 'location', 'last_service_date', 'next_service_due')
+FLEET_UNIT_FIELDS = ('equipment_id', 'asset_code', 'equipment_type_id', 'type_name', 'model', 'condition',
+                     'location', 'unit_state', 'current_interaction_id', 'current_reference_number',
+                     'current_allocation_status', 'current_hire_start', 'current_hire_end', 'next_booking_start',
+                     'next_service_due', 'is_service_due', 'is_overdue_return')
+ALLOCATION_QUEUE_FIELDS = ('interaction_id', 'reference_number', 'customer_name', 'contact_name', 'site_name',
+                           'hire_start_date', 'delivery_date', 'delivery_time', 'priority', 'equipment_count',
+                           'units_pending', 'total_value', 'generic_equipment', 'claimed_by', 'claimed_until',
+                           'claimed_by_me')
+# Hire list field -> mv_hire_summary column
+HIRE_LIST_COLUMNS = {
+    'id': 'interaction_id',
+    'reference_number': 'reference_number',
+    'hire_start_date': 'hire_start_date',
+    'hire_end_date': 'hire_end_date',
+    'delivery_date': 'delivery_date',
+    'status': 'status',
+    'created_at': 'created_at',
+    'customer_id': 'customer_id',
+    'customer_name': 'customer_name',
+    'equipment_types_count': 'equipment_types_count',
+    'total_equipment_booked': 'total_equipment_booked',
+    'total_equipment_allocated': 'total_equipment_allocated',
+    'allocation_status': 'allocation_status',
+    'driver_task_status': 'driver_task_status'
+}
+
+# Longest diary range one request may ask for, and rows fetched per round trip
+DIARY_MAX_DAYS = 62
+DIARY_BATCH_ROWS = 500
+
+# Most hires one off-hire request may close
+OFF_HIRE_MAX_HIRES = 500
+
+# Pending-QC queue page size, and most allocations one bulk sign-off may name
+QC_QUEUE_LIMIT = 50
+QC_QUEUE_MAX_LIMIT = 500
+QC_SIGNOFF_MAX_ALLOCATIONS = 1000
 
+
+class OffHireError(ValueError):
+    """The off-hire request is missing hires or a valid return date"""
+
+
+class QualityControlError(ValueError):
+    """The sign-off request names neither allocations nor a hire, or is too large"""
+
+
+@tracer.trace_methods(exclude=('get_db_connection', 'execute_stored_procedure', 'execute_query', 'serialize_decimal'))
 class HireManager:
     """Comprehensive hire management class using stored procedures"""
     
     def __init__(self):
-        self.db_config = {
-            'host': os.getenv('PGHOST', 'localhost'),
-            'database': os.getenv('PGDATABASE', 'hire_system'),
-            'user': os.getenv('PGUSER', 'postgres'),
-            'password': os.getenv('PGPASSWORD', 'password'),
-            'port': os.getenv('PGPORT', '5432')
-        }
+        self.db_config = DATABASE_CONFIG
     
     def get_db_connection(self):
-        """Get database connection with proper error handling"""
-        try:
-            if os.getenv('DATABASE_URL'):
-                conn = psycopg2.connect(os.getenv('DATABASE_URL'))
-            else:
-                conn = psycopg2.connect(**self.db_config)
-            
-            conn.autocommit = True
-            return conn
-        except psycopg2.Error as e:
-            logger.error(f"Database connection error: {e}")
-            raise
+        """Get a dedicated database connection (queries below use the shared pool)"""
+        return get_db_connection()
     
-    def execute_stored_procedure(self, proc_name: str, params: List = None) -> List[Dict]:
-        """Execute stored procedure and return results as dictionaries"""
-        try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            
-            if params:
-                cursor.callproc(proc_name, params)
-            else:
-                cursor.callproc(proc_name)
-            
-            try:
-                results = cursor.fetchall()
-                cursor.close()
-                conn.close()
-                return [dict(row) for row in results]
-            except psycopg2.ProgrammingError:
-                cursor.close()
-                conn.close()
-                return []
-        except psycopg2.Error as e:
-            logger.error(f"Stored procedure error: {e}")
-            raise
+    def execute_stored_procedure(self, proc_name: str, params: List = None, columns: List[str] = None) -> List[Dict]:
+        """Execute stored procedure and return results as dictionaries (only columns, if given)"""
+        return execute_stored_procedure(proc_name, params, columns)
     
-    def execute_query(self, query: str, params: List = None) -> List[Dict]:
-        """Execute direct SQL query and return results"""
-        try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            try:
-                results = cursor.fetchall()
-                cursor.close()
-                conn.close()
-                return [dict(row) for row in results]
-            except psycopg2.ProgrammingError:
-                cursor.close()
-                conn.close()
-                return []
-        except psycopg2.Error as e:
-            logger.error(f"Query execution error: {e}")
-            raise
+    def execute_query(self, query: str, params: List = None, read_only: bool = False) -> List[Dict]:
+        """Execute direct SQL query and return results (read_only queries may use a replica)"""
+        return execute_query(query, params, read_only)
     
     # =========================================================================
     # CUSTOMER MANAGEMENT
     # =========================================================================
     
-    def search_customers(self, search_term: str = '') -> List[Dict]:
-        """Search customers using stored procedure"""
+    def search_customers(self, search_term: str = '', fields: str = None) -> List[Dict]:
+        """Search customers using stored procedure (fields: comma-separated subset of CUSTOMER_FIELDS)"""
+        selected = parse_fields(fields, CUSTOMER_FIELDS)
         try:
             # Rename fields to match frontend expectations
-            results = self.execute_stored_procedure('sp_get_customers_for_selection', [search_term])
-            return [
+            results = self.execute_stored_procedure('sp_get_customers_for_selection', [search_term],
+                                                    ['customer_id', 'customer_name', 'customer_code'])
+            return project([
                 {
                     'id': row['customer_id'],
                     'name': row['customer_name'], 
                     'customer_code': row['customer_code']
                 }
                 for row in results
-            ]
+            ], selected)
         except Exception as e:
             logger.error(f"Error searching customers: {e}")
             raise
     
-    def get_customer_contacts(self, customer_id: int) -> List[Dict]:
-        """Get contacts for a specific customer"""
+    def get_customer_contacts(self, customer_id: int, fields: str = None) -> List[Dict]:
+        """Get contacts for a specific customer (fields: subset of CONTACT_FIELDS, fetched alone)"""
+        columns = parse_fields(fields, CONTACT_FIELDS)
         try:
-            return self.execute_stored_procedure('sp_get_customer_contacts', [customer_id])
+            return self.execute_stored_procedure('sp_get_customer_contacts', [customer_id], columns)
         except Exception as e:
             logger.error(f"Error fetching customer contacts: {e}")
             raise
     
-    def get_customer_sites(self, customer_id: int) -> List[Dict]:
-        """Get delivery sites for a specific customer"""
+    def get_customer_sites(self, customer_id: int, fields: str = None) -> List[Dict]:
+        """Get delivery sites for a specific customer (fields: subset of SITE_FIELDS, fetched alone)"""
+        columns = parse_fields(fields, SITE_FIELDS)
         try:
-            return self.execute_stored_procedure('sp_get_customer_sites', [customer_id])
+            return self.execute_stored_procedure('sp_get_customer_sites', [customer_id], columns)
         except Exception as e:
             logger.error(f"Error fetching customer sites: {e}")
             raise
@@ -130,22 +149,52 @@ class HireManager:
     # EQUIPMENT MANAGEMENT
     # =========================================================================
     
-    def search_equipment_types(self, search_term: str = '', hire_start_date: str = None, hire_end_date: str = None) -> List[Dict]:
-        """Search equipment types with availability checking"""
+    def search_equipment_types(self, search_term: str = '', hire_start_date: str = None, hire_end_date: str = None,
+                               limit: int = DEFAULT_LIMIT, offset: int = 0, fields: str = None) -> List[Dict]:
+        """Search equipment types with availability checking (ranked by the in-memory search index).
+
+        fields selects from EQUIPMENT_TYPE_FIELDS; availability is only queried
+        when available_units or total_units is among them.
+        """
+        selected = parse_fields(fields, EQUIPMENT_TYPE_FIELDS)
+        with_counts = not selected or 'available_units' in selected or 'total_units' in selected
         try:
-            return self.execute_stored_procedure('sp_get_available_equipment_types', [search_term, hire_start_date, hire_end_date])
+            return project(equipment_search_index.search_types(
+                search_term, hire_start_date, hire_end_date, limit=limit, offset=offset, with_counts=with_counts
+            )['results'], selected)
         except Exception as e:
             logger.error(f"Error searching equipment types: {e}")
             raise
     
-    def search_specific_equipment(self, search_term: str = '', hire_start_date: str = None, hire_end_date: str = None) -> List[Dict]:
-        """Search specific equipment units with availability checking"""
+    def search_specific_equipment(self, search_term: str = '', hire_start_date: str = None, hire_end_date: str = None,
+                                  equipment_type_id: int = None, limit: int = DEFAULT_LIMIT, offset: int = 0,
+                                  fields: str = None) -> List[Dict]:
+        """Search specific equipment units with availability checking (ranked by the in-memory search index)"""
+        selected = parse_fields(fields, EQUIPMENT_UNIT_FIELDS)
         try:
-            return self.execute_stored_procedure('sp_get_available_individual_equipment', [search_term, hire_start_date, hire_end_date])
+            return project(equipment_search_index.search_units(
+                search_term, equipment_type_id, hire_start_date, hire_end_date, limit=limit, offset=offset
+            )['results'], selected)
         except Exception as e:
             logger.error(f"Error searching specific equipment: {e}")
             raise
     
+    def get_fleet_status(self, equipment_type_id: int = None, unit_state: str = None,
+                         limit: int = 100, offset: int = 0, fields: str = None) -> Dict:
+        """Current state of each unit, plus per-type counts, from the unit status projection
+        (fields: subset of FLEET_UNIT_FIELDS, fetched alone)"""
+        columns = parse_fields(fields, FLEET_UNIT_FIELDS)
+        try:
+            units = self.execute_stored_procedure('sp_get_fleet_status', [equipment_type_id, unit_state, limit, offset],
+                                                  columns)
+            summary = self.execute_stored_procedure('sp_get_fleet_status_summary')
+            if equipment_type_id:
+                summary = [row for row in summary if row['equipment_type_id'] == equipment_type_id]
+            return {'units': units, 'summary': summary}
+        except Exception as e:
+            logger.error(f"Error fetching fleet status: {e}")
+            raise
+    
     def get_equipment_type_accessories(self, equipment_type_id: int) -> List[Dict]:
         """Get accessories for a specific equipment type"""
         try:
@@ -270,30 +319,47 @@ class HireManager:
             return {'error': str(e)}
     
     def get_all_hires(self, filters: Dict = None) -> List[Dict]:
-        """Get all hires with optional filtering"""
+        """Get hires from the materialized hire summary, newest first.
+
+        Filters: status (comma-separated), date_from / date_to (delivery date),
+        customer_id, limit (default 100, max 500), offset and fields (a subset of
+        HIRE_LIST_COLUMNS; only those columns are selected).
+        """
+        filters = filters or {}
+        selected = parse_fields(filters.get('fields'), HIRE_LIST_COLUMNS) or list(HIRE_LIST_COLUMNS)
         try:
-            query = """
+            hire_summary_refresher.start()
+            conditions = []
+            params = []
+            if filters.get('status'):
+                conditions.append("status = ANY(%s)")
+                params.append([status.strip() for status in filters['status'].split(',') if status.strip()])
+            if filters.get('date_from'):
+                conditions.append("delivery_date >= %s")
+                params.append(filters['date_from'])
+            if filters.get('date_to'):
+                conditions.append("delivery_date <= %s")
+                params.append(filters['date_to'])
+            if filters.get('customer_id'):
+                conditions.append("customer_id = %s")
+                params.append(int(filters['customer_id']))
+            limit = min(max(int(filters.get('limit') or HIRE_LIST_LIMIT), 1), HIRE_LIST_MAX_LIMIT)
+            offset = max(int(filters.get('offset') or 0), 0)
+
+            columns = ',\n                    '.join(
+                HIRE_LIST_COLUMNS[field] if HIRE_LIST_COLUMNS[field] == field
+                else f"{HIRE_LIST_COLUMNS[field]} as {field}"
+                for field in selected
+            )
+            query = f"""
                 SELECT 
-                    i.id,
-                    i.reference_number,
-                    i.hire_start_date,
-                    i.hire_end_date,
-                    i.delivery_date,
-                    i.status,
-                    i.created_date,
-                    c.name as customer_name,
-                    c.account_code,
-                    cc.name as contact_name,
-                    cs.name as site_name
-                FROM interactions.interactions i
-                LEFT JOIN core.customers c ON i.customer_id = c.id
-                LEFT JOIN core.customer_contacts cc ON i.contact_id = cc.id
-                LEFT JOIN core.customer_sites cs ON i.site_id = cs.id
-                WHERE i.interaction_type = 'hire'
-                ORDER BY i.created_date DESC
-                LIMIT 100
+                    {columns}
+                FROM mv_hire_summary
+                {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+                ORDER BY interaction_id DESC
+                LIMIT %s OFFSET %s
             """
-            return self.execute_query(query)
+            return self.execute_query(query, params + [limit, offset], read_only=True)
         except Exception as e:
             logger.error(f"Error fetching all hires: {e}")
             raise
@@ -334,14 +400,135 @@ class HireManager:
             logger.error(f"Error getting today's hires: {str(e)}")
             return []
     
-    def get_pending_allocations(self):
-        """Get hires that have generic equipment needing allocation."""
+    def stream_diary_interactions(self, date_from: date, date_to: date, interaction_types: List[str] = None,
+                                  search: str = None) -> Iterator[bytes]:
+        """Stream the diary for a date range as one JSON document.
+
+        {"success": true, "date_from", "date_to", "data": [interactions in diary order],
+         "days": [{"date", "count", "total_value"} for every day in the range]}
+        Rows are fetched in batches from one query, so a week costs one round trip
+        per DIARY_BATCH_ROWS interactions rather than one query per day.
+        """
+        if date_to < date_from:
+            raise ValueError('date_to must not be before date_from')
+        if (date_to - date_from).days >= DIARY_MAX_DAYS:
+            raise ValueError(f'Date range is limited to {DIARY_MAX_DAYS} days')
+        return self._stream_diary(date_from, date_to, interaction_types or None, search or None)
+
+    def _stream_diary(self, date_from: date, date_to: date, interaction_types: Optional[List[str]],
+                      search: Optional[str]) -> Iterator[bytes]:
+        days = {date_from + timedelta(days=n): {'count': 0, 'total_value': 0.0}
+                for n in range((date_to - date_from).days + 1)}
+
+        with pooled_connection(autocommit=False, read_only=True) as conn:
+            try:
+                # Server-side cursor: however busy the range, memory holds one batch
+                cursor = conn.cursor(name='diary_interactions')
+                cursor.itersize = DIARY_BATCH_ROWS
+                cursor.execute("SELECT * FROM sp_get_diary_interactions(%s, %s, %s::VARCHAR[], %s)",
+                               [date_from, date_to, interaction_types, search])
+                separator = ''
+                yield (f'{{"success": true, "date_from": "{date_from.isoformat()}", '
+                       f'"date_to": "{date_to.isoformat()}", "data": [').encode()
+                while True:
+                    rows = cursor.fetchmany(DIARY_BATCH_ROWS)
+                    if not rows:
+                        break
+                    columns = [column[0] for column in cursor.description]
+                    out = []
+                    for row in rows:
+                        item = dict(zip(columns, row))
+                        day = days[item['diary_date']]
+                        day['count'] += 1
+                        day['total_value'] += float(item['total_value'])
+                        out.append(json.dumps(item, default=self.serialize_decimal))
+                    yield (separator + ', '.join(out)).encode()
+                    separator = ', '
+                cursor.close()
+            finally:
+                # Read-only: end the transaction even if the client went away mid-stream
+                if not conn.closed:
+                    conn.rollback()
+
+        summary = [{'date': day.isoformat(), 'count': totals['count'], 'total_value': round(totals['total_value'], 2)}
+                   for day, totals in days.items()]
+        yield ('], "days": ' + json.dumps(summary) + '}').encode()
+
+    def get_pending_allocations(self, limit=None, offset=0):
+        """Get hires that have generic equipment needing allocation (all of them unless limit is given)."""
         try:
-            result = self.execute_stored_procedure('sp_get_pending_allocations', [])
+            result = self.execute_stored_procedure('sp_get_pending_allocations', [limit, offset])
             return result if result else []
         except Exception as e:
             logger.error(f"Error getting pending allocations: {str(e)}")
             return []
+
+    # =========================================================================
+    # ALLOCATION WORK QUEUE
+    # =========================================================================
+
+    def _lease_seconds(self, lease_seconds=None) -> int:
+        return min(max(int(lease_seconds or ALLOCATION_LEASE_SECONDS), 30), ALLOCATION_MAX_LEASE_SECONDS)
+
+    def get_allocation_queue(self, priority: str = None, claimant: str = None, exclude_claimed: bool = False,
+                             limit=None, offset=0, fields: str = None) -> Dict:
+        """Page through the allocation work queue, most urgent first.
+
+        exclude_claimed hides hires another allocator holds a live lease on, and
+        fields limits each item to a subset of ALLOCATION_QUEUE_FIELDS.
+        Returns {'items': [...], 'total': n}.
+        """
+        selected = parse_fields(fields, ALLOCATION_QUEUE_FIELDS)
+        try:
+            limit = min(max(int(limit or ALLOCATION_QUEUE_LIMIT), 1), ALLOCATION_QUEUE_MAX_LIMIT)
+            offset = max(int(offset or 0), 0)
+            rows = self.execute_stored_procedure('sp_get_allocation_queue', [
+                priority or None, claimant, exclude_claimed, limit, offset, None
+            ], selected + ['total_count'] if selected else None)
+            total = rows[0]['total_count'] if rows else 0
+            for row in rows:
+                row.pop('total_count', None)
+            return {'items': rows, 'total': total}
+        except Exception as e:
+            logger.error(f"Error getting allocation queue: {str(e)}")
+            raise
+
+    def claim_allocation_work(self, claimant: str, limit=1, lease_seconds=None) -> List[Dict]:
+        """Lease the next unclaimed hires in the queue to this allocator."""
+        try:
+            limit = min(max(int(limit or 1), 1), ALLOCATION_QUEUE_MAX_LIMIT)
+            rows = self.execute_stored_procedure('sp_claim_allocation_work', [
+                claimant, limit, self._lease_seconds(lease_seconds)
+            ])
+            for row in rows:
+                row.pop('total_count', None)
+            return rows
+        except Exception as e:
+            logger.error(f"Error claiming allocation work: {str(e)}")
+            raise
+
+    def claim_allocation_hire(self, hire_id: int, claimant: str, lease_seconds=None) -> Dict:
+        """Lease one hire to this allocator (or renew its lease); fails while someone else holds it."""
+        try:
+            result = self.execute_stored_procedure('sp_claim_allocation_hire', [
+                hire_id, claimant, self._lease_seconds(lease_seconds)
+            ])
+            claim = result[0] if result else {'success': False, 'claimed_by': None, 'claimed_until': None}
+            if not claim['success']:
+                claim['error'] = f"Hire is being allocated by {claim['claimed_by']}"
+            return claim
+        except Exception as e:
+            logger.error(f"Error claiming hire {hire_id} for allocation: {str(e)}")
+            raise
+
+    def release_allocation_hire(self, hire_id: int, claimant: str) -> bool:
+        """Give up this allocator's lease on a hire."""
+        try:
+            result = self.execute_stored_procedure('sp_release_allocation_hire', [hire_id, claimant])
+            return bool(result and result[0]['sp_release_allocation_hire'])
+        except Exception as e:
+            logger.error(f"Error releasing hire {hire_id}: {str(e)}")
+            raise
     
     def get_available_equipment(self, equipment_type_id):
         """Get available equipment for a specific type."""
@@ -352,15 +539,24 @@ class HireManager:
             logger.error(f"Error getting available equipment: {str(e)}")
             return []
     
-    def allocate_equipment(self, data):
-        """Allocate specific equipment to a hire."""
+    def allocate_equipment(self, data, claimant: str = None, employee_id: int = 1):
+        """Allocate specific equipment to a hire, recorded as allocated by employee_id.
+
+        With a claimant, the hire is leased to them first, so two allocators
+        working the queue cannot allocate the same hire at once.
+        """
         try:
             hire_id = data.get('hire_id')
             equipment_type_id = data.get('equipment_type_id')
             equipment_ids = data.get('equipment_ids', [])
             
+            if claimant:
+                claim = self.claim_allocation_hire(hire_id, claimant)
+                if not claim['success']:
+                    return {'success': False, 'error': claim['error'], 'claimed_by': claim['claimed_by']}
+            
             result = self.execute_stored_procedure('sp_allocate_equipment', [
-                hire_id, equipment_type_id, equipment_ids
+                hire_id, equipment_type_id, equipment_ids, employee_id
             ])
             
             if result:
@@ -390,15 +586,155 @@ class HireManager:
             logger.error(f"Error removing equipment: {str(e)}")
             return {'success': False, 'error': str(e)}
 
+    # =========================================================================
+    # QUALITY CONTROL
+    # =========================================================================
+
+    def get_pending_qc(self, interaction_id: int = None, limit=None, offset=0) -> Dict:
+        """Page through units awaiting QC, soonest delivery first (optionally for one hire).
+
+        Returns {'items': [...], 'total': n}.
+        """
+        try:
+            limit = min(max(int(limit or QC_QUEUE_LIMIT), 1), QC_QUEUE_MAX_LIMIT)
+            offset = max(int(offset or 0), 0)
+            rows = self.execute_stored_procedure('sp_get_equipment_pending_qc', [interaction_id, limit, offset])
+            if rows or not offset:
+                total = rows[0]['total_count'] if rows else 0
+            else:
+                # Past the last page - no row carries the count, so fetch it from the first
+                first = self.execute_stored_procedure('sp_get_equipment_pending_qc', [interaction_id, 1, 0],
+                                                      columns=['total_count'])
+                total = first[0]['total_count'] if first else 0
+            for row in rows:
+                row.pop('total_count', None)
+            return {'items': rows, 'total': total}
+        except Exception as e:
+            logger.error(f"Error getting pending QC equipment: {str(e)}")
+            raise
+
+    def qc_signoff(self, data: Dict, employee_id: int = 1) -> Dict:
+        """Approve or reject many allocations in one transaction.
+
+        data holds allocation_ids, or hire_id to sign off everything awaiting QC on
+        that hire (both: only those allocations on that hire), plus approved
+        (default true) and qc_notes. Returns {'success', 'signed_off', 'failed',
+        'results': [per-allocation results]}.
+        """
+        allocation_ids = data.get('allocation_ids')
+        hire_id = data.get('hire_id')
+        if allocation_ids is None and hire_id is None:
+            raise QualityControlError('Give allocation_ids or hire_id')
+        if allocation_ids is not None and (not isinstance(allocation_ids, list) or not allocation_ids):
+            raise QualityControlError('allocation_ids must be a non-empty list')
+        if allocation_ids and len(allocation_ids) > QC_SIGNOFF_MAX_ALLOCATIONS:
+            raise QualityControlError(f'At most {QC_SIGNOFF_MAX_ALLOCATIONS} allocations can be signed off at once')
+        try:
+            allocation_ids = [int(allocation_id) for allocation_id in allocation_ids] if allocation_ids else None
+            hire_id = int(hire_id) if hire_id is not None else None
+        except (TypeError, ValueError):
+            raise QualityControlError('allocation_ids and hire_id must be integers')
+        approved = data.get('approved', True)
+        if not isinstance(approved, bool):
+            raise QualityControlError('approved must be true or false')
+
+        try:
+            rows = self.execute_stored_procedure('sp_bulk_quality_control_signoff', [
+                allocation_ids, hire_id, employee_id, approved, data.get('qc_notes')
+            ])
+        except Exception as e:
+            logger.error(f"Error in bulk QC sign-off: {str(e)}")
+            raise
+
+        signed_off = sum(1 for row in rows if row['success'])
+        return {
+            'success': signed_off > 0,
+            'signed_off': signed_off,
+            'failed': len(rows) - signed_off,
+            'results': rows
+        }
+
+    # =========================================================================
+    # OFF-HIRE
+    # =========================================================================
+
+    def off_hire(self, data: Dict, employee_id: int = 1) -> Dict:
+        """Off-hire one or more hires on a return date in one transaction.
+
+        data holds hire_ids (or hire_id), return_date (YYYY-MM-DD) and optionally
+        equipment_ids (return only these units), collection_time (HH:MM) and notes.
+        Allocations are closed as returned, units go back into stock, fully
+        returned hires are completed and hires with delivered units get a collection task.
+        Returns {'success', 'hires': [per-hire results], 'units_returned',
+        'hires_completed', 'collection_task_ids'}.
+        """
+        hire_ids = data.get('hire_ids')
+        if hire_ids is None and data.get('hire_id') is not None:
+            hire_ids = [data.get('hire_id')]
+        if not isinstance(hire_ids, list) or not hire_ids:
+            raise OffHireError('hire_ids must be a non-empty list')
+        if len(hire_ids) > OFF_HIRE_MAX_HIRES:
+            raise OffHireError(f'At most {OFF_HIRE_MAX_HIRES} hires can be off-hired at once')
+        equipment_ids = data.get('equipment_ids')
+        if equipment_ids is not None and (not isinstance(equipment_ids, list) or not equipment_ids):
+            raise OffHireError('equipment_ids must be a non-empty list when given')
+        try:
+            hire_ids = [int(hire_id) for hire_id in hire_ids]
+            equipment_ids = [int(equipment_id) for equipment_id in equipment_ids] if equipment_ids else None
+        except (TypeError, ValueError):
+            raise OffHireError('hire_ids and equipment_ids must be integers')
+        try:
+            return_date = date.fromisoformat(data.get('return_date') or '')
+        except (TypeError, ValueError):
+            raise OffHireError('return_date must be a date (YYYY-MM-DD)')
+        if return_date > date.today():
+            raise OffHireError('return_date cannot be in the future')
+        collection_time = data.get('collection_time') or None
+        if collection_time:
+            try:
+                collection_time = datetime.strptime(
+                    collection_time, '%H:%M:%S' if collection_time.count(':') == 2 else '%H:%M'
+                ).time()
+            except (AttributeError, ValueError):
+                raise OffHireError('collection_time must be a time (HH:MM)')
+
+        try:
+            rows = self.execute_stored_procedure('sp_bulk_off_hire', [
+                hire_ids, return_date, employee_id, equipment_ids, collection_time, data.get('notes')
+            ])
+        except Exception as e:
+            logger.error(f"Error off-hiring hires {hire_ids}: {str(e)}")
+            raise
+
+        return {
+            'success': any(row['success'] for row in rows),
+            'hires': rows,
+            'units_returned': sum(row['units_returned'] for row in rows),
+            'hires_completed': sum(1 for row in rows if row['hire_completed']),
+            'collection_task_ids': sorted({row['collection_task_id'] for row in rows
+                                           if row['collection_task_id'] is not None})
+        }
+
+    def get_hire_document(self, hire_id: int) -> Optional[str]:
+        """Get the precomputed hire document as JSON text (None if not found).
+
+        Documents are rebuilt by triggers when the hire changes, so this is a
+        primary-key read whose result can be sent to the client as-is.
+        """
+        try:
+            result = self.execute_stored_procedure('sp_get_hire_document', [hire_id])
+            return result[0]['sp_get_hire_document'] if result else None
+        except Exception as e:
+            logger.error(f"Error getting hire document: {str(e)}")
+            raise
+
     def get_hire_details(self, hire_id):
         """Get detailed hire information by ID."""
         try:
-            result = self.execute_stored_procedure('sp_get_hire_details', [hire_id])
+            document = self.get_hire_document(hire_id)
             
-            if result and len(result) > 0:
-                import json
-                hire_data = json.loads(json.dumps(result[0], default=self.serialize_decimal))
-                return hire_data
+            if document:
+                return json.loads(document)
             else:
                 return {'error': 'Hire not found'}
         except Exception as e:
@@ -3,8 +3,12 @@ Hire management routes for the Equipment Hire System
 Handles hire creation, viewing, and management using HireManager class
 """
 
-from flask import Blueprint, request, jsonify, session
-from .hire_manager import HireManager
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
+from .hire_manager import HireManager, OffHireError, QualityControlError
+from server.responses import FieldSelectionError
+from datetime import date
+from functools import wraps
+import itertools
 import json
 import logging
 
@@ -13,6 +17,15 @@ logger = logging.getLogger(__name__)
 hire_bp = Blueprint('hire', __name__)
 hire_manager = HireManager()
 
+def require_user(f):
+    """Reject requests without a logged-in user; leases and allocations are recorded against them."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not session.get('currentUser'):
+            return jsonify({'success': False, 'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
 @hire_bp.route('/create', methods=['POST'])
 def create_hire():
     """Create a new hire interaction using HireManager."""
@@ -41,18 +54,16 @@ def create_hire():
 def get_hire(hire_id):
     """Get hire details by ID using HireManager."""
     try:
-        hire_details = hire_manager.get_hire_details(hire_id)
+        document = hire_manager.get_hire_document(hire_id)
         
-        if 'error' in hire_details:
+        if not document:
             return jsonify({
                 'success': False,
-                'error': hire_details['error']
+                'error': 'Hire not found'
             }), 404
         
-        return jsonify({
-            'success': True,
-            'hire': hire_details
-        })
+        # The stored document is already JSON - wrap it without decoding
+        return Response('{"success": true, "hire": ' + document + '}', mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Error fetching hire {hire_id}: {str(e)}")
@@ -81,12 +92,25 @@ def list_hires():
     """Get list of all hires."""
     try:
         filters = request.args.to_dict()
+        for name in ('customer_id', 'limit', 'offset'):
+            if filters.get(name):
+                filters[name] = request.args.get(name, type=int)
+                if filters[name] is None:
+                    return jsonify({'success': False, 'error': f'{name} must be a whole number'}), 400
+        for name in ('date_from', 'date_to'):
+            if filters.get(name):
+                try:
+                    filters[name] = date.fromisoformat(filters[name])
+                except ValueError:
+                    return jsonify({'success': False, 'error': f'{name} must be a date (YYYY-MM-DD)'}), 400
         hires = hire_manager.get_all_hires(filters)
         return jsonify({
             'success': True,
             'hires': hires
         })
         
+    except FieldSelectionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching hires: {str(e)}")
         return jsonify({
@@ -106,16 +130,104 @@ def get_todays_hires():
         logger.error(f"Error getting today's hires: {str(e)}")
         return jsonify({'error': 'Failed to load hires'}), 500
 
+@hire_bp.route('/interactions-by-date', methods=['GET'])
+def get_interactions_by_date():
+    """Diary interactions for one day (target_date) or a range (date_from / date_to).
+
+    Optional: types (comma-separated interaction types) and search.
+    """
+    try:
+        target_date = request.args.get('target_date') or date.today().isoformat()
+        date_from = date.fromisoformat(request.args.get('date_from') or target_date)
+        date_to = date.fromisoformat(request.args.get('date_to') or request.args.get('date_from') or target_date)
+        types = [t.strip() for t in request.args.get('types', '').split(',') if t.strip()]
+        chunks = hire_manager.stream_diary_interactions(date_from, date_to, types, request.args.get('search'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        # Run the query before the response starts, so a failure is still a 500
+        first = next(chunks)
+    except Exception as e:
+        logger.error(f"Error getting diary interactions: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to load interactions'}), 500
+
+    response = Response(stream_with_context(itertools.chain([first], chunks)), mimetype='application/json')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @hire_bp.route('/pending-allocations', methods=['GET'])
 def get_pending_allocations():
-    """Get hires that need equipment allocation."""
+    """Get hires that need equipment allocation (optionally paged with limit/offset)."""
     try:
-        pending = hire_manager.get_pending_allocations()
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        pending = hire_manager.get_pending_allocations(limit, offset)
         return jsonify(pending)
     except Exception as e:
         logger.error(f"Error getting pending allocations: {str(e)}")
         return jsonify({'error': 'Failed to load pending allocations'}), 500
 
+@hire_bp.route('/allocation-queue', methods=['GET'])
+def get_allocation_queue():
+    """Page through the allocation work queue, most urgent first."""
+    try:
+        result = hire_manager.get_allocation_queue(
+            priority=request.args.get('priority'),
+            claimant=session.get('currentUser'),
+            exclude_claimed=request.args.get('available_only', 'false').lower() == 'true',
+            limit=request.args.get('limit', type=int),
+            offset=request.args.get('offset', 0, type=int),
+            fields=request.args.get('fields')
+        )
+        return jsonify({'success': True, **result})
+    except FieldSelectionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error getting allocation queue: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to load allocation queue'}), 500
+
+@hire_bp.route('/allocation-queue/claim', methods=['POST'])
+@require_user
+def claim_allocation_work():
+    """Lease the next unclaimed hires in the queue to the current user."""
+    try:
+        data = request.get_json(silent=True) or {}
+        items = hire_manager.claim_allocation_work(
+            session['currentUser'],
+            data.get('limit', 1),
+            data.get('lease_seconds')
+        )
+        return jsonify({'success': True, 'items': items})
+    except Exception as e:
+        logger.error(f"Error claiming allocation work: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to claim allocation work'}), 500
+
+@hire_bp.route('/allocation-queue/<int:hire_id>/claim', methods=['POST'])
+@require_user
+def claim_allocation_hire(hire_id):
+    """Lease one hire to the current user, or renew their lease."""
+    try:
+        data = request.get_json(silent=True) or {}
+        claim = hire_manager.claim_allocation_hire(
+            hire_id, session['currentUser'], data.get('lease_seconds')
+        )
+        return jsonify(claim) if claim['success'] else (jsonify(claim), 409)
+    except Exception as e:
+        logger.error(f"Error claiming hire {hire_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to claim hire'}), 500
+
+@hire_bp.route('/allocation-queue/<int:hire_id>/release', methods=['POST'])
+@require_user
+def release_allocation_hire(hire_id):
+    """Give up the current user's lease on a hire."""
+    try:
+        released = hire_manager.release_allocation_hire(hire_id, session['currentUser'])
+        return jsonify({'success': True, 'released': released})
+    except Exception as e:
+        logger.error(f"Error releasing hire {hire_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to release hire'}), 500
+
 @hire_bp.route('/equipment/<int:equipment_type_id>/available', methods=['GET'])
 def get_available_equipment(equipment_type_id):
     """Get available equipment for allocation."""
@@ -127,11 +239,13 @@ def get_available_equipment(equipment_type_id):
         return jsonify({'error': 'Failed to load equipment'}), 500
 
 @hire_bp.route('/allocate-equipment', methods=['POST'])
+@require_user
 def allocate_equipment():
     """Allocate specific equipment to a hire."""
     try:
         data = request.json
-        result = hire_manager.allocate_equipment(data)
+        result = hire_manager.allocate_equipment(data, session['currentUser'],
+                                                 session.get('employee_id', 1))
         return jsonify(result)
     except Exception as e:
         logger.error(f"Error allocating equipment: {str(e)}")
@@ -146,4 +260,44 @@ def remove_equipment():
         return jsonify(result)
     except Exception as e:
         logger.error(f"Error removing equipment: {str(e)}")
-        return jsonify({'success': False, 'error': 'Failed to remove equipment'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': 'Failed to remove equipment'}), 500
+
+@hire_bp.route('/qc/pending', methods=['GET'])
+def get_pending_qc():
+    """Page through units awaiting QC (optionally for one hire with interaction_id)."""
+    try:
+        result = hire_manager.get_pending_qc(
+            interaction_id=request.args.get('interaction_id', type=int),
+            limit=request.args.get('limit', type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        logger.error(f"Error getting pending QC equipment: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to load pending QC equipment'}), 500
+
+@hire_bp.route('/qc/signoff', methods=['POST'])
+def qc_signoff():
+    """Approve or reject a list of allocations, or everything awaiting QC on a hire."""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = hire_manager.qc_signoff(data, session.get('employee_id', 1))
+        return jsonify(result) if result['success'] else (jsonify(result), 409)
+    except QualityControlError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in QC sign-off: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to sign off QC'}), 500
+
+@hire_bp.route('/off-hire', methods=['POST'])
+def off_hire():
+    """Off-hire hires (or chosen units on them) and book their collections."""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = hire_manager.off_hire(data, session.get('employee_id', 1))
+        return jsonify(result) if result['success'] else (jsonify(result), 409)
+    except OffHireError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error off-hiring: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to off-hire'}), 500
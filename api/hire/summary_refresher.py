@@ -0,0 +1,145 @@
+"""
+Hire Summary Refresher
+Keeps the mv_hire_summary materialized view current: refreshes it concurrently a
+short while after hire changes arrive on the event bus, and on a schedule regardless
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+import logging
+
+from database.connection import pooled_connection
+from events.event_bus import event_bus
+
+logger = logging.getLogger(__name__)
+
+# Tables whose changes show up in the summary (all publish change events)
+WATCHED_TABLES = {
+    'interactions.interactions',
+    'interactions.interaction_equipment_generic',
+    'interactions.interaction_equipment',
+    'tasks.drivers_taskboard'
+}
+
+# Wait this long after a change so a burst of edits costs one refresh
+REFRESH_DELAY = float(os.getenv('HIRE_SUMMARY_REFRESH_DELAY', '2'))
+# Refresh at least this often, for changes that publish no event (e.g. customer names)
+MAX_SUMMARY_AGE = float(os.getenv('HIRE_SUMMARY_MAX_AGE', '300'))
+
+
+class HireSummaryRefresher:
+    """Background thread that refreshes mv_hire_summary when it goes stale"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._dirty_since: Optional[float] = None
+        self._refreshed_at = 0.0
+        self._stats = {'refreshes': 0, 'skipped': 0, 'failures': 0, 'last_refresh_ms': None, 'last_error': None}
+        event_bus.add_handler(self.handle_change_event)
+
+    # =========================================================================
+    # LIFECYCLE
+    # =========================================================================
+
+    def start(self):
+        """Start the refresh thread (idempotent, and safe after a worker fork)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # The summary may already be behind whatever changed before this worker started
+            self._refreshed_at = 0.0
+            self._thread = threading.Thread(target=self._refresh_loop, name='hire-summary-refresher', daemon=True)
+            self._thread.start()
+        event_bus.start()
+
+    def handle_change_event(self, event: Dict):
+        if event.get('op') == 'RESYNC' or event.get('table') in WATCHED_TABLES:
+            with self._lock:
+                if self._dirty_since is None:
+                    self._dirty_since = time.time()
+            self._wake.set()
+
+    # =========================================================================
+    # REFRESHING
+    # =========================================================================
+
+    def refresh(self) -> str:
+        """Refresh unless another worker already has: 'refreshed', 'current' or 'busy'"""
+        started = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            dirty_since = self._dirty_since
+            self._dirty_since = None
+        # A refresh that began after the oldest pending change (or within the scheduled
+        # window) already covers it. Passed as an age so only the database clock is compared.
+        covered_age = now - dirty_since if dirty_since is not None else MAX_SUMMARY_AGE
+        try:
+            with pooled_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT sp_refresh_hire_summary(clock_timestamp() - make_interval(secs => %s))",
+                               [covered_age])
+                outcome = cursor.fetchone()[0]
+                cursor.close()
+        except Exception as e:
+            with self._lock:
+                self._keep_pending(dirty_since)
+                self._stats['failures'] += 1
+                self._stats['last_error'] = str(e).strip()
+            raise
+
+        with self._lock:
+            self._refreshed_at = now
+            if outcome == 'busy':
+                # Another worker is mid-refresh and may have started before these changes
+                self._keep_pending(dirty_since)
+            if outcome == 'refreshed':
+                self._stats['refreshes'] += 1
+                self._stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                self._stats['last_error'] = None
+            else:
+                self._stats['skipped'] += 1
+        return outcome
+
+    def _keep_pending(self, dirty_since: Optional[float]):
+        if dirty_since is not None and (self._dirty_since is None or dirty_since < self._dirty_since):
+            self._dirty_since = dirty_since
+
+    def _due_in(self) -> float:
+        """Seconds until the next refresh is due (0 or less means now)"""
+        with self._lock:
+            now = time.time()
+            due = self._refreshed_at + MAX_SUMMARY_AGE
+            if self._dirty_since is not None:
+                due = min(due, max(self._dirty_since + REFRESH_DELAY, self._refreshed_at + REFRESH_DELAY))
+            return due - now
+
+    def _refresh_loop(self):
+        while True:
+            wait = self._due_in()
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing hire summary: {e}")
+                self._wake.wait(max(REFRESH_DELAY, 5))
+                self._wake.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats,
+                        running=bool(self._thread and self._thread.is_alive() and self._pid == os.getpid()),
+                        pending_changes=self._dirty_since is not None,
+                        refreshed_seconds_ago=round(time.time() - self._refreshed_at, 1) if self._refreshed_at else None)
+
+
+# Shared per-process refresher
+hire_summary_refresher = HireSummaryRefresher()
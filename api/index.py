@@ -5,14 +5,11 @@ Based on the comprehensive old system from api/old/index.py
 """
 
 import os
+import sys
 import json
-import psycopg2
-import psycopg2.extras
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
-from flask_moment import Moment
+from flask import Flask, request, jsonify, session
 from flask_cors import CORS
-from datetime import datetime, date, time, timedelta
-from decimal import Decimal
+from datetime import timedelta
 import logging
 
 # Configure logging
@@ -30,8 +27,89 @@ CORS(app,
 # Session configuration
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=8)
 
-# Initialize Flask-Moment for date formatting
-moment = Moment(app)
+# Flask-Moment for date formatting in templates - imported on first template render
+# rather than at cold start, since the JSON API never renders templates
+@app.context_processor
+def inject_moment():
+    from flask_moment import moment
+    app.extensions.setdefault('moment', moment)
+    return {'moment': moment}
+
+# Response compression: large JSON and text bodies go out as brotli or gzip per
+# Accept-Encoding, streamed ones chunk by chunk (see server/responses.py).
+# Registered first so it runs after every other after_request hook.
+@app.after_request
+def compress_response(response):
+    from server.responses import response_compressor
+    return response_compressor.compress(response, request.headers.get('Accept-Encoding', ''))
+
+# Request tracing: every sampled request gets a span tree (see server/tracing.py);
+# slow ones are written to the trace file. The trace ID is echoed in X-Trace-Id.
+@app.before_request
+def begin_trace():
+    from flask import g
+    from server.tracing import tracer, TRACE_HEADER
+    g.trace_id = tracer.begin_request(f"{request.method} {request.path}", request.headers.get(TRACE_HEADER),
+                                      {'endpoint': request.endpoint, 'query_args': sorted(request.args.keys())})
+
+@app.after_request
+def add_trace_header(response):
+    from flask import g
+    from server.tracing import tracer, TRACE_HEADER
+    if 'trace_id' in g:
+        response.headers[TRACE_HEADER] = g.trace_id
+        tracer.set_attribute('status', response.status_code)
+    return response
+
+@app.teardown_request
+def end_trace(error):
+    from server.tracing import tracer
+    tracer.end_request(error)
+
+# Admission control: database-using requests take a per-class slot (write,
+# interactive, report) or get a fast 503 with Retry-After when their class is
+# saturated, so health checks and writes keep answering under load
+@app.before_request
+def admit_request():
+    from server.admission import ADMISSION_ENABLED, AdmissionRejected, admission_controller, classify
+    request_class = classify(request.method, request.path) if ADMISSION_ENABLED else None
+    if request_class is None:
+        return None
+    try:
+        admission_controller.acquire(request_class)
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding {request.method} {request.path}: {e}")
+        response = jsonify({'success': False, 'error': 'Server busy - please retry shortly',
+                            'request_class': e.request_class, 'reason': e.reason})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    from server.tracing import tracer
+    tracer.set_attribute('request_class', request_class)
+    return None
+
+@app.teardown_request
+def release_admission(error):
+    from server.admission import admission_controller
+    admission_controller.release()
+
+# Read-your-writes for read replicas: a session that wrote keeps reading from the
+# primary until its replicas have caught up (stored in the session cookie so it
+# holds across workers)
+@app.before_request
+def begin_read_routing():
+    from database.connection import replica_router
+    if replica_router.enabled:
+        replica_router.begin_request(session.get('db_primary_until'))
+
+@app.after_request
+def end_read_routing(response):
+    from database.connection import replica_router
+    if replica_router.enabled:
+        primary_until = replica_router.end_request()
+        if primary_until:
+            session['db_primary_until'] = primary_until
+    return response
 
 # Import and register auth blueprint
 from auth.login import auth_bp
@@ -41,6 +119,34 @@ app.register_blueprint(auth_bp, url_prefix='/api/auth')
 from hire.routes import hire_bp
 app.register_blueprint(hire_bp, url_prefix='/api/hire')
 
+# Import and register change events blueprint (Server-Sent Events)
+from events.routes import events_bp
+app.register_blueprint(events_bp, url_prefix='/api/events')
+
+# Import and register driver taskboard blueprint
+from tasks.routes import tasks_bp
+app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
+
+# Import and register bulk data blueprint (CSV import / export)
+from bulk.routes import bulk_bp
+app.register_blueprint(bulk_bp, url_prefix='/api/bulk')
+
+# Import and register analytics blueprint
+from analytics.routes import analytics_bp
+app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+
+# Import and register pricing blueprint (quotes and billing run)
+from pricing.routes import pricing_bp
+app.register_blueprint(pricing_bp, url_prefix='/api/pricing')
+
+# Import and register audit blueprint (activity log search)
+from audit.routes import audit_bp
+app.register_blueprint(audit_bp, url_prefix='/api/audit')
+
+# Import and register batch blueprint (several API calls in one round trip)
+from batch.routes import batch_bp
+app.register_blueprint(batch_bp, url_prefix='/api/batch')
+
 # Add custom Jinja2 filters
 @app.template_filter('fromjson')
 def fromjson_filter(json_string):
@@ -52,58 +158,12 @@ def fromjson_filter(json_string):
     except (json.JSONDecodeError, TypeError):
         return []
 
-# Database configuration
-DATABASE_CONFIG = {
-    'host': os.getenv('PGHOST', 'localhost'),
-    'database': os.getenv('PGDATABASE', 'hire_system'),
-    'user': os.getenv('PGUSER', 'postgres'),
-    'password': os.getenv('PGPASSWORD', 'password'),
-    'port': os.getenv('PGPORT', '5432')
-}
-
-def get_db_connection():
-    """Get database connection with proper error handling"""
-    try:
-        # Try environment variable first
-        if os.getenv('DATABASE_URL'):
-            conn = psycopg2.connect(os.getenv('DATABASE_URL'))
-        else:
-            conn = psycopg2.connect(**DATABASE_CONFIG)
-        
-        conn.autocommit = True
-        return conn
-    except psycopg2.Error as e:
-        logger.error(f"Database connection error: {e}")
-        raise
-
-def execute_stored_procedure(proc_name, params=None):
-    """Execute stored procedure and return results"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        if params:
-            cursor.callproc(proc_name, params)
-        else:
-            cursor.callproc(proc_name)
-        
-        # Fetch results if available
-        try:
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return results
-        except psycopg2.ProgrammingError:
-            # No results to fetch (e.g., for INSERT/UPDATE operations)
-            cursor.close()
-            conn.close()
-            return []
-    except psycopg2.Error as e:
-        logger.error(f"Stored procedure error: {e}")
-        raise
+# Shared database helpers (pooled connections)
+from database.connection import execute_stored_procedure
 
 # Import hire manager for API routes
 from hire.hire_manager import HireManager
+from server.responses import FieldSelectionError
 hire_manager = HireManager()
 
 # API Routes using HireManager
@@ -112,8 +172,10 @@ def api_customers():
     """API endpoint for customer search using HireManager"""
     search = request.args.get('search', '')
     try:
-        customers = hire_manager.search_customers(search)
+        customers = hire_manager.search_customers(search, request.args.get('fields'))
         return jsonify(customers)
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching customers: {e}")
         return jsonify({'error': str(e)}), 500
@@ -122,8 +184,10 @@ def api_customers():
 def api_customer_contacts(customer_id):
     """API endpoint for customer contacts using HireManager"""
     try:
-        contacts = hire_manager.get_customer_contacts(customer_id)
+        contacts = hire_manager.get_customer_contacts(customer_id, request.args.get('fields'))
         return jsonify(contacts)
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching customer contacts: {e}")
         return jsonify({'error': str(e)}), 500
@@ -132,8 +196,10 @@ def api_customer_contacts(customer_id):
 def api_customer_sites(customer_id):
     """API endpoint for customer sites using HireManager"""
     try:
-        sites = hire_manager.get_customer_sites(customer_id)
+        sites = hire_manager.get_customer_sites(customer_id, request.args.get('fields'))
         return jsonify(sites)
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching customer sites: {e}")
         return jsonify({'error': str(e)}), 500
@@ -145,9 +211,15 @@ def api_equipment_types():
     hire_start_date = request.args.get('hire_start_date')
     hire_end_date = request.args.get('hire_end_date')
     
+    limit = request.args.get('limit', 50, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    
     try:
-        equipment_types = hire_manager.search_equipment_types(search, hire_start_date, hire_end_date)
+        equipment_types = hire_manager.search_equipment_types(search, hire_start_date, hire_end_date, limit, offset,
+                                                              request.args.get('fields'))
         return jsonify(equipment_types)
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching equipment types: {e}")
         return jsonify({'error': str(e)}), 500
@@ -159,13 +231,38 @@ def api_equipment():
     hire_start_date = request.args.get('hire_start_date')
     hire_end_date = request.args.get('hire_end_date')
     
+    equipment_type_id = request.args.get('equipment_type_id', type=int)
+    limit = request.args.get('limit', 50, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    
     try:
-        equipment = hire_manager.search_specific_equipment(search, hire_start_date, hire_end_date)
+        equipment = hire_manager.search_specific_equipment(search, hire_start_date, hire_end_date,
+                                                           equipment_type_id, limit, offset,
+                                                           request.args.get('fields'))
         return jsonify(equipment)
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching equipment: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/equipment/fleet-status')
+def api_fleet_status():
+    """API endpoint for the fleet status screen (unit status projection)"""
+    equipment_type_id = request.args.get('equipment_type_id', type=int)
+    unit_state = request.args.get('state') or None
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    offset = request.args.get('offset', 0, type=int)
+    
+    try:
+        return jsonify(hire_manager.get_fleet_status(equipment_type_id, unit_state, limit, offset,
+                                                     request.args.get('fields')))
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error fetching fleet status: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/equipment-types/<int:equipment_type_id>/accessories')
 def api_equipment_type_accessories(equipment_type_id):
     """API endpoint for equipment type accessories using HireManager"""
@@ -206,6 +303,8 @@ def api_hires():
         filters = request.args.to_dict()
         hires = hire_manager.get_all_hires(filters)
         return jsonify(hires)
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching hires: {e}")
         return jsonify({'error': str(e)}), 500
@@ -214,12 +313,13 @@ def api_hires():
 def api_hire_details(interaction_id):
     """API endpoint for hire details using HireManager"""
     try:
-        hire_details = hire_manager.get_hire_details(interaction_id)
+        document = hire_manager.get_hire_document(interaction_id)
         
-        if 'error' in hire_details:
-            return jsonify({'error': hire_details['error']}), 404
+        if not document:
+            return jsonify({'error': 'Hire not found'}), 404
         
-        return jsonify(hire_details)
+        # Precomputed JSON document, sent without re-encoding
+        return app.response_class(document, mimetype='application/json')
     except Exception as e:
         logger.error(f"Error fetching hire details: {e}")
         return jsonify({'error': str(e)}), 500
@@ -253,5 +353,70 @@ def api_health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'Equipment Hire API'})
 
+@app.route('/api/metrics')
+def api_metrics():
+    """Per-process cache, coalescing and event bus counters"""
+    from database.single_flight import single_flight
+    from database.connection import replica_router
+    from events.event_bus import event_bus
+    from equipment.search_index import equipment_search_index
+    from hire.summary_refresher import hire_summary_refresher
+    from tasks.routes import taskboard_manager
+    from server.tracing import tracer
+    from server.admission import admission_controller
+    from server.responses import response_compressor
+    metrics = {
+        'pid': os.getpid(),
+        'coalescing': single_flight.stats(),
+        'taskboard_cache': taskboard_manager.cache_stats(),
+        'equipment_search_index': equipment_search_index.stats(),
+        'event_bus': event_bus.stats(),
+        'hire_summary': hire_summary_refresher.stats(),
+        'read_replicas': replica_router.stats(),
+        'tracing': tracer.stats(),
+        'admission': admission_controller.stats(),
+        'compression': response_compressor.stats()
+    }
+    # Only reported once analytics has been used (it pulls in NumPy)
+    if 'analytics.utilization_engine' in sys.modules:
+        metrics['utilization_engine'] = sys.modules['analytics.utilization_engine'].utilization_engine.stats()
+    return jsonify(metrics)
+
+@app.route('/api/traces')
+def api_traces():
+    """Slowest recent request traces (all workers) - limit, since_minutes, path"""
+    from server.tracing import tracer
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    since_minutes = request.args.get('since_minutes', 60, type=float)
+    try:
+        traces = tracer.slowest(limit, since_minutes, request.args.get('path'))
+        return jsonify({'success': True, 'traces': traces})
+    except Exception as e:
+        logger.error(f"Error reading traces: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/traces/<trace_id>')
+def api_trace(trace_id):
+    """One slow request's full span tree"""
+    from server.tracing import tracer
+    try:
+        trace = tracer.find(trace_id)
+        if trace is None:
+            return jsonify({'success': False, 'error': 'Trace not found'}), 404
+        return jsonify({'success': True, 'trace': trace})
+    except Exception as e:
+        logger.error(f"Error reading trace {trace_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/ready')
+def api_ready():
+    """Readiness endpoint - 503 until this worker has warmed up, and while draining"""
+    from server.warmup import warmup_state
+    status = warmup_state.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
+    # Development server; production uses gunicorn with wsgi.py
+    from server.warmup import warm_up
+    warm_up()
     app.run(host='0.0.0.0', port=5328, debug=True)
\ No newline at end of file
@@ -0,0 +1,389 @@
+"""
+Pricing Engine
+Prices hire lines with the cheapest mix of monthly, weekly and daily rates over each
+line's hire period, plus accessories, vectorized with NumPy over whole batches of lines.
+Serves interactive quotes and the periodic billing run.
+"""
+
+import json
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+import logging
+
+import numpy as np
+
+from database.connection import execute_stored_procedure, pooled_connection
+
+logger = logging.getLogger(__name__)
+
+# Days covered by one monthly / weekly charge (must match sp_price_rental)
+MONTH_DAYS = 30
+WEEK_DAYS = 7
+
+# Lines fetched and priced per batch during a billing run
+BILLING_BATCH_LINES = 20000
+
+# Open-ended lines (no hire end date yet) are loaded as this
+OPEN_END = -1
+
+MAX_QUOTE_LINES = 500
+
+EPOCH = date(1970, 1, 1)
+
+
+class PricingError(ValueError):
+    """A quote or billing request that cannot be priced as given"""
+
+
+def day_number(value: date) -> int:
+    return (value - EPOCH).days
+
+
+def from_day_number(day: int) -> date:
+    return EPOCH + timedelta(days=int(day))
+
+
+def cheapest_rental(days: np.ndarray, daily: np.ndarray, weekly: np.ndarray,
+                    monthly: np.ndarray) -> Dict[str, np.ndarray]:
+    """Cheapest charge per unit for each line, with the months/weeks/days used.
+
+    For every whole number of months up to the line's length, the remaining days
+    are covered by days only, whole weeks plus odd days, or weeks rounded up;
+    the cheapest of all of these wins. A rate of 0 means it is not offered.
+    """
+    days = np.maximum(np.asarray(days, dtype=np.int64), 0)
+    daily = np.where(daily > 0, daily, np.inf)
+    weekly = np.where(weekly > 0, weekly, np.inf)
+    has_monthly = monthly > 0
+
+    best = np.full(len(days), np.inf)
+    best_months = np.zeros(len(days), dtype=np.int64)
+    best_weeks = np.zeros(len(days), dtype=np.int64)
+    best_days = np.zeros(len(days), dtype=np.int64)
+
+    month_limit = -(-days // MONTH_DAYS)
+    max_months = int(month_limit[has_monthly].max()) if has_monthly.any() else 0
+
+    with np.errstate(invalid='ignore'):
+        for months in range(max_months + 1):
+            allowed = np.ones(len(days), dtype=bool) if months == 0 else has_monthly & (months <= month_limit)
+            if not allowed.any():
+                continue
+            month_cost = months * monthly if months else np.zeros(len(days))
+            remaining = np.maximum(days - months * MONTH_DAYS, 0)
+            for weeks, extra in ((np.zeros_like(remaining), remaining),
+                                 (remaining // WEEK_DAYS, remaining % WEEK_DAYS),
+                                 (-(-remaining // WEEK_DAYS), np.zeros_like(remaining))):
+                cost = (month_cost
+                        + np.where(weeks > 0, weeks * weekly, 0)
+                        + np.where(extra > 0, extra * daily, 0))
+                better = allowed & (cost < best)
+                best = np.where(better, cost, best)
+                best_months = np.where(better, months, best_months)
+                best_weeks = np.where(better, weeks, best_weeks)
+                best_days = np.where(better, extra, best_days)
+
+    # Nothing offered at all: the line is free rather than infinitely expensive
+    unpriced = np.isinf(best)
+    best[unpriced] = 0
+    return {
+        'cost': best,
+        'months': np.where(unpriced, 0, best_months),
+        'weeks': np.where(unpriced, 0, best_weeks),
+        'days': np.where(unpriced, 0, best_days)
+    }
+
+
+class PricingEngine:
+    """Quotes and billing runs over the shared rental pricing rules"""
+
+    # =========================================================================
+    # QUOTES
+    # =========================================================================
+
+    def quote(self, data: Dict) -> Dict:
+        """Price a prospective hire from equipment types, accessories and dates"""
+        hire_start = self._parse_date(data.get('hire_start_date'), 'hire_start_date')
+        hire_end = self._parse_date(data.get('hire_end_date'), 'hire_end_date')
+        equipment = data.get('equipment') or []
+        accessories = data.get('accessories') or []
+        if not equipment and not accessories:
+            raise PricingError('Quote needs at least one equipment or accessory line')
+        if len(equipment) + len(accessories) > MAX_QUOTE_LINES:
+            raise PricingError(f"A quote is limited to {MAX_QUOTE_LINES} lines")
+
+        lines = []
+        type_ids = sorted({self._positive_int(item.get('equipment_type_id'), 'equipment_type_id')
+                           for item in equipment})
+        rates = {row['equipment_type_id']: row
+                 for row in (execute_stored_procedure('sp_get_equipment_type_rates', [type_ids]) if type_ids else [])}
+        for item in equipment:
+            type_id = int(item['equipment_type_id'])
+            if type_id not in rates:
+                raise PricingError(f"Equipment type {type_id} not found or inactive")
+            start = self._parse_date(item.get('hire_start_date'), 'hire_start_date', hire_start)
+            end = self._parse_date(item.get('hire_end_date'), 'hire_end_date', hire_end)
+            if end < start:
+                raise PricingError('hire_end_date must not be before hire_start_date')
+            rate = rates[type_id]
+            lines.append({
+                'line_kind': 'equipment',
+                'item_id': type_id,
+                'item_code': rate['type_code'],
+                'item_name': rate['type_name'],
+                'quantity': self._quantity(item),
+                'hire_start_date': start.isoformat(),
+                'hire_end_date': end.isoformat(),
+                'days': (end - start).days + 1,
+                'rates': (float(rate['daily_rate']), float(rate['weekly_rate']), float(rate['monthly_rate']))
+            })
+
+        accessory_ids = sorted({self._positive_int(item.get('accessory_id'), 'accessory_id')
+                                for item in accessories})
+        accessory_rates = {row['accessory_id']: row
+                           for row in (execute_stored_procedure('sp_get_accessory_rates', [accessory_ids])
+                                       if accessory_ids else [])}
+        for item in accessories:
+            accessory_id = int(item['accessory_id'])
+            if accessory_id not in accessory_rates:
+                raise PricingError(f"Accessory {accessory_id} not found or inactive")
+            rate = accessory_rates[accessory_id]
+            lines.append({
+                'line_kind': 'accessory',
+                'item_id': accessory_id,
+                'item_code': rate['accessory_code'],
+                'item_name': rate['accessory_name'],
+                'quantity': self._quantity(item),
+                'unit_of_measure': rate['unit_of_measure'],
+                'unit_rate': float(rate['unit_rate'])
+            })
+
+        return self._price_quote_lines(lines)
+
+    def quote_hire(self, hire_id: int) -> Optional[Dict]:
+        """Price an existing hire's equipment and accessory lines over their hire periods"""
+        rows = execute_stored_procedure('sp_get_billing_lines', [None, None, hire_id])
+        if not rows:
+            return None
+        lines = []
+        for row in rows:
+            line = {
+                'line_kind': row['line_kind'],
+                'line_id': row['line_id'],
+                'item_id': row['item_id'],
+                'item_code': row['item_code'],
+                'item_name': row['item_name'],
+                'quantity': float(row['quantity'])
+            }
+            if row['line_kind'] == 'equipment':
+                # Open-ended lines are priced up to today
+                start = from_day_number(row['start_day'])
+                end = from_day_number(row['end_day']) if row['end_day'] is not None else max(start, date.today())
+                line.update({
+                    'hire_start_date': start.isoformat(),
+                    'hire_end_date': end.isoformat(),
+                    'open_ended': row['end_day'] is None,
+                    'days': (end - start).days + 1,
+                    'rates': (float(row['daily_rate']), float(row['weekly_rate']), float(row['monthly_rate']))
+                })
+            else:
+                line['unit_rate'] = float(row['unit_rate'])
+            lines.append(line)
+
+        quote = self._price_quote_lines(lines)
+        quote.update({
+            'interaction_id': hire_id,
+            'reference_number': rows[0]['reference_number'],
+            'customer_id': rows[0]['customer_id']
+        })
+        return quote
+
+    def _price_quote_lines(self, lines: List[Dict]) -> Dict:
+        equipment = [line for line in lines if line['line_kind'] == 'equipment']
+        if equipment:
+            rates = np.array([line['rates'] for line in equipment], dtype=np.float64)
+            priced = cheapest_rental(np.array([line['days'] for line in equipment]),
+                                     rates[:, 0], rates[:, 1], rates[:, 2])
+            for n, line in enumerate(equipment):
+                daily, weekly, monthly = line.pop('rates')
+                line.update({
+                    'daily_rate': daily,
+                    'weekly_rate': weekly,
+                    'monthly_rate': monthly,
+                    'months': int(priced['months'][n]),
+                    'weeks': int(priced['weeks'][n]),
+                    'extra_days': int(priced['days'][n]),
+                    'unit_price': round(float(priced['cost'][n]), 2),
+                    'charge': round(float(priced['cost'][n]) * line['quantity'], 2),
+                })
+                # What the line would cost at the daily rate alone, where one is offered
+                line['daily_rate_charge'] = (round(daily * line['days'] * line['quantity'], 2)
+                                             if daily > 0 else line['charge'])
+        for line in lines:
+            if line['line_kind'] == 'accessory':
+                line['charge'] = round(line['unit_rate'] * line['quantity'], 2)
+
+        equipment_total = round(sum(line['charge'] for line in equipment), 2)
+        accessories_total = round(sum(line['charge'] for line in lines if line['line_kind'] == 'accessory'), 2)
+        return {
+            'lines': lines,
+            'equipment_total': equipment_total,
+            'accessories_total': accessories_total,
+            'total': round(equipment_total + accessories_total, 2),
+            'saving_vs_daily_rate': round(sum(line['daily_rate_charge'] for line in equipment) - equipment_total, 2)
+        }
+
+    # =========================================================================
+    # BILLING RUN
+    # =========================================================================
+
+    def billing_run(self, period_start: date, period_end: date) -> Iterator[bytes]:
+        """Stream charges for every active hire in a billing period as JSON lines.
+
+        Each equipment line is charged the difference between its cheapest price
+        up to the period end and up to the period start, so a hire billed month
+        by month pays exactly its cheapest overall price. Accessories are charged
+        once, in the period the hire starts. The last line is a summary.
+        """
+        if period_end < period_start:
+            raise PricingError('period_end must not be before period_start')
+        return self._stream_billing(period_start, period_end)
+
+    def _stream_billing(self, period_start: date, period_end: date) -> Iterator[bytes]:
+        started = time.perf_counter()
+        first_day, last_day = day_number(period_start), day_number(period_end)
+        summary = {'lines': 0, 'hires': 0, 'equipment_total': 0.0, 'accessories_total': 0.0}
+        last_hire = None
+
+        with pooled_connection(autocommit=False, read_only=True) as conn:
+            try:
+                # Server-side cursor: lines arrive batch by batch however many hires are active
+                cursor = conn.cursor(name='billing_run')
+                cursor.itersize = BILLING_BATCH_LINES
+                cursor.execute("""
+                    SELECT interaction_id, reference_number, customer_id, line_kind, line_id,
+                           item_code, item_name, quantity::FLOAT8, start_day, COALESCE(end_day, %s),
+                           daily_rate::FLOAT8, weekly_rate::FLOAT8, monthly_rate::FLOAT8, unit_rate::FLOAT8
+                    FROM sp_get_billing_lines(%s, %s, NULL)
+                """, [OPEN_END, period_start, period_end])
+
+                while True:
+                    rows = cursor.fetchmany(BILLING_BATCH_LINES)
+                    if not rows:
+                        break
+                    charges = self.bill_batch(rows, first_day, last_day)
+                    out = []
+                    for n in np.flatnonzero(charges['billable']):
+                        row = rows[n]
+                        charge = round(float(charges['charge'][n]), 2)
+                        out.append(json.dumps({
+                            'interaction_id': row[0],
+                            'reference_number': row[1],
+                            'customer_id': row[2],
+                            'line_kind': row[3],
+                            'line_id': row[4],
+                            'item_code': row[5],
+                            'item_name': row[6],
+                            'quantity': row[7],
+                            'billed_from': from_day_number(charges['billed_from'][n]).isoformat(),
+                            'billed_to': from_day_number(charges['billed_to'][n]).isoformat(),
+                            'billable_days': int(charges['billable_days'][n]),
+                            'charge': charge,
+                            'hire_to_date': round(float(charges['hire_to_date'][n]), 2)
+                        }))
+                        summary['lines'] += 1
+                        summary['equipment_total' if row[3] == 'equipment' else 'accessories_total'] += charge
+                        if row[0] != last_hire:
+                            summary['hires'] += 1
+                            last_hire = row[0]
+                    if out:
+                        yield ('\n'.join(out) + '\n').encode()
+                cursor.close()
+            finally:
+                # Read-only: end the transaction even if the client went away mid-stream
+                if not conn.closed:
+                    conn.rollback()
+
+        summary.update({
+            'period_start': period_start.isoformat(),
+            'period_end': period_end.isoformat(),
+            'equipment_total': round(summary['equipment_total'], 2),
+            'accessories_total': round(summary['accessories_total'], 2),
+            'total': round(summary['equipment_total'] + summary['accessories_total'], 2),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        })
+        yield (json.dumps({'summary': summary}) + '\n').encode()
+
+    @staticmethod
+    def bill_batch(rows: List[tuple], first_day: int, last_day: int) -> Dict[str, np.ndarray]:
+        """Charges for one batch of billing lines in the period [first_day, last_day]"""
+        count = len(rows)
+        is_equipment = np.fromiter((row[3] == 'equipment' for row in rows), dtype=bool, count=count)
+        quantity = np.fromiter((row[7] for row in rows), dtype=np.float64, count=count)
+        start = np.fromiter((row[8] for row in rows), dtype=np.int64, count=count)
+        end = np.fromiter((row[9] for row in rows), dtype=np.int64, count=count)
+        rates = np.array([row[10:14] for row in rows], dtype=np.float64).reshape(-1, 4)
+
+        # Open-ended hires are billed through the end of the period
+        end = np.where(end == OPEN_END, last_day, end)
+        billed_to = np.minimum(end, last_day)
+        days_to_end = np.clip(billed_to - start + 1, 0, None)
+        days_before = np.clip(np.minimum(end, first_day - 1) - start + 1, 0, None)
+
+        to_end = cheapest_rental(days_to_end, rates[:, 0], rates[:, 1], rates[:, 2])['cost']
+        before = cheapest_rental(days_before, rates[:, 0], rates[:, 1], rates[:, 2])['cost']
+        accessory_due = (start >= first_day) & (start <= last_day)
+
+        charge = np.where(is_equipment, quantity * (to_end - before),
+                          np.where(accessory_due, quantity * rates[:, 3], 0))
+        hire_to_date = np.where(is_equipment, quantity * to_end,
+                                np.where(start <= last_day, quantity * rates[:, 3], 0))
+        billable_days = np.where(is_equipment, days_to_end - days_before, 0)
+        return {
+            'charge': charge,
+            'hire_to_date': hire_to_date,
+            'billable_days': billable_days,
+            'billed_from': np.maximum(start, first_day),
+            'billed_to': billed_to,
+            'billable': np.where(is_equipment, billable_days > 0, accessory_due)
+        }
+
+    # =========================================================================
+    # INPUT HELPERS
+    # =========================================================================
+
+    @staticmethod
+    def _parse_date(value, name: str, default: date = None) -> date:
+        if value in (None, ''):
+            if default is None:
+                raise PricingError(f"{name} is required")
+            return default
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            raise PricingError(f"{name} must be a date (YYYY-MM-DD)")
+
+    @staticmethod
+    def _positive_int(value, name: str) -> int:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise PricingError(f"{name} must be an integer")
+        if number <= 0:
+            raise PricingError(f"{name} must be positive")
+        return number
+
+    @staticmethod
+    def _quantity(item: Dict) -> float:
+        try:
+            quantity = float(item.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise PricingError('quantity must be a number')
+        if quantity <= 0:
+            raise PricingError('quantity must be positive')
+        return quantity
+
+
+# Shared per-process engine
+pricing_engine = PricingEngine()
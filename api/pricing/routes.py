@@ -0,0 +1,77 @@
+"""
+Pricing routes for the Equipment Hire System
+Quotes and the streaming billing run using the pricing engine
+"""
+
+from datetime import date, timedelta
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+pricing_bp = Blueprint('pricing', __name__)
+
+
+def _engine():
+    # NumPy is only imported once pricing is used, keeping API cold starts light
+    from .pricing_engine import pricing_engine
+    return pricing_engine
+
+
+def _pricing_error():
+    from .pricing_engine import PricingError
+    return PricingError
+
+
+@pricing_bp.route('/quote', methods=['POST'])
+def create_quote():
+    """Price equipment types and accessories over a hire period.
+
+    Body: hire_start_date, hire_end_date, equipment [{equipment_type_id, quantity,
+    optional hire_start_date / hire_end_date}], accessories [{accessory_id, quantity}]
+    """
+    try:
+        quote = _engine().quote(request.get_json(silent=True) or {})
+        return jsonify({'success': True, 'quote': quote})
+    except _pricing_error() as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error creating quote: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to create quote'}), 500
+
+
+@pricing_bp.route('/hires/<int:hire_id>', methods=['GET'])
+def get_hire_price(hire_id):
+    """Price an existing hire's lines (open-ended lines up to today)"""
+    try:
+        quote = _engine().quote_hire(hire_id)
+        if quote is None:
+            return jsonify({'success': False, 'error': 'Hire not found or has no lines'}), 404
+        return jsonify({'success': True, 'quote': quote})
+    except Exception as e:
+        logger.error(f"Error pricing hire {hire_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to price hire'}), 500
+
+
+@pricing_bp.route('/billing-run', methods=['GET'])
+def billing_run():
+    """Stream charges for every active hire as JSON lines.
+
+    period_start / period_end default to the previous calendar month.
+    """
+    first_of_month = date.today().replace(day=1)
+    try:
+        period_start = date.fromisoformat(request.args.get('period_start')
+                                          or (first_of_month - timedelta(days=1)).replace(day=1).isoformat())
+        period_end = date.fromisoformat(request.args.get('period_end')
+                                        or (first_of_month - timedelta(days=1)).isoformat())
+        chunks = _engine().billing_run(period_start, period_end)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    response = Response(stream_with_context(chunks), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="billing_{period_start.isoformat()}_{period_end.isoformat()}.ndjson"'
+    )
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
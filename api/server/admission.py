@@ -0,0 +1,193 @@
+"""
+Admission Control
+Per-worker concurrency limits for requests that use the database, by request class
+(writes, interactive reads, reports), with a bounded wait queue, a statement_timeout
+per class, and fast 503 responses when a class is saturated. Writes are admitted
+ahead of waiting reads and reports, and reports can never take the last slots.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_CONTROL', 'on').lower() not in ('off', 'false', '0')
+
+# Database-using requests in flight per worker, across all classes
+TOTAL_LIMIT = int(os.getenv('ADMISSION_TOTAL_LIMIT', '6'))
+# Slots a report may not take, so writes always find one free
+WRITE_RESERVE = int(os.getenv('ADMISSION_WRITE_RESERVE', '1'))
+# statement_timeout for database work outside a request (background threads, CLI); 0 = none
+DEFAULT_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+
+# Highest priority first
+CLASS_PRIORITY = ['write', 'interactive', 'report']
+
+
+def _class_setting(name: str, setting: str, default):
+    return type(default)(os.getenv(f'ADMISSION_{name.upper()}_{setting}', str(default)))
+
+
+# class -> (concurrent limit, queue length, max wait seconds, statement_timeout ms, Retry-After seconds)
+CLASS_DEFAULTS = {
+    'write': (4, 8, 5.0, 15000, 2),
+    'interactive': (4, 8, 1.5, 5000, 1),
+    'report': (1, 2, 0.5, 120000, 10)
+}
+
+# Path prefixes that never wait: health, readiness, metrics, event streams and sessions,
+# and batches (each sub-request is admitted on its own)
+EXEMPT_PREFIXES = ('/api/health', '/api/ready', '/api/metrics', '/api/traces', '/api/events', '/api/auth',
+                   '/api/batch')
+
+# Long-running reads: analytics, bulk exports, audit and billing runs. Bulk imports are writes
+# and take the write class like any other POST.
+REPORT_PREFIXES = ('/api/analytics', '/api/bulk/export', '/api/audit', '/api/pricing/billing-run')
+
+# POSTs that only read (validation, quotes, calculations)
+READ_ONLY_POSTS = ('/api/hire/validate', '/api/pricing/quote', '/api/accessories/auto-calculate')
+
+_request_class: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('admission_class', default=None)
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Request class for a method and path (None = not subject to admission control)"""
+    if method in ('OPTIONS', 'HEAD') or not path.startswith('/api/') or path.startswith(EXEMPT_PREFIXES):
+        return None
+    if path.startswith(REPORT_PREFIXES):
+        return 'report'
+    if method in ('POST', 'PUT', 'PATCH', 'DELETE') and not path.startswith(READ_ONLY_POSTS):
+        return 'write'
+    return 'interactive'
+
+
+def statement_timeout_ms() -> int:
+    """statement_timeout for database work in the current context"""
+    request_class = _request_class.get()
+    if request_class is None:
+        return DEFAULT_STATEMENT_TIMEOUT_MS
+    return admission_controller.classes[request_class]['statement_timeout_ms']
+
+
+class AdmissionRejected(Exception):
+    """The request's class is saturated; retry after retry_after seconds"""
+
+    def __init__(self, request_class: str, reason: str, retry_after: int):
+        super().__init__(f"{request_class} requests saturated ({reason})")
+        self.request_class = request_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per-process slots for database-using requests"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.classes: Dict[str, Dict] = {}
+        for name, (limit, queue, wait, timeout, retry_after) in CLASS_DEFAULTS.items():
+            self.classes[name] = {
+                'limit': _class_setting(name, 'LIMIT', limit),
+                'queue': _class_setting(name, 'QUEUE', queue),
+                'max_wait': _class_setting(name, 'MAX_WAIT', wait),
+                'statement_timeout_ms': _class_setting(name, 'STATEMENT_TIMEOUT_MS', timeout),
+                'retry_after': _class_setting(name, 'RETRY_AFTER', retry_after)
+            }
+        self._in_flight = {name: 0 for name in self.classes}
+        self._waiting = {name: 0 for name in self.classes}
+        self._stats = {name: {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0,
+                              'wait_ms_total': 0.0, 'wait_ms_max': 0.0, 'statement_timeouts': 0}
+                       for name in self.classes}
+
+    # =========================================================================
+    # ADMISSION
+    # =========================================================================
+
+    def _can_admit(self, request_class: str) -> bool:
+        total = sum(self._in_flight.values())
+        if self._in_flight[request_class] >= self.classes[request_class]['limit'] or total >= TOTAL_LIMIT:
+            return False
+        if request_class == 'report' and total >= TOTAL_LIMIT - WRITE_RESERVE:
+            return False
+        # Waiting higher-priority requests go first
+        for higher in CLASS_PRIORITY[:CLASS_PRIORITY.index(request_class)]:
+            if self._waiting[higher]:
+                return False
+        return True
+
+    def acquire(self, request_class: str):
+        """Take a slot, waiting up to the class's max_wait; raises AdmissionRejected"""
+        settings = self.classes[request_class]
+        stats = self._stats[request_class]
+        with self._condition:
+            if self._can_admit(request_class):
+                self._in_flight[request_class] += 1
+                stats['admitted'] += 1
+                _request_class.set(request_class)
+                return
+            if self._waiting[request_class] >= settings['queue']:
+                stats['rejected_queue_full'] += 1
+                raise AdmissionRejected(request_class, 'queue full', settings['retry_after'])
+
+            started = time.monotonic()
+            deadline = started + settings['max_wait']
+            self._waiting[request_class] += 1
+            stats['queued'] += 1
+            try:
+                while not self._can_admit(request_class):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        stats['rejected_timeout'] += 1
+                        raise AdmissionRejected(request_class, 'wait timed out', settings['retry_after'])
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting[request_class] -= 1
+                waited_ms = (time.monotonic() - started) * 1000
+                stats['wait_ms_total'] += waited_ms
+                stats['wait_ms_max'] = max(stats['wait_ms_max'], waited_ms)
+                # Lower-priority waiters may have been held back by this one
+                self._condition.notify_all()
+            self._in_flight[request_class] += 1
+            stats['admitted'] += 1
+            _request_class.set(request_class)
+
+    def release(self):
+        """Give back the current request's slot (no-op if it holds none)"""
+        request_class = _request_class.get()
+        if request_class is None:
+            return
+        _request_class.set(None)
+        with self._condition:
+            self._in_flight[request_class] -= 1
+            self._condition.notify_all()
+
+    def record_statement_timeout(self):
+        request_class = _request_class.get()
+        if request_class is not None:
+            with self._condition:
+                self._stats[request_class]['statement_timeouts'] += 1
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return {
+                'enabled': ADMISSION_ENABLED,
+                'total_limit': TOTAL_LIMIT,
+                'write_reserve': WRITE_RESERVE,
+                'in_flight': sum(self._in_flight.values()),
+                'classes': {
+                    name: dict(settings,
+                               in_flight=self._in_flight[name],
+                               waiting=self._waiting[name],
+                               **{key: round(value, 1) if isinstance(value, float) else value
+                                  for key, value in self._stats[name].items()})
+                    for name, settings in self.classes.items()
+                }
+            }
+
+
+# Shared per-process controller
+admission_controller = AdmissionController()
@@ -0,0 +1,207 @@
+"""
+Response Shaping
+Sparse fieldsets for list endpoints (?fields=a,b,c) and compression of JSON and
+text responses on the way out: brotli when the client accepts it and the brotli
+package is installed, gzip otherwise. Streamed responses are compressed chunk by
+chunk, so they still start flowing before the last row is fetched.
+"""
+
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_ENABLED = os.getenv('RESPONSE_COMPRESSION', 'on').lower() not in ('off', 'false', '0')
+# Smaller bodies gain too little to be worth compressing
+COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', '5'))
+# Streamed bodies are flushed to the client after about this much input, so small
+# chunks still compress well while the response keeps flowing
+STREAM_FLUSH_BYTES = 16 * 1024
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html')
+
+_brotli = None
+_brotli_checked = False
+
+
+class FieldSelectionError(ValueError):
+    """The fields parameter names columns the endpoint does not have"""
+
+
+def parse_fields(raw: Optional[str], available: Iterable[str]) -> Optional[List[str]]:
+    """Validated field list from a comma-separated fields parameter (None = all fields)"""
+    if not raw:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    if not fields:
+        return None
+    available = list(available)
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise FieldSelectionError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(available)})")
+    return fields
+
+
+def project(rows: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Keep only the selected fields of each row, in the requested order"""
+    if not fields:
+        return rows
+    return [{field: row.get(field) for field in fields} for row in rows]
+
+
+# =============================================================================
+# COMPRESSION
+# =============================================================================
+
+def _load_brotli():
+    """The brotli module if installed (optional; gzip is always available)"""
+    global _brotli, _brotli_checked
+    if not _brotli_checked:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = None
+        _brotli_checked = True
+    return _brotli
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'br', 'gzip' or None for an Accept-Encoding header"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    if accepted.get('br', 0) > 0 and _load_brotli() is not None:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+class _Compressor:
+    """Incremental compressor with a common interface for gzip and brotli"""
+
+    def __init__(self, encoding: str):
+        if encoding == 'br':
+            self._compressor = _load_brotli().Compressor(quality=BROTLI_QUALITY)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def flush(self) -> bytes:
+        """Everything compressed so far, so the client can decode it now"""
+        return self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class ResponseCompressor:
+    """after_request hook compressing large JSON and text bodies, with byte counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, encoding: str, bytes_in: int, bytes_out: int):
+        with self._lock:
+            stats = self._stats.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+            stats['responses'] += 1
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+
+    def compress(self, response, accept_encoding: str):
+        """Compress the response in place if it is worth it and the client accepts it"""
+        if (not COMPRESSION_ENABLED or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(accept_encoding)
+
+        if response.is_streamed:
+            if encoding is None:
+                return response
+            response.response = self._stream(response.response, encoding)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        body = response.get_data()
+        if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+            self._record('identity', len(body), len(body))
+            return response
+        compressor = _Compressor(encoding)
+        compressed = compressor.compress(body) + compressor.finish()
+        self._record(encoding, len(body), len(compressed))
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.headers['X-Uncompressed-Length'] = str(len(body))
+        return response
+
+    def _stream(self, chunks: Iterable, encoding: str) -> Iterator[bytes]:
+        """Compress a streamed body chunk by chunk, flushing every STREAM_FLUSH_BYTES of input"""
+        compressor = _Compressor(encoding)
+        bytes_in = bytes_out = pending = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if not chunk:
+                    continue
+                bytes_in += len(chunk)
+                pending += len(chunk)
+                data = compressor.compress(chunk)
+                if pending >= STREAM_FLUSH_BYTES:
+                    data += compressor.flush()
+                    pending = 0
+                if data:
+                    bytes_out += len(data)
+                    yield data
+            data = compressor.finish()
+            bytes_out += len(data)
+            yield data
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            self._record(encoding, bytes_in, bytes_out)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {}
+            for encoding, counts in self._stats.items():
+                stats[encoding] = dict(counts, ratio=round(counts['bytes_out'] / counts['bytes_in'], 3)
+                                       if counts['bytes_in'] else None)
+            return {
+                'enabled': COMPRESSION_ENABLED,
+                'min_bytes': COMPRESSION_MIN_BYTES,
+                'brotli_available': _load_brotli() is not None,
+                'encodings': stats
+            }
+
+
+# Shared per-process compressor
+response_compressor = ResponseCompressor()
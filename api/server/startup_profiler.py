@@ -0,0 +1,124 @@
+"""
+Start-up Import Profiler
+Reports how long each module takes to import when the API starts cold, using
+Python's -X importtime in a fresh interpreter
+
+    cd api
+    python -m server.startup_profiler              # profile 'import index'
+    python -m server.startup_profiler --target wsgi --top 40
+    python -m server.startup_profiler --json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+# Packages that belong to this API (everything else is a dependency or stdlib)
+FIRST_PARTY = {'index', 'wsgi', 'app_legacy', 'analytics', 'audit', 'auth', 'batch', 'bulk', 'database', 'equipment',
+               'events', 'hire', 'pricing', 'server', 'tasks'}
+
+
+def profile_imports(target: str = 'index') -> Dict:
+    """Import target in a fresh interpreter and collect per-module import times (microseconds)"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append({
+            'module': name,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': len(indent) // 2
+        })
+
+    root = next((m for m in modules if m['module'] == target), None)
+    packages = defaultdict(int)
+    for module in modules:
+        packages[module['module'].split('.')[0]] += module['self_us']
+
+    return {
+        'target': target,
+        'exit_code': completed.returncode,
+        'total_ms': round(root['cumulative_us'] / 1000, 1) if root else None,
+        'modules': modules,
+        'packages': dict(packages)
+    }
+
+
+def summarize(profile: Dict, top: int = 25) -> Dict:
+    """Slowest modules, packages and first-party modules from a profile"""
+    modules: List[Dict] = profile['modules']
+    by_cumulative = sorted(modules, key=lambda m: m['cumulative_us'], reverse=True)
+    return {
+        'target': profile['target'],
+        'total_ms': profile['total_ms'],
+        'slowest_modules': [
+            {'module': m['module'], 'cumulative_ms': round(m['cumulative_us'] / 1000, 2),
+             'self_ms': round(m['self_us'] / 1000, 2)}
+            for m in by_cumulative[:top]
+        ],
+        'packages': [
+            {'package': name, 'self_ms': round(us / 1000, 2)}
+            for name, us in sorted(profile['packages'].items(), key=lambda p: p[1], reverse=True)[:top]
+        ],
+        'first_party': [
+            {'module': m['module'], 'cumulative_ms': round(m['cumulative_us'] / 1000, 2),
+             'self_ms': round(m['self_us'] / 1000, 2)}
+            for m in by_cumulative if m['module'].split('.')[0] in FIRST_PARTY
+        ]
+    }
+
+
+def print_report(summary: Dict):
+    print(f"Import profile for '{summary['target']}': {summary['total_ms']} ms total\n")
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in summary['slowest_modules']:
+        print(f"{row['cumulative_ms']:>14.2f} {row['self_ms']:>9.2f}  {row['module']}")
+
+    print(f"\n{'self ms':>14}  package")
+    for row in summary['packages']:
+        print(f"{row['self_ms']:>14.2f}  {row['package']}")
+
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  first-party module")
+    for row in summary['first_party']:
+        print(f"{row['cumulative_ms']:>14.2f} {row['self_ms']:>9.2f}  {row['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report per-module import time for the API')
+    parser.add_argument('--target', default='index', help="module to import (default: index)")
+    parser.add_argument('--top', type=int, default=25, help='rows per section')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    profile = profile_imports(args.target)
+    if profile['exit_code'] != 0:
+        print(f"Importing {args.target} failed (exit code {profile['exit_code']})", file=sys.stderr)
+    summary = summarize(profile, args.top)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""
+Request Tracing
+Lightweight span trees for API requests: the request itself, manager methods,
+connection acquisition and each SQL call. Requests slower than TRACE_SLOW_MS are
+appended to a local JSONL file as span trees; argument values are never recorded,
+only their types and sizes.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests traced (0 disables tracing, 1 traces every request); traced
+# requests slower than TRACE_SLOW_MS are written to TRACE_FILE
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.01'))
+TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', '1000'))
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                   'traces', 'slow_requests.jsonl'))
+# The file rolls over to <file>.1 past this size
+TRACE_FILE_MAX_BYTES = int(os.getenv('TRACE_FILE_MAX_BYTES', str(20 * 1024 * 1024)))
+# Spans kept per trace, so a runaway loop of queries cannot grow a trace without bound
+MAX_SPANS_PER_TRACE = 500
+# How much of the end of each trace file the viewer reads
+VIEW_SCAN_BYTES = 8 * 1024 * 1024
+
+TRACE_HEADER = 'X-Trace-Id'
+_TRACE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{8,64}$')
+
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('current_trace', default=None)
+
+
+def redact(value) -> str:
+    """Describe an argument without its value: its type, and size for collections and strings"""
+    if value is None:
+        return 'None'
+    if isinstance(value, (str, bytes, list, tuple, dict, set)):
+        return f'{type(value).__name__}({len(value)})'
+    return type(value).__name__
+
+
+class Span:
+    __slots__ = ('name', 'kind', 'attrs', 'started', 'duration_ms', 'children', 'error')
+
+    def __init__(self, name: str, kind: str, attrs: Dict):
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.children: List['Span'] = []
+        self.error = None
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+    def to_dict(self, trace_started: float) -> Dict:
+        span = {
+            'name': self.name,
+            'kind': self.kind,
+            'start_ms': round((self.started - trace_started) * 1000, 2),
+            'duration_ms': round(self.duration_ms if self.duration_ms is not None
+                                 else (time.perf_counter() - self.started) * 1000, 2)
+        }
+        if self.attrs:
+            span['attrs'] = self.attrs
+        if self.error:
+            span['error'] = self.error
+        if self.children:
+            span['children'] = [child.to_dict(trace_started) for child in self.children]
+        return span
+
+
+class Trace:
+    """One request's span tree"""
+
+    def __init__(self, trace_id: str, name: str, attrs: Dict):
+        self.trace_id = trace_id
+        self.started_at = datetime.now(timezone.utc)
+        self.root = Span(name, 'request', attrs)
+        self.stack = [self.root]
+        self.span_count = 1
+        self.dropped_spans = 0
+
+    def totals(self) -> Dict:
+        """Time and count per span kind, so the slow part stands out without reading the tree"""
+        totals = {}
+        pending = list(self.root.children)
+        while pending:
+            span = pending.pop()
+            pending.extend(span.children)
+            kind = totals.setdefault(span.kind, {'count': 0, 'ms': 0.0})
+            kind['count'] += 1
+            kind['ms'] += span.duration_ms or 0.0
+        return {kind: {'count': t['count'], 'ms': round(t['ms'], 2)} for kind, t in totals.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'pid': os.getpid(),
+            'started_at': self.started_at.isoformat(),
+            'name': self.root.name,
+            'duration_ms': round(self.root.duration_ms or 0.0, 2),
+            'status': self.root.attrs.get('status'),
+            'totals': self.totals(),
+            'dropped_spans': self.dropped_spans,
+            'root': self.root.to_dict(self.root.started)
+        }
+
+
+class Tracer:
+    """Per-process tracer: starts and ends request traces and writes the slow ones"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'traced': 0, 'slow': 0, 'written': 0, 'write_failures': 0}
+        self._recent_slow = deque(maxlen=50)
+
+    # =========================================================================
+    # REQUESTS
+    # =========================================================================
+
+    def begin_request(self, name: str, incoming_id: Optional[str] = None, attrs: Dict = None) -> str:
+        """Start a trace for this request if sampled; returns the trace ID either way"""
+        trace_id = incoming_id if incoming_id and _TRACE_ID_PATTERN.match(incoming_id) else uuid.uuid4().hex
+        if TRACE_SAMPLE_RATE > 0 and (TRACE_SAMPLE_RATE >= 1 or random.random() < TRACE_SAMPLE_RATE):
+            _current_trace.set(Trace(trace_id, name, attrs or {}))
+        else:
+            _current_trace.set(None)
+        return trace_id
+
+    def set_attribute(self, key: str, value):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.root.attrs[key] = value
+
+    def end_request(self, error: Optional[BaseException] = None) -> Optional[Dict]:
+        """Finish the current trace; written to the trace file if it was slow"""
+        trace = _current_trace.get()
+        if trace is None:
+            return None
+        _current_trace.set(None)
+        trace.root.finish()
+        if error is not None:
+            trace.root.error = type(error).__name__
+        with self._lock:
+            self._stats['traced'] += 1
+        if trace.root.duration_ms < TRACE_SLOW_MS:
+            return None
+
+        record = trace.to_dict()
+        with self._lock:
+            self._stats['slow'] += 1
+            self._recent_slow.append({k: record[k] for k in ('trace_id', 'name', 'duration_ms', 'started_at')})
+        self._write(record)
+        return record
+
+    def _write(self, record: Dict):
+        if not TRACE_FILE:
+            return
+        line = json.dumps(record, default=str) + '\n'
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+                if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) > TRACE_FILE_MAX_BYTES:
+                    os.replace(TRACE_FILE, TRACE_FILE + '.1')
+                # One append per trace, so concurrent workers never interleave lines
+                with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                self._stats['written'] += 1
+        except OSError as e:
+            with self._lock:
+                self._stats['write_failures'] += 1
+            logger.warning(f"Could not write slow request trace: {e}")
+
+    # =========================================================================
+    # SPANS
+    # =========================================================================
+
+    @contextmanager
+    def span(self, name: str, kind: str = 'internal', **attrs) -> Iterator[Optional[Span]]:
+        """Time a block as a child of the current span (does nothing outside a traced request)"""
+        trace = _current_trace.get()
+        if trace is None:
+            yield None
+            return
+        if trace.span_count >= MAX_SPANS_PER_TRACE:
+            trace.dropped_spans += 1
+            yield None
+            return
+        span = Span(name, kind, attrs)
+        trace.stack[-1].children.append(span)
+        trace.stack.append(span)
+        trace.span_count += 1
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.finish()
+            trace.stack.pop()
+
+    def trace_methods(self, kind: str = 'manager', exclude=()):
+        """Class decorator: a span around every public method, with redacted arguments"""
+        def decorate(cls):
+            for attr, method in list(vars(cls).items()):
+                if attr.startswith('_') or attr in exclude or not callable(method):
+                    continue
+                setattr(cls, attr, self._traced(f'{cls.__name__}.{attr}', kind, method))
+            return cls
+        return decorate
+
+    def _traced(self, name: str, kind: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return method(*args, **kwargs)
+            attrs = {}
+            if len(args) > 1:
+                attrs['args'] = [redact(arg) for arg in args[1:]]
+            if kwargs:
+                attrs['kwargs'] = {key: redact(value) for key, value in kwargs.items()}
+            with self.span(name, kind, **attrs):
+                return method(*args, **kwargs)
+        return wrapper
+
+    # =========================================================================
+    # VIEWER
+    # =========================================================================
+
+    def read_traces(self) -> List[Dict]:
+        """Slow traces from the end of the trace file (and its rolled-over predecessor)"""
+        traces = []
+        for path in (TRACE_FILE + '.1', TRACE_FILE):
+            if not path or not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - VIEW_SCAN_BYTES))
+                if size > VIEW_SCAN_BYTES:
+                    f.readline()  # skip the partial first line
+                for line in f:
+                    try:
+                        traces.append(json.loads(line))
+                    except ValueError:
+                        continue
+        return traces
+
+    def slowest(self, limit: int = 20, since_minutes: float = 60, path_prefix: str = None) -> List[Dict]:
+        """Summaries of the slowest recent traces (every worker's, from the shared file)"""
+        cutoff = time.time() - since_minutes * 60
+        summaries = []
+        for trace in self.read_traces():
+            if datetime.fromisoformat(trace['started_at']).timestamp() < cutoff:
+                continue
+            if path_prefix and not trace['name'].split(' ', 1)[-1].startswith(path_prefix):
+                continue
+            summaries.append({k: trace.get(k) for k in
+                              ('trace_id', 'pid', 'started_at', 'name', 'status', 'duration_ms', 'totals')})
+        summaries.sort(key=lambda t: t['duration_ms'], reverse=True)
+        return summaries[:limit]
+
+    def find(self, trace_id: str) -> Optional[Dict]:
+        for trace in reversed(self.read_traces()):
+            if trace['trace_id'] == trace_id:
+                return trace
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats,
+                        sample_rate=TRACE_SAMPLE_RATE,
+                        slow_ms=TRACE_SLOW_MS,
+                        file=TRACE_FILE or None,
+                        recent_slow=list(self._recent_slow)[-10:])
+
+
+# Shared per-process tracer
+tracer = Tracer()
@@ -0,0 +1,144 @@
+"""
+Worker Warm-up and Readiness
+Per-worker start-up hook that opens the connection pool and loads reference caches
+before the worker accepts traffic, plus the drain flag set on graceful shutdown
+"""
+
+import os
+import signal
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List
+import logging
+
+from database.connection import fill_pool
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_connection_pool():
+    return {'connections': fill_pool()}
+
+
+def _warm_equipment_search_index():
+    from equipment.search_index import equipment_search_index
+    equipment_search_index.ensure_loaded()
+    return equipment_search_index.stats()
+
+
+def _warm_driver_boards():
+    from tasks.routes import taskboard_manager
+    board = taskboard_manager.get_driver_board(None, date.today().isoformat())
+    return {'unassigned_tasks': board['task_count']}
+
+
+def _start_hire_summary_refresher():
+    from hire.summary_refresher import hire_summary_refresher
+    hire_summary_refresher.start()
+    return hire_summary_refresher.stats()
+
+
+# (name, function, required) - a worker is not ready until every required step passes
+WARMUP_STEPS: List[tuple] = [
+    ('connection_pool', _warm_connection_pool, True),
+    ('equipment_search_index', _warm_equipment_search_index, False),
+    ('driver_boards', _warm_driver_boards, False),
+    ('hire_summary_refresher', _start_hire_summary_refresher, False)
+]
+
+
+class WarmupState:
+    """Warm-up progress for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pid = None
+        self.state = 'cold'
+        self.started_at = None
+        self.finished_at = None
+        self.steps: List[Dict] = []
+        self.draining = threading.Event()
+
+    def run(self, steps: List[tuple] = None) -> Dict:
+        """Run each warm-up step, recording timings and failures"""
+        with self._lock:
+            self.pid = os.getpid()
+            self.state = 'warming'
+            self.started_at = time.time()
+            self.finished_at = None
+            self.steps = []
+
+        required_failed = False
+        optional_failed = False
+        for name, step, required in steps or WARMUP_STEPS:
+            started = time.perf_counter()
+            result = {'name': name, 'required': required}
+            try:
+                result['detail'] = step()
+                result['ok'] = True
+            except Exception as e:
+                logger.error(f"Warm-up step {name} failed: {e}")
+                result['ok'] = False
+                result['error'] = str(e)
+                required_failed = required_failed or required
+                optional_failed = optional_failed or not required
+            result['ms'] = round((time.perf_counter() - started) * 1000, 1)
+            with self._lock:
+                self.steps.append(result)
+
+        with self._lock:
+            self.finished_at = time.time()
+            if required_failed:
+                self.state = 'failed'
+            elif optional_failed:
+                self.state = 'degraded'
+            else:
+                self.state = 'ready'
+        logger.info(f"Worker {self.pid} warm-up {self.state} in "
+                    f"{(self.finished_at - self.started_at) * 1000:.0f}ms")
+        return self.status()
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ('ready', 'degraded') and not self.draining.is_set()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'state': 'draining' if self.draining.is_set() else self.state,
+                'pid': self.pid or os.getpid(),
+                'started_at': self.started_at,
+                'warmup_ms': round((self.finished_at - self.started_at) * 1000, 1)
+                if self.started_at and self.finished_at else None,
+                'steps': list(self.steps)
+            }
+
+    def start_draining(self):
+        """Stop advertising readiness and ask long-lived streams to finish"""
+        if not self.draining.is_set():
+            logger.info(f"Worker {os.getpid()} draining")
+            self.draining.set()
+
+
+# Shared per-process state
+warmup_state = WarmupState()
+
+
+def warm_up() -> Dict:
+    """Warm this worker (called from the WSGI server's worker start-up hook)"""
+    return warmup_state.run()
+
+
+def install_drain_handler(signals=(signal.SIGTERM, signal.SIGQUIT)):
+    """Mark the worker as draining before the server's own shutdown handler runs"""
+    for signum in signals:
+        previous: Callable = signal.getsignal(signum)
+
+        def handler(received, frame, previous=previous):
+            warmup_state.start_draining()
+            if callable(previous):
+                previous(received, frame)
+
+        signal.signal(signum, handler)
@@ -0,0 +1,257 @@
+"""
+Batch Dispatch Scheduler
+Assigns a day's backlog driver tasks to the available drivers with a greedy
+time-window heuristic and commits the whole plan in one set-based transaction
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+import logging
+
+from database.connection import pooled_connection
+from .taskboard_manager import TaskboardManager
+
+logger = logging.getLogger(__name__)
+
+# Working day in minutes from midnight
+DAY_START = 7 * 60
+DAY_END = 17 * 60
+
+# Estimated time on site per task type (minutes)
+SERVICE_MINUTES = {
+    'delivery': 45,
+    'collection': 40,
+    'service': 60,
+    'inspection': 30,
+    'transfer': 45
+}
+DEFAULT_SERVICE_MINUTES = 45
+
+# Estimated drive time between stops
+TRAVEL_SAME_AREA = 10
+TRAVEL_OTHER_AREA = 35
+
+# A scheduled_time may be met this many minutes either side
+TIME_WINDOW = 60
+
+# Cost weights: lateness dominates, then spreading work across drivers
+LATE_WEIGHT = 10
+OVERTIME_WEIGHT = 5
+BALANCE_WEIGHT = 15
+
+PRIORITY_RANK = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+
+def area_key(site_address: Optional[str]) -> str:
+    """Rough area for a site: postal code when present, otherwise the city.
+
+    Site addresses are built as 'line1, line2, city, province, postal_code'.
+    """
+    parts = [part.strip().lower() for part in (site_address or '').split(',') if part.strip()]
+    if not parts:
+        return ''
+    if re.fullmatch(r'\d{4,5}', parts[-1]):
+        return parts[-1]
+    return parts[-2] if len(parts) >= 3 else parts[-1]
+
+
+def parse_minutes(value: Optional[str]) -> Optional[int]:
+    """'HH:MM[:SS]' -> minutes from midnight"""
+    if not value:
+        return None
+    hours, minutes = str(value).split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@dataclass
+class DriverRoute:
+    driver_id: int
+    driver_name: str
+    free_at: int = DAY_START
+    last_area: Optional[str] = None
+    task_count: int = 0
+    committed_count: int = 0
+    stops: List[Dict] = field(default_factory=list)
+
+
+class DispatchScheduler:
+    """Greedy dispatcher for a day's backlog of delivery and collection tasks"""
+
+    def __init__(self, taskboard_manager: TaskboardManager = None):
+        self.taskboard_manager = taskboard_manager or TaskboardManager()
+
+    def plan(self, dispatch_date: str = None, driver_ids: List[int] = None) -> Dict:
+        """Build an assignment and run order for every backlog task on a date"""
+        dispatch_date = dispatch_date or date.today().isoformat()
+
+        drivers = self.taskboard_manager.get_drivers()
+        if driver_ids:
+            wanted = set(driver_ids)
+            drivers = [d for d in drivers if d['driver_id'] in wanted]
+
+        backlog = self.taskboard_manager.get_tasks(
+            date_from=dispatch_date, date_to=dispatch_date,
+            statuses=['backlog'], unassigned_only=True, limit=100000
+        )
+        committed = self.taskboard_manager.get_tasks(
+            date_from=dispatch_date, date_to=dispatch_date,
+            statuses=['assigned', 'in_progress'], limit=100000
+        )
+
+        routes = {d['driver_id']: DriverRoute(d['driver_id'], d['driver_name']) for d in drivers}
+        if not routes:
+            return self._result(dispatch_date, routes, [], [t['task_id'] for t in backlog])
+
+        # Work already on a driver's board counts against their day
+        for task in committed:
+            route = routes.get(task['assigned_driver_id'])
+            if route:
+                route.free_at += self._service_minutes(task) + TRAVEL_OTHER_AREA
+                route.task_count += 1
+                route.committed_count += 1
+
+        # Timed tasks first in time order, then untimed tasks grouped by area
+        def sort_key(task):
+            start = parse_minutes(task['scheduled_time'])
+            return (
+                start is None,
+                start if start is not None else 0,
+                PRIORITY_RANK.get(task['priority'], 4),
+                area_key(task['site_address']),
+                task['task_id']
+            )
+
+        late_tasks = []
+        for task in sorted(backlog, key=sort_key):
+            area = area_key(task['site_address'])
+            target = parse_minutes(task['scheduled_time'])
+            duration = self._service_minutes(task)
+
+            best = None
+            for route in routes.values():
+                travel = TRAVEL_SAME_AREA if route.last_area == area else TRAVEL_OTHER_AREA
+                arrive = route.free_at + (travel if route.stops or route.task_count else 0)
+                start = max(arrive, target - TIME_WINDOW) if target is not None else arrive
+                lateness = max(0, start - (target + TIME_WINDOW)) if target is not None else 0
+                finish = start + duration
+                overtime = max(0, finish - DAY_END)
+                cost = (lateness * LATE_WEIGHT + overtime * OVERTIME_WEIGHT
+                        + route.task_count * BALANCE_WEIGHT + (start - route.free_at))
+                if best is None or cost < best[0]:
+                    best = (cost, route, start, finish, lateness)
+
+            _, route, start, finish, lateness = best
+            route.stops.append({
+                'task_id': task['task_id'],
+                'reference_number': task['reference_number'],
+                'task_type': task['task_type'],
+                'customer_name': task['customer_name'],
+                'site_address': task['site_address'],
+                'area': area,
+                'scheduled_time': task['scheduled_time'],
+                'estimated_start': format_minutes(start),
+                'estimated_finish': format_minutes(finish),
+                'late_minutes': lateness
+            })
+            route.free_at = finish
+            route.last_area = area
+            route.task_count += 1
+            if lateness:
+                late_tasks.append(task['task_id'])
+
+        return self._result(dispatch_date, routes, late_tasks, [])
+
+    def dispatch(self, dispatch_date: str = None, driver_ids: List[int] = None,
+                 preview: bool = True, employee_id: int = 1) -> Dict:
+        """Plan the day and, unless previewing, commit the assignments"""
+        result = self.plan(dispatch_date, driver_ids)
+        result['preview'] = preview
+        if preview:
+            return result
+
+        task_ids, assigned_driver_ids, sequences = [], [], []
+        for route in result['routes']:
+            for stop in route['stops']:
+                task_ids.append(stop['task_id'])
+                assigned_driver_ids.append(route['driver_id'])
+                sequences.append(stop['run_sequence'])
+
+        result['committed'] = self._commit(task_ids, assigned_driver_ids, sequences,
+                                           result['date'], employee_id)
+        return result
+
+    # =========================================================================
+    # INTERNALS
+    # =========================================================================
+
+    def _service_minutes(self, task: Dict) -> int:
+        return SERVICE_MINUTES.get(task['task_type'], DEFAULT_SERVICE_MINUTES)
+
+    def _result(self, dispatch_date: str, routes: Dict[int, DriverRoute],
+                late_tasks: List[int], unassigned: List[int]) -> Dict:
+        route_list = []
+        for route in routes.values():
+            for sequence, stop in enumerate(route.stops, start=route.committed_count + 1):
+                stop['run_sequence'] = sequence
+            route_list.append({
+                'driver_id': route.driver_id,
+                'driver_name': route.driver_name,
+                'task_count': len(route.stops),
+                'estimated_finish': format_minutes(route.free_at),
+                'stops': route.stops
+            })
+        return {
+            'date': dispatch_date,
+            'routes': route_list,
+            'tasks_planned': sum(len(r['stops']) for r in route_list),
+            'late_tasks': late_tasks,
+            'unassigned_tasks': unassigned
+        }
+
+    def _commit(self, task_ids: List[int], driver_ids: List[int], sequences: List[int],
+                dispatch_date: str, employee_id: int) -> Dict:
+        """Apply the whole plan in one transaction.
+
+        Tasks picked up by hand since the plan was built are left alone and reported.
+        """
+        if not task_ids:
+            return {'assigned': 0, 'skipped_task_ids': []}
+
+        try:
+            with pooled_connection(autocommit=False) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE tasks.drivers_taskboard dt
+                    SET assigned_driver_id = plan.driver_id,
+                        run_sequence = plan.run_sequence,
+                        status = 'assigned'
+                    FROM unnest(%s::INTEGER[], %s::INTEGER[], %s::INTEGER[])
+                         AS plan(task_id, driver_id, run_sequence)
+                    WHERE dt.id = plan.task_id
+                      AND dt.status = 'backlog'
+                      AND dt.assigned_driver_id IS NULL
+                    RETURNING dt.id
+                """, [task_ids, driver_ids, sequences])
+                assigned = {row[0] for row in cursor.fetchall()}
+
+                cursor.execute("SELECT sp_log_activity(%s, %s, %s, %s, %s, %s::JSONB)", [
+                    employee_id, 'DISPATCH_TASKS', 'tasks.drivers_taskboard', None, None,
+                    json.dumps({'date': dispatch_date, 'assigned': len(assigned)})
+                ])
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Error committing dispatch plan: {e}")
+            raise
+
+        return {
+            'assigned': len(assigned),
+            'skipped_task_ids': [task_id for task_id in task_ids if task_id not in assigned]
+        }
@@ -0,0 +1,86 @@
+"""
+Driver taskboard routes for the Equipment Hire System
+Serves the drivers board rendered by TaskBoard.tsx and DriverItem.tsx using TaskboardManager
+"""
+
+from flask import Blueprint, request, jsonify, session
+from .taskboard_manager import TaskboardManager
+from .dispatch_scheduler import DispatchScheduler
+import logging
+
+logger = logging.getLogger(__name__)
+
+tasks_bp = Blueprint('tasks', __name__)
+taskboard_manager = TaskboardManager()
+dispatch_scheduler = DispatchScheduler(taskboard_manager)
+
+
+def parse_statuses(raw_statuses: str):
+    """Parse 'backlog,assigned' into a status list"""
+    statuses = [status.strip() for status in (raw_statuses or '').split(',') if status.strip()]
+    return statuses or None
+
+
+@tasks_bp.route('/drivers', methods=['GET'])
+def get_drivers():
+    """Get active drivers."""
+    try:
+        return jsonify(taskboard_manager.get_drivers())
+    except Exception as e:
+        logger.error(f"Error getting drivers: {str(e)}")
+        return jsonify({'error': 'Failed to load drivers'}), 500
+
+@tasks_bp.route('/driver-tasks', methods=['GET'])
+def get_driver_tasks():
+    """Get driver tasks filtered by driver, date range and status."""
+    try:
+        driver_id = request.args.get('driver_id', type=int)
+        tasks = taskboard_manager.get_tasks(
+            driver_id=driver_id,
+            date_from=request.args.get('date_from'),
+            date_to=request.args.get('date_to'),
+            statuses=parse_statuses(request.args.get('status')),
+            unassigned_only=request.args.get('unassigned') == 'true',
+            limit=min(request.args.get('limit', 500, type=int), 2000)
+        )
+        return jsonify(tasks)
+    except Exception as e:
+        logger.error(f"Error getting driver tasks: {str(e)}")
+        return jsonify({'error': 'Failed to load driver tasks'}), 500
+
+@tasks_bp.route('/drivers/<int:driver_id>/board', methods=['GET'])
+def get_driver_board(driver_id):
+    """Get a driver's board for a day (defaults to today)."""
+    try:
+        board = taskboard_manager.get_driver_board(driver_id, request.args.get('date'))
+        return jsonify(board)
+    except Exception as e:
+        logger.error(f"Error getting board for driver {driver_id}: {str(e)}")
+        return jsonify({'error': 'Failed to load driver board'}), 500
+
+@tasks_bp.route('/unassigned/board', methods=['GET'])
+def get_unassigned_board():
+    """Get the unassigned tasks board for a day (defaults to today)."""
+    try:
+        board = taskboard_manager.get_driver_board(None, request.args.get('date'))
+        return jsonify(board)
+    except Exception as e:
+        logger.error(f"Error getting unassigned board: {str(e)}")
+        return jsonify({'error': 'Failed to load unassigned board'}), 500
+
+@tasks_bp.route('/dispatch', methods=['POST'])
+def dispatch_tasks():
+    """Assign a day's backlog tasks to drivers (preview unless preview is false)."""
+    try:
+        data = request.get_json() or {}
+        employee_id = session.get('employee_id', 1)  # Default employee for demo
+        result = dispatch_scheduler.dispatch(
+            dispatch_date=data.get('date'),
+            driver_ids=data.get('driver_ids'),
+            preview=data.get('preview', True),
+            employee_id=employee_id
+        )
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error dispatching tasks: {str(e)}")
+        return jsonify({'success': False, 'error': 'Failed to dispatch tasks'}), 500
@@ -0,0 +1,154 @@
+"""
+Driver Taskboard Management
+Filtered driver task queries and per-driver, per-day boards with an in-process cache
+kept current by the change event bus
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+import logging
+
+from database.connection import execute_stored_procedure
+from events.event_bus import event_bus
+
+logger = logging.getLogger(__name__)
+
+# Column order on the drivers board (matches tasks.drivers_taskboard.status)
+BOARD_STATUSES = ['backlog', 'assigned', 'in_progress', 'completed', 'cancelled']
+
+# Boards kept per process and how long one may live without a change event
+BOARD_CACHE_SIZE = 512
+BOARD_CACHE_TTL = 300
+
+
+def _json_safe(rows: List[Dict]) -> List[Dict]:
+    """Convert dates, times and decimals so cached boards can be returned as-is"""
+    def convert(value):
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return float(value)
+        if hasattr(value, 'strftime'):
+            return value.strftime('%H:%M:%S')
+        return value
+    return [{key: convert(value) for key, value in row.items()} for row in rows]
+
+
+class TaskboardManager:
+    """Driver taskboard queries backed by sp_get_driver_tasks"""
+
+    def __init__(self):
+        self._boards = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        event_bus.add_handler(self.handle_change_event)
+
+    # =========================================================================
+    # TASK QUERIES
+    # =========================================================================
+
+    def get_tasks(self, driver_id: int = None, date_from: str = None, date_to: str = None,
+                  statuses: List[str] = None, unassigned_only: bool = False, limit: int = 500) -> List[Dict]:
+        """Get driver tasks filtered by driver, date range and status"""
+        try:
+            rows = execute_stored_procedure('sp_get_driver_tasks', [
+                driver_id, date_from, date_to, statuses or None, unassigned_only, limit
+            ])
+            return _json_safe(rows)
+        except Exception as e:
+            logger.error(f"Error fetching driver tasks: {e}")
+            raise
+
+    def get_drivers(self) -> List[Dict]:
+        """Get active drivers for the board columns"""
+        try:
+            return execute_stored_procedure('sp_get_active_drivers')
+        except Exception as e:
+            logger.error(f"Error fetching drivers: {e}")
+            raise
+
+    # =========================================================================
+    # DRIVER BOARDS
+    # =========================================================================
+
+    def get_driver_board(self, driver_id: Optional[int], board_date: str = None) -> Dict:
+        """Get one driver's board for a day, grouped by status.
+
+        A driver_id of None returns the unassigned board. Boards are cached per
+        (driver, day) and dropped when a change event touches that driver or day.
+        """
+        board_date = board_date or date.today().isoformat()
+        key = (driver_id, board_date)
+
+        with self._lock:
+            cached = self._boards.get(key)
+            if cached and time.monotonic() - cached['loaded_at'] < BOARD_CACHE_TTL:
+                self._boards.move_to_end(key)
+                self.hits += 1
+                return cached['board']
+            self.misses += 1
+            generation = self._generation
+
+        # Cached boards rely on change events for invalidation
+        event_bus.start()
+
+        tasks = self.get_tasks(
+            driver_id=driver_id,
+            date_from=board_date,
+            date_to=board_date,
+            unassigned_only=driver_id is None
+        )
+        columns = {status: [] for status in BOARD_STATUSES}
+        for task in tasks:
+            columns.setdefault(task['status'], []).append(task)
+
+        board = {
+            'driver_id': driver_id,
+            'date': board_date,
+            'columns': columns,
+            'task_count': len(tasks),
+            'total_equipment': sum(task['total_equipment'] or 0 for task in tasks)
+        }
+
+        with self._lock:
+            # A change arrived while loading - serve this board but don't cache it
+            if generation != self._generation:
+                return board
+            self._boards[key] = {'board': board, 'loaded_at': time.monotonic()}
+            self._boards.move_to_end(key)
+            while len(self._boards) > BOARD_CACHE_SIZE:
+                self._boards.popitem(last=False)
+        return board
+
+    def handle_change_event(self, event: Dict):
+        """Drop cached boards affected by a change event"""
+        if event.get('op') == 'RESYNC':
+            self.clear_cache()
+            return
+        if event.get('table') != 'tasks.drivers_taskboard':
+            return
+
+        drivers = {event.get('driver_id'), event.get('old_driver_id')}
+        dates = {str(d) for d in (event.get('date'), event.get('old_date')) if d}
+        with self._lock:
+            self._generation += 1
+            for key in list(self._boards):
+                driver_id, board_date = key
+                # Unassigned boards (None) are affected by every assignment change
+                if (driver_id in drivers or driver_id is None) and (not dates or board_date in dates):
+                    del self._boards[key]
+
+    def clear_cache(self):
+        with self._lock:
+            self._generation += 1
+            self._boards.clear()
+
+    def cache_stats(self) -> Dict:
+        with self._lock:
+            return {'boards': len(self._boards), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for production serving
+
+    cd api
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Each worker imports the app, warms its connection pool and caches in the
+gunicorn post_worker_init hook and only then starts accepting requests.
+"""
+
+from index import app
+
+__all__ = ['app']
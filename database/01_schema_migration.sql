@@ -22,6 +22,10 @@ CREATE SCHEMA system;
 -- Set search path
 SET search_path TO core, equipment, interactions, tasks, system, public;
 
+-- GiST operator classes for plain columns, so exclusion constraints can combine
+-- equality on an id with range overlap
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- =============================================================================
 -- CORE SCHEMA - Master Data
 -- =============================================================================
@@ -219,6 +223,26 @@ CREATE TABLE equipment.equipment_accessories (
 
 COMMENT ON TABLE equipment.equipment_accessories IS 'Links equipment types to accessories - serves both generic and specific equipment';
 
+-- Unit status projection (read model for fleet status screens)
+CREATE TABLE equipment.unit_status (
+    equipment_id INTEGER PRIMARY KEY,
+    equipment_type_id INTEGER NOT NULL,
+    unit_state VARCHAR(20) NOT NULL DEFAULT 'available'
+        CHECK (unit_state IN ('available', 'allocated', 'on_hire', 'maintenance', 'repair', 'sold')),
+    current_interaction_id INTEGER,         -- Hire the unit is allocated to or out on
+    current_allocation_id INTEGER,
+    current_allocation_status VARCHAR(20),
+    current_hire_start DATE,
+    current_hire_end DATE,                  -- NULL while the hire is open-ended
+    next_booking_start DATE,                -- Start of the unit's next allocation after the current one
+    active_allocations INTEGER NOT NULL DEFAULT 0,
+    next_service_due DATE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (equipment_id) REFERENCES equipment.equipment(id) ON DELETE CASCADE
+);
+
+COMMENT ON TABLE equipment.unit_status IS 'Current state of each unit, maintained by triggers on equipment and allocations (13_unit_status_procedures.sql)';
+
 -- =============================================================================
 -- INTERACTIONS SCHEMA - Business Transactions
 -- =============================================================================
@@ -292,11 +316,20 @@ CREATE TABLE interactions.interaction_equipment (
     qc_notes TEXT,
     delivery_notes TEXT,
     return_notes TEXT,
+    -- Days the unit is held for: the hire's period while it is a live hire, NULL
+    -- once cancelled or completed (set by triggers, 17_allocation_period_procedures.sql)
+    hire_period DATERANGE,
     FOREIGN KEY (interaction_id) REFERENCES interactions.interactions(id) ON DELETE CASCADE,
     FOREIGN KEY (equipment_id) REFERENCES equipment.equipment(id),
     FOREIGN KEY (equipment_generic_booking_id) REFERENCES interactions.interaction_equipment_generic(id),
     FOREIGN KEY (allocated_by) REFERENCES core.employees(id),
-    FOREIGN KEY (qc_approved_by) REFERENCES core.employees(id)
+    FOREIGN KEY (qc_approved_by) REFERENCES core.employees(id),
+    -- No unit on two live hires over overlapping days (also indexes overlap lookups)
+    CONSTRAINT excl_interaction_equipment_period EXCLUDE USING gist (
+        equipment_id WITH =,
+        hire_period WITH &&,
+        interaction_id WITH <>
+    )
 );
 
 COMMENT ON TABLE interactions.interaction_equipment IS 'Phase 2: Specific equipment allocations - links to generic bookings';
@@ -321,6 +354,35 @@ CREATE TABLE interactions.interaction_accessories (
 
 COMMENT ON TABLE interactions.interaction_accessories IS 'Accessories assigned to hire interactions - links to generic bookings';
 
+-- Precomputed hire documents (read model for the hire detail view)
+CREATE TABLE interactions.hire_documents (
+    interaction_id INTEGER PRIMARY KEY,
+    document JSONB NOT NULL,
+    built_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (interaction_id) REFERENCES interactions.interactions(id) ON DELETE CASCADE
+);
+
+COMMENT ON TABLE interactions.hire_documents IS 'One JSON document per hire, rebuilt by triggers when the hire or its lines change';
+
+-- Allocation work queue: one row per open hire with generic bookings still to allocate
+CREATE TABLE interactions.allocation_queue (
+    interaction_id INTEGER PRIMARY KEY,
+    delivery_date DATE,
+    delivery_time TIME,
+    hire_start_date DATE,
+    equipment_count INTEGER NOT NULL DEFAULT 0,   -- Booked lines still to allocate
+    units_pending INTEGER NOT NULL DEFAULT 0,     -- Units still to allocate across those lines
+    total_value DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    generic_equipment JSONB NOT NULL DEFAULT '[]',
+    claimed_by VARCHAR(100),                      -- Allocator holding the lease
+    claimed_until TIMESTAMP WITH TIME ZONE,
+    queued_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (interaction_id) REFERENCES interactions.interactions(id) ON DELETE CASCADE
+);
+
+COMMENT ON TABLE interactions.allocation_queue IS 'Hires awaiting allocation, maintained by triggers on bookings and allocations (14_allocation_queue_procedures.sql)';
+
 -- =============================================================================
 -- TASKS SCHEMA - Driver and User Task Management
 -- =============================================================================
@@ -340,10 +402,13 @@ CREATE TABLE tasks.drivers_taskboard (
     site_address TEXT,
     scheduled_date DATE,
     scheduled_time TIME,
+    run_sequence INTEGER, -- Stop order on the assigned driver's run (set by dispatch)
     actual_start_time TIMESTAMP WITH TIME ZONE,
     actual_completion_time TIMESTAMP WITH TIME ZONE,
     equipment_allocated BOOLEAN NOT NULL DEFAULT false,
     equipment_verified BOOLEAN NOT NULL DEFAULT false,
+    equipment_types_count INTEGER NOT NULL DEFAULT 0, -- Pre-aggregated from generic bookings
+    total_equipment INTEGER NOT NULL DEFAULT 0,       -- Maintained by trg_task_equipment_counts
     driver_notes TEXT,
     completion_notes TEXT,
     created_by INTEGER NOT NULL,
@@ -412,6 +477,15 @@ CREATE TABLE system.activity_log (
 
 COMMENT ON TABLE system.activity_log IS 'System activity and audit trail';
 
+-- Materialized view refresh bookkeeping (see sp_refresh_hire_summary)
+CREATE TABLE system.view_refreshes (
+    view_name VARCHAR(100) PRIMARY KEY,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    duration_ms DECIMAL(12,1)
+);
+
+COMMENT ON TABLE system.view_refreshes IS 'When each materialized view was last refreshed, so workers skip refreshes another has already done';
+
 -- =============================================================================
 -- INDEXES FOR PERFORMANCE
 -- =============================================================================
@@ -429,6 +503,8 @@ CREATE INDEX idx_equipment_status ON equipment.equipment(status);
 CREATE INDEX idx_equipment_code ON equipment.equipment(asset_code);
 CREATE INDEX idx_generic_equipment_type ON equipment.equipment_generic(equipment_type_id);
 CREATE INDEX idx_accessories_code ON equipment.accessories(accessory_code);
+CREATE INDEX idx_unit_status_type_state ON equipment.unit_status(equipment_type_id, unit_state);
+CREATE INDEX idx_unit_status_state ON equipment.unit_status(unit_state);
 CREATE INDEX idx_equipment_accessories_type ON equipment.equipment_accessories(equipment_type_id);
 
 -- Interaction indexes
@@ -437,17 +513,35 @@ CREATE INDEX idx_interactions_type ON interactions.interactions(interaction_type
 CREATE INDEX idx_interactions_status ON interactions.interactions(status);
 CREATE INDEX idx_interactions_ref ON interactions.interactions(reference_number);
 CREATE INDEX idx_interactions_date ON interactions.interactions(hire_start_date);
+CREATE INDEX idx_interactions_delivery_type ON interactions.interactions(delivery_date, interaction_type);
 CREATE INDEX idx_equipment_generic_interaction ON interactions.interaction_equipment_generic(interaction_id);
 CREATE INDEX idx_equipment_interaction ON interactions.interaction_equipment(interaction_id);
+CREATE INDEX idx_equipment_allocated_unit ON interactions.interaction_equipment(equipment_id);
+CREATE INDEX idx_equipment_allocation_booking ON interactions.interaction_equipment(equipment_generic_booking_id);
+-- Allocations awaiting QC only (the pending-QC queue and bulk sign-off), so it stays small as history grows
+CREATE INDEX idx_equipment_allocation_pending_qc ON interactions.interaction_equipment(interaction_id, allocated_at)
+    WHERE allocation_status IN ('allocated', 'qc_pending');
 CREATE INDEX idx_accessories_interaction ON interactions.interaction_accessories(interaction_id);
+CREATE INDEX idx_allocation_queue_order ON interactions.allocation_queue(delivery_date, delivery_time, interaction_id);
 
 -- Task indexes
 CREATE INDEX idx_driver_tasks_driver ON tasks.drivers_taskboard(assigned_driver_id);
 CREATE INDEX idx_driver_tasks_status ON tasks.drivers_taskboard(status);
 CREATE INDEX idx_driver_tasks_date ON tasks.drivers_taskboard(scheduled_date);
+CREATE INDEX idx_driver_tasks_driver_date ON tasks.drivers_taskboard(assigned_driver_id, scheduled_date, status);
+CREATE INDEX idx_driver_tasks_date_status ON tasks.drivers_taskboard(scheduled_date, status);
+CREATE INDEX idx_driver_tasks_interaction ON tasks.drivers_taskboard(interaction_id);
 CREATE INDEX idx_user_tasks_user ON tasks.user_taskboard(assigned_user_id);
 CREATE INDEX idx_user_tasks_status ON tasks.user_taskboard(status);
 
+-- Activity log indexes (keyset pages newest first; see 16_audit_log_procedures.sql)
+CREATE INDEX idx_activity_log_created ON system.activity_log(created_at, id);
+CREATE INDEX idx_activity_log_user ON system.activity_log(user_id, created_at, id);
+CREATE INDEX idx_activity_log_action ON system.activity_log(action, created_at, id);
+CREATE INDEX idx_activity_log_record ON system.activity_log(table_name, record_id, created_at, id);
+CREATE INDEX idx_activity_log_new_values ON system.activity_log USING GIN (new_values jsonb_path_ops);
+CREATE INDEX idx_activity_log_old_values ON system.activity_log USING GIN (old_values jsonb_path_ops);
+
 -- =============================================================================
 -- TRIGGERS FOR AUTOMATIC UPDATES
 -- =============================================================================
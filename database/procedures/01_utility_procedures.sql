@@ -39,6 +39,7 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Get customers for selection dropdown
+-- (this and the contact/site lookups are plain SQL so callers selecting a few columns fetch only those)
 CREATE OR REPLACE FUNCTION sp_get_customers_for_selection(
     p_search_term VARCHAR(100) DEFAULT NULL,
     p_active_only BOOLEAN DEFAULT true
@@ -51,8 +52,6 @@ RETURNS TABLE (
     status VARCHAR(20),
     credit_limit DECIMAL(15,2)
 ) AS $$
-BEGIN
-    RETURN QUERY
     SELECT 
         c.id,
         c.customer_code,
@@ -69,8 +68,7 @@ BEGIN
             OR c.customer_code ILIKE '%' || p_search_term || '%'
         )
     ORDER BY c.customer_name;
-END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE sql STABLE;
 
 -- Get contacts for selected customer
 CREATE OR REPLACE FUNCTION sp_get_customer_contacts(
@@ -85,8 +83,6 @@ RETURNS TABLE (
     whatsapp_number VARCHAR(20),
     is_primary_contact BOOLEAN
 ) AS $$
-BEGIN
-    RETURN QUERY
     SELECT 
         c.id,
         (c.first_name || ' ' || c.last_name)::VARCHAR(255),
@@ -100,8 +96,7 @@ BEGIN
         c.customer_id = p_customer_id
         AND c.status = 'active'
     ORDER BY c.is_primary_contact DESC, c.first_name, c.last_name;
-END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE sql STABLE;
 
 -- Get sites for selected customer
 CREATE OR REPLACE FUNCTION sp_get_customer_sites(
@@ -116,8 +111,6 @@ RETURNS TABLE (
     site_contact_name VARCHAR(200),
     site_contact_phone VARCHAR(20)
 ) AS $$
-BEGIN
-    RETURN QUERY
     SELECT 
         s.id,
         s.site_code,
@@ -136,8 +129,7 @@ BEGIN
         s.customer_id = p_customer_id
         AND s.is_active = true
     ORDER BY s.site_type, s.site_name;
-END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE sql STABLE;
 
 -- Log system activity
 CREATE OR REPLACE FUNCTION sp_log_activity(
@@ -175,13 +167,12 @@ RETURNS TABLE (
 BEGIN
     RETURN QUERY
     SELECT 
-        -- Active hires
-        (SELECT COUNT(*) FROM interactions.interactions 
-         WHERE interaction_type = 'hire' AND status IN ('pending', 'in_progress'))::INTEGER,
+        -- Active hires (from the materialized hire summary, see database_views.sql)
+        (SELECT COUNT(*) FROM mv_hire_summary 
+         WHERE status IN ('pending', 'in_progress'))::INTEGER,
         
         -- Pending allocations (generic bookings not allocated)
-        (SELECT COUNT(*) FROM interactions.interaction_equipment_types 
-         WHERE booking_status = 'booked')::INTEGER,
+        (SELECT COALESCE(SUM(pending_bookings), 0) FROM mv_hire_summary)::INTEGER,
         
         -- Pending deliveries
         (SELECT COUNT(*) FROM tasks.drivers_taskboard 
@@ -200,3 +191,36 @@ BEGIN
          WHERE status = 'available')::INTEGER;
 END;
 $$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- HIRE PERIODS
+-- =============================================================================
+-- Allocations store the period they hold a unit for as a DATERANGE
+-- (interaction_equipment.hire_period), and a GiST exclusion constraint stops two
+-- live hires holding the same unit over overlapping periods. Availability checks
+-- compare that column with the requested period using && (overlaps).
+
+-- Period a hire holds its units for: both ends inclusive, and an open-ended hire
+-- holds them for 30 days from the start
+CREATE OR REPLACE FUNCTION sp_hire_period(
+    p_hire_start_date DATE,
+    p_hire_end_date DATE
+)
+RETURNS DATERANGE AS $$
+    SELECT CASE WHEN p_hire_start_date IS NOT NULL THEN
+        daterange(p_hire_start_date,
+                  GREATEST(COALESCE(p_hire_end_date, p_hire_start_date + 30), p_hire_start_date), '[]')
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Period an availability check asks about: from the start date (today if none)
+-- to the end date, or the start day alone
+CREATE OR REPLACE FUNCTION sp_requested_period(
+    p_hire_start_date DATE,
+    p_hire_end_date DATE DEFAULT NULL
+)
+RETURNS DATERANGE AS $$
+    SELECT daterange(COALESCE(p_hire_start_date, CURRENT_DATE),
+                     GREATEST(COALESCE(p_hire_end_date, p_hire_start_date, CURRENT_DATE),
+                              COALESCE(p_hire_start_date, CURRENT_DATE)), '[]');
+$$ LANGUAGE sql STABLE;
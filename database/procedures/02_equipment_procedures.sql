@@ -3,6 +3,7 @@
 -- =============================================================================
 
 -- Get available equipment types for selection
+-- (plain SQL so it inlines: selecting only some columns skips the others, including the unit counts)
 CREATE OR REPLACE FUNCTION sp_get_available_equipment_types(
     p_search_term VARCHAR(100) DEFAULT NULL,
     p_hire_start_date DATE DEFAULT CURRENT_DATE,
@@ -20,8 +21,6 @@ RETURNS TABLE (
     available_units INTEGER,
     total_units INTEGER
 ) AS $$
-BEGIN
-    RETURN QUERY
     SELECT 
         et.id,
         et.type_code,
@@ -37,17 +36,12 @@ BEGIN
              FROM equipment.equipment e
              WHERE e.equipment_type_id = et.id
                AND e.status = 'available'
-               AND e.id NOT IN (
-                   -- Exclude equipment already allocated for overlapping periods
-                   SELECT ie.equipment_id
+               AND NOT EXISTS (
+                   -- Exclude equipment already booked for an overlapping period
+                   SELECT 1
                    FROM interactions.interaction_equipment ie
-                   JOIN interactions.interactions i ON ie.interaction_id = i.id
-                   WHERE i.interaction_type = 'hire'
-                     AND i.status NOT IN ('cancelled', 'completed')
-                     AND (
-                         (i.hire_start_date <= COALESCE(p_hire_end_date, p_hire_start_date))
-                         AND (COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= p_hire_start_date)
-                     )
+                   WHERE ie.equipment_id = e.id
+                     AND ie.hire_period && sp_requested_period(p_hire_start_date, p_hire_end_date)
                )), 0),
         -- Total units
         (SELECT COUNT(*)::INTEGER
@@ -64,8 +58,7 @@ BEGIN
             OR et.description ILIKE '%' || p_search_term || '%'
         )
     ORDER BY et.type_name;
-END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE sql STABLE;
 
 -- Get individual equipment units for specific selection
 CREATE OR REPLACE FUNCTION sp_get_available_individual_equipment(
@@ -111,17 +104,12 @@ BEGIN
             OR et.type_name ILIKE '%' || p_search_term || '%'
             OR e.model ILIKE '%' || p_search_term || '%'
         )
-        AND e.id NOT IN (
-            -- Exclude equipment already allocated for overlapping periods
-            SELECT ie.equipment_id
+        AND NOT EXISTS (
+            -- Exclude equipment already booked for an overlapping period
+            SELECT 1
             FROM interactions.interaction_equipment ie
-            JOIN interactions.interactions i ON ie.interaction_id = i.id
-            WHERE i.interaction_type = 'hire'
-              AND i.status NOT IN ('cancelled', 'completed')
-              AND (
-                  (i.hire_start_date <= COALESCE(p_hire_end_date, p_hire_start_date))
-                  AND (COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= p_hire_start_date)
-              )
+            WHERE ie.equipment_id = e.id
+              AND ie.hire_period && sp_requested_period(p_hire_start_date, p_hire_end_date)
         )
     ORDER BY et.type_name, e.condition DESC, e.asset_code;
 END;
@@ -295,6 +283,7 @@ DECLARE
     v_available_units INTEGER;
     v_next_date DATE;
     v_conflicts TEXT := '';
+    v_period DATERANGE := sp_requested_period(p_hire_start_date, p_hire_end_date);
 BEGIN
     -- Get total units of this type
     SELECT COUNT(*) INTO v_total_units
@@ -307,29 +296,22 @@ BEGIN
     FROM equipment.equipment e
     WHERE e.equipment_type_id = p_equipment_type_id
       AND e.status = 'available'
-      AND e.id NOT IN (
-          SELECT ie.equipment_id
+      AND NOT EXISTS (
+          SELECT 1
           FROM interactions.interaction_equipment ie
-          JOIN interactions.interactions i ON ie.interaction_id = i.id
-          WHERE i.interaction_type = 'hire'
-            AND i.status NOT IN ('cancelled', 'completed')
-            AND (
-                (i.hire_start_date <= COALESCE(p_hire_end_date, p_hire_start_date))
-                AND (COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= p_hire_start_date)
-            )
+          WHERE ie.equipment_id = e.id
+            AND ie.hire_period && v_period
       );
     
-    -- Find next available date if insufficient units
+    -- Find next available date if insufficient units: the day after the earliest
+    -- conflicting booking ends (upper bound of an inclusive range)
     IF v_available_units < p_quantity THEN
-        SELECT MIN(COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') + INTERVAL '1 day')
+        SELECT MIN(upper(ie.hire_period))
         INTO v_next_date
-        FROM interactions.interactions i
-        JOIN interactions.interaction_equipment ie ON i.id = ie.interaction_id
+        FROM interactions.interaction_equipment ie
         JOIN equipment.equipment e ON ie.equipment_id = e.id
         WHERE e.equipment_type_id = p_equipment_type_id
-          AND i.interaction_type = 'hire'
-          AND i.status NOT IN ('cancelled', 'completed')
-          AND i.hire_start_date <= COALESCE(p_hire_end_date, p_hire_start_date);
+          AND ie.hire_period && v_period;
     END IF;
     
     RETURN QUERY
@@ -100,18 +100,13 @@ BEGIN
     WHERE 
         e.equipment_type_id = p_equipment_type_id
         AND e.status = 'available'
-        AND e.id NOT IN (
-            -- Exclude equipment already allocated for overlapping periods
-            SELECT ie.equipment_id
+        AND NOT EXISTS (
+            -- Exclude equipment already booked for an overlapping period
+            SELECT 1
             FROM interactions.interaction_equipment ie
-            JOIN interactions.interactions i ON ie.interaction_id = i.id
-            WHERE i.interaction_type = 'hire'
-              AND i.status NOT IN ('cancelled', 'completed')
-              AND (p_exclude_interaction_id IS NULL OR i.id != p_exclude_interaction_id)
-              AND (
-                  (i.hire_start_date <= COALESCE(p_hire_end_date, p_hire_start_date))
-                  AND (COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= p_hire_start_date)
-              )
+            WHERE ie.equipment_id = e.id
+              AND ie.hire_period && sp_requested_period(p_hire_start_date, p_hire_end_date)
+              AND (p_exclude_interaction_id IS NULL OR ie.interaction_id != p_exclude_interaction_id)
         )
     ORDER BY 
         e.condition DESC, -- Excellent condition first
@@ -145,7 +140,6 @@ DECLARE
     v_allocation_ids INTEGER[] := ARRAY[]::INTEGER[];
     v_allocation_id INTEGER;
     v_equipment_type_check INTEGER;
-    v_availability_check INTEGER;
 BEGIN
     -- Get booking details
     SELECT 
@@ -188,20 +182,15 @@ BEGIN
             RETURN;
         END IF;
         
-        -- Check availability for date range
-        SELECT COUNT(*) INTO v_availability_check
-        FROM interactions.interaction_equipment ie
-        JOIN interactions.interactions i ON ie.interaction_id = i.id
-        WHERE ie.equipment_id = v_equipment_id
-          AND i.interaction_type = 'hire'
-          AND i.status NOT IN ('cancelled', 'completed')
-          AND i.id != v_interaction_id -- Exclude current interaction
-          AND (
-              (i.hire_start_date <= COALESCE(v_hire_end_date, v_hire_start_date))
-              AND (COALESCE(i.hire_end_date, i.hire_start_date + INTERVAL '30 days') >= v_hire_start_date)
-          );
-        
-        IF v_availability_check > 0 THEN
+        -- Check availability for date range (the exclusion constraint on hire_period
+        -- also enforces this against concurrent allocations)
+        IF EXISTS (
+            SELECT 1
+            FROM interactions.interaction_equipment ie
+            WHERE ie.equipment_id = v_equipment_id
+              AND ie.hire_period && sp_requested_period(v_hire_start_date, v_hire_end_date)
+              AND ie.interaction_id != v_interaction_id -- Exclude current interaction
+        ) THEN
             RETURN QUERY
             SELECT false, v_allocated_count, ('Equipment ' || v_equipment_id || ' is not available for the requested period')::TEXT, v_allocation_ids;
             RETURN;
@@ -256,7 +245,11 @@ BEGIN
     RETURN QUERY
     SELECT true, v_allocated_count, NULL::TEXT, v_allocation_ids;
     
-EXCEPTION WHEN OTHERS THEN
+EXCEPTION WHEN exclusion_violation THEN
+    -- Another allocation took one of the units for an overlapping period first
+    RETURN QUERY
+    SELECT false, 0, 'Equipment is not available for the requested period'::TEXT, ARRAY[]::INTEGER[];
+WHEN OTHERS THEN
     RETURN QUERY
     SELECT false, v_allocated_count, SQLERRM::TEXT, v_allocation_ids;
 END;
@@ -394,9 +387,122 @@ EXCEPTION WHEN OTHERS THEN
 END;
 $$ LANGUAGE plpgsql;
 
--- Get equipment pending quality control
+-- Sign off many allocations at once: the given allocations, or every one awaiting
+-- QC on a hire (both: only the given ones on that hire). Approved units become
+-- qc_approved and rejected ones go back to allocated, in one UPDATE; each hire's
+-- delivery task is then marked verified (or not) once, and the batch is logged once.
+-- Returns one row per allocation asked for or signed off.
+CREATE OR REPLACE FUNCTION sp_bulk_quality_control_signoff(
+    p_allocation_ids INTEGER[],
+    p_interaction_id INTEGER,
+    p_qc_approved_by INTEGER,
+    p_approved BOOLEAN DEFAULT true,
+    p_qc_notes TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    allocation_id INTEGER,
+    interaction_id INTEGER,
+    success BOOLEAN,
+    allocation_status VARCHAR(20),
+    error_message TEXT
+) AS $$
+DECLARE
+    v_allocation_ids INTEGER[] := '{}';
+    v_hire_ids INTEGER[] := '{}';
+BEGIN
+    IF p_allocation_ids IS NULL AND p_interaction_id IS NULL THEN
+        RAISE EXCEPTION 'Give allocation ids or a hire to sign off';
+    END IF;
+
+    -- Allocations awaiting QC, locked in id order so overlapping batches queue
+    SELECT COALESCE(array_agg(pending.id), '{}')
+    INTO v_allocation_ids
+    FROM (
+        SELECT ie.id
+        FROM interactions.interaction_equipment ie
+        WHERE (p_allocation_ids IS NULL OR ie.id = ANY(p_allocation_ids))
+          AND (p_interaction_id IS NULL OR ie.interaction_id = p_interaction_id)
+          AND ie.allocation_status IN ('allocated', 'qc_pending')
+        ORDER BY ie.id
+        FOR UPDATE
+    ) pending;
+
+    WITH signed AS (
+        UPDATE interactions.interaction_equipment ie
+        SET
+            allocation_status = CASE WHEN p_approved THEN 'qc_approved' ELSE 'allocated' END,
+            qc_approved_by = p_qc_approved_by,
+            qc_approved_at = CURRENT_TIMESTAMP,
+            qc_notes = p_qc_notes
+        WHERE ie.id = ANY(v_allocation_ids)
+        RETURNING ie.interaction_id
+    )
+    SELECT COALESCE(array_agg(DISTINCT signed.interaction_id), '{}') INTO v_hire_ids FROM signed;
+
+    -- A delivery task is verified while every unit on its hire is QC approved
+    UPDATE tasks.drivers_taskboard dt
+    SET equipment_verified = verified.all_approved, updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT h.id,
+               NOT EXISTS (
+                   SELECT 1
+                   FROM interactions.interaction_equipment ie
+                   WHERE ie.interaction_id = h.id
+                     AND ie.allocation_status NOT IN ('qc_approved', 'delivered')
+               ) AS all_approved
+        FROM unnest(v_hire_ids) AS h(id)
+    ) verified
+    WHERE dt.interaction_id = verified.id
+      AND dt.task_type = 'delivery'
+      AND dt.status IN ('backlog', 'assigned')
+      AND dt.equipment_verified IS DISTINCT FROM verified.all_approved;
+
+    IF cardinality(v_allocation_ids) > 0 THEN
+        PERFORM sp_log_activity(
+            p_qc_approved_by,
+            'BULK_QC_SIGNOFF',
+            'interactions.interaction_equipment',
+            NULL,
+            NULL,
+            jsonb_build_object(
+                'allocation_ids', v_allocation_ids,
+                'interaction_ids', v_hire_ids,
+                'approved', p_approved,
+                'qc_notes', p_qc_notes
+            )
+        );
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        req.id,
+        ie.interaction_id,
+        req.id = ANY(v_allocation_ids),
+        ie.allocation_status,
+        CASE
+            WHEN req.id = ANY(v_allocation_ids) THEN NULL
+            WHEN ie.id IS NULL THEN 'Allocation not found'
+            WHEN p_interaction_id IS NOT NULL AND ie.interaction_id <> p_interaction_id THEN 'Allocation is not on this hire'
+            ELSE 'Equipment not ready for quality control'
+        END::TEXT
+    FROM (
+        SELECT unnest(v_allocation_ids) AS id
+        UNION
+        SELECT unnest(p_allocation_ids)
+    ) req
+    LEFT JOIN interactions.interaction_equipment ie ON ie.id = req.id
+    ORDER BY req.id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Get equipment pending quality control, soonest delivery first, a page at a time
+-- (p_limit NULL returns every unit). Served by the partial index on allocations
+-- awaiting QC, so the queue costs the same however many allocations are signed off.
+DROP FUNCTION IF EXISTS sp_get_equipment_pending_qc(INTEGER);
 CREATE OR REPLACE FUNCTION sp_get_equipment_pending_qc(
-    p_interaction_id INTEGER DEFAULT NULL
+    p_interaction_id INTEGER DEFAULT NULL,
+    p_limit INTEGER DEFAULT NULL,
+    p_offset INTEGER DEFAULT 0
 )
 RETURNS TABLE (
     allocation_id INTEGER,
@@ -410,7 +516,8 @@ RETURNS TABLE (
     condition VARCHAR(20),
     allocation_status VARCHAR(20),
     allocated_at TIMESTAMP WITH TIME ZONE,
-    delivery_date DATE
+    delivery_date DATE,
+    total_count INTEGER
 ) AS $$
 BEGIN
     RETURN QUERY
@@ -426,7 +533,8 @@ BEGIN
         e.condition,
         ie.allocation_status,
         ie.allocated_at,
-        i.delivery_date
+        i.delivery_date,
+        (COUNT(*) OVER ())::INTEGER
     FROM interactions.interaction_equipment ie
     JOIN interactions.interactions i ON ie.interaction_id = i.id
     JOIN core.customers c ON i.customer_id = c.id
@@ -435,6 +543,8 @@ BEGIN
     WHERE 
         ie.allocation_status IN ('allocated', 'qc_pending')
         AND (p_interaction_id IS NULL OR ie.interaction_id = p_interaction_id)
-    ORDER BY i.delivery_date, ie.allocated_at;
+    ORDER BY i.delivery_date, ie.allocated_at, ie.id
+    LIMIT p_limit
+    OFFSET p_offset;
 END;
 $$ LANGUAGE plpgsql;
@@ -3,68 +3,15 @@
 -- Procedures for viewing hires, pending allocations, and equipment allocation
 -- =====================================================================================
 
--- Get all hires for today with summary information
-CREATE OR REPLACE FUNCTION sp_get_todays_hires(p_date DATE DEFAULT CURRENT_DATE)
-RETURNS TABLE (
-    interaction_id INTEGER,
-    reference_number VARCHAR,
-    customer_name VARCHAR,
-    contact_name VARCHAR,
-    site_name VARCHAR,
-    hire_start_date DATE,
-    hire_end_date DATE,
-    delivery_date DATE,
-    delivery_time TIME,
-    status VARCHAR,
-    allocation_status VARCHAR,
-    has_generic_equipment BOOLEAN,
-    equipment_count INTEGER,
-    total_value DECIMAL(10,2)
-) AS $$
-BEGIN
-    RETURN QUERY
-    SELECT 
-        i.id AS interaction_id,
-        i.reference_number::VARCHAR,
-        c.customer_name::VARCHAR,
-        CONCAT(cc.first_name, ' ', cc.last_name)::VARCHAR AS contact_name,
-        cs.site_name::VARCHAR,
-        i.hire_start_date,
-        i.hire_end_date,
-        i.delivery_date,
-        i.delivery_time,
-        i.status::VARCHAR,
-        i.allocation_status::VARCHAR,
-        COALESCE(
-            (SELECT TRUE FROM interactions.interaction_equipment_generic ieg 
-             WHERE ieg.interaction_id = i.id LIMIT 1), 
-            FALSE
-        ) AS has_generic_equipment,
-        COALESCE(
-            (SELECT COUNT(*)::INTEGER FROM interactions.interaction_equipment_generic ieg 
-             WHERE ieg.interaction_id = i.id), 
-            0
-        ) AS equipment_count,
-        COALESCE(
-            (SELECT SUM(ieg.quantity * et.daily_rate)::DECIMAL(10,2)
-             FROM interactions.interaction_equipment_generic ieg
-             JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
-             JOIN equipment.equipment_types et ON eg.equipment_type_id = et.id
-             WHERE ieg.interaction_id = i.id), 
-            0.00
-        ) AS total_value
-    FROM interactions.interactions i
-    LEFT JOIN core.customers c ON i.customer_id = c.id
-    LEFT JOIN core.contacts cc ON i.contact_id = cc.id
-    LEFT JOIN core.sites cs ON i.site_id = cs.id
-    WHERE i.delivery_date = p_date
-    AND i.interaction_type = 'hire'
-    ORDER BY i.delivery_time, i.reference_number;
-END;
-$$ LANGUAGE plpgsql;
+-- sp_get_todays_hires (one day's hires) is built on the diary query in 15_diary_procedures.sql
 
--- Get hires with generic equipment that need allocation
-CREATE OR REPLACE FUNCTION sp_get_pending_allocations()
+-- Get hires that have generic equipment needing allocation, most urgent first.
+-- Reads the allocation work queue (14_allocation_queue_procedures.sql); p_limit NULL returns every hire.
+DROP FUNCTION IF EXISTS sp_get_pending_allocations();
+CREATE OR REPLACE FUNCTION sp_get_pending_allocations(
+    p_limit INTEGER DEFAULT NULL,
+    p_offset INTEGER DEFAULT 0
+)
 RETURNS TABLE (
     interaction_id INTEGER,
     reference_number VARCHAR,
@@ -82,66 +29,19 @@ RETURNS TABLE (
 BEGIN
     RETURN QUERY
     SELECT 
-        i.id AS interaction_id,
-        i.reference_number::VARCHAR,
-        c.customer_name::VARCHAR,
-        cc.contact_name::VARCHAR,
-        cs.site_name::VARCHAR,
-        i.hire_start_date,
-        i.delivery_date,
-        i.delivery_time,
-        CASE 
-            WHEN i.delivery_date < CURRENT_DATE THEN 'urgent'
-            WHEN i.delivery_date = CURRENT_DATE THEN 'today'
-            ELSE 'future'
-        END::VARCHAR AS priority,
-        COALESCE(
-            (SELECT COUNT(*)::INTEGER FROM interactions.interaction_equipment_generic ieg 
-             WHERE ieg.interaction_id = i.id), 
-            0
-        ) AS equipment_count,
-        COALESCE(
-            (SELECT SUM(ieg.quantity * et.daily_rate)::DECIMAL(10,2)
-             FROM interactions.interaction_equipment_generic ieg
-             JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
-             JOIN equipment.equipment_types et ON eg.equipment_type_id = et.id
-             WHERE ieg.interaction_id = i.id), 
-            0.00
-        ) AS total_value,
-        COALESCE(
-            (SELECT json_agg(
-                json_build_object(
-                    'equipment_type_id', et.id,
-                    'type_name', et.type_name,
-                    'type_code', et.type_code,
-                    'quantity', ieg.quantity,
-                    'daily_rate', et.daily_rate
-                )
-            )
-             FROM interactions.interaction_equipment_generic ieg
-             JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
-             JOIN equipment.equipment_types et ON eg.equipment_type_id = et.id
-             WHERE ieg.interaction_id = i.id), 
-            '[]'::json
-        ) AS generic_equipment
-    FROM interactions.interactions i
-    LEFT JOIN core.customers c ON i.customer_id = c.id
-    LEFT JOIN core.customer_contacts cc ON i.contact_id = cc.id
-    LEFT JOIN core.customer_sites cs ON i.site_id = cs.id
-    WHERE i.allocation_status = 'not_allocated'
-    AND i.interaction_type = 'hire'
-    AND EXISTS (
-        SELECT 1 FROM interactions.interaction_equipment_generic ieg 
-        WHERE ieg.interaction_id = i.id
-    )
-    ORDER BY 
-        CASE 
-            WHEN i.delivery_date < CURRENT_DATE THEN 1
-            WHEN i.delivery_date = CURRENT_DATE THEN 2
-            ELSE 3
-        END,
-        i.delivery_date,
-        i.delivery_time;
+        q.interaction_id,
+        q.reference_number::VARCHAR,
+        q.customer_name::VARCHAR,
+        q.contact_name::VARCHAR,
+        q.site_name::VARCHAR,
+        q.hire_start_date,
+        q.delivery_date,
+        q.delivery_time,
+        q.priority::VARCHAR,
+        q.equipment_count,
+        q.total_value,
+        q.generic_equipment::JSON
+    FROM sp_get_allocation_queue(NULL, NULL, false, p_limit, p_offset) q;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -282,82 +182,107 @@ BEGIN
         e.condition::VARCHAR,
         et.type_name::VARCHAR,
         et.daily_rate
-    FROM equipment.equipment e
+    FROM equipment.unit_status us
+    JOIN equipment.equipment e ON e.id = us.equipment_id
     JOIN equipment.equipment_types et ON e.equipment_type_id = et.id
-    WHERE e.equipment_type_id = p_equipment_type_id
-    AND e.status = 'available'
-    AND e.is_active = true
+    WHERE us.equipment_type_id = p_equipment_type_id
+    -- Not in maintenance and not allocated to any open hire (see 13_unit_status_procedures.sql)
+    AND us.unit_state = 'available'
     AND et.is_active = true
-    -- Add availability check - not already allocated for overlapping periods
-    AND NOT EXISTS (
-        SELECT 1 FROM interactions.interaction_equipment ie
-        JOIN interactions.interactions i ON ie.interaction_id = i.id
-        WHERE ie.equipment_id = e.id
-        AND i.allocation_status IN ('allocated', 'delivered')
-        AND i.hire_end_date >= CURRENT_DATE
-    )
     ORDER BY e.asset_code;
 END;
 $$ LANGUAGE plpgsql;
 
--- Allocate specific equipment to replace generic equipment
+-- Allocate specific units against a hire's generic booking for their type,
+-- recorded as allocated by p_allocated_by
+DROP FUNCTION IF EXISTS sp_allocate_equipment(INTEGER, INTEGER, INTEGER[]);
 CREATE OR REPLACE FUNCTION sp_allocate_equipment(
     p_hire_id INTEGER,
     p_equipment_type_id INTEGER,
-    p_equipment_ids INTEGER[]
+    p_equipment_ids INTEGER[],
+    p_allocated_by INTEGER
 )
 RETURNS BOOLEAN AS $$
 DECLARE
-    equipment_id INTEGER;
-    generic_booking_id INTEGER;
-    remaining_quantity INTEGER;
+    v_booking_id INTEGER;
+    v_quantity INTEGER;
+    v_already_allocated INTEGER;
+    v_units_taken INTEGER;
 BEGIN
-    -- Find the generic equipment booking
-    SELECT ieg.id, ieg.quantity INTO generic_booking_id, remaining_quantity
+    -- Find (and lock) the generic equipment booking
+    SELECT ieg.id, ieg.quantity INTO v_booking_id, v_quantity
     FROM interactions.interaction_equipment_generic ieg
     JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
     WHERE ieg.interaction_id = p_hire_id
     AND eg.equipment_type_id = p_equipment_type_id
-    LIMIT 1;
+    AND ieg.booking_status NOT IN ('cancelled', 'returned')
+    ORDER BY ieg.id
+    LIMIT 1
+    FOR UPDATE OF ieg;
     
-    IF generic_booking_id IS NULL THEN
+    IF v_booking_id IS NULL THEN
         RAISE EXCEPTION 'Generic equipment booking not found';
     END IF;
     
-    -- Check if we have enough equipment IDs
-    IF array_length(p_equipment_ids, 1) != remaining_quantity THEN
-        RAISE EXCEPTION 'Equipment count mismatch: needed %, provided %', 
-            remaining_quantity, array_length(p_equipment_ids, 1);
+    SELECT COUNT(*) INTO v_already_allocated
+    FROM interactions.interaction_equipment ie
+    WHERE ie.equipment_generic_booking_id = v_booking_id;
+    
+    -- Check we are not allocating more units than were booked
+    IF v_already_allocated + COALESCE(array_length(p_equipment_ids, 1), 0) > v_quantity THEN
+        RAISE EXCEPTION 'Equipment count mismatch: % booked, % already allocated, % provided',
+            v_quantity, v_already_allocated, COALESCE(array_length(p_equipment_ids, 1), 0);
     END IF;
     
-    -- Insert specific equipment allocations
-    FOREACH equipment_id IN ARRAY p_equipment_ids
-    LOOP
+    -- Take the units: only available units of the booked type, and the row locks
+    -- stop two allocations taking the same unit
+    UPDATE equipment.equipment
+    SET status = 'rented'
+    WHERE id = ANY(p_equipment_ids)
+    AND equipment_type_id = p_equipment_type_id
+    AND status = 'available';
+    
+    GET DIAGNOSTICS v_units_taken = ROW_COUNT;
+    IF v_units_taken <> cardinality(ARRAY(SELECT DISTINCT unnest(p_equipment_ids))) THEN
+        RAISE EXCEPTION 'One or more units are not available or not of the booked type';
+    END IF;
+    
+    -- Insert specific equipment allocations linked to the generic booking; the
+    -- exclusion constraint on hire_period refuses units booked for an overlapping period
+    BEGIN
         INSERT INTO interactions.interaction_equipment (
             interaction_id,
             equipment_id,
-            allocated_date,
-            allocation_notes
-        ) VALUES (
-            p_hire_id,
-            equipment_id,
-            CURRENT_TIMESTAMP,
-            'Allocated from generic booking'
-        );
-    END LOOP;
+            equipment_generic_booking_id,
+            allocation_status,
+            allocated_by,
+            allocated_at
+        )
+        SELECT p_hire_id, unit_id, v_booking_id, 'allocated', p_allocated_by, CURRENT_TIMESTAMP
+        FROM (SELECT DISTINCT unnest(p_equipment_ids) AS unit_id) units;
+    EXCEPTION WHEN exclusion_violation THEN
+        RAISE EXCEPTION 'One or more units are already booked for an overlapping period'
+            USING ERRCODE = 'exclusion_violation';
+    END;
     
-    -- Remove the generic equipment booking
-    DELETE FROM interactions.interaction_equipment_generic
-    WHERE id = generic_booking_id;
+    -- Booking fully allocated
+    IF v_already_allocated + v_units_taken >= v_quantity THEN
+        UPDATE interactions.interaction_equipment_generic
+        SET booking_status = 'allocated'
+        WHERE id = v_booking_id;
+    END IF;
     
-    -- Update hire allocation status if no more generic equipment
+    -- Flag the delivery task once every booking on the hire is allocated
     IF NOT EXISTS (
         SELECT 1 FROM interactions.interaction_equipment_generic ieg
         WHERE ieg.interaction_id = p_hire_id
+        AND ieg.booking_status = 'booked'
     ) THEN
-        UPDATE interactions.interactions 
-        SET allocation_status = 'allocated'
-        WHERE id = p_hire_id;
+        UPDATE tasks.drivers_taskboard
+        SET equipment_allocated = true
+        WHERE interaction_id = p_hire_id
+        AND task_type = 'delivery'
+        AND status IN ('backlog', 'assigned');
     END IF;
     
     RETURN TRUE;
@@ -371,12 +296,44 @@ CREATE OR REPLACE FUNCTION sp_remove_hire_equipment(
     p_equipment_id INTEGER DEFAULT NULL
 )
 RETURNS BOOLEAN AS $$
+DECLARE
+    v_booking_ids INTEGER[];
 BEGIN
     IF p_equipment_id IS NOT NULL THEN
         -- Remove specific equipment
-        DELETE FROM interactions.interaction_equipment
+        WITH removed AS (
+            DELETE FROM interactions.interaction_equipment
+            WHERE interaction_id = p_hire_id
+            AND equipment_id = p_equipment_id
+            RETURNING equipment_generic_booking_id
+        )
+        SELECT array_agg(DISTINCT equipment_generic_booking_id) INTO v_booking_ids FROM removed;
+        
+        -- The unit goes back into stock unless another open hire still has it
+        UPDATE equipment.equipment e
+        SET status = 'available'
+        WHERE e.id = p_equipment_id
+        AND e.status = 'rented'
+        AND NOT EXISTS (
+            SELECT 1 FROM interactions.interaction_equipment ie
+            JOIN interactions.interactions i ON ie.interaction_id = i.id
+            WHERE ie.equipment_id = e.id
+            AND ie.allocation_status IN ('allocated', 'qc_pending', 'qc_approved', 'delivered')
+            AND i.status NOT IN ('cancelled', 'completed')
+        );
+        
+        -- Its booking needs allocating again
+        UPDATE interactions.interaction_equipment_generic
+        SET booking_status = 'booked'
+        WHERE id = ANY(v_booking_ids)
+        AND booking_status = 'allocated';
+        
+        UPDATE tasks.drivers_taskboard
+        SET equipment_allocated = false, equipment_verified = false
         WHERE interaction_id = p_hire_id
-        AND equipment_id = p_equipment_id;
+        AND task_type = 'delivery'
+        AND status IN ('backlog', 'assigned')
+        AND v_booking_ids IS NOT NULL;
     ELSE
         -- Remove generic equipment
         DELETE FROM interactions.interaction_equipment_generic ieg
@@ -386,19 +343,6 @@ BEGIN
         AND eg.equipment_type_id = p_equipment_type_id;
     END IF;
     
-    -- Update allocation status
-    IF NOT EXISTS (
-        SELECT 1 FROM interactions.interaction_equipment_generic ieg
-        WHERE ieg.interaction_id = p_hire_id
-    ) AND NOT EXISTS (
-        SELECT 1 FROM interactions.interaction_equipment ie
-        WHERE ie.interaction_id = p_hire_id
-    ) THEN
-        UPDATE interactions.interactions 
-        SET allocation_status = 'not_allocated'
-        WHERE id = p_hire_id;
-    END IF;
-    
     RETURN TRUE;
 END;
 $$ LANGUAGE plpgsql;
\ No newline at end of file
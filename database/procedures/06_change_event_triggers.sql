@@ -0,0 +1,84 @@
+-- =============================================================================
+-- CHANGE EVENT TRIGGERS (LISTEN/NOTIFY)
+-- =============================================================================
+-- Publishes a compact JSON change event on the 'aetherflow_changes' channel
+-- whenever interactions, bookings, allocations or driver tasks change.
+-- The API runs one listener per process and fans the events out to browsers
+-- (Server-Sent Events) and to in-process caches.
+--
+-- Payload shape (kept well below the 8000 byte NOTIFY limit):
+--   {"table": "tasks.drivers_taskboard", "op": "UPDATE", "id": 42,
+--    "interaction_id": 17, "date": "2025-07-01", "driver_id": 5,
+--    "old_date": "2025-06-30", "old_driver_id": null}
+
+-- Build and send the change event for the affected row
+CREATE OR REPLACE FUNCTION sp_notify_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_new JSONB;
+    v_old JSONB;
+    v_row JSONB;
+    v_payload JSONB;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_new := jsonb_strip_nulls(to_jsonb(NEW));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_old := jsonb_strip_nulls(to_jsonb(OLD));
+    END IF;
+    -- Nulls are stripped up front so missing columns fall through COALESCE
+    v_row := COALESCE(v_new, v_old);
+
+    v_payload := jsonb_build_object(
+        'table', TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', v_row->'id',
+        -- The interactions table is its own hire; child tables carry the link
+        'interaction_id', CASE
+            WHEN TG_TABLE_NAME = 'interactions' THEN v_row->'id'
+            ELSE v_row->'interaction_id'
+        END,
+        -- Diary date: delivery date for hires, scheduled date for driver tasks
+        'date', COALESCE(v_row->'delivery_date', v_row->'scheduled_date', v_row->'hire_start_date'),
+        'driver_id', v_row->'assigned_driver_id'
+    );
+
+    -- Let subscribers of the previous date/driver know the row moved away
+    IF TG_OP = 'UPDATE' THEN
+        IF COALESCE(v_old->'delivery_date', v_old->'scheduled_date', v_old->'hire_start_date')
+           IS DISTINCT FROM (v_payload->'date') THEN
+            v_payload := v_payload || jsonb_build_object(
+                'old_date', COALESCE(v_old->'delivery_date', v_old->'scheduled_date', v_old->'hire_start_date')
+            );
+        END IF;
+        IF (v_old->'assigned_driver_id') IS DISTINCT FROM (v_payload->'driver_id') THEN
+            v_payload := v_payload || jsonb_build_object('old_driver_id', v_old->'assigned_driver_id');
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('aetherflow_changes', jsonb_strip_nulls(v_payload)::TEXT);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Attach to the tables the diary, allocation and driver screens read from
+DROP TRIGGER IF EXISTS trg_notify_interactions ON interactions.interactions;
+CREATE TRIGGER trg_notify_interactions
+    AFTER INSERT OR UPDATE OR DELETE ON interactions.interactions
+    FOR EACH ROW EXECUTE FUNCTION sp_notify_change();
+
+DROP TRIGGER IF EXISTS trg_notify_generic_bookings ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_notify_generic_bookings
+    AFTER INSERT OR UPDATE OR DELETE ON interactions.interaction_equipment_generic
+    FOR EACH ROW EXECUTE FUNCTION sp_notify_change();
+
+DROP TRIGGER IF EXISTS trg_notify_allocations ON interactions.interaction_equipment;
+CREATE TRIGGER trg_notify_allocations
+    AFTER INSERT OR UPDATE OR DELETE ON interactions.interaction_equipment
+    FOR EACH ROW EXECUTE FUNCTION sp_notify_change();
+
+DROP TRIGGER IF EXISTS trg_notify_driver_tasks ON tasks.drivers_taskboard;
+CREATE TRIGGER trg_notify_driver_tasks
+    AFTER INSERT OR UPDATE OR DELETE ON tasks.drivers_taskboard
+    FOR EACH ROW EXECUTE FUNCTION sp_notify_change();
@@ -0,0 +1,187 @@
+-- =============================================================================
+-- DRIVER TASKBOARD PROCEDURES
+-- =============================================================================
+-- Equipment counts are pre-aggregated onto tasks.drivers_taskboard so board
+-- reads never join or group the generic bookings.
+
+-- Recalculate the stored equipment counts for every task of an interaction
+CREATE OR REPLACE FUNCTION sp_refresh_task_equipment_counts(
+    p_interaction_id INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE tasks.drivers_taskboard dt
+    SET
+        equipment_types_count = counts.equipment_types_count,
+        total_equipment = counts.total_equipment
+    FROM (
+        SELECT
+            COUNT(ieg.id)::INTEGER AS equipment_types_count,
+            COALESCE(SUM(ieg.quantity), 0)::INTEGER AS total_equipment
+        FROM interactions.interaction_equipment_generic ieg
+        WHERE ieg.interaction_id = p_interaction_id
+          AND ieg.booking_status != 'cancelled'
+    ) counts
+    WHERE dt.interaction_id = p_interaction_id
+      AND (dt.equipment_types_count, dt.total_equipment)
+          IS DISTINCT FROM (counts.equipment_types_count, counts.total_equipment);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Keep task counts in step with generic bookings
+CREATE OR REPLACE FUNCTION sp_task_equipment_counts_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM sp_refresh_task_equipment_counts(OLD.interaction_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.interaction_id != OLD.interaction_id) THEN
+        PERFORM sp_refresh_task_equipment_counts(NEW.interaction_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_task_equipment_counts ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_task_equipment_counts
+    AFTER INSERT OR UPDATE OF quantity, booking_status, interaction_id OR DELETE
+    ON interactions.interaction_equipment_generic
+    FOR EACH ROW EXECUTE FUNCTION sp_task_equipment_counts_trigger();
+
+-- New tasks pick up the counts of bookings created before them
+CREATE OR REPLACE FUNCTION sp_task_initial_counts_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT
+        COUNT(ieg.id)::INTEGER,
+        COALESCE(SUM(ieg.quantity), 0)::INTEGER
+    INTO NEW.equipment_types_count, NEW.total_equipment
+    FROM interactions.interaction_equipment_generic ieg
+    WHERE ieg.interaction_id = NEW.interaction_id
+      AND ieg.booking_status != 'cancelled';
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_task_initial_counts ON tasks.drivers_taskboard;
+CREATE TRIGGER trg_task_initial_counts
+    BEFORE INSERT ON tasks.drivers_taskboard
+    FOR EACH ROW EXECUTE FUNCTION sp_task_initial_counts_trigger();
+
+-- Backfill counts for tasks that existed before the columns were maintained
+UPDATE tasks.drivers_taskboard dt
+SET
+    equipment_types_count = counts.equipment_types_count,
+    total_equipment = counts.total_equipment
+FROM (
+    SELECT
+        ieg.interaction_id,
+        COUNT(ieg.id)::INTEGER AS equipment_types_count,
+        COALESCE(SUM(ieg.quantity), 0)::INTEGER AS total_equipment
+    FROM interactions.interaction_equipment_generic ieg
+    WHERE ieg.booking_status != 'cancelled'
+    GROUP BY ieg.interaction_id
+) counts
+WHERE dt.interaction_id = counts.interaction_id;
+
+-- Filtered driver task query (by driver, date range and status)
+-- LANGUAGE sql so the planner inlines it and the NULL filters fold away,
+-- leaving an index scan on idx_driver_tasks_driver_date / idx_driver_tasks_date_status
+CREATE OR REPLACE FUNCTION sp_get_driver_tasks(
+    p_driver_id INTEGER DEFAULT NULL,
+    p_date_from DATE DEFAULT NULL,
+    p_date_to DATE DEFAULT NULL,
+    p_statuses TEXT[] DEFAULT NULL,
+    p_unassigned_only BOOLEAN DEFAULT false,
+    p_limit INTEGER DEFAULT 500
+)
+RETURNS TABLE (
+    task_id INTEGER,
+    interaction_id INTEGER,
+    reference_number VARCHAR(20),
+    task_type VARCHAR(50),
+    status VARCHAR(20),
+    priority VARCHAR(20),
+    customer_name VARCHAR(255),
+    contact_name VARCHAR(255),
+    contact_phone VARCHAR(20),
+    contact_whatsapp VARCHAR(20),
+    site_address TEXT,
+    scheduled_date DATE,
+    scheduled_time TIME,
+    run_sequence INTEGER,
+    assigned_driver_id INTEGER,
+    assigned_driver VARCHAR(255),
+    equipment_allocated BOOLEAN,
+    equipment_verified BOOLEAN,
+    equipment_types_count INTEGER,
+    total_equipment INTEGER,
+    updated_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        dt.id,
+        dt.interaction_id,
+        i.reference_number,
+        dt.task_type,
+        dt.status,
+        dt.priority,
+        dt.customer_name,
+        dt.contact_name,
+        dt.contact_phone,
+        dt.contact_whatsapp,
+        dt.site_address,
+        dt.scheduled_date,
+        dt.scheduled_time,
+        dt.run_sequence,
+        dt.assigned_driver_id,
+        CASE
+            WHEN dt.assigned_driver_id IS NOT NULL
+            THEN (e.name || ' ' || e.surname)::VARCHAR(255)
+            ELSE 'Unassigned'::VARCHAR(255)
+        END,
+        dt.equipment_allocated,
+        dt.equipment_verified,
+        dt.equipment_types_count,
+        dt.total_equipment,
+        dt.updated_at
+    FROM tasks.drivers_taskboard dt
+    JOIN interactions.interactions i ON dt.interaction_id = i.id
+    LEFT JOIN core.employees e ON dt.assigned_driver_id = e.id
+    WHERE
+        (p_driver_id IS NULL OR dt.assigned_driver_id = p_driver_id)
+        AND (NOT p_unassigned_only OR dt.assigned_driver_id IS NULL)
+        AND (p_date_from IS NULL OR dt.scheduled_date >= p_date_from)
+        AND (p_date_to IS NULL OR dt.scheduled_date <= p_date_to)
+        AND (p_statuses IS NULL OR dt.status = ANY(p_statuses))
+    ORDER BY
+        dt.scheduled_date, dt.run_sequence NULLS LAST, dt.scheduled_time NULLS LAST,
+        CASE dt.priority
+            WHEN 'urgent' THEN 1
+            WHEN 'high' THEN 2
+            WHEN 'medium' THEN 3
+            ELSE 4
+        END,
+        dt.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Active drivers for the taskboard columns
+CREATE OR REPLACE FUNCTION sp_get_active_drivers()
+RETURNS TABLE (
+    driver_id INTEGER,
+    employee_code VARCHAR(20),
+    driver_name VARCHAR(255),
+    phone_number VARCHAR(20),
+    whatsapp_number VARCHAR(20)
+) AS $$
+    SELECT
+        e.id,
+        e.employee_code,
+        (e.name || ' ' || e.surname)::VARCHAR(255),
+        e.phone_number,
+        e.whatsapp_number
+    FROM core.employees e
+    WHERE e.role = 'driver'
+      AND e.status = 'active'
+    ORDER BY e.name, e.surname;
+$$ LANGUAGE sql STABLE;
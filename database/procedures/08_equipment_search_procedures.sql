@@ -0,0 +1,146 @@
+-- =============================================================================
+-- EQUIPMENT SEARCH PROCEDURES
+-- =============================================================================
+-- Support for the in-process equipment search index (api/equipment/search_index.py).
+-- The index does the text matching; these procedures load its documents and
+-- check availability for the matched candidates only.
+
+-- Publish equipment and type changes so the index refreshes incrementally
+DROP TRIGGER IF EXISTS trg_notify_equipment ON equipment.equipment;
+CREATE TRIGGER trg_notify_equipment
+    AFTER INSERT OR UPDATE OR DELETE ON equipment.equipment
+    FOR EACH ROW EXECUTE FUNCTION sp_notify_change();
+
+DROP TRIGGER IF EXISTS trg_notify_equipment_types ON equipment.equipment_types;
+CREATE TRIGGER trg_notify_equipment_types
+    AFTER INSERT OR UPDATE OR DELETE ON equipment.equipment_types
+    FOR EACH ROW EXECUTE FUNCTION sp_notify_change();
+
+-- Equipment unit documents for the search index (all, changed, or by id/type)
+CREATE OR REPLACE FUNCTION sp_get_equipment_search_documents(
+    p_changed_since TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_equipment_ids INTEGER[] DEFAULT NULL,
+    p_equipment_type_ids INTEGER[] DEFAULT NULL
+)
+RETURNS TABLE (
+    equipment_id INTEGER,
+    asset_code VARCHAR(20),
+    equipment_type_id INTEGER,
+    type_code VARCHAR(20),
+    type_name VARCHAR(255),
+    model VARCHAR(100),
+    serial_number VARCHAR(50),
+    condition VARCHAR(20),
+    location VARCHAR(100),
+    status VARCHAR(20),
+    type_is_active BOOLEAN,
+    last_service_date DATE,
+    next_service_due DATE,
+    updated_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        e.id,
+        e.asset_code,
+        e.equipment_type_id,
+        et.type_code,
+        et.type_name,
+        e.model,
+        e.serial_number,
+        e.condition,
+        e.location,
+        e.status,
+        et.is_active,
+        e.last_service_date,
+        e.next_service_due,
+        GREATEST(e.updated_at, et.updated_at)
+    FROM equipment.equipment e
+    JOIN equipment.equipment_types et ON e.equipment_type_id = et.id
+    WHERE
+        (p_changed_since IS NULL OR e.updated_at > p_changed_since OR et.updated_at > p_changed_since)
+        AND (p_equipment_ids IS NULL OR e.id = ANY(p_equipment_ids))
+        AND (p_equipment_type_ids IS NULL OR e.equipment_type_id = ANY(p_equipment_type_ids));
+$$ LANGUAGE sql STABLE;
+
+-- Equipment type documents for the search index
+CREATE OR REPLACE FUNCTION sp_get_equipment_type_search_documents(
+    p_changed_since TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_equipment_type_ids INTEGER[] DEFAULT NULL
+)
+RETURNS TABLE (
+    equipment_type_id INTEGER,
+    type_code VARCHAR(20),
+    type_name VARCHAR(255),
+    description TEXT,
+    specifications TEXT,
+    daily_rate DECIMAL(10,2),
+    weekly_rate DECIMAL(10,2),
+    monthly_rate DECIMAL(10,2),
+    is_active BOOLEAN,
+    updated_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        et.id,
+        et.type_code,
+        et.type_name,
+        et.description,
+        et.specifications,
+        et.daily_rate,
+        et.weekly_rate,
+        et.monthly_rate,
+        et.is_active,
+        et.updated_at
+    FROM equipment.equipment_types et
+    WHERE
+        (p_changed_since IS NULL OR et.updated_at > p_changed_since)
+        AND (p_equipment_type_ids IS NULL OR et.id = ANY(p_equipment_type_ids));
+$$ LANGUAGE sql STABLE;
+
+-- Which of the candidate units are free for the hire period
+CREATE OR REPLACE FUNCTION sp_filter_available_equipment(
+    p_equipment_ids INTEGER[],
+    p_hire_start_date DATE DEFAULT CURRENT_DATE,
+    p_hire_end_date DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    equipment_id INTEGER
+) AS $$
+    SELECT e.id
+    FROM equipment.equipment e
+    WHERE e.id = ANY(p_equipment_ids)
+      AND e.status = 'available'
+      AND NOT EXISTS (
+          -- Exclude equipment already booked for an overlapping period
+          SELECT 1
+          FROM interactions.interaction_equipment ie
+          WHERE ie.equipment_id = e.id
+            AND ie.hire_period && sp_requested_period(p_hire_start_date, p_hire_end_date)
+      );
+$$ LANGUAGE sql STABLE;
+
+-- Available / total unit counts for a page of equipment types
+CREATE OR REPLACE FUNCTION sp_get_equipment_type_availability(
+    p_equipment_type_ids INTEGER[],
+    p_hire_start_date DATE DEFAULT CURRENT_DATE,
+    p_hire_end_date DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    equipment_type_id INTEGER,
+    available_units INTEGER,
+    total_units INTEGER
+) AS $$
+    SELECT
+        e.equipment_type_id,
+        COUNT(*) FILTER (
+            WHERE e.status = 'available'
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM interactions.interaction_equipment ie
+                  WHERE ie.equipment_id = e.id
+                    AND ie.hire_period && sp_requested_period(p_hire_start_date, p_hire_end_date)
+              )
+        )::INTEGER,
+        COUNT(*) FILTER (WHERE e.status IN ('available', 'rented'))::INTEGER
+    FROM equipment.equipment e
+    WHERE e.equipment_type_id = ANY(p_equipment_type_ids)
+    GROUP BY e.equipment_type_id;
+$$ LANGUAGE sql STABLE;
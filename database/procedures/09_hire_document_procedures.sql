@@ -0,0 +1,332 @@
+-- =============================================================================
+-- HIRE DOCUMENT PROCEDURES
+-- =============================================================================
+-- interactions.hire_documents holds one prebuilt JSONB document per hire.
+-- Triggers rebuild a hire's document whenever the hire, its equipment lines,
+-- allocations or accessories change, so opening a hire is a primary-key read.
+
+-- Build the document for one hire (NULL if it is not a hire)
+CREATE OR REPLACE FUNCTION sp_build_hire_document(p_hire_id INTEGER)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'interaction_id', i.id,
+        'reference_number', i.reference_number,
+        'customer_id', i.customer_id,
+        'customer_name', c.customer_name,
+        'contact_id', i.contact_id,
+        'contact_name', ct.first_name || ' ' || ct.last_name,
+        'contact_phone', ct.phone_number,
+        'contact_email', ct.email,
+        'site_id', i.site_id,
+        'site_name', s.site_name,
+        'site_address', CONCAT_WS(', ', s.address_line1, s.address_line2, s.city, s.province, s.postal_code),
+        'hire_start_date', i.hire_start_date,
+        'hire_end_date', i.hire_end_date,
+        'delivery_date', i.delivery_date,
+        'delivery_time', i.delivery_time,
+        'contact_method', i.contact_method,
+        'special_instructions', i.special_instructions,
+        'notes', i.notes,
+        'status', i.status,
+        'allocation_status', CASE
+            WHEN lines.booked_quantity > 0 AND units.allocated_count >= lines.booked_quantity THEN 'allocated'
+            WHEN units.allocated_count > 0 THEN 'partially_allocated'
+            ELSE 'not_allocated'
+        END,
+        'created_at', i.created_at,
+        'updated_at', i.updated_at,
+        'equipment', lines.items || units.items,
+        'accessories', accessories.items
+    )
+    FROM interactions.interactions i
+    JOIN core.customers c ON i.customer_id = c.id
+    JOIN core.contacts ct ON i.contact_id = ct.id
+    LEFT JOIN core.sites s ON i.site_id = s.id
+    -- Generic equipment lines
+    CROSS JOIN LATERAL (
+        SELECT
+            COALESCE(SUM(ieg.quantity), 0) AS booked_quantity,
+            COALESCE(jsonb_agg(jsonb_build_object(
+                'id', ieg.id,
+                'mode', 'generic',
+                'equipment_type_id', et.id,
+                'equipment_id', NULL,
+                'name', et.type_name,
+                'code', et.type_code,
+                'quantity', ieg.quantity,
+                'daily_rate', et.daily_rate,
+                'asset_code', NULL,
+                'condition', NULL,
+                'status', ieg.booking_status
+            ) ORDER BY ieg.id), '[]'::JSONB) AS items
+        FROM interactions.interaction_equipment_generic ieg
+        JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
+        JOIN equipment.equipment_types et ON eg.equipment_type_id = et.id
+        WHERE ieg.interaction_id = i.id
+    ) lines
+    -- Specific (allocated) units
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(ie.id) AS allocated_count,
+            COALESCE(jsonb_agg(jsonb_build_object(
+                'id', ie.id,
+                'mode', 'specific',
+                'equipment_type_id', et.id,
+                'equipment_id', e.id,
+                'name', et.type_name,
+                'code', e.asset_code,
+                'quantity', 1,
+                'daily_rate', et.daily_rate,
+                'asset_code', e.asset_code,
+                'condition', e.condition,
+                'status', ie.allocation_status,
+                'booking_id', ie.equipment_generic_booking_id
+            ) ORDER BY ie.id), '[]'::JSONB) AS items
+        FROM interactions.interaction_equipment ie
+        JOIN equipment.equipment e ON ie.equipment_id = e.id
+        JOIN equipment.equipment_types et ON e.equipment_type_id = et.id
+        WHERE ie.interaction_id = i.id
+    ) units
+    -- Accessories
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'accessory_id', a.id,
+                'accessory_name', a.accessory_name,
+                'accessory_code', a.accessory_code,
+                'quantity', ia.quantity,
+                'accessory_type', ia.accessory_type,
+                'unit_of_measure', a.unit_of_measure,
+                'unit_rate', a.unit_rate,
+                'booking_id', ia.equipment_generic_booking_id
+            ) ORDER BY ia.id), '[]'::JSONB) AS items
+        FROM interactions.interaction_accessories ia
+        JOIN equipment.accessories a ON ia.accessory_id = a.id
+        WHERE ia.interaction_id = i.id
+    ) accessories
+    WHERE i.id = p_hire_id
+      AND i.interaction_type = 'hire';
+$$ LANGUAGE sql STABLE;
+
+-- Rebuild and store one hire's document (removes it if the hire no longer exists).
+-- The hire row is locked first, so two transactions changing the same hire rebuild
+-- one after the other: the second waits for the first to commit and then builds
+-- from a snapshot that includes its change. NO KEY UPDATE still lets other
+-- transactions insert lines that reference the hire.
+CREATE OR REPLACE FUNCTION sp_refresh_hire_document(p_hire_id INTEGER)
+RETURNS JSONB AS $$
+DECLARE
+    v_document JSONB;
+BEGIN
+    PERFORM 1 FROM interactions.interactions i WHERE i.id = p_hire_id FOR NO KEY UPDATE;
+
+    v_document := sp_build_hire_document(p_hire_id);
+
+    IF v_document IS NULL THEN
+        DELETE FROM interactions.hire_documents WHERE interaction_id = p_hire_id;
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO interactions.hire_documents (interaction_id, document, built_at)
+    VALUES (p_hire_id, v_document, CURRENT_TIMESTAMP)
+    ON CONFLICT (interaction_id) DO UPDATE
+    SET document = EXCLUDED.document,
+        built_at = EXCLUDED.built_at;
+
+    RETURN v_document;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Stored document as JSON text, built on first read if missing
+CREATE OR REPLACE FUNCTION sp_get_hire_document(p_hire_id INTEGER)
+RETURNS TEXT AS $$
+DECLARE
+    v_document TEXT;
+BEGIN
+    SELECT hd.document::TEXT INTO v_document
+    FROM interactions.hire_documents hd
+    WHERE hd.interaction_id = p_hire_id;
+
+    IF NOT FOUND THEN
+        v_document := sp_refresh_hire_document(p_hire_id)::TEXT;
+    END IF;
+
+    RETURN v_document;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- TRIGGERS
+-- =============================================================================
+
+-- Hire headers, lines, allocations and accessories: rebuild each affected hire once
+-- per statement (in id order), so allocating, signing off, off-hiring or bulk-editing
+-- a whole site costs one rebuild per hire, not one per row
+CREATE OR REPLACE FUNCTION sp_hire_document_rows_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'interactions' THEN
+        PERFORM sp_refresh_hire_document(affected.id)
+        FROM (SELECT DISTINCT id FROM new_rows WHERE interaction_type = 'hire' ORDER BY id) affected;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM sp_refresh_hire_document(affected.interaction_id)
+        FROM (SELECT DISTINCT interaction_id FROM new_rows ORDER BY interaction_id) affected;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM sp_refresh_hire_document(affected.interaction_id)
+        FROM (SELECT DISTINCT interaction_id FROM old_rows ORDER BY interaction_id) affected;
+    ELSE
+        PERFORM sp_refresh_hire_document(affected.interaction_id)
+        FROM (
+            SELECT interaction_id FROM new_rows
+            UNION
+            SELECT interaction_id FROM old_rows
+            ORDER BY interaction_id
+        ) affected;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_hire_document_interactions ON interactions.interactions;
+DROP TRIGGER IF EXISTS trg_hire_document_interactions_insert ON interactions.interactions;
+CREATE TRIGGER trg_hire_document_interactions_insert
+    AFTER INSERT ON interactions.interactions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_interactions_update ON interactions.interactions;
+CREATE TRIGGER trg_hire_document_interactions_update
+    AFTER UPDATE ON interactions.interactions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_generic ON interactions.interaction_equipment_generic;
+DROP TRIGGER IF EXISTS trg_hire_document_generic_insert ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_hire_document_generic_insert
+    AFTER INSERT ON interactions.interaction_equipment_generic
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_generic_update ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_hire_document_generic_update
+    AFTER UPDATE ON interactions.interaction_equipment_generic
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_generic_delete ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_hire_document_generic_delete
+    AFTER DELETE ON interactions.interaction_equipment_generic
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_allocations ON interactions.interaction_equipment;
+DROP TRIGGER IF EXISTS trg_hire_document_allocations_insert ON interactions.interaction_equipment;
+CREATE TRIGGER trg_hire_document_allocations_insert
+    AFTER INSERT ON interactions.interaction_equipment
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_allocations_update ON interactions.interaction_equipment;
+CREATE TRIGGER trg_hire_document_allocations_update
+    AFTER UPDATE ON interactions.interaction_equipment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_allocations_delete ON interactions.interaction_equipment;
+CREATE TRIGGER trg_hire_document_allocations_delete
+    AFTER DELETE ON interactions.interaction_equipment
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_accessories ON interactions.interaction_accessories;
+DROP TRIGGER IF EXISTS trg_hire_document_accessories_insert ON interactions.interaction_accessories;
+CREATE TRIGGER trg_hire_document_accessories_insert
+    AFTER INSERT ON interactions.interaction_accessories
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_accessories_update ON interactions.interaction_accessories;
+CREATE TRIGGER trg_hire_document_accessories_update
+    AFTER UPDATE ON interactions.interaction_accessories
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_accessories_delete ON interactions.interaction_accessories;
+CREATE TRIGGER trg_hire_document_accessories_delete
+    AFTER DELETE ON interactions.interaction_accessories
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_hire_document_rows_trigger();
+
+-- Replaced by sp_hire_document_rows_trigger
+DROP FUNCTION IF EXISTS sp_hire_document_line_trigger();
+DROP FUNCTION IF EXISTS sp_hire_document_allocations_trigger();
+
+-- Master data shown in documents: rebuild the hires that reference the changed row
+CREATE OR REPLACE FUNCTION sp_hire_document_master_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM sp_refresh_hire_document(affected.interaction_id)
+    FROM (
+        SELECT i.id AS interaction_id
+        FROM interactions.interactions i
+        WHERE i.interaction_type = 'hire'
+          AND ((TG_TABLE_NAME = 'customers' AND i.customer_id = NEW.id)
+            OR (TG_TABLE_NAME = 'contacts' AND i.contact_id = NEW.id)
+            OR (TG_TABLE_NAME = 'sites' AND i.site_id = NEW.id))
+        UNION
+        SELECT ie.interaction_id
+        FROM interactions.interaction_equipment ie
+        WHERE TG_TABLE_NAME = 'equipment' AND ie.equipment_id = NEW.id
+        UNION
+        SELECT ieg.interaction_id
+        FROM interactions.interaction_equipment_generic ieg
+        JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
+        WHERE TG_TABLE_NAME = 'equipment_types' AND eg.equipment_type_id = NEW.id
+        UNION
+        SELECT ie.interaction_id
+        FROM interactions.interaction_equipment ie
+        JOIN equipment.equipment e ON ie.equipment_id = e.id
+        WHERE TG_TABLE_NAME = 'equipment_types' AND e.equipment_type_id = NEW.id
+        UNION
+        SELECT ia.interaction_id
+        FROM interactions.interaction_accessories ia
+        WHERE TG_TABLE_NAME = 'accessories' AND ia.accessory_id = NEW.id
+    ) affected;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_hire_document_customers ON core.customers;
+CREATE TRIGGER trg_hire_document_customers
+    AFTER UPDATE OF customer_name ON core.customers
+    FOR EACH ROW EXECUTE FUNCTION sp_hire_document_master_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_contacts ON core.contacts;
+CREATE TRIGGER trg_hire_document_contacts
+    AFTER UPDATE OF first_name, last_name, phone_number, email ON core.contacts
+    FOR EACH ROW EXECUTE FUNCTION sp_hire_document_master_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_sites ON core.sites;
+CREATE TRIGGER trg_hire_document_sites
+    AFTER UPDATE OF site_name, address_line1, address_line2, city, province, postal_code ON core.sites
+    FOR EACH ROW EXECUTE FUNCTION sp_hire_document_master_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_equipment ON equipment.equipment;
+CREATE TRIGGER trg_hire_document_equipment
+    AFTER UPDATE OF asset_code, condition ON equipment.equipment
+    FOR EACH ROW EXECUTE FUNCTION sp_hire_document_master_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_equipment_types ON equipment.equipment_types;
+CREATE TRIGGER trg_hire_document_equipment_types
+    AFTER UPDATE OF type_name, type_code, daily_rate ON equipment.equipment_types
+    FOR EACH ROW EXECUTE FUNCTION sp_hire_document_master_trigger();
+
+DROP TRIGGER IF EXISTS trg_hire_document_accessories_master ON equipment.accessories;
+CREATE TRIGGER trg_hire_document_accessories_master
+    AFTER UPDATE OF accessory_name, accessory_code, unit_of_measure, unit_rate ON equipment.accessories
+    FOR EACH ROW EXECUTE FUNCTION sp_hire_document_master_trigger();
+
+-- Backfill documents for existing hires
+SELECT sp_refresh_hire_document(i.id)
+FROM interactions.interactions i
+WHERE i.interaction_type = 'hire'
+  AND NOT EXISTS (SELECT 1 FROM interactions.hire_documents hd WHERE hd.interaction_id = i.id);
@@ -0,0 +1,757 @@
+-- =============================================================================
+-- BULK DATA PROCEDURES
+-- =============================================================================
+-- Set-based bulk import and export used by api/bulk (CLI and /api/bulk).
+-- Import: the API creates a per-transaction staging table, COPYs the CSV into it,
+-- validates every row in a few set-based checks (errors keyed by CSV line), then
+-- upserts the valid rows in one statement per target table.
+-- Export: sp_export_* functions are wrapped in COPY (...) TO STDOUT.
+
+-- =============================================================================
+-- VALUE CHECKS
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION sp_bulk_is_integer(p_value TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT p_value IS NULL OR TRIM(p_value) = '' OR TRIM(p_value) ~ '^-?\d{1,9}$';
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION sp_bulk_is_numeric(p_value TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT p_value IS NULL OR TRIM(p_value) = '' OR TRIM(p_value) ~ '^-?\d{1,13}(\.\d{1,2})?$';
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION sp_bulk_is_boolean(p_value TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT p_value IS NULL OR TRIM(p_value) = ''
+        OR LOWER(TRIM(p_value)) IN ('true', 'false', 't', 'f', 'yes', 'no', 'y', 'n', '1', '0');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION sp_bulk_to_boolean(p_value TEXT, p_default BOOLEAN)
+RETURNS BOOLEAN AS $$
+    SELECT CASE
+        WHEN p_value IS NULL OR TRIM(p_value) = '' THEN p_default
+        ELSE LOWER(TRIM(p_value)) IN ('true', 't', 'yes', 'y', '1')
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION sp_bulk_is_date(p_value TEXT)
+RETURNS BOOLEAN AS $$
+BEGIN
+    IF p_value IS NULL OR TRIM(p_value) = '' THEN
+        RETURN true;
+    END IF;
+    PERFORM TRIM(p_value)::DATE;
+    RETURN true;
+EXCEPTION WHEN others THEN
+    RETURN false;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Empty CSV fields become NULL
+CREATE OR REPLACE FUNCTION sp_bulk_text(p_value TEXT)
+RETURNS TEXT AS $$
+    SELECT NULLIF(TRIM(p_value), '');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- =============================================================================
+-- STAGING
+-- =============================================================================
+
+-- Create the staging and error tables for one import (dropped at commit/rollback)
+CREATE OR REPLACE FUNCTION sp_bulk_create_stage(p_entity VARCHAR)
+RETURNS VOID AS $$
+BEGIN
+    CREATE TEMP TABLE bulk_stage_errors (
+        line_no BIGINT NOT NULL,
+        field TEXT,
+        message TEXT NOT NULL
+    ) ON COMMIT DROP;
+
+    IF p_entity = 'equipment' THEN
+        CREATE TEMP TABLE bulk_stage_equipment (
+            line_no BIGSERIAL,
+            asset_code TEXT,
+            type_code TEXT,
+            serial_number TEXT,
+            model TEXT,
+            year_manufactured TEXT,
+            date_acquired TEXT,
+            condition TEXT,
+            location TEXT,
+            status TEXT,
+            last_service_date TEXT,
+            next_service_due TEXT,
+            notes TEXT
+        ) ON COMMIT DROP;
+    ELSIF p_entity = 'customers' THEN
+        CREATE TEMP TABLE bulk_stage_customers (
+            line_no BIGSERIAL,
+            customer_code TEXT,
+            customer_name TEXT,
+            is_company TEXT,
+            registration_number TEXT,
+            vat_number TEXT,
+            credit_limit TEXT,
+            payment_terms TEXT,
+            status TEXT
+        ) ON COMMIT DROP;
+    ELSIF p_entity = 'contacts' THEN
+        CREATE TEMP TABLE bulk_stage_contacts (
+            line_no BIGSERIAL,
+            customer_code TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            job_title TEXT,
+            department TEXT,
+            email TEXT,
+            phone_number TEXT,
+            whatsapp_number TEXT,
+            is_primary_contact TEXT,
+            is_billing_contact TEXT,
+            status TEXT
+        ) ON COMMIT DROP;
+    ELSIF p_entity = 'sites' THEN
+        CREATE TEMP TABLE bulk_stage_sites (
+            line_no BIGSERIAL,
+            customer_code TEXT,
+            site_code TEXT,
+            site_name TEXT,
+            site_type TEXT,
+            address_line1 TEXT,
+            address_line2 TEXT,
+            city TEXT,
+            province TEXT,
+            postal_code TEXT,
+            country TEXT,
+            site_contact_name TEXT,
+            site_contact_phone TEXT,
+            delivery_instructions TEXT
+        ) ON COMMIT DROP;
+    ELSE
+        RAISE EXCEPTION 'Unknown bulk import entity: %', p_entity;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- EQUIPMENT UNITS (key: asset_code)
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION sp_bulk_validate_equipment()
+RETURNS INTEGER AS $$
+DECLARE
+    v_errors INTEGER;
+BEGIN
+    INSERT INTO bulk_stage_errors (line_no, field, message)
+    SELECT s.line_no, 'asset_code', 'asset_code is required'
+    FROM bulk_stage_equipment s WHERE sp_bulk_text(s.asset_code) IS NULL
+    UNION ALL
+    SELECT d.line_no, 'asset_code', 'duplicate asset_code in file (first on line ' || d.first_line || ')'
+    FROM (
+        SELECT s.line_no, MIN(s.line_no) OVER (PARTITION BY UPPER(TRIM(s.asset_code))) AS first_line
+        FROM bulk_stage_equipment s WHERE sp_bulk_text(s.asset_code) IS NOT NULL
+    ) d WHERE d.line_no <> d.first_line
+    UNION ALL
+    SELECT s.line_no, 'type_code', 'unknown type_code ' || COALESCE(quote_literal(s.type_code), '(empty)')
+    FROM bulk_stage_equipment s
+    WHERE NOT EXISTS (SELECT 1 FROM equipment.equipment_types et WHERE et.type_code = TRIM(s.type_code))
+    UNION ALL
+    SELECT s.line_no, 'serial_number', 'serial_number already belongs to ' || e.asset_code
+    FROM bulk_stage_equipment s
+    JOIN equipment.equipment e ON e.serial_number = TRIM(s.serial_number)
+    WHERE e.asset_code <> UPPER(TRIM(s.asset_code))
+    UNION ALL
+    SELECT d.line_no, 'serial_number', 'duplicate serial_number in file (first on line ' || d.first_line || ')'
+    FROM (
+        SELECT s.line_no, MIN(s.line_no) OVER (PARTITION BY TRIM(s.serial_number)) AS first_line
+        FROM bulk_stage_equipment s WHERE sp_bulk_text(s.serial_number) IS NOT NULL
+    ) d WHERE d.line_no <> d.first_line
+    UNION ALL
+    SELECT s.line_no, f.field, f.field || ' is longer than ' || f.max_length || ' characters'
+    FROM bulk_stage_equipment s
+    CROSS JOIN LATERAL (VALUES
+        ('asset_code', s.asset_code, 20),
+        ('serial_number', s.serial_number, 50),
+        ('model', s.model, 100),
+        ('location', s.location, 100)
+    ) f(field, value, max_length)
+    WHERE char_length(TRIM(f.value)) > f.max_length
+    UNION ALL
+    SELECT s.line_no, 'condition', 'condition must be excellent, good, fair, poor or out_of_service'
+    FROM bulk_stage_equipment s
+    WHERE sp_bulk_text(s.condition) IS NOT NULL
+      AND LOWER(TRIM(s.condition)) NOT IN ('excellent', 'good', 'fair', 'poor', 'out_of_service')
+    UNION ALL
+    SELECT s.line_no, 'status', 'status must be available, rented, maintenance, repair or sold'
+    FROM bulk_stage_equipment s
+    WHERE sp_bulk_text(s.status) IS NOT NULL
+      AND LOWER(TRIM(s.status)) NOT IN ('available', 'rented', 'maintenance', 'repair', 'sold')
+    UNION ALL
+    SELECT s.line_no, 'year_manufactured', 'year_manufactured must be a whole number'
+    FROM bulk_stage_equipment s WHERE NOT sp_bulk_is_integer(s.year_manufactured)
+    UNION ALL
+    SELECT s.line_no, f.field, f.field || ' must be a date (YYYY-MM-DD)'
+    FROM bulk_stage_equipment s
+    CROSS JOIN LATERAL (VALUES
+        ('date_acquired', s.date_acquired),
+        ('last_service_date', s.last_service_date),
+        ('next_service_due', s.next_service_due)
+    ) f(field, value)
+    WHERE NOT sp_bulk_is_date(f.value);
+
+    SELECT COUNT(*) INTO v_errors FROM bulk_stage_errors;
+    RETURN v_errors;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Existing units (matched on asset_code) take only the values the CSV supplies;
+-- blank cells keep what is there. Defaults apply only to new units.
+CREATE OR REPLACE FUNCTION sp_bulk_apply_equipment(p_employee_id INTEGER)
+RETURNS TABLE (inserted INTEGER, updated INTEGER) AS $$
+DECLARE
+    v_inserted INTEGER;
+    v_updated INTEGER;
+BEGIN
+    UPDATE equipment.equipment e
+    SET equipment_type_id = et.id,
+        serial_number = COALESCE(sp_bulk_text(s.serial_number), e.serial_number),
+        model = COALESCE(sp_bulk_text(s.model), e.model),
+        year_manufactured = COALESCE(sp_bulk_text(s.year_manufactured)::INTEGER, e.year_manufactured),
+        date_acquired = COALESCE(sp_bulk_text(s.date_acquired)::DATE, e.date_acquired),
+        condition = COALESCE(LOWER(sp_bulk_text(s.condition)), e.condition),
+        location = COALESCE(sp_bulk_text(s.location), e.location),
+        status = COALESCE(LOWER(sp_bulk_text(s.status)), e.status),
+        last_service_date = COALESCE(sp_bulk_text(s.last_service_date)::DATE, e.last_service_date),
+        next_service_due = COALESCE(sp_bulk_text(s.next_service_due)::DATE, e.next_service_due),
+        notes = COALESCE(sp_bulk_text(s.notes), e.notes)
+    FROM bulk_stage_equipment s
+    JOIN equipment.equipment_types et ON et.type_code = TRIM(s.type_code)
+    WHERE e.asset_code = UPPER(TRIM(s.asset_code))
+      AND NOT EXISTS (SELECT 1 FROM bulk_stage_errors be WHERE be.line_no = s.line_no);
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    INSERT INTO equipment.equipment (
+        equipment_type_id, asset_code, serial_number, model, year_manufactured, date_acquired,
+        condition, location, status, last_service_date, next_service_due, notes, created_by
+    )
+    SELECT
+        et.id,
+        UPPER(TRIM(s.asset_code)),
+        sp_bulk_text(s.serial_number),
+        sp_bulk_text(s.model),
+        sp_bulk_text(s.year_manufactured)::INTEGER,
+        sp_bulk_text(s.date_acquired)::DATE,
+        COALESCE(LOWER(sp_bulk_text(s.condition)), 'good'),
+        COALESCE(sp_bulk_text(s.location), 'depot'),
+        COALESCE(LOWER(sp_bulk_text(s.status)), 'available'),
+        sp_bulk_text(s.last_service_date)::DATE,
+        sp_bulk_text(s.next_service_due)::DATE,
+        sp_bulk_text(s.notes),
+        p_employee_id
+    FROM bulk_stage_equipment s
+    JOIN equipment.equipment_types et ON et.type_code = TRIM(s.type_code)
+    WHERE NOT EXISTS (SELECT 1 FROM bulk_stage_errors be WHERE be.line_no = s.line_no)
+      AND NOT EXISTS (SELECT 1 FROM equipment.equipment e WHERE e.asset_code = UPPER(TRIM(s.asset_code)))
+    ORDER BY s.line_no
+    -- A unit another import added since the update is left as that import wrote it
+    ON CONFLICT (asset_code) DO NOTHING;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    RETURN QUERY SELECT v_inserted, v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- CUSTOMERS (key: customer_code)
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION sp_bulk_validate_customers()
+RETURNS INTEGER AS $$
+DECLARE
+    v_errors INTEGER;
+BEGIN
+    INSERT INTO bulk_stage_errors (line_no, field, message)
+    SELECT s.line_no, 'customer_code', 'customer_code is required'
+    FROM bulk_stage_customers s WHERE sp_bulk_text(s.customer_code) IS NULL
+    UNION ALL
+    SELECT d.line_no, 'customer_code', 'duplicate customer_code in file (first on line ' || d.first_line || ')'
+    FROM (
+        SELECT s.line_no, MIN(s.line_no) OVER (PARTITION BY UPPER(TRIM(s.customer_code))) AS first_line
+        FROM bulk_stage_customers s WHERE sp_bulk_text(s.customer_code) IS NOT NULL
+    ) d WHERE d.line_no <> d.first_line
+    UNION ALL
+    SELECT s.line_no, 'customer_name', 'customer_name is required'
+    FROM bulk_stage_customers s WHERE sp_bulk_text(s.customer_name) IS NULL
+    UNION ALL
+    SELECT s.line_no, 'is_company', 'is_company must be true or false'
+    FROM bulk_stage_customers s WHERE NOT sp_bulk_is_boolean(s.is_company)
+    UNION ALL
+    SELECT s.line_no, 'credit_limit', 'credit_limit must be a number'
+    FROM bulk_stage_customers s WHERE NOT sp_bulk_is_numeric(s.credit_limit)
+    UNION ALL
+    SELECT s.line_no, 'status', 'status must be active, inactive, suspended or credit_hold'
+    FROM bulk_stage_customers s
+    WHERE sp_bulk_text(s.status) IS NOT NULL
+      AND LOWER(TRIM(s.status)) NOT IN ('active', 'inactive', 'suspended', 'credit_hold')
+    UNION ALL
+    SELECT s.line_no, f.field, f.field || ' is longer than ' || f.max_length || ' characters'
+    FROM bulk_stage_customers s
+    CROSS JOIN LATERAL (VALUES
+        ('customer_code', s.customer_code, 20),
+        ('customer_name', s.customer_name, 255),
+        ('registration_number', s.registration_number, 50),
+        ('vat_number', s.vat_number, 20),
+        ('payment_terms', s.payment_terms, 50)
+    ) f(field, value, max_length)
+    WHERE char_length(TRIM(f.value)) > f.max_length;
+
+    SELECT COUNT(*) INTO v_errors FROM bulk_stage_errors;
+    RETURN v_errors;
+END;
+$$ LANGUAGE plpgsql;
+
+-- As for equipment: blank cells keep the existing customer's values (credit
+-- limit, terms, status), and defaults apply only to new customers
+CREATE OR REPLACE FUNCTION sp_bulk_apply_customers(p_employee_id INTEGER)
+RETURNS TABLE (inserted INTEGER, updated INTEGER) AS $$
+DECLARE
+    v_inserted INTEGER;
+    v_updated INTEGER;
+BEGIN
+    UPDATE core.customers c
+    SET customer_name = TRIM(s.customer_name),
+        is_company = sp_bulk_to_boolean(s.is_company, c.is_company),
+        registration_number = COALESCE(sp_bulk_text(s.registration_number), c.registration_number),
+        vat_number = COALESCE(sp_bulk_text(s.vat_number), c.vat_number),
+        credit_limit = COALESCE(sp_bulk_text(s.credit_limit)::DECIMAL(15,2), c.credit_limit),
+        payment_terms = COALESCE(sp_bulk_text(s.payment_terms), c.payment_terms),
+        status = COALESCE(LOWER(sp_bulk_text(s.status)), c.status)
+    FROM bulk_stage_customers s
+    WHERE c.customer_code = UPPER(TRIM(s.customer_code))
+      AND NOT EXISTS (SELECT 1 FROM bulk_stage_errors be WHERE be.line_no = s.line_no);
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    INSERT INTO core.customers (
+        customer_code, customer_name, is_company, registration_number, vat_number,
+        credit_limit, payment_terms, status, created_by
+    )
+    SELECT
+        UPPER(TRIM(s.customer_code)),
+        TRIM(s.customer_name),
+        sp_bulk_to_boolean(s.is_company, true),
+        sp_bulk_text(s.registration_number),
+        sp_bulk_text(s.vat_number),
+        COALESCE(sp_bulk_text(s.credit_limit)::DECIMAL(15,2), 0.00),
+        COALESCE(sp_bulk_text(s.payment_terms), '30 days'),
+        COALESCE(LOWER(sp_bulk_text(s.status)), 'active'),
+        p_employee_id
+    FROM bulk_stage_customers s
+    WHERE NOT EXISTS (SELECT 1 FROM bulk_stage_errors be WHERE be.line_no = s.line_no)
+      AND NOT EXISTS (SELECT 1 FROM core.customers c WHERE c.customer_code = UPPER(TRIM(s.customer_code)))
+    ORDER BY s.line_no
+    ON CONFLICT (customer_code) DO NOTHING;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    RETURN QUERY SELECT v_inserted, v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- CONTACTS (key: customer + email, or customer + name when there is no email)
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION sp_bulk_validate_contacts()
+RETURNS INTEGER AS $$
+DECLARE
+    v_errors INTEGER;
+BEGIN
+    INSERT INTO bulk_stage_errors (line_no, field, message)
+    SELECT s.line_no, 'customer_code', 'unknown customer_code ' || COALESCE(quote_literal(s.customer_code), '(empty)')
+    FROM bulk_stage_contacts s
+    WHERE NOT EXISTS (SELECT 1 FROM core.customers c WHERE c.customer_code = UPPER(TRIM(s.customer_code)))
+    UNION ALL
+    SELECT s.line_no, 'first_name', 'first_name is required'
+    FROM bulk_stage_contacts s WHERE sp_bulk_text(s.first_name) IS NULL
+    UNION ALL
+    SELECT s.line_no, 'last_name', 'last_name is required'
+    FROM bulk_stage_contacts s WHERE sp_bulk_text(s.last_name) IS NULL
+    UNION ALL
+    SELECT s.line_no, 'email', 'email is not a valid address'
+    FROM bulk_stage_contacts s
+    WHERE sp_bulk_text(s.email) IS NOT NULL AND TRIM(s.email) !~ '^[^@\s]+@[^@\s]+\.[^@\s]+$'
+    UNION ALL
+    SELECT d.line_no, 'email', 'duplicate contact in file (first on line ' || d.first_line || ')'
+    FROM (
+        SELECT s.line_no, MIN(s.line_no) OVER (
+            PARTITION BY UPPER(TRIM(s.customer_code)),
+                COALESCE(LOWER(sp_bulk_text(s.email)), LOWER(TRIM(s.first_name)) || ' ' || LOWER(TRIM(s.last_name)))
+        ) AS first_line
+        FROM bulk_stage_contacts s
+    ) d WHERE d.line_no <> d.first_line
+    UNION ALL
+    SELECT s.line_no, f.field, f.field || ' must be true or false'
+    FROM bulk_stage_contacts s
+    CROSS JOIN LATERAL (VALUES
+        ('is_primary_contact', s.is_primary_contact),
+        ('is_billing_contact', s.is_billing_contact)
+    ) f(field, value)
+    WHERE NOT sp_bulk_is_boolean(f.value)
+    UNION ALL
+    SELECT s.line_no, 'status', 'status must be active or inactive'
+    FROM bulk_stage_contacts s
+    WHERE sp_bulk_text(s.status) IS NOT NULL AND LOWER(TRIM(s.status)) NOT IN ('active', 'inactive')
+    UNION ALL
+    SELECT s.line_no, f.field, f.field || ' is longer than ' || f.max_length || ' characters'
+    FROM bulk_stage_contacts s
+    CROSS JOIN LATERAL (VALUES
+        ('first_name', s.first_name, 100),
+        ('last_name', s.last_name, 100),
+        ('job_title', s.job_title, 100),
+        ('department', s.department, 100),
+        ('email', s.email, 255),
+        ('phone_number', s.phone_number, 20),
+        ('whatsapp_number', s.whatsapp_number, 20)
+    ) f(field, value, max_length)
+    WHERE char_length(TRIM(f.value)) > f.max_length;
+
+    SELECT COUNT(*) INTO v_errors FROM bulk_stage_errors;
+    RETURN v_errors;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sp_bulk_apply_contacts(p_employee_id INTEGER)
+RETURNS TABLE (inserted INTEGER, updated INTEGER) AS $$
+DECLARE
+    v_inserted INTEGER;
+    v_updated INTEGER;
+BEGIN
+    -- Resolve customers and match existing contacts once
+    CREATE TEMP TABLE bulk_contacts_resolved ON COMMIT DROP AS
+    SELECT
+        s.line_no,
+        c.id AS customer_id,
+        TRIM(s.first_name) AS first_name,
+        TRIM(s.last_name) AS last_name,
+        sp_bulk_text(s.job_title) AS job_title,
+        sp_bulk_text(s.department) AS department,
+        LOWER(sp_bulk_text(s.email)) AS email,
+        sp_bulk_text(s.phone_number) AS phone_number,
+        sp_bulk_text(s.whatsapp_number) AS whatsapp_number,
+        sp_bulk_to_boolean(s.is_primary_contact, NULL) AS is_primary_contact,
+        sp_bulk_to_boolean(s.is_billing_contact, NULL) AS is_billing_contact,
+        LOWER(sp_bulk_text(s.status)) AS status,
+        existing.id AS contact_id
+    FROM bulk_stage_contacts s
+    JOIN core.customers c ON c.customer_code = UPPER(TRIM(s.customer_code))
+    LEFT JOIN LATERAL (
+        SELECT ct.id
+        FROM core.contacts ct
+        WHERE ct.customer_id = c.id
+          AND CASE
+              WHEN sp_bulk_text(s.email) IS NOT NULL THEN LOWER(ct.email) = LOWER(TRIM(s.email))
+              ELSE LOWER(ct.first_name) = LOWER(TRIM(s.first_name)) AND LOWER(ct.last_name) = LOWER(TRIM(s.last_name))
+          END
+        ORDER BY ct.id
+        LIMIT 1
+    ) existing ON true
+    WHERE NOT EXISTS (SELECT 1 FROM bulk_stage_errors be WHERE be.line_no = s.line_no);
+
+    UPDATE core.contacts ct
+    SET first_name = r.first_name,
+        last_name = r.last_name,
+        job_title = COALESCE(r.job_title, ct.job_title),
+        department = COALESCE(r.department, ct.department),
+        email = COALESCE(r.email, ct.email),
+        phone_number = COALESCE(r.phone_number, ct.phone_number),
+        whatsapp_number = COALESCE(r.whatsapp_number, ct.whatsapp_number),
+        is_primary_contact = COALESCE(r.is_primary_contact, ct.is_primary_contact),
+        is_billing_contact = COALESCE(r.is_billing_contact, ct.is_billing_contact),
+        status = COALESCE(r.status, ct.status)
+    FROM bulk_contacts_resolved r
+    WHERE ct.id = r.contact_id;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    INSERT INTO core.contacts (
+        customer_id, first_name, last_name, job_title, department, email, phone_number,
+        whatsapp_number, is_primary_contact, is_billing_contact, status, created_by
+    )
+    SELECT
+        r.customer_id, r.first_name, r.last_name, r.job_title, r.department, r.email, r.phone_number,
+        r.whatsapp_number, COALESCE(r.is_primary_contact, false), COALESCE(r.is_billing_contact, false),
+        COALESCE(r.status, 'active'), p_employee_id
+    FROM bulk_contacts_resolved r
+    WHERE r.contact_id IS NULL
+    ORDER BY r.line_no;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    DROP TABLE bulk_contacts_resolved;
+    RETURN QUERY SELECT v_inserted, v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- SITES (key: customer + site_code, or customer + site_name when there is no code)
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION sp_bulk_validate_sites()
+RETURNS INTEGER AS $$
+DECLARE
+    v_errors INTEGER;
+BEGIN
+    INSERT INTO bulk_stage_errors (line_no, field, message)
+    SELECT s.line_no, 'customer_code', 'unknown customer_code ' || COALESCE(quote_literal(s.customer_code), '(empty)')
+    FROM bulk_stage_sites s
+    WHERE NOT EXISTS (SELECT 1 FROM core.customers c WHERE c.customer_code = UPPER(TRIM(s.customer_code)))
+    UNION ALL
+    SELECT s.line_no, f.field, f.field || ' is required'
+    FROM bulk_stage_sites s
+    CROSS JOIN LATERAL (VALUES
+        ('site_name', s.site_name),
+        ('address_line1', s.address_line1),
+        ('city', s.city)
+    ) f(field, value)
+    WHERE sp_bulk_text(f.value) IS NULL
+    UNION ALL
+    SELECT d.line_no, 'site_code', 'duplicate site in file (first on line ' || d.first_line || ')'
+    FROM (
+        SELECT s.line_no, MIN(s.line_no) OVER (
+            PARTITION BY UPPER(TRIM(s.customer_code)),
+                COALESCE(UPPER(sp_bulk_text(s.site_code)), LOWER(TRIM(s.site_name)))
+        ) AS first_line
+        FROM bulk_stage_sites s
+    ) d WHERE d.line_no <> d.first_line
+    UNION ALL
+    SELECT s.line_no, 'site_type', 'site_type must be delivery_site, billing_address, head_office, branch, warehouse or project_site'
+    FROM bulk_stage_sites s
+    WHERE sp_bulk_text(s.site_type) IS NOT NULL
+      AND LOWER(TRIM(s.site_type)) NOT IN ('delivery_site', 'billing_address', 'head_office', 'branch', 'warehouse', 'project_site')
+    UNION ALL
+    SELECT s.line_no, f.field, f.field || ' is longer than ' || f.max_length || ' characters'
+    FROM bulk_stage_sites s
+    CROSS JOIN LATERAL (VALUES
+        ('site_code', s.site_code, 20),
+        ('site_name', s.site_name, 255),
+        ('address_line1', s.address_line1, 255),
+        ('address_line2', s.address_line2, 255),
+        ('city', s.city, 100),
+        ('province', s.province, 100),
+        ('postal_code', s.postal_code, 10),
+        ('country', s.country, 100),
+        ('site_contact_name', s.site_contact_name, 200),
+        ('site_contact_phone', s.site_contact_phone, 20)
+    ) f(field, value, max_length)
+    WHERE char_length(TRIM(f.value)) > f.max_length;
+
+    SELECT COUNT(*) INTO v_errors FROM bulk_stage_errors;
+    RETURN v_errors;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sp_bulk_apply_sites(p_employee_id INTEGER)
+RETURNS TABLE (inserted INTEGER, updated INTEGER) AS $$
+DECLARE
+    v_inserted INTEGER;
+    v_updated INTEGER;
+BEGIN
+    CREATE TEMP TABLE bulk_sites_resolved ON COMMIT DROP AS
+    SELECT
+        s.line_no,
+        c.id AS customer_id,
+        UPPER(sp_bulk_text(s.site_code)) AS site_code,
+        TRIM(s.site_name) AS site_name,
+        LOWER(sp_bulk_text(s.site_type)) AS site_type,
+        TRIM(s.address_line1) AS address_line1,
+        sp_bulk_text(s.address_line2) AS address_line2,
+        TRIM(s.city) AS city,
+        sp_bulk_text(s.province) AS province,
+        sp_bulk_text(s.postal_code) AS postal_code,
+        sp_bulk_text(s.country) AS country,
+        sp_bulk_text(s.site_contact_name) AS site_contact_name,
+        sp_bulk_text(s.site_contact_phone) AS site_contact_phone,
+        sp_bulk_text(s.delivery_instructions) AS delivery_instructions,
+        existing.id AS site_id
+    FROM bulk_stage_sites s
+    JOIN core.customers c ON c.customer_code = UPPER(TRIM(s.customer_code))
+    LEFT JOIN LATERAL (
+        SELECT st.id
+        FROM core.sites st
+        WHERE st.customer_id = c.id
+          AND CASE
+              WHEN sp_bulk_text(s.site_code) IS NOT NULL THEN UPPER(st.site_code) = UPPER(TRIM(s.site_code))
+              ELSE LOWER(st.site_name) = LOWER(TRIM(s.site_name))
+          END
+        ORDER BY st.id
+        LIMIT 1
+    ) existing ON true
+    WHERE NOT EXISTS (SELECT 1 FROM bulk_stage_errors be WHERE be.line_no = s.line_no);
+
+    UPDATE core.sites st
+    SET site_code = COALESCE(r.site_code, st.site_code),
+        site_name = COALESCE(r.site_name, st.site_name),
+        site_type = COALESCE(r.site_type, st.site_type),
+        address_line1 = COALESCE(r.address_line1, st.address_line1),
+        address_line2 = COALESCE(r.address_line2, st.address_line2),
+        city = COALESCE(r.city, st.city),
+        province = COALESCE(r.province, st.province),
+        postal_code = COALESCE(r.postal_code, st.postal_code),
+        country = COALESCE(r.country, st.country),
+        site_contact_name = COALESCE(r.site_contact_name, st.site_contact_name),
+        site_contact_phone = COALESCE(r.site_contact_phone, st.site_contact_phone),
+        delivery_instructions = COALESCE(r.delivery_instructions, st.delivery_instructions)
+    FROM bulk_sites_resolved r
+    WHERE st.id = r.site_id;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    INSERT INTO core.sites (
+        customer_id, site_code, site_name, site_type, address_line1, address_line2, city, province,
+        postal_code, country, site_contact_name, site_contact_phone, delivery_instructions, created_by
+    )
+    SELECT
+        r.customer_id, r.site_code, r.site_name, COALESCE(r.site_type, 'delivery_site'), r.address_line1,
+        r.address_line2, r.city, r.province, r.postal_code, COALESCE(r.country, 'South Africa'),
+        r.site_contact_name, r.site_contact_phone,
+        r.delivery_instructions, p_employee_id
+    FROM bulk_sites_resolved r
+    WHERE r.site_id IS NULL
+    ORDER BY r.line_no;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    DROP TABLE bulk_sites_resolved;
+    RETURN QUERY SELECT v_inserted, v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- EXPORTS (streamed with COPY (SELECT * FROM sp_export_...) TO STDOUT)
+-- =============================================================================
+
+-- Interactions by hire start date (created date for interactions without one)
+CREATE OR REPLACE FUNCTION sp_export_interactions(
+    p_date_from DATE DEFAULT NULL,
+    p_date_to DATE DEFAULT NULL,
+    p_interaction_type VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (
+    interaction_id INTEGER,
+    reference_number VARCHAR,
+    interaction_type VARCHAR,
+    status VARCHAR,
+    customer_code VARCHAR,
+    customer_name VARCHAR,
+    contact_name TEXT,
+    site_name VARCHAR,
+    hire_start_date DATE,
+    hire_end_date DATE,
+    delivery_date DATE,
+    delivery_time TIME,
+    contact_method VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        i.id,
+        i.reference_number,
+        i.interaction_type,
+        i.status,
+        c.customer_code,
+        c.customer_name,
+        ct.first_name || ' ' || ct.last_name,
+        s.site_name,
+        i.hire_start_date,
+        i.hire_end_date,
+        i.delivery_date,
+        i.delivery_time,
+        i.contact_method,
+        i.created_at,
+        i.completed_at
+    FROM interactions.interactions i
+    JOIN core.customers c ON i.customer_id = c.id
+    JOIN core.contacts ct ON i.contact_id = ct.id
+    LEFT JOIN core.sites s ON i.site_id = s.id
+    WHERE (p_interaction_type IS NULL OR i.interaction_type = p_interaction_type)
+      AND (p_date_from IS NULL OR COALESCE(i.hire_start_date, i.created_at::DATE) >= p_date_from)
+      AND (p_date_to IS NULL OR COALESCE(i.hire_start_date, i.created_at::DATE) <= p_date_to)
+    ORDER BY i.id;
+$$ LANGUAGE sql STABLE;
+
+-- Equipment allocations for hires starting in the period
+CREATE OR REPLACE FUNCTION sp_export_allocations(
+    p_date_from DATE DEFAULT NULL,
+    p_date_to DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    allocation_id INTEGER,
+    interaction_id INTEGER,
+    reference_number VARCHAR,
+    booking_id INTEGER,
+    asset_code VARCHAR,
+    type_code VARCHAR,
+    type_name VARCHAR,
+    allocation_status VARCHAR,
+    allocated_at TIMESTAMP WITH TIME ZONE,
+    qc_approved_at TIMESTAMP WITH TIME ZONE,
+    hire_start_date DATE,
+    hire_end_date DATE
+) AS $$
+    SELECT
+        ie.id,
+        i.id,
+        i.reference_number,
+        ie.equipment_generic_booking_id,
+        e.asset_code,
+        et.type_code,
+        et.type_name,
+        ie.allocation_status,
+        ie.allocated_at,
+        ie.qc_approved_at,
+        i.hire_start_date,
+        i.hire_end_date
+    FROM interactions.interaction_equipment ie
+    JOIN interactions.interactions i ON ie.interaction_id = i.id
+    JOIN equipment.equipment e ON ie.equipment_id = e.id
+    JOIN equipment.equipment_types et ON e.equipment_type_id = et.id
+    WHERE (p_date_from IS NULL OR i.hire_start_date >= p_date_from)
+      AND (p_date_to IS NULL OR i.hire_start_date <= p_date_to)
+    ORDER BY ie.id;
+$$ LANGUAGE sql STABLE;
+
+-- Accessory lines for hires starting in the period
+CREATE OR REPLACE FUNCTION sp_export_accessories(
+    p_date_from DATE DEFAULT NULL,
+    p_date_to DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    line_id INTEGER,
+    interaction_id INTEGER,
+    reference_number VARCHAR,
+    booking_id INTEGER,
+    accessory_code VARCHAR,
+    accessory_name VARCHAR,
+    accessory_type VARCHAR,
+    quantity DECIMAL(8,2),
+    unit_of_measure VARCHAR,
+    unit_rate DECIMAL(10,2),
+    hire_start_date DATE,
+    hire_end_date DATE
+) AS $$
+    SELECT
+        ia.id,
+        i.id,
+        i.reference_number,
+        ia.equipment_generic_booking_id,
+        a.accessory_code,
+        a.accessory_name,
+        ia.accessory_type,
+        ia.quantity,
+        a.unit_of_measure,
+        ia.unit_rate,
+        i.hire_start_date,
+        i.hire_end_date
+    FROM interactions.interaction_accessories ia
+    JOIN interactions.interactions i ON ia.interaction_id = i.id
+    JOIN equipment.accessories a ON ia.accessory_id = a.id
+    WHERE (p_date_from IS NULL OR i.hire_start_date >= p_date_from)
+      AND (p_date_to IS NULL OR i.hire_start_date <= p_date_to)
+    ORDER BY ia.id;
+$$ LANGUAGE sql STABLE;
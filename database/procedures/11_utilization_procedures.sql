@@ -0,0 +1,65 @@
+-- =============================================================================
+-- FLEET UTILIZATION PROCEDURES
+-- =============================================================================
+-- Bulk loaders for the utilization analytics engine (api/analytics/utilization_engine.py).
+-- Dates are returned as day numbers (days since 1970-01-01) so the whole history
+-- loads straight into NumPy arrays; the engine does the interval arithmetic.
+
+-- Equipment types with their list rates
+CREATE OR REPLACE FUNCTION sp_get_utilization_types()
+RETURNS TABLE (
+    equipment_type_id INTEGER,
+    type_code VARCHAR(20),
+    type_name VARCHAR(255),
+    daily_rate DECIMAL(10,2),
+    weekly_rate DECIMAL(10,2),
+    monthly_rate DECIMAL(10,2)
+) AS $$
+    SELECT et.id, et.type_code, et.type_name,
+           COALESCE(et.daily_rate, 0), COALESCE(et.weekly_rate, 0), COALESCE(et.monthly_rate, 0)
+    FROM equipment.equipment_types et
+    ORDER BY et.id;
+$$ LANGUAGE sql STABLE;
+
+-- Units and the days they were in the fleet: [in_fleet_from, in_fleet_to), open if NULL
+CREATE OR REPLACE FUNCTION sp_get_utilization_units()
+RETURNS TABLE (
+    equipment_id INTEGER,
+    equipment_type_id INTEGER,
+    asset_code VARCHAR(20),
+    in_fleet_from INTEGER,
+    in_fleet_to INTEGER
+) AS $$
+    SELECT
+        e.id,
+        e.equipment_type_id,
+        e.asset_code,
+        COALESCE(e.date_acquired, e.created_at::DATE) - DATE '1970-01-01',
+        CASE WHEN e.status = 'sold' THEN e.updated_at::DATE - DATE '1970-01-01' + 1 END
+    FROM equipment.equipment e
+    ORDER BY e.id;
+$$ LANGUAGE sql STABLE;
+
+-- Booked intervals per allocated unit: [start_day, end_day), open if still out with no end date
+CREATE OR REPLACE FUNCTION sp_get_utilization_intervals()
+RETURNS TABLE (
+    equipment_id INTEGER,
+    start_day INTEGER,
+    end_day INTEGER
+) AS $$
+    SELECT
+        ie.equipment_id,
+        COALESCE(ieg.hire_start_date, i.hire_start_date, i.delivery_date, ie.allocated_at::DATE)
+            - DATE '1970-01-01',
+        CASE
+            WHEN COALESCE(ieg.hire_end_date, i.hire_end_date) IS NOT NULL
+                THEN COALESCE(ieg.hire_end_date, i.hire_end_date) - DATE '1970-01-01' + 1
+            WHEN ie.allocation_status = 'returned' OR i.status = 'completed'
+                THEN COALESCE(i.completed_at::DATE, i.updated_at::DATE) - DATE '1970-01-01' + 1
+        END
+    FROM interactions.interaction_equipment ie
+    JOIN interactions.interactions i ON ie.interaction_id = i.id
+    LEFT JOIN interactions.interaction_equipment_generic ieg ON ie.equipment_generic_booking_id = ieg.id
+    WHERE i.interaction_type = 'hire'
+      AND i.status <> 'cancelled';
+$$ LANGUAGE sql STABLE;
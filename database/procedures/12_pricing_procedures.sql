@@ -0,0 +1,145 @@
+-- =============================================================================
+-- PRICING PROCEDURES
+-- =============================================================================
+-- Rental pricing: the cheapest mix of monthly (30 day), weekly (7 day) and daily
+-- rates that covers a hire period. The API prices whole batches of lines with the
+-- same rules in NumPy (api/pricing/pricing_engine.py); sp_price_rental is the SQL
+-- equivalent for procedures that show a hire's value.
+
+-- Cheapest charge for one unit over p_days days (rates of 0 are not offered)
+CREATE OR REPLACE FUNCTION sp_price_rental(
+    p_days INTEGER,
+    p_daily_rate DECIMAL,
+    p_weekly_rate DECIMAL,
+    p_monthly_rate DECIMAL
+)
+RETURNS DECIMAL(12,2) AS $$
+    SELECT COALESCE(MIN(months.n * COALESCE(p_monthly_rate, 0) + options.cost), 0)::DECIMAL(12,2)
+    FROM generate_series(
+        0,
+        CASE WHEN p_monthly_rate > 0 THEN CEIL(GREATEST(p_days, 0) / 30.0)::INTEGER ELSE 0 END
+    ) AS months(n)
+    CROSS JOIN LATERAL (SELECT GREATEST(p_days - 30 * months.n, 0) AS days) remaining
+    CROSS JOIN LATERAL (
+        -- Days only
+        SELECT remaining.days * COALESCE(p_daily_rate, 0) AS cost
+        WHERE p_daily_rate > 0 OR remaining.days = 0
+        UNION ALL
+        -- Whole weeks plus the odd days
+        SELECT (remaining.days / 7) * p_weekly_rate + (remaining.days % 7) * COALESCE(p_daily_rate, 0)
+        WHERE p_weekly_rate > 0 AND (p_daily_rate > 0 OR remaining.days % 7 = 0)
+        -- Weeks rounded up
+        UNION ALL
+        SELECT CEIL(remaining.days / 7.0) * p_weekly_rate
+        WHERE p_weekly_rate > 0
+    ) options;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Rates for equipment types being quoted
+CREATE OR REPLACE FUNCTION sp_get_equipment_type_rates(p_equipment_type_ids INTEGER[])
+RETURNS TABLE (
+    equipment_type_id INTEGER,
+    type_code VARCHAR(20),
+    type_name VARCHAR(255),
+    daily_rate DECIMAL(10,2),
+    weekly_rate DECIMAL(10,2),
+    monthly_rate DECIMAL(10,2)
+) AS $$
+    SELECT et.id, et.type_code, et.type_name,
+           COALESCE(et.daily_rate, 0), COALESCE(et.weekly_rate, 0), COALESCE(et.monthly_rate, 0)
+    FROM equipment.equipment_types et
+    WHERE et.id = ANY(p_equipment_type_ids)
+      AND et.is_active = true;
+$$ LANGUAGE sql STABLE;
+
+-- Rates for accessories being quoted
+CREATE OR REPLACE FUNCTION sp_get_accessory_rates(p_accessory_ids INTEGER[])
+RETURNS TABLE (
+    accessory_id INTEGER,
+    accessory_code VARCHAR(50),
+    accessory_name VARCHAR(255),
+    unit_of_measure VARCHAR(20),
+    is_consumable BOOLEAN,
+    unit_rate DECIMAL(10,2)
+) AS $$
+    SELECT a.id, a.accessory_code, a.accessory_name, a.unit_of_measure,
+           COALESCE(a.is_consumable, false), COALESCE(a.unit_rate, 0)
+    FROM equipment.accessories a
+    WHERE a.id = ANY(p_accessory_ids)
+      AND a.status = 'active';
+$$ LANGUAGE sql STABLE;
+
+-- Billable lines: every equipment and accessory line of hires active in a period,
+-- or of one hire. Dates are day numbers (days since 1970-01-01); end_day is the
+-- last hire day, NULL while a hire is open-ended.
+CREATE OR REPLACE FUNCTION sp_get_billing_lines(
+    p_period_start DATE DEFAULT NULL,
+    p_period_end DATE DEFAULT NULL,
+    p_interaction_id INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    interaction_id INTEGER,
+    reference_number VARCHAR(20),
+    customer_id INTEGER,
+    line_kind VARCHAR(10),
+    line_id INTEGER,
+    item_id INTEGER,
+    item_code VARCHAR(50),
+    item_name VARCHAR(255),
+    quantity DECIMAL(10,2),
+    start_day INTEGER,
+    end_day INTEGER,
+    daily_rate DECIMAL(10,2),
+    weekly_rate DECIMAL(10,2),
+    monthly_rate DECIMAL(10,2),
+    unit_rate DECIMAL(10,2)
+) AS $$
+    WITH hires AS (
+        SELECT i.id, i.reference_number, i.customer_id, i.hire_start_date, i.hire_end_date,
+               i.delivery_date, i.status, i.completed_at
+        FROM interactions.interactions i
+        WHERE i.interaction_type = 'hire'
+          AND i.status <> 'cancelled'
+          AND (p_interaction_id IS NULL OR i.id = p_interaction_id)
+    ),
+    lines AS (
+        SELECT h.id AS interaction_id, h.reference_number, h.customer_id,
+               'equipment'::VARCHAR(10) AS line_kind, ieg.id AS line_id,
+               et.id AS item_id, et.type_code::VARCHAR(50) AS item_code, et.type_name AS item_name,
+               ieg.quantity::DECIMAL(10,2) AS quantity,
+               COALESCE(ieg.hire_start_date, h.hire_start_date, h.delivery_date) AS start_date,
+               COALESCE(ieg.hire_end_date, h.hire_end_date,
+                        CASE WHEN h.status = 'completed' THEN h.completed_at::DATE END) AS end_date,
+               COALESCE(et.daily_rate, 0) AS daily_rate,
+               COALESCE(et.weekly_rate, 0) AS weekly_rate,
+               COALESCE(et.monthly_rate, 0) AS monthly_rate,
+               0::DECIMAL(10,2) AS unit_rate
+        FROM hires h
+        JOIN interactions.interaction_equipment_generic ieg ON ieg.interaction_id = h.id
+        JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
+        JOIN equipment.equipment_types et ON eg.equipment_type_id = et.id
+        WHERE ieg.booking_status <> 'cancelled'
+        UNION ALL
+        SELECT h.id, h.reference_number, h.customer_id,
+               'accessory'::VARCHAR(10), ia.id,
+               a.id, a.accessory_code, a.accessory_name,
+               ia.quantity::DECIMAL(10,2),
+               COALESCE(h.hire_start_date, h.delivery_date),
+               h.hire_end_date,
+               0, 0, 0,
+               COALESCE(ia.unit_rate, a.unit_rate, 0)
+        FROM hires h
+        JOIN interactions.interaction_accessories ia ON ia.interaction_id = h.id
+        JOIN equipment.accessories a ON ia.accessory_id = a.id
+    )
+    SELECT l.interaction_id, l.reference_number, l.customer_id, l.line_kind, l.line_id,
+           l.item_id, l.item_code, l.item_name, l.quantity,
+           l.start_date - DATE '1970-01-01',
+           l.end_date - DATE '1970-01-01',
+           l.daily_rate, l.weekly_rate, l.monthly_rate, l.unit_rate
+    FROM lines l
+    WHERE l.start_date IS NOT NULL
+      AND (p_period_end IS NULL OR l.start_date <= p_period_end)
+      AND (p_period_start IS NULL OR l.end_date IS NULL OR l.end_date >= p_period_start)
+    ORDER BY l.interaction_id, l.line_kind DESC, l.line_id;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,312 @@
+-- =============================================================================
+-- UNIT STATUS PROCEDURES
+-- =============================================================================
+-- equipment.unit_status holds one row per unit: its state, the hire it is on or
+-- allocated to, when its next booking starts and when it is due a service. Triggers
+-- on equipment, allocations and hires rebuild the affected rows in the same
+-- transaction, so allocation, removal and QC sign-off keep it current, and fleet
+-- status screens read it instead of searching allocations for every unit.
+--
+-- An allocation is active while it is allocated, in QC or delivered and its hire is
+-- neither cancelled nor completed (the same rule as v_equipment_utilization).
+
+-- Rebuild the projection rows of the given units (NULL = every unit). The units are
+-- locked first (in id order), so when two transactions change the same unit - say an
+-- allocation and a return - the second waits for the first to commit and recomputes
+-- from a snapshot that includes it, instead of overwriting it with a stale row.
+CREATE OR REPLACE FUNCTION sp_refresh_unit_status(p_equipment_ids INTEGER[] DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    IF p_equipment_ids IS NOT NULL THEN
+        PERFORM 1
+        FROM equipment.equipment e
+        WHERE e.id = ANY(p_equipment_ids)
+        ORDER BY e.id
+        FOR NO KEY UPDATE;
+    END IF;
+
+    INSERT INTO equipment.unit_status (
+        equipment_id, equipment_type_id, unit_state,
+        current_interaction_id, current_allocation_id, current_allocation_status,
+        current_hire_start, current_hire_end, next_booking_start, active_allocations,
+        next_service_due, updated_at
+    )
+    SELECT
+        e.id,
+        e.equipment_type_id,
+        CASE
+            WHEN e.status IN ('maintenance', 'repair', 'sold') THEN e.status
+            WHEN cur.allocation_status = 'delivered' THEN 'on_hire'
+            WHEN cur.allocation_id IS NOT NULL THEN 'allocated'
+            ELSE 'available'
+        END,
+        cur.interaction_id,
+        cur.allocation_id,
+        cur.allocation_status,
+        cur.start_date,
+        cur.end_date,
+        cur.next_start,
+        COALESCE(cur.active_count, 0),
+        e.next_service_due,
+        CURRENT_TIMESTAMP
+    FROM equipment.equipment e
+    LEFT JOIN LATERAL (
+        -- The unit's current allocation: the one out on delivery, else the earliest.
+        -- Window values are computed over every active allocation before the LIMIT.
+        SELECT
+            ie.id AS allocation_id,
+            ie.interaction_id,
+            ie.allocation_status,
+            COALESCE(ieg.hire_start_date, i.hire_start_date, i.delivery_date) AS start_date,
+            COALESCE(ieg.hire_end_date, i.hire_end_date) AS end_date,
+            LEAD(COALESCE(ieg.hire_start_date, i.hire_start_date, i.delivery_date)) OVER w AS next_start,
+            COUNT(*) OVER () AS active_count
+        FROM interactions.interaction_equipment ie
+        JOIN interactions.interactions i ON ie.interaction_id = i.id
+        LEFT JOIN interactions.interaction_equipment_generic ieg ON ie.equipment_generic_booking_id = ieg.id
+        WHERE ie.equipment_id = e.id
+          AND ie.allocation_status IN ('allocated', 'qc_pending', 'qc_approved', 'delivered')
+          AND i.status NOT IN ('cancelled', 'completed')
+        WINDOW w AS (
+            ORDER BY (ie.allocation_status = 'delivered') DESC,
+                     COALESCE(ieg.hire_start_date, i.hire_start_date, i.delivery_date), ie.id
+        )
+        ORDER BY (ie.allocation_status = 'delivered') DESC,
+                 COALESCE(ieg.hire_start_date, i.hire_start_date, i.delivery_date), ie.id
+        LIMIT 1
+    ) cur ON true
+    WHERE p_equipment_ids IS NULL OR e.id = ANY(p_equipment_ids)
+    ON CONFLICT (equipment_id) DO UPDATE SET
+        equipment_type_id = EXCLUDED.equipment_type_id,
+        unit_state = EXCLUDED.unit_state,
+        current_interaction_id = EXCLUDED.current_interaction_id,
+        current_allocation_id = EXCLUDED.current_allocation_id,
+        current_allocation_status = EXCLUDED.current_allocation_status,
+        current_hire_start = EXCLUDED.current_hire_start,
+        current_hire_end = EXCLUDED.current_hire_end,
+        next_booking_start = EXCLUDED.next_booking_start,
+        active_allocations = EXCLUDED.active_allocations,
+        next_service_due = EXCLUDED.next_service_due,
+        updated_at = EXCLUDED.updated_at;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- TRIGGERS
+-- =============================================================================
+-- Statement-level, so a bulk import or a multi-unit allocation rebuilds each
+-- affected unit once.
+
+-- Units added, or their status, type or service date changed
+CREATE OR REPLACE FUNCTION sp_unit_status_equipment_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM sp_refresh_unit_status(ARRAY(SELECT id FROM new_rows));
+    ELSE
+        PERFORM sp_refresh_unit_status(ARRAY(
+            SELECT n.id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            WHERE (n.status, n.equipment_type_id, n.next_service_due)
+                  IS DISTINCT FROM (o.status, o.equipment_type_id, o.next_service_due)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_unit_status_equipment_insert ON equipment.equipment;
+CREATE TRIGGER trg_unit_status_equipment_insert
+    AFTER INSERT ON equipment.equipment
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_unit_status_equipment_trigger();
+
+DROP TRIGGER IF EXISTS trg_unit_status_equipment_update ON equipment.equipment;
+CREATE TRIGGER trg_unit_status_equipment_update
+    AFTER UPDATE ON equipment.equipment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_unit_status_equipment_trigger();
+
+-- Allocations made, removed, signed off by QC, delivered or returned
+CREATE OR REPLACE FUNCTION sp_unit_status_allocation_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM sp_refresh_unit_status(ARRAY(SELECT DISTINCT equipment_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM sp_refresh_unit_status(ARRAY(SELECT DISTINCT equipment_id FROM old_rows));
+    ELSE
+        PERFORM sp_refresh_unit_status(ARRAY(
+            SELECT n.equipment_id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            WHERE (n.equipment_id, n.allocation_status, n.interaction_id, n.equipment_generic_booking_id)
+                  IS DISTINCT FROM (o.equipment_id, o.allocation_status, o.interaction_id, o.equipment_generic_booking_id)
+            UNION
+            SELECT o.equipment_id
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            WHERE n.equipment_id <> o.equipment_id
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_unit_status_allocation_insert ON interactions.interaction_equipment;
+CREATE TRIGGER trg_unit_status_allocation_insert
+    AFTER INSERT ON interactions.interaction_equipment
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_unit_status_allocation_trigger();
+
+DROP TRIGGER IF EXISTS trg_unit_status_allocation_update ON interactions.interaction_equipment;
+CREATE TRIGGER trg_unit_status_allocation_update
+    AFTER UPDATE ON interactions.interaction_equipment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_unit_status_allocation_trigger();
+
+DROP TRIGGER IF EXISTS trg_unit_status_allocation_delete ON interactions.interaction_equipment;
+CREATE TRIGGER trg_unit_status_allocation_delete
+    AFTER DELETE ON interactions.interaction_equipment
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_unit_status_allocation_trigger();
+
+-- Hires completed, cancelled or moved: rebuild the units allocated to them
+CREATE OR REPLACE FUNCTION sp_unit_status_hire_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM sp_refresh_unit_status(ARRAY(
+        SELECT DISTINCT ie.equipment_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN interactions.interaction_equipment ie ON ie.interaction_id = n.id
+        WHERE (n.status, n.hire_start_date, n.hire_end_date, n.delivery_date)
+              IS DISTINCT FROM (o.status, o.hire_start_date, o.hire_end_date, o.delivery_date)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_unit_status_hire_update ON interactions.interactions;
+CREATE TRIGGER trg_unit_status_hire_update
+    AFTER UPDATE ON interactions.interactions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_unit_status_hire_trigger();
+
+-- Booking dates changed: rebuild the units allocated against those bookings
+CREATE OR REPLACE FUNCTION sp_unit_status_booking_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM sp_refresh_unit_status(ARRAY(
+        SELECT DISTINCT ie.equipment_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN interactions.interaction_equipment ie ON ie.equipment_generic_booking_id = n.id
+        WHERE (n.hire_start_date, n.hire_end_date) IS DISTINCT FROM (o.hire_start_date, o.hire_end_date)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_unit_status_booking_update ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_unit_status_booking_update
+    AFTER UPDATE ON interactions.interaction_equipment_generic
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_unit_status_booking_trigger();
+
+-- =============================================================================
+-- FLEET STATUS QUERIES
+-- =============================================================================
+
+-- Units with their current state, filtered by type and state. is_service_due and
+-- is_overdue_return are worked out from the row's own dates, so they are always
+-- correct for today without the projection being rebuilt at midnight.
+CREATE OR REPLACE FUNCTION sp_get_fleet_status(
+    p_equipment_type_id INTEGER DEFAULT NULL,
+    p_unit_state VARCHAR(20) DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    equipment_id INTEGER,
+    asset_code VARCHAR(20),
+    equipment_type_id INTEGER,
+    type_name VARCHAR(255),
+    model VARCHAR(100),
+    condition VARCHAR(20),
+    location VARCHAR(100),
+    unit_state VARCHAR(20),
+    current_interaction_id INTEGER,
+    current_reference_number VARCHAR(20),
+    current_allocation_status VARCHAR(20),
+    current_hire_start DATE,
+    current_hire_end DATE,
+    next_booking_start DATE,
+    next_service_due DATE,
+    is_service_due BOOLEAN,
+    is_overdue_return BOOLEAN
+) AS $$
+    SELECT
+        us.equipment_id,
+        e.asset_code,
+        us.equipment_type_id,
+        et.type_name,
+        e.model,
+        e.condition,
+        e.location,
+        us.unit_state,
+        us.current_interaction_id,
+        i.reference_number,
+        us.current_allocation_status,
+        us.current_hire_start,
+        us.current_hire_end,
+        us.next_booking_start,
+        us.next_service_due,
+        COALESCE(us.next_service_due <= CURRENT_DATE, false),
+        COALESCE(us.current_hire_end < CURRENT_DATE, false)
+    FROM equipment.unit_status us
+    JOIN equipment.equipment e ON e.id = us.equipment_id
+    JOIN equipment.equipment_types et ON et.id = us.equipment_type_id
+    LEFT JOIN interactions.interactions i ON i.id = us.current_interaction_id
+    WHERE (p_equipment_type_id IS NULL OR us.equipment_type_id = p_equipment_type_id)
+      AND (p_unit_state IS NULL OR us.unit_state = p_unit_state)
+    ORDER BY et.type_name, e.asset_code
+    LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
+-- Unit counts per state for each equipment type
+CREATE OR REPLACE FUNCTION sp_get_fleet_status_summary()
+RETURNS TABLE (
+    equipment_type_id INTEGER,
+    type_name VARCHAR(255),
+    total_units INTEGER,
+    available_units INTEGER,
+    allocated_units INTEGER,
+    on_hire_units INTEGER,
+    maintenance_units INTEGER,
+    service_due_units INTEGER
+) AS $$
+    SELECT
+        et.id,
+        et.type_name,
+        COUNT(us.equipment_id)::INTEGER,
+        COUNT(*) FILTER (WHERE us.unit_state = 'available')::INTEGER,
+        COUNT(*) FILTER (WHERE us.unit_state = 'allocated')::INTEGER,
+        COUNT(*) FILTER (WHERE us.unit_state = 'on_hire')::INTEGER,
+        COUNT(*) FILTER (WHERE us.unit_state IN ('maintenance', 'repair'))::INTEGER,
+        COUNT(*) FILTER (WHERE us.next_service_due <= CURRENT_DATE)::INTEGER
+    FROM equipment.equipment_types et
+    LEFT JOIN equipment.unit_status us ON us.equipment_type_id = et.id AND us.unit_state <> 'sold'
+    WHERE et.is_active = true
+    GROUP BY et.id, et.type_name
+    ORDER BY et.type_name;
+$$ LANGUAGE sql STABLE;
+
+-- Backfill the projection for units that existed before it was maintained
+SELECT sp_refresh_unit_status(NULL);
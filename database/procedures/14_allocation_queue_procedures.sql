@@ -0,0 +1,382 @@
+-- =============================================================================
+-- ALLOCATION QUEUE PROCEDURES
+-- =============================================================================
+-- interactions.allocation_queue holds one row per open hire that still has generic
+-- bookings to allocate, with its line counts, value and lines pre-aggregated.
+-- Triggers on bookings, allocations and hires rebuild the affected rows in the same
+-- transaction, so the allocate page pages through a small indexed table instead of
+-- aggregating every hire's lines on each refresh.
+--
+-- Allocators lease hires from the queue: sp_claim_allocation_work hands out the most
+-- urgent unclaimed hires with FOR UPDATE SKIP LOCKED, so concurrent allocators never
+-- get the same hire, and a lease that is not renewed expires on its own.
+
+-- Rebuild the queue rows of the given hires (NULL = every hire). The hires are locked
+-- first (in id order), so when two transactions change the same hire the second waits
+-- for the first to commit and rebuilds from a snapshot that includes it, instead of
+-- overwriting the queue row with a stale one.
+CREATE OR REPLACE FUNCTION sp_refresh_allocation_queue(p_interaction_ids INTEGER[] DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    IF p_interaction_ids IS NOT NULL THEN
+        PERFORM 1
+        FROM interactions.interactions i
+        WHERE i.id = ANY(p_interaction_ids)
+        ORDER BY i.id
+        FOR NO KEY UPDATE;
+    END IF;
+
+    WITH lines AS (
+        SELECT
+            ieg.id,
+            ieg.interaction_id,
+            ieg.quantity,
+            ieg.booking_status,
+            ieg.hire_start_date,
+            ieg.hire_end_date,
+            et.id AS equipment_type_id,
+            et.type_name,
+            et.type_code,
+            et.daily_rate,
+            et.weekly_rate,
+            et.monthly_rate,
+            ieg.quantity - (
+                SELECT COUNT(*) FROM interactions.interaction_equipment ie
+                WHERE ie.equipment_generic_booking_id = ieg.id
+            ) AS pending_quantity
+        FROM interactions.interaction_equipment_generic ieg
+        JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
+        JOIN equipment.equipment_types et ON eg.equipment_type_id = et.id
+        WHERE ieg.booking_status <> 'cancelled'
+          AND (p_interaction_ids IS NULL OR ieg.interaction_id = ANY(p_interaction_ids))
+    ),
+    work AS (
+        SELECT
+            i.id AS interaction_id,
+            i.delivery_date,
+            i.delivery_time,
+            i.hire_start_date,
+            COUNT(*) FILTER (WHERE l.booking_status = 'booked' AND l.pending_quantity > 0) AS equipment_count,
+            COALESCE(SUM(l.pending_quantity) FILTER (WHERE l.booking_status = 'booked' AND l.pending_quantity > 0), 0)
+                AS units_pending,
+            -- Cheapest daily/weekly/monthly mix over each line's hire period (one day if open-ended)
+            COALESCE(SUM(l.quantity * sp_price_rental(
+                COALESCE(l.hire_end_date, i.hire_end_date, l.hire_start_date) - l.hire_start_date + 1,
+                l.daily_rate, l.weekly_rate, l.monthly_rate)), 0)::DECIMAL(10,2) AS total_value,
+            COALESCE(jsonb_agg(
+                jsonb_build_object(
+                    'booking_id', l.id,
+                    'equipment_type_id', l.equipment_type_id,
+                    'type_name', l.type_name,
+                    'type_code', l.type_code,
+                    'quantity', l.quantity,
+                    'pending_quantity', l.pending_quantity,
+                    'daily_rate', l.daily_rate
+                ) ORDER BY l.id
+            ) FILTER (WHERE l.booking_status = 'booked' AND l.pending_quantity > 0), '[]'::jsonb) AS generic_equipment
+        FROM interactions.interactions i
+        JOIN lines l ON l.interaction_id = i.id
+        WHERE i.interaction_type = 'hire'
+          AND i.status NOT IN ('cancelled', 'completed')
+        GROUP BY i.id, i.delivery_date, i.delivery_time, i.hire_start_date
+    ),
+    finished AS (
+        DELETE FROM interactions.allocation_queue q
+        WHERE (p_interaction_ids IS NULL OR q.interaction_id = ANY(p_interaction_ids))
+          AND NOT EXISTS (
+              SELECT 1 FROM work w
+              WHERE w.interaction_id = q.interaction_id AND w.units_pending > 0
+          )
+    )
+    INSERT INTO interactions.allocation_queue (
+        interaction_id, delivery_date, delivery_time, hire_start_date,
+        equipment_count, units_pending, total_value, generic_equipment
+    )
+    SELECT
+        w.interaction_id, w.delivery_date, w.delivery_time, w.hire_start_date,
+        w.equipment_count, w.units_pending, w.total_value, w.generic_equipment
+    FROM work w
+    WHERE w.units_pending > 0
+    -- Claims survive the rebuild; only the work itself is replaced
+    ON CONFLICT (interaction_id) DO UPDATE SET
+        delivery_date = EXCLUDED.delivery_date,
+        delivery_time = EXCLUDED.delivery_time,
+        hire_start_date = EXCLUDED.hire_start_date,
+        equipment_count = EXCLUDED.equipment_count,
+        units_pending = EXCLUDED.units_pending,
+        total_value = EXCLUDED.total_value,
+        generic_equipment = EXCLUDED.generic_equipment,
+        updated_at = CURRENT_TIMESTAMP;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =============================================================================
+-- TRIGGERS
+-- =============================================================================
+
+-- Bookings created, allocated or removed, and units allocated or removed
+CREATE OR REPLACE FUNCTION sp_allocation_queue_lines_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM sp_refresh_allocation_queue(ARRAY(SELECT DISTINCT interaction_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM sp_refresh_allocation_queue(ARRAY(SELECT DISTINCT interaction_id FROM old_rows));
+    ELSE
+        PERFORM sp_refresh_allocation_queue(ARRAY(
+            SELECT interaction_id FROM new_rows
+            UNION
+            SELECT interaction_id FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_allocation_queue_booking_insert ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_allocation_queue_booking_insert
+    AFTER INSERT ON interactions.interaction_equipment_generic
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_allocation_queue_lines_trigger();
+
+DROP TRIGGER IF EXISTS trg_allocation_queue_booking_update ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_allocation_queue_booking_update
+    AFTER UPDATE ON interactions.interaction_equipment_generic
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_allocation_queue_lines_trigger();
+
+DROP TRIGGER IF EXISTS trg_allocation_queue_booking_delete ON interactions.interaction_equipment_generic;
+CREATE TRIGGER trg_allocation_queue_booking_delete
+    AFTER DELETE ON interactions.interaction_equipment_generic
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_allocation_queue_lines_trigger();
+
+DROP TRIGGER IF EXISTS trg_allocation_queue_allocation_insert ON interactions.interaction_equipment;
+CREATE TRIGGER trg_allocation_queue_allocation_insert
+    AFTER INSERT ON interactions.interaction_equipment
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_allocation_queue_lines_trigger();
+
+DROP TRIGGER IF EXISTS trg_allocation_queue_allocation_delete ON interactions.interaction_equipment;
+CREATE TRIGGER trg_allocation_queue_allocation_delete
+    AFTER DELETE ON interactions.interaction_equipment
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_allocation_queue_lines_trigger();
+
+-- Hires cancelled, completed or rescheduled
+CREATE OR REPLACE FUNCTION sp_allocation_queue_hire_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM sp_refresh_allocation_queue(ARRAY(
+        SELECT n.id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.interaction_type = 'hire'
+          AND (n.status, n.delivery_date, n.delivery_time, n.hire_start_date, n.hire_end_date)
+              IS DISTINCT FROM (o.status, o.delivery_date, o.delivery_time, o.hire_start_date, o.hire_end_date)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_allocation_queue_hire_update ON interactions.interactions;
+CREATE TRIGGER trg_allocation_queue_hire_update
+    AFTER UPDATE ON interactions.interactions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_allocation_queue_hire_trigger();
+
+-- =============================================================================
+-- QUEUE READS
+-- =============================================================================
+
+-- One page of the queue, most urgent first (overdue deliveries, then today, then
+-- future by date and time). Priority buckets are ranges of the ordering index.
+-- p_exclude_claimed hides hires leased to someone other than p_claimant.
+CREATE OR REPLACE FUNCTION sp_get_allocation_queue(
+    p_priority VARCHAR(10) DEFAULT NULL,
+    p_claimant VARCHAR(100) DEFAULT NULL,
+    p_exclude_claimed BOOLEAN DEFAULT false,
+    p_limit INTEGER DEFAULT 50,
+    p_offset INTEGER DEFAULT 0,
+    p_interaction_ids INTEGER[] DEFAULT NULL
+)
+RETURNS TABLE (
+    interaction_id INTEGER,
+    reference_number VARCHAR(20),
+    customer_name VARCHAR(255),
+    contact_name VARCHAR(255),
+    site_name VARCHAR(255),
+    hire_start_date DATE,
+    delivery_date DATE,
+    delivery_time TIME,
+    priority VARCHAR(10),
+    equipment_count INTEGER,
+    units_pending INTEGER,
+    total_value DECIMAL(10,2),
+    generic_equipment JSONB,
+    claimed_by VARCHAR(100),
+    claimed_until TIMESTAMP WITH TIME ZONE,
+    claimed_by_me BOOLEAN,
+    total_count INTEGER
+) AS $$
+    SELECT
+        q.interaction_id,
+        i.reference_number,
+        c.customer_name,
+        (ct.first_name || ' ' || ct.last_name)::VARCHAR(255),
+        s.site_name,
+        q.hire_start_date,
+        q.delivery_date,
+        q.delivery_time,
+        CASE
+            WHEN q.delivery_date < CURRENT_DATE THEN 'urgent'
+            WHEN q.delivery_date = CURRENT_DATE THEN 'today'
+            ELSE 'future'
+        END::VARCHAR(10),
+        q.equipment_count,
+        q.units_pending,
+        q.total_value,
+        q.generic_equipment,
+        CASE WHEN q.claimed_until > CURRENT_TIMESTAMP THEN q.claimed_by END,
+        CASE WHEN q.claimed_until > CURRENT_TIMESTAMP THEN q.claimed_until END,
+        COALESCE(q.claimed_until > CURRENT_TIMESTAMP AND q.claimed_by = p_claimant, false),
+        (COUNT(*) OVER ())::INTEGER
+    FROM interactions.allocation_queue q
+    JOIN interactions.interactions i ON i.id = q.interaction_id
+    JOIN core.customers c ON c.id = i.customer_id
+    LEFT JOIN core.contacts ct ON ct.id = i.contact_id
+    LEFT JOIN core.sites s ON s.id = i.site_id
+    WHERE (p_interaction_ids IS NULL OR q.interaction_id = ANY(p_interaction_ids))
+      AND (p_priority IS NULL
+           OR (p_priority = 'urgent' AND q.delivery_date < CURRENT_DATE)
+           OR (p_priority = 'today' AND q.delivery_date = CURRENT_DATE)
+           OR (p_priority = 'future' AND (q.delivery_date > CURRENT_DATE OR q.delivery_date IS NULL)))
+      AND (NOT p_exclude_claimed
+           OR q.claimed_until IS NULL
+           OR q.claimed_until <= CURRENT_TIMESTAMP
+           OR q.claimed_by = p_claimant)
+    ORDER BY q.delivery_date, q.delivery_time, q.interaction_id
+    LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
+-- =============================================================================
+-- CLAIMS AND LEASES
+-- =============================================================================
+
+-- Lease the next p_limit unclaimed hires (or ones whose lease has lapsed) to an
+-- allocator. Rows another allocator is claiming at this moment are skipped, not
+-- waited for. Hires the allocator already holds are renewed and returned first.
+CREATE OR REPLACE FUNCTION sp_claim_allocation_work(
+    p_claimant VARCHAR(100),
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (
+    interaction_id INTEGER,
+    reference_number VARCHAR(20),
+    customer_name VARCHAR(255),
+    contact_name VARCHAR(255),
+    site_name VARCHAR(255),
+    hire_start_date DATE,
+    delivery_date DATE,
+    delivery_time TIME,
+    priority VARCHAR(10),
+    equipment_count INTEGER,
+    units_pending INTEGER,
+    total_value DECIMAL(10,2),
+    generic_equipment JSONB,
+    claimed_by VARCHAR(100),
+    claimed_until TIMESTAMP WITH TIME ZONE,
+    claimed_by_me BOOLEAN,
+    total_count INTEGER
+) AS $$
+DECLARE
+    v_claimed INTEGER[];
+BEGIN
+    WITH next_work AS (
+        SELECT q.interaction_id
+        FROM interactions.allocation_queue q
+        WHERE q.claimed_until IS NULL
+           OR q.claimed_until <= CURRENT_TIMESTAMP
+           OR q.claimed_by = p_claimant
+        ORDER BY (q.claimed_by = p_claimant AND q.claimed_until > CURRENT_TIMESTAMP) DESC NULLS LAST,
+                 q.delivery_date, q.delivery_time, q.interaction_id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE interactions.allocation_queue q
+        SET claimed_by = p_claimant,
+            claimed_until = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds)
+        FROM next_work
+        WHERE q.interaction_id = next_work.interaction_id
+        RETURNING q.interaction_id
+    )
+    SELECT array_agg(claimed.interaction_id) INTO v_claimed FROM claimed;
+
+    IF v_claimed IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Read the claimed rows back in queue order, with their new leases
+    RETURN QUERY
+    SELECT * FROM sp_get_allocation_queue(NULL, p_claimant, false, p_limit, 0, v_claimed);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Claim (or renew) one hire for an allocator. Fails only while another allocator
+-- holds a live lease; a hire that is not queued has nothing to claim and succeeds.
+CREATE OR REPLACE FUNCTION sp_claim_allocation_hire(
+    p_interaction_id INTEGER,
+    p_claimant VARCHAR(100),
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (
+    success BOOLEAN,
+    claimed_by VARCHAR(100),
+    claimed_until TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE interactions.allocation_queue q
+    SET claimed_by = p_claimant,
+        claimed_until = CURRENT_TIMESTAMP + make_interval(secs => p_lease_seconds)
+    WHERE q.interaction_id = p_interaction_id
+      AND (q.claimed_until IS NULL OR q.claimed_until <= CURRENT_TIMESTAMP OR q.claimed_by = p_claimant)
+    RETURNING true, q.claimed_by, q.claimed_until;
+
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT false, q.claimed_by, q.claimed_until
+        FROM interactions.allocation_queue q
+        WHERE q.interaction_id = p_interaction_id;
+
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT true, NULL::VARCHAR(100), NULL::TIMESTAMP WITH TIME ZONE;
+        END IF;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Give a hire back to the queue before its lease runs out
+CREATE OR REPLACE FUNCTION sp_release_allocation_hire(
+    p_interaction_id INTEGER,
+    p_claimant VARCHAR(100)
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE interactions.allocation_queue
+    SET claimed_by = NULL, claimed_until = NULL
+    WHERE interaction_id = p_interaction_id
+      AND claimed_by = p_claimant;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill the queue for hires booked before it was maintained
+SELECT sp_refresh_allocation_queue(NULL);
@@ -0,0 +1,136 @@
+-- =============================================================================
+-- DIARY PROCEDURES
+-- =============================================================================
+-- The diary lists every interaction (hires, off-hires, breakdowns, coring, ...)
+-- by delivery date. sp_get_diary_interactions returns a whole date range in one
+-- query: the range is an index scan on (delivery_date, interaction_type), and each
+-- interaction's line counts, allocation progress and value come from a single
+-- LATERAL aggregate over its bookings instead of one subquery per column.
+
+-- Interactions delivered between p_date_from and p_date_to (inclusive), in diary
+-- order. p_interaction_types NULL means every type; p_search matches the
+-- reference, customer or contact name.
+CREATE OR REPLACE FUNCTION sp_get_diary_interactions(
+    p_date_from DATE,
+    p_date_to DATE,
+    p_interaction_types VARCHAR[] DEFAULT NULL,
+    p_search VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (
+    diary_date DATE,
+    interaction_id INTEGER,
+    interaction_type VARCHAR(50),
+    reference_number VARCHAR(20),
+    interaction_status VARCHAR(50),
+    customer_name VARCHAR(255),
+    contact_name VARCHAR(255),
+    site_name VARCHAR(255),
+    hire_start_date DATE,
+    hire_end_date DATE,
+    delivery_time TIME,
+    equipment_count INTEGER,
+    units_booked INTEGER,
+    units_allocated INTEGER,
+    allocation_status VARCHAR(20),
+    total_value DECIMAL(10,2),
+    priority_score INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        i.delivery_date,
+        i.id,
+        i.interaction_type,
+        i.reference_number,
+        i.status,
+        c.customer_name,
+        (ct.first_name || ' ' || ct.last_name)::VARCHAR(255),
+        s.site_name,
+        i.hire_start_date,
+        i.hire_end_date,
+        i.delivery_time,
+        lines.equipment_count,
+        lines.units_booked,
+        lines.units_allocated,
+        CASE
+            WHEN lines.units_booked = 0 THEN 'none'
+            WHEN lines.units_allocated >= lines.units_booked THEN 'allocated'
+            WHEN lines.units_allocated > 0 THEN 'partial'
+            ELSE 'pending'
+        END::VARCHAR(20),
+        lines.total_value,
+        -- 1 overdue, 2 today, 3 upcoming, 4 closed
+        CASE
+            WHEN i.status IN ('completed', 'cancelled') THEN 4
+            WHEN i.delivery_date < CURRENT_DATE THEN 1
+            WHEN i.delivery_date = CURRENT_DATE THEN 2
+            ELSE 3
+        END,
+        i.created_at
+    FROM interactions.interactions i
+    JOIN core.customers c ON c.id = i.customer_id
+    LEFT JOIN core.contacts ct ON ct.id = i.contact_id
+    LEFT JOIN core.sites s ON s.id = i.site_id
+    CROSS JOIN LATERAL (
+        SELECT
+            COUNT(ieg.id)::INTEGER AS equipment_count,
+            COALESCE(SUM(ieg.quantity), 0)::INTEGER AS units_booked,
+            COALESCE(SUM(LEAST(alloc.units, ieg.quantity)), 0)::INTEGER AS units_allocated,
+            -- Cheapest daily/weekly/monthly mix over each line's hire period (one day if open-ended)
+            COALESCE(SUM(ieg.quantity * sp_price_rental(
+                COALESCE(ieg.hire_end_date, i.hire_end_date, ieg.hire_start_date) - ieg.hire_start_date + 1,
+                et.daily_rate, et.weekly_rate, et.monthly_rate)), 0)::DECIMAL(10,2) AS total_value
+        FROM interactions.interaction_equipment_generic ieg
+        JOIN equipment.equipment_generic eg ON eg.id = ieg.equipment_generic_id
+        JOIN equipment.equipment_types et ON et.id = eg.equipment_type_id
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*) AS units
+            FROM interactions.interaction_equipment ie
+            WHERE ie.equipment_generic_booking_id = ieg.id
+        ) alloc
+        WHERE ieg.interaction_id = i.id
+          AND ieg.booking_status <> 'cancelled'
+    ) lines
+    WHERE i.delivery_date BETWEEN p_date_from AND p_date_to
+      AND (p_interaction_types IS NULL OR i.interaction_type = ANY(p_interaction_types))
+      AND (p_search IS NULL OR p_search = ''
+           OR i.reference_number ILIKE '%' || p_search || '%'
+           OR c.customer_name ILIKE '%' || p_search || '%'
+           OR (ct.first_name || ' ' || ct.last_name) ILIKE '%' || p_search || '%')
+    ORDER BY i.delivery_date, i.delivery_time NULLS LAST, i.reference_number;
+$$ LANGUAGE sql STABLE;
+
+-- One day's hires (the allocation and driver screens' day view), from the diary query
+CREATE OR REPLACE FUNCTION sp_get_todays_hires(p_date DATE DEFAULT CURRENT_DATE)
+RETURNS TABLE (
+    interaction_id INTEGER,
+    reference_number VARCHAR,
+    customer_name VARCHAR,
+    contact_name VARCHAR,
+    site_name VARCHAR,
+    hire_start_date DATE,
+    hire_end_date DATE,
+    delivery_date DATE,
+    delivery_time TIME,
+    status VARCHAR,
+    allocation_status VARCHAR,
+    has_generic_equipment BOOLEAN,
+    equipment_count INTEGER,
+    total_value DECIMAL(10,2)
+) AS $$
+    SELECT
+        d.interaction_id,
+        d.reference_number::VARCHAR,
+        d.customer_name::VARCHAR,
+        d.contact_name::VARCHAR,
+        d.site_name::VARCHAR,
+        d.hire_start_date,
+        d.hire_end_date,
+        d.diary_date,
+        d.delivery_time,
+        d.interaction_status::VARCHAR,
+        d.allocation_status::VARCHAR,
+        d.equipment_count > 0,
+        d.equipment_count,
+        d.total_value
+    FROM sp_get_diary_interactions(p_date, p_date, ARRAY['hire']::VARCHAR[], NULL) d;
+$$ LANGUAGE sql STABLE;
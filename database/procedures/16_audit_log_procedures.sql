@@ -0,0 +1,98 @@
+-- =============================================================================
+-- AUDIT LOG PROCEDURES
+-- =============================================================================
+-- system.activity_log grows by a row for every hire, allocation, QC sign-off,
+-- dispatch and import. sp_search_activity_log reads it newest first with keyset
+-- pagination: each page continues from the (created_at, id) of the last row of
+-- the previous one, so page 1000 costs the same as page 1.
+--
+-- Indexes (01_schema_migration.sql): btree (created_at, id) for time ranges, with
+-- user, action and table/record variants so a filtered page is a single index
+-- range scan, and jsonb_path_ops GIN on new_values / old_values for containment
+-- lookups such as {"reference_number": "HR250601001"} or {"booking_id": 42}.
+--
+-- The function is plain SQL and STABLE, so PostgreSQL inlines it into the
+-- caller's query: filters left NULL fold away and the planner picks the index
+-- that fits the filters actually given.
+
+-- One page of audit entries, newest first. Pass the created_at and log_id of the
+-- last entry of a page as p_before_at / p_before_id to get the next page.
+CREATE OR REPLACE FUNCTION sp_search_activity_log(
+    p_user_id INTEGER DEFAULT NULL,
+    p_actions TEXT[] DEFAULT NULL,
+    p_table_name VARCHAR(100) DEFAULT NULL,
+    p_record_id INTEGER DEFAULT NULL,
+    p_contains JSONB DEFAULT NULL,
+    p_from TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_to TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_id INTEGER DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100
+)
+RETURNS TABLE (
+    log_id INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE,
+    user_id INTEGER,
+    employee_name VARCHAR(255),
+    action VARCHAR(100),
+    table_name VARCHAR(100),
+    record_id INTEGER,
+    old_values JSONB,
+    new_values JSONB,
+    ip_address TEXT,
+    user_agent TEXT
+) AS $$
+    SELECT
+        l.id,
+        l.created_at,
+        l.user_id,
+        (e.name || ' ' || e.surname)::VARCHAR(255),
+        l.action,
+        l.table_name,
+        l.record_id,
+        l.old_values,
+        l.new_values,
+        host(l.ip_address),
+        l.user_agent
+    FROM system.activity_log l
+    LEFT JOIN core.employees e ON e.id = l.user_id
+    WHERE (p_user_id IS NULL OR l.user_id = p_user_id)
+      AND (p_actions IS NULL OR l.action = ANY(p_actions))
+      AND (p_table_name IS NULL OR l.table_name = p_table_name)
+      AND (p_record_id IS NULL OR l.record_id = p_record_id)
+      AND (p_contains IS NULL OR l.new_values @> p_contains OR l.old_values @> p_contains)
+      AND (p_from IS NULL OR l.created_at >= p_from)
+      AND (p_to IS NULL OR l.created_at < p_to)
+      AND (p_before_at IS NULL OR (l.created_at, l.id) < (p_before_at, p_before_id))
+    ORDER BY l.created_at DESC, l.id DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Distinct actions and tables logged so far, for the audit screen's filter lists.
+-- Skip-scans the action and table indexes instead of reading the log.
+CREATE OR REPLACE FUNCTION sp_get_activity_log_facets()
+RETURNS TABLE (
+    facet VARCHAR(20),
+    value VARCHAR(100)
+) AS $$
+    WITH RECURSIVE actions AS (
+        (SELECT l.action FROM system.activity_log l ORDER BY l.action LIMIT 1)
+        UNION ALL
+        SELECT (SELECT l.action FROM system.activity_log l
+                WHERE l.action > a.action ORDER BY l.action LIMIT 1)
+        FROM actions a
+        WHERE a.action IS NOT NULL
+    ),
+    tables AS (
+        (SELECT l.table_name FROM system.activity_log l
+         WHERE l.table_name IS NOT NULL ORDER BY l.table_name LIMIT 1)
+        UNION ALL
+        SELECT (SELECT l.table_name FROM system.activity_log l
+                WHERE l.table_name > t.table_name ORDER BY l.table_name LIMIT 1)
+        FROM tables t
+        WHERE t.table_name IS NOT NULL
+    )
+    SELECT 'action'::VARCHAR(20), action FROM actions WHERE action IS NOT NULL
+    UNION ALL
+    SELECT 'table'::VARCHAR(20), table_name FROM tables WHERE table_name IS NOT NULL;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,131 @@
+-- =============================================================================
+-- ALLOCATION PERIOD PROCEDURES
+-- =============================================================================
+-- interactions.interaction_equipment.hire_period is the DATERANGE an allocation holds
+-- its unit for: sp_hire_period of the hire's dates while the hire is live, NULL once
+-- it is cancelled or completed, once the unit is returned (and for other
+-- interaction types). The exclusion
+-- constraint excl_interaction_equipment_period (01_schema_migration.sql) then makes
+-- PostgreSQL refuse a second live hire holding the same unit over overlapping days,
+-- whichever procedure writes the row and however many run at once, and its GiST
+-- index serves the && (overlaps) lookups in the availability procedures.
+--
+-- The periods follow the hires: a trigger fills hire_period on new allocations and
+-- returns, and another recomputes it when a hire's dates, status or type change. Moving or
+-- reopening a hire onto days one of its units is booked elsewhere fails with
+-- exclusion_violation.
+
+-- Period an allocation on this interaction holds its unit for (NULL = none)
+CREATE OR REPLACE FUNCTION sp_allocation_period(
+    p_interaction_type VARCHAR,
+    p_status VARCHAR,
+    p_hire_start_date DATE,
+    p_hire_end_date DATE,
+    p_allocation_status VARCHAR DEFAULT NULL
+)
+RETURNS DATERANGE AS $$
+    SELECT CASE WHEN p_interaction_type = 'hire' AND p_status NOT IN ('cancelled', 'completed')
+                 AND p_allocation_status IS DISTINCT FROM 'returned'
+                THEN sp_hire_period(p_hire_start_date, p_hire_end_date)
+           END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recompute the periods of the given interactions' allocations (NULL = every allocation)
+CREATE OR REPLACE FUNCTION sp_refresh_allocation_periods(p_interaction_ids INTEGER[] DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    UPDATE interactions.interaction_equipment ie
+    SET hire_period = sp_allocation_period(i.interaction_type, i.status, i.hire_start_date, i.hire_end_date,
+                                           ie.allocation_status)
+    FROM interactions.interactions i
+    WHERE i.id = ie.interaction_id
+      AND (p_interaction_ids IS NULL OR ie.interaction_id = ANY(p_interaction_ids))
+      AND ie.hire_period IS DISTINCT FROM
+          sp_allocation_period(i.interaction_type, i.status, i.hire_start_date, i.hire_end_date, ie.allocation_status);
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Units that are on more than one live hire over overlapping days, judged from the
+-- hires themselves (what the constraint would reject)
+CREATE OR REPLACE FUNCTION sp_find_allocation_overlaps()
+RETURNS TABLE (
+    equipment_id INTEGER,
+    allocation_id INTEGER,
+    interaction_id INTEGER,
+    hire_period DATERANGE,
+    other_allocation_id INTEGER,
+    other_interaction_id INTEGER,
+    other_hire_period DATERANGE
+) AS $$
+    WITH periods AS (
+        SELECT
+            ie.id,
+            ie.equipment_id,
+            ie.interaction_id,
+            sp_allocation_period(i.interaction_type, i.status, i.hire_start_date, i.hire_end_date,
+                                 ie.allocation_status) AS period
+        FROM interactions.interaction_equipment ie
+        JOIN interactions.interactions i ON i.id = ie.interaction_id
+    )
+    SELECT a.equipment_id, a.id, a.interaction_id, a.period, b.id, b.interaction_id, b.period
+    FROM periods a
+    JOIN periods b ON b.equipment_id = a.equipment_id
+                  AND b.id > a.id
+                  AND b.interaction_id <> a.interaction_id
+                  AND b.period && a.period
+    ORDER BY a.equipment_id, a.id;
+$$ LANGUAGE sql STABLE;
+
+-- =============================================================================
+-- TRIGGERS
+-- =============================================================================
+
+-- New allocations (or ones moved to another interaction) take that interaction's
+-- period; returned units give theirs up
+CREATE OR REPLACE FUNCTION sp_allocation_period_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT sp_allocation_period(i.interaction_type, i.status, i.hire_start_date, i.hire_end_date,
+                                NEW.allocation_status)
+    INTO NEW.hire_period
+    FROM interactions.interactions i
+    WHERE i.id = NEW.interaction_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_allocation_period ON interactions.interaction_equipment;
+CREATE TRIGGER trg_allocation_period
+    BEFORE INSERT OR UPDATE OF interaction_id, allocation_status ON interactions.interaction_equipment
+    FOR EACH ROW EXECUTE FUNCTION sp_allocation_period_trigger();
+
+-- Hires moved, cancelled, completed or reopened: recompute their allocations' periods
+CREATE OR REPLACE FUNCTION sp_allocation_period_hire_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM sp_refresh_allocation_periods(ARRAY(
+        SELECT n.id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE (n.interaction_type, n.status, n.hire_start_date, n.hire_end_date)
+              IS DISTINCT FROM (o.interaction_type, o.status, o.hire_start_date, o.hire_end_date)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_allocation_period_hire_update ON interactions.interactions;
+CREATE TRIGGER trg_allocation_period_hire_update
+    AFTER UPDATE ON interactions.interactions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sp_allocation_period_hire_trigger();
+
+-- Fill in periods for existing allocations. If this fails with exclusion_violation the
+-- data already holds double bookings: SELECT * FROM sp_find_allocation_overlaps()
+-- lists them.
+SELECT sp_refresh_allocation_periods(NULL);
@@ -0,0 +1,231 @@
+-- =============================================================================
+-- OFF-HIRE PROCEDURES
+-- =============================================================================
+-- Off-hiring closes a hire's unit allocations as returned on the return date,
+-- puts the units back into stock and books a collection run on the driver board
+-- for hires with delivered units to pick up.
+-- sp_bulk_off_hire does this for any number of hires, or for chosen units on
+-- them, as a fixed handful of set-based statements in one transaction, so
+-- closing a whole site costs the same few statements as closing one unit.
+--
+-- Returned allocations give up their hire_period (17_allocation_period_procedures.sql),
+-- so the units can be booked again from the day after the return. A hire whose
+-- units are all returned is completed with the return date as its end date.
+
+-- Off-hire the given hires on p_return_date, which cannot be later than today. With
+-- p_equipment_ids only those units are returned (a partial off-hire); the hire stays
+-- open while others are still out.
+-- Returns one row per requested hire; hires that cannot be off-hired are reported
+-- with success = false and the reason, and do not stop the others.
+CREATE OR REPLACE FUNCTION sp_bulk_off_hire(
+    p_interaction_ids INTEGER[],
+    p_return_date DATE,
+    p_employee_id INTEGER,
+    p_equipment_ids INTEGER[] DEFAULT NULL,
+    p_collection_time TIME DEFAULT NULL,
+    p_notes TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    interaction_id INTEGER,
+    reference_number VARCHAR(20),
+    success BOOLEAN,
+    units_returned INTEGER,
+    units_remaining INTEGER,
+    hire_completed BOOLEAN,
+    collection_task_id INTEGER,
+    error_message TEXT
+) AS $$
+DECLARE
+    v_hire_ids INTEGER[] := '{}';
+    v_returned_hire_ids INTEGER[] := '{}';
+    v_returned_unit_ids INTEGER[] := '{}';
+    v_collect_hire_ids INTEGER[] := '{}';
+    v_completed_ids INTEGER[] := '{}';
+    v_task_ids INTEGER[] := '{}';
+BEGIN
+    IF p_return_date IS NULL THEN
+        RAISE EXCEPTION 'A return date is required';
+    END IF;
+    -- Returned lines give up their hire_period, so a future return would let the
+    -- units be double-booked for days they are still out on site
+    IF p_return_date > CURRENT_DATE THEN
+        RAISE EXCEPTION 'Return date % is in the future', p_return_date;
+    END IF;
+
+    -- Live hires that can end on the return date, locked in id order so two
+    -- overlapping batches queue behind each other instead of deadlocking
+    SELECT COALESCE(array_agg(locked.id), '{}')
+    INTO v_hire_ids
+    FROM (
+        SELECT i.id
+        FROM interactions.interactions i
+        WHERE i.id = ANY(p_interaction_ids)
+          AND i.interaction_type = 'hire'
+          AND i.status NOT IN ('cancelled', 'completed')
+          AND (i.hire_start_date IS NULL OR i.hire_start_date <= p_return_date)
+        ORDER BY i.id
+        FOR UPDATE
+    ) locked;
+
+    -- Close the allocated lines. The self-join returns each line's status before the
+    -- update: only lines that were delivered are on site and need collecting.
+    WITH returned AS (
+        UPDATE interactions.interaction_equipment ie
+        SET allocation_status = 'returned',
+            return_notes = COALESCE(p_notes, ie.return_notes)
+        FROM interactions.interaction_equipment prev
+        WHERE prev.id = ie.id
+          AND ie.interaction_id = ANY(v_hire_ids)
+          AND ie.allocation_status IN ('allocated', 'qc_pending', 'qc_approved', 'delivered')
+          AND (p_equipment_ids IS NULL OR ie.equipment_id = ANY(p_equipment_ids))
+        RETURNING ie.interaction_id, ie.equipment_id, prev.allocation_status AS previous_status
+    )
+    SELECT
+        COALESCE(array_agg(returned.interaction_id), '{}'),
+        COALESCE(array_agg(returned.equipment_id), '{}'),
+        COALESCE(array_agg(DISTINCT returned.interaction_id)
+                 FILTER (WHERE returned.previous_status = 'delivered'), '{}')
+    INTO v_returned_hire_ids, v_returned_unit_ids, v_collect_hire_ids
+    FROM returned;
+
+    -- Hires off-hired in full (or left with nothing out) are complete
+    SELECT COALESCE(array_agg(h.id), '{}')
+    INTO v_completed_ids
+    FROM unnest(v_hire_ids) AS h(id)
+    WHERE p_equipment_ids IS NULL
+       OR NOT EXISTS (
+           SELECT 1
+           FROM interactions.interaction_equipment ie
+           WHERE ie.interaction_id = h.id
+             AND ie.allocation_status IN ('allocated', 'qc_pending', 'qc_approved', 'delivered')
+       );
+
+    IF cardinality(v_completed_ids) > 0 THEN
+        UPDATE interactions.interaction_equipment_generic ieg
+        SET booking_status = 'returned'
+        WHERE ieg.interaction_id = ANY(v_completed_ids)
+          AND ieg.booking_status IN ('booked', 'allocated', 'delivered');
+
+        UPDATE interactions.interactions i
+        SET status = 'completed',
+            hire_end_date = p_return_date,
+            completed_at = CURRENT_TIMESTAMP
+        WHERE i.id = ANY(v_completed_ids);
+
+        -- Deliveries not yet made are no longer needed
+        UPDATE tasks.drivers_taskboard dt
+        SET status = 'cancelled'
+        WHERE dt.interaction_id = ANY(v_completed_ids)
+          AND dt.task_type = 'delivery'
+          AND dt.status IN ('backlog', 'assigned');
+    END IF;
+
+    -- Units go back into stock unless another open hire still has them
+    UPDATE equipment.equipment e
+    SET status = 'available'
+    WHERE e.id = ANY(v_returned_unit_ids)
+      AND e.status = 'rented'
+      AND NOT EXISTS (
+          SELECT 1
+          FROM interactions.interaction_equipment ie
+          JOIN interactions.interactions i ON ie.interaction_id = i.id
+          WHERE ie.equipment_id = e.id
+            AND ie.allocation_status IN ('allocated', 'qc_pending', 'qc_approved', 'delivered')
+            AND i.status NOT IN ('cancelled', 'completed')
+      );
+
+    -- One collection task per hire with delivered units returned, unless one is
+    -- already booked for that day (an earlier partial off-hire). Units returned
+    -- before delivery never left the depot.
+    WITH created AS (
+        INSERT INTO tasks.drivers_taskboard (
+            interaction_id, task_type, priority, status, customer_name, contact_name,
+            contact_phone, contact_whatsapp, site_address, scheduled_date, scheduled_time,
+            equipment_allocated, equipment_verified, driver_notes, created_by
+        )
+        SELECT
+            i.id, 'collection', 'medium', 'backlog', c.customer_name, ct.first_name || ' ' || ct.last_name,
+            ct.phone_number, ct.whatsapp_number,
+            CASE WHEN s.id IS NOT NULL
+                 THEN CONCAT_WS(', ', s.address_line1, s.address_line2, s.city, s.province, s.postal_code)
+            END,
+            p_return_date, p_collection_time,
+            true, false, p_notes, p_employee_id
+        FROM interactions.interactions i
+        JOIN core.customers c ON i.customer_id = c.id
+        JOIN core.contacts ct ON i.contact_id = ct.id
+        LEFT JOIN core.sites s ON i.site_id = s.id
+        WHERE i.id = ANY(v_collect_hire_ids)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM tasks.drivers_taskboard dt
+              WHERE dt.interaction_id = i.id
+                AND dt.task_type = 'collection'
+                AND dt.status IN ('backlog', 'assigned')
+                AND dt.scheduled_date = p_return_date
+          )
+        RETURNING id
+    )
+    SELECT COALESCE(array_agg(created.id), '{}') INTO v_task_ids FROM created;
+
+    IF cardinality(v_hire_ids) > 0 THEN
+        PERFORM sp_log_activity(
+            p_employee_id,
+            'BULK_OFF_HIRE',
+            'interactions.interactions',
+            NULL,
+            NULL,
+            jsonb_build_object(
+                'interaction_ids', v_hire_ids,
+                'return_date', p_return_date,
+                'equipment_ids', p_equipment_ids,
+                'units_returned', cardinality(v_returned_unit_ids),
+                'completed_ids', v_completed_ids,
+                'collection_task_ids', v_task_ids
+            )
+        );
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        req.id,
+        i.reference_number,
+        req.id = ANY(v_hire_ids),
+        COALESCE(returned.units, 0)::INTEGER,
+        COALESCE(remaining.units, 0)::INTEGER,
+        req.id = ANY(v_completed_ids),
+        task.id,
+        CASE
+            WHEN req.id = ANY(v_hire_ids) THEN NULL
+            WHEN i.id IS NULL THEN 'Hire not found'
+            WHEN i.interaction_type <> 'hire' THEN 'Not a hire'
+            WHEN i.status IN ('cancelled', 'completed') THEN 'Hire is already ' || i.status
+            ELSE 'Return date is before the hire starts'
+        END::TEXT
+    FROM (SELECT DISTINCT unnest(p_interaction_ids) AS id) req
+    LEFT JOIN interactions.interactions i ON i.id = req.id
+    LEFT JOIN (
+        SELECT r.hire_id, COUNT(*) AS units
+        FROM unnest(v_returned_hire_ids) AS r(hire_id)
+        GROUP BY r.hire_id
+    ) returned ON returned.hire_id = req.id
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS units
+        FROM interactions.interaction_equipment ie
+        WHERE ie.interaction_id = req.id
+          AND ie.allocation_status IN ('allocated', 'qc_pending', 'qc_approved', 'delivered')
+    ) remaining ON true
+    LEFT JOIN LATERAL (
+        SELECT dt.id
+        FROM tasks.drivers_taskboard dt
+        WHERE dt.interaction_id = req.id
+          AND req.id = ANY(v_collect_hire_ids)
+          AND dt.task_type = 'collection'
+          AND dt.status IN ('backlog', 'assigned')
+          AND dt.scheduled_date = p_return_date
+        ORDER BY dt.id DESC
+        LIMIT 1
+    ) task ON true
+    ORDER BY req.id;
+END;
+$$ LANGUAGE plpgsql;
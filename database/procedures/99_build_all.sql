@@ -29,6 +29,58 @@ SET search_path TO core, equipment, interactions, tasks, system, public;
 \echo 'Building hire viewing procedures...'
 \i database/procedures/05_hire_viewing_procedures.sql
 
+-- 6. Change event triggers (LISTEN/NOTIFY push channel)
+\echo 'Building change event triggers...'
+\i database/procedures/06_change_event_triggers.sql
+
+-- 7. Driver taskboard procedures (pre-aggregated counts and board queries)
+\echo 'Building driver taskboard procedures...'
+\i database/procedures/07_taskboard_procedures.sql
+
+-- 8. Equipment search procedures (search index documents and availability checks)
+\echo 'Building equipment search procedures...'
+\i database/procedures/08_equipment_search_procedures.sql
+
+-- 9. Hire document procedures (precomputed hire detail documents)
+\echo 'Building hire document procedures...'
+\i database/procedures/09_hire_document_procedures.sql
+
+-- 10. Bulk data procedures (COPY staging, validation, upsert and exports)
+\echo 'Building bulk data procedures...'
+\i database/procedures/10_bulk_data_procedures.sql
+
+-- 11. Fleet utilization procedures (bulk loaders for the analytics engine)
+\echo 'Building fleet utilization procedures...'
+\i database/procedures/11_utilization_procedures.sql
+
+-- 12. Pricing procedures (cheapest rate mix and billing lines)
+\echo 'Building pricing procedures...'
+\i database/procedures/12_pricing_procedures.sql
+
+-- 13. Unit status procedures (fleet status projection and its triggers)
+\echo 'Building unit status procedures...'
+\i database/procedures/13_unit_status_procedures.sql
+
+-- 14. Allocation queue procedures (pending-allocation work queue, claims and leases)
+\echo 'Building allocation queue procedures...'
+\i database/procedures/14_allocation_queue_procedures.sql
+
+-- 15. Diary procedures (date-range interaction listing)
+\echo 'Building diary procedures...'
+\i database/procedures/15_diary_procedures.sql
+
+-- 16. Audit log procedures (keyset-paginated activity log search)
+\echo 'Building audit log procedures...'
+\i database/procedures/16_audit_log_procedures.sql
+
+-- 17. Allocation period procedures (daterange periods behind the no-double-booking constraint)
+\echo 'Building allocation period procedures...'
+\i database/procedures/17_allocation_period_procedures.sql
+
+-- 18. Off-hire procedures (set-based returns and collection tasks)
+\echo 'Building off-hire procedures...'
+\i database/procedures/18_off_hire_procedures.sql
+
 -- =============================================================================
 -- CREATE VIEWS AND FINALIZE
 -- =============================================================================
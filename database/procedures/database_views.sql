@@ -87,6 +87,8 @@ COMMENT ON VIEW v_accessories_with_equipment IS 'Accessories with summary of whi
 -- =============================================================================
 
 -- View: Hire summary with allocation status
+-- Bookings, allocations and the delivery task are each aggregated to one row per
+-- hire before joining, so a hire's lines never multiply each other's counts
 CREATE OR REPLACE VIEW v_hire_summary AS
 SELECT 
     i.id as interaction_id,
@@ -96,30 +98,49 @@ SELECT
     i.hire_start_date,
     i.hire_end_date,
     i.delivery_date,
-    COUNT(iet.id) as equipment_types_count,
-    SUM(iet.quantity) as total_equipment_booked,
-    COUNT(ie.id) as total_equipment_allocated,
+    COALESCE(bookings.equipment_types_count, 0) as equipment_types_count,
+    COALESCE(bookings.total_equipment_booked, 0) as total_equipment_booked,
+    COALESCE(allocations.total_equipment_allocated, 0) as total_equipment_allocated,
     CASE 
-        WHEN SUM(iet.quantity) = COUNT(ie.id) THEN 'Fully Allocated'
-        WHEN COUNT(ie.id) > 0 THEN 'Partially Allocated'
+        WHEN bookings.total_equipment_booked > 0
+             AND allocations.total_equipment_allocated >= bookings.total_equipment_booked THEN 'Fully Allocated'
+        WHEN allocations.total_equipment_allocated > 0 THEN 'Partially Allocated'
         ELSE 'Not Allocated'
     END as allocation_status,
     dt.status as driver_task_status,
     dt.equipment_allocated,
-    dt.equipment_verified
+    dt.equipment_verified,
+    i.customer_id,
+    i.created_at,
+    COALESCE(bookings.pending_bookings, 0) as pending_bookings
 FROM interactions.interactions i
 JOIN core.customers c ON i.customer_id = c.id
-LEFT JOIN interactions.interaction_equipment_types iet ON i.id = iet.interaction_id
-LEFT JOIN interactions.interaction_equipment ie ON i.id = ie.interaction_id
-LEFT JOIN tasks.drivers_taskboard dt ON i.id = dt.interaction_id
-WHERE i.interaction_type = 'hire'
-GROUP BY 
-    i.id, i.reference_number, i.status, c.customer_name, 
-    i.hire_start_date, i.hire_end_date, i.delivery_date,
-    dt.status, dt.equipment_allocated, dt.equipment_verified
-ORDER BY i.delivery_date DESC, i.created_at DESC;
+LEFT JOIN (
+    SELECT 
+        ieg.interaction_id,
+        COUNT(DISTINCT eg.equipment_type_id) as equipment_types_count,
+        SUM(ieg.quantity) as total_equipment_booked,
+        COUNT(*) FILTER (WHERE ieg.booking_status = 'booked') as pending_bookings
+    FROM interactions.interaction_equipment_generic ieg
+    JOIN equipment.equipment_generic eg ON ieg.equipment_generic_id = eg.id
+    WHERE ieg.booking_status <> 'cancelled'
+    GROUP BY ieg.interaction_id
+) bookings ON bookings.interaction_id = i.id
+LEFT JOIN (
+    SELECT ie.interaction_id, COUNT(*) as total_equipment_allocated
+    FROM interactions.interaction_equipment ie
+    GROUP BY ie.interaction_id
+) allocations ON allocations.interaction_id = i.id
+LEFT JOIN (
+    SELECT DISTINCT ON (interaction_id)
+        interaction_id, status, equipment_allocated, equipment_verified
+    FROM tasks.drivers_taskboard
+    WHERE task_type = 'delivery'
+    ORDER BY interaction_id, created_at DESC, id DESC
+) dt ON dt.interaction_id = i.id
+WHERE i.interaction_type = 'hire';
 
-COMMENT ON VIEW v_hire_summary IS 'Summary view of all hires with allocation and task status';
+COMMENT ON VIEW v_hire_summary IS 'Summary view of all hires with allocation and delivery task status';
 
 -- View: Hire accessories detailed
 CREATE OR REPLACE VIEW v_hire_accessories_detailed AS
@@ -157,6 +178,8 @@ COMMENT ON VIEW v_hire_accessories_detailed IS 'Detailed view of hire accessorie
 -- =============================================================================
 
 -- View: Driver taskboard summary
+-- Equipment counts are stored on the task row (see 07_taskboard_procedures.sql),
+-- so no join to the bookings, no GROUP BY and no sort; callers order and filter.
 CREATE OR REPLACE VIEW v_driver_tasks_summary AS
 SELECT 
     dt.id as task_id,
@@ -177,25 +200,12 @@ SELECT
         THEN (e.name || ' ' || e.surname)
         ELSE 'Unassigned'
     END as assigned_driver,
-    COUNT(iet.id) as equipment_types_count,
-    SUM(iet.quantity) as total_equipment
+    dt.equipment_types_count,
+    dt.total_equipment,
+    dt.assigned_driver_id
 FROM tasks.drivers_taskboard dt
 JOIN interactions.interactions i ON dt.interaction_id = i.id
-LEFT JOIN core.employees e ON dt.assigned_driver_id = e.id
-LEFT JOIN interactions.interaction_equipment_types iet ON i.id = iet.interaction_id
-GROUP BY 
-    dt.id, dt.task_type, dt.status, dt.priority, dt.customer_name,
-    dt.contact_name, dt.contact_phone, dt.scheduled_date, dt.scheduled_time,
-    i.reference_number, i.hire_start_date, dt.equipment_allocated, 
-    dt.equipment_verified, dt.assigned_driver_id, e.name, e.surname
-ORDER BY 
-    dt.scheduled_date, dt.scheduled_time, 
-    CASE dt.priority 
-        WHEN 'urgent' THEN 1 
-        WHEN 'high' THEN 2 
-        WHEN 'medium' THEN 3 
-        ELSE 4 
-    END;
+LEFT JOIN core.employees e ON dt.assigned_driver_id = e.id;
 
 COMMENT ON VIEW v_driver_tasks_summary IS 'Summary view of driver tasks with hire and equipment context';
 
@@ -203,7 +213,7 @@ COMMENT ON VIEW v_driver_tasks_summary IS 'Summary view of driver tasks with hir
 -- EQUIPMENT AVAILABILITY VIEWS
 -- =============================================================================
 
--- View: Equipment availability status
+-- View: Equipment availability status (from the unit status projection)
 CREATE OR REPLACE VIEW v_equipment_availability AS
 SELECT 
     e.id as equipment_id,
@@ -217,31 +227,98 @@ SELECT
     e.location,
     e.last_service_date,
     e.next_service_due,
+    COALESCE(us.next_service_due < CURRENT_DATE, false) as is_overdue_service,
     CASE 
-        WHEN e.next_service_due IS NOT NULL AND e.next_service_due < CURRENT_DATE 
-        THEN true 
-        ELSE false 
-    END as is_overdue_service,
-    CASE 
-        WHEN EXISTS (
-            SELECT 1 FROM interactions.interaction_equipment ie
-            JOIN interactions.interactions i ON ie.interaction_id = i.id
-            WHERE ie.equipment_id = e.id
-            AND i.status NOT IN ('cancelled', 'completed')
-            AND i.hire_end_date >= CURRENT_DATE
-        ) THEN 'On Hire'
-        WHEN e.status = 'available' THEN 'Available'
-        WHEN e.status = 'maintenance' THEN 'In Maintenance'
-        WHEN e.status = 'damaged' THEN 'Damaged'
+        WHEN us.unit_state IN ('allocated', 'on_hire') AND us.current_hire_end < CURRENT_DATE THEN 'Overdue Return'
+        WHEN us.unit_state IN ('allocated', 'on_hire') THEN 'On Hire'
+        WHEN us.unit_state = 'available' THEN 'Available'
+        WHEN us.unit_state = 'maintenance' THEN 'In Maintenance'
+        WHEN us.unit_state = 'repair' THEN 'In Repair'
+        WHEN us.unit_state = 'sold' THEN 'Sold'
         ELSE 'Unknown'
-    END as availability_status
+    END as availability_status,
+    us.unit_state,
+    us.current_interaction_id,
+    us.current_hire_end,
+    us.next_booking_start
 FROM equipment.equipment e
 JOIN equipment.equipment_types et ON e.equipment_type_id = et.id
-WHERE e.is_active = true AND et.is_active = true
+LEFT JOIN equipment.unit_status us ON us.equipment_id = e.id
+WHERE et.is_active = true
 ORDER BY et.type_name, e.asset_code;
 
 COMMENT ON VIEW v_equipment_availability IS 'Current availability status of all equipment units';
 
+-- View: Current fleet utilization per equipment type (legacy dashboard).
+-- Point-in-time only; utilization over periods comes from /api/analytics/utilization.
+CREATE OR REPLACE VIEW v_equipment_utilization AS
+SELECT
+    et.id as equipment_type_id,
+    et.type_code,
+    et.type_name,
+    COUNT(us.equipment_id) as total_units,
+    COUNT(us.equipment_id) FILTER (WHERE us.unit_state = 'available') as available_units,
+    COUNT(us.equipment_id) FILTER (WHERE us.unit_state IN ('allocated', 'on_hire')) as on_hire_units,
+    COUNT(us.equipment_id) FILTER (WHERE us.unit_state IN ('maintenance', 'repair')) as maintenance_units,
+    COALESCE(ROUND(
+        100.0 * COUNT(us.equipment_id) FILTER (WHERE us.unit_state IN ('allocated', 'on_hire'))
+        / NULLIF(COUNT(us.equipment_id), 0), 1
+    ), 0) as utilization_percentage
+FROM equipment.equipment_types et
+LEFT JOIN equipment.unit_status us ON us.equipment_type_id = et.id AND us.unit_state <> 'sold'
+WHERE et.is_active = true
+GROUP BY et.id, et.type_code, et.type_name;
+
+COMMENT ON VIEW v_equipment_utilization IS 'Current units on hire as a share of the fleet, per equipment type';
+
+-- =============================================================================
+-- MATERIALIZED VIEWS
+-- =============================================================================
+
+-- Materialized hire summary for the hire list and dashboards. The API refreshes it
+-- shortly after hire changes and on a schedule (api/hire/summary_refresher.py).
+DROP MATERIALIZED VIEW IF EXISTS mv_hire_summary;
+CREATE MATERIALIZED VIEW mv_hire_summary AS
+SELECT * FROM v_hire_summary;
+
+-- REFRESH ... CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX idx_mv_hire_summary_id ON mv_hire_summary(interaction_id);
+CREATE INDEX idx_mv_hire_summary_delivery ON mv_hire_summary(delivery_date, status);
+CREATE INDEX idx_mv_hire_summary_status ON mv_hire_summary(status, hire_start_date);
+
+COMMENT ON MATERIALIZED VIEW mv_hire_summary IS 'Materialized v_hire_summary, refreshed concurrently by sp_refresh_hire_summary';
+
+-- Refresh mv_hire_summary without blocking readers. Every API worker hears the same
+-- change events, so a refresh is skipped ('current') when one that started after
+-- p_changed_since has already run, and ('busy') when another session is refreshing.
+CREATE OR REPLACE FUNCTION sp_refresh_hire_summary(p_changed_since TIMESTAMP WITH TIME ZONE DEFAULT NULL)
+RETURNS VARCHAR(10) AS $$
+DECLARE
+    v_started TIMESTAMP WITH TIME ZONE;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('mv_hire_summary')) THEN
+        RETURN 'busy';
+    END IF;
+
+    IF p_changed_since IS NOT NULL AND EXISTS (
+        SELECT 1 FROM system.view_refreshes
+        WHERE view_name = 'mv_hire_summary' AND started_at > p_changed_since
+    ) THEN
+        RETURN 'current';
+    END IF;
+
+    v_started := clock_timestamp();
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_hire_summary;
+
+    INSERT INTO system.view_refreshes (view_name, started_at, duration_ms)
+    VALUES ('mv_hire_summary', v_started, EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000)
+    ON CONFLICT (view_name) DO UPDATE
+    SET started_at = EXCLUDED.started_at, duration_ms = EXCLUDED.duration_ms;
+
+    RETURN 'refreshed';
+END;
+$$ LANGUAGE plpgsql;
+
 -- =============================================================================
 -- VIEW PERMISSIONS
 -- =============================================================================
@@ -253,9 +330,11 @@ GRANT SELECT ON v_equipment_default_accessories TO PUBLIC;
 GRANT SELECT ON v_equipment_all_accessories TO PUBLIC;
 GRANT SELECT ON v_accessories_with_equipment TO PUBLIC;
 GRANT SELECT ON v_hire_summary TO PUBLIC;
+GRANT SELECT ON mv_hire_summary TO PUBLIC;
 GRANT SELECT ON v_hire_accessories_detailed TO PUBLIC;
 GRANT SELECT ON v_driver_tasks_summary TO PUBLIC;
 GRANT SELECT ON v_equipment_availability TO PUBLIC;
+GRANT SELECT ON v_equipment_utilization TO PUBLIC;
 
 \echo 'Database views created successfully!'
 \echo '==================================================================='
@@ -264,7 +343,9 @@ GRANT SELECT ON v_equipment_availability TO PUBLIC;
 \echo '- v_equipment_all_accessories: All equipment-accessory relationships'
 \echo '- v_accessories_with_equipment: Accessories with equipment context'
 \echo '- v_hire_summary: Hire summary with allocation status'
+\echo '- mv_hire_summary: Materialized hire summary (sp_refresh_hire_summary)'
 \echo '- v_hire_accessories_detailed: Detailed hire accessories'
 \echo '- v_driver_tasks_summary: Driver taskboard summary'
-\echo '- v_equipment_availability: Equipment availability status'
+\echo '- v_equipment_availability: Equipment availability status (from equipment.unit_status)'
+\echo '- v_equipment_utilization: Current fleet utilization per equipment type'
 \echo '==================================================================='
\ No newline at end of file